@@ -0,0 +1 @@
+"""Benchmark delle query del backend"""
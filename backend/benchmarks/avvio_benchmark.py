@@ -0,0 +1,100 @@
+"""Benchmark dell'avvio dell'API: tempi di import e tempo alla prima richiesta
+
+Ogni misura gira in un interprete nuovo, come un avvio reale o un reload di
+uvicorn:
+- import: `python -X importtime -c "import backend.main"`, con il totale e
+  i moduli più lenti (tempo cumulativo, figli compresi);
+- prima richiesta: import, create_app(), lifespan (init_db su un database
+  temporaneo già aggiornato) e GET /api/conti, misurati dall'esterno.
+
+Con --soglia-ms termina con codice 1 se la mediana del tempo alla prima
+richiesta supera la soglia (uso in CI).
+
+Uso (dalla root del progetto):
+    python -m backend.benchmarks.avvio_benchmark --ripetizioni 5 --moduli 15
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+_PRIMA_RICHIESTA = """
+from fastapi.testclient import TestClient
+from backend.main import create_app
+
+with TestClient(create_app()) as client:
+    assert client.get("/api/conti").status_code == 200
+"""
+
+
+def _esegui(argomenti: List[str], env: Dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *argomenti],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def tempi_import(env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    """(modulo, µs propri, µs cumulativi) da -X importtime, in ordine di import"""
+    risultato = _esegui(["-X", "importtime", "-c", "import backend.main"], env)
+    moduli = []
+    for riga in risultato.stderr.splitlines():
+        if not riga.startswith("import time:") or "self [us]" in riga:
+            continue
+        proprio, cumulativo, nome = riga[len("import time:"):].split("|")
+        moduli.append((nome.strip(), int(proprio), int(cumulativo)))
+    return moduli
+
+
+def tempo_prima_richiesta(env: Dict[str, str]) -> float:
+    """Millisecondi dall'avvio dell'interprete alla risposta della prima richiesta"""
+    inizio = time.perf_counter()
+    _esegui(["-c", _PRIMA_RICHIESTA], env)
+    return (time.perf_counter() - inizio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--moduli", type=int, default=15, help="Moduli più lenti da mostrare")
+    parser.add_argument("--soglia-ms", type=float, default=None, help="Mediana massima della prima richiesta")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cartella:
+        env = dict(os.environ, DB_PATH=os.path.join(cartella, "avvio.db"))
+
+        moduli = tempi_import(env)
+        totale = next((cumulativo for nome, _, cumulativo in moduli if nome == "backend.main"), 0)
+        print(f"import backend.main: {totale / 1000:.1f} ms")
+        print(f"{'cumulativo ms':>14} {'proprio ms':>11}  modulo")
+        for nome, proprio, cumulativo in sorted(moduli, key=lambda m: m[2], reverse=True)[:args.moduli]:
+            print(f"{cumulativo / 1000:>14.1f} {proprio / 1000:>11.1f}  {nome}")
+
+        caricati = {nome for nome, _, _ in moduli}
+        for pesante in ("numpy", "pandas", "uvicorn"):
+            print(f"{pesante}: {'importato' if pesante in caricati else 'non importato'}")
+
+        # Primo avvio: crea schema, migrations e seed (non misurato)
+        primo = tempo_prima_richiesta(env)
+        print(f"\nprimo avvio (creazione database): {primo:.0f} ms")
+
+        tempi = [tempo_prima_richiesta(env) for _ in range(args.ripetizioni)]
+        mediana = statistics.median(tempi)
+        print(f"prima richiesta, database aggiornato: p50 {mediana:.0f} ms, "
+              f"min {min(tempi):.0f} ms, max {max(tempi):.0f} ms ({args.ripetizioni} avvii)")
+
+    if args.soglia_ms is not None and mediana > args.soglia_ms:
+        print(f"✗ mediana {mediana:.0f} ms oltre la soglia di {args.soglia_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Benchmark di /analytics/dashboard: query unica contro le otto query precedenti
+
+Crea un database temporaneo con N movimenti distribuiti su più anni e
+misura la latenza (p50/p99) delle due implementazioni sullo stesso periodo.
+
+Uso (dalla root del progetto):
+    python -m backend.benchmarks.dashboard_benchmark --righe 1000000 --ripetizioni 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from calendar import monthrange
+from datetime import date, timedelta
+
+from .. import database
+from ..database import dict_from_row, get_db_connection
+
+
+def dashboard_legacy(conn, primo_giorno: date, ultimo_giorno: date) -> dict:
+    """Implementazione precedente: otto statement separati"""
+    cursor = conn.cursor()
+    periodo = (primo_giorno.isoformat(), ultimo_giorno.isoformat())
+
+    cursor.execute("SELECT SUM(saldo) FROM conti WHERE attivo = 1")
+    patrimonio_totale = cursor.fetchone()[0] or 0.0
+
+    cursor.execute(
+        """
+        SELECT COALESCE(SUM(importo), 0) FROM movimenti
+        WHERE tipo = 'entrata' AND data_giorno >= ? AND data_giorno <= ?
+        """,
+        periodo
+    )
+    entrate = cursor.fetchone()[0] or 0.0
+
+    cursor.execute(
+        """
+        SELECT COALESCE(SUM(importo), 0) FROM movimenti
+        WHERE tipo = 'uscita' AND data_giorno >= ? AND data_giorno <= ?
+        """,
+        periodo
+    )
+    uscite = cursor.fetchone()[0] or 0.0
+
+    cursor.execute(
+        """
+        SELECT c.nome, c.icona, c.colore, SUM(m.importo) as totale
+        FROM movimenti m
+        JOIN categorie c ON m.categoria_id = c.id
+        WHERE m.tipo = 'uscita' AND m.data_giorno >= ? AND m.data_giorno <= ?
+        GROUP BY c.id, c.nome, c.icona, c.colore
+        ORDER BY totale DESC
+        LIMIT 10
+        """,
+        periodo
+    )
+    spese_per_categoria = [dict_from_row(row) for row in cursor.fetchall()]
+
+    cursor.execute(
+        """
+        SELECT m.*, c.nome as categoria_nome, c.icona as categoria_icona, co.nome as conto_nome
+        FROM movimenti m
+        LEFT JOIN categorie c ON m.categoria_id = c.id
+        LEFT JOIN conti co ON m.conto_id = co.id
+        ORDER BY m.data DESC
+        LIMIT 10
+        """
+    )
+    ultimi_movimenti = [dict_from_row(row) for row in cursor.fetchall()]
+
+    cursor.execute(
+        """
+        SELECT id, nome, importo_target, importo_attuale, data_target, priorita,
+               ROUND((importo_attuale * 100.0) / importo_target, 1) as percentuale_completamento
+        FROM obiettivi_risparmio
+        WHERE completato = 0
+        ORDER BY priorita DESC, data_target ASC
+        LIMIT 5
+        """
+    )
+    obiettivi = [dict_from_row(row) for row in cursor.fetchall()]
+
+    cursor.execute("SELECT id, nome, tipo, saldo, valuta FROM conti WHERE attivo = 1 ORDER BY saldo DESC")
+    conti_attivi = [dict_from_row(row) for row in cursor.fetchall()]
+
+    return {
+        "kpi": {
+            "patrimonio_totale": round(patrimonio_totale, 2),
+            "entrate_mese": round(entrate, 2),
+            "uscite_mese": round(uscite, 2),
+            "saldo_mese": round(entrate - uscite, 2)
+        },
+        "spese_per_categoria": spese_per_categoria,
+        "ultimi_movimenti": ultimi_movimenti,
+        "obiettivi_risparmio": obiettivi,
+        "conti_attivi": conti_attivi
+    }
+
+
+def popola(righe: int, anni: int = 5, seed: int = 42):
+    """Inserisce `righe` movimenti casuali negli ultimi `anni` anni"""
+    rnd = random.Random(seed)
+    oggi = date.today()
+    giorni = anni * 365
+
+    with get_db_connection() as conn:
+        conti = [r[0] for r in conn.execute("SELECT id FROM conti")]
+        uscite = [r[0] for r in conn.execute("SELECT id FROM categorie WHERE tipo = 'uscita'")]
+        entrate = [r[0] for r in conn.execute("SELECT id FROM categorie WHERE tipo = 'entrata'")]
+
+        def genera():
+            for _ in range(righe):
+                giorno = oggi - timedelta(days=rnd.randrange(giorni))
+                if rnd.random() < 0.15:
+                    yield (giorno.isoformat(), round(rnd.uniform(500, 3000), 2), 'entrata',
+                           rnd.choice(entrate), rnd.choice(conti), 'Entrata benchmark')
+                else:
+                    yield (giorno.isoformat(), round(rnd.uniform(1, 300), 2), 'uscita',
+                           rnd.choice(uscite), rnd.choice(conti), 'Spesa benchmark')
+
+        conn.executemany(
+            """
+            INSERT INTO movimenti (data, importo, tipo, categoria_id, conto_id, descrizione)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            genera()
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+
+
+def misura(funzione, ripetizioni: int) -> list:
+    """Esegue la funzione `ripetizioni` volte e restituisce le latenze in ms"""
+    funzione()  # riscaldamento cache
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        funzione()
+        tempi.append((time.perf_counter() - inizio) * 1000)
+    return tempi
+
+
+def percentili(tempi: list) -> tuple:
+    """p50 e p99 in millisecondi"""
+    quantili = statistics.quantiles(tempi, n=100, method='inclusive')
+    return statistics.median(tempi), quantili[98]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--righe", type=int, default=1_000_000)
+    parser.add_argument("--ripetizioni", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    from ..routes.analytics import dashboard_summary
+    dashboard = dashboard_summary.__wrapped__
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "benchmark.db")
+        database.init_db()
+
+        inizio = time.perf_counter()
+        popola(args.righe)
+        print(f"\n{args.righe:,} movimenti inseriti in {time.perf_counter() - inizio:.1f}s\n")
+
+        oggi = date.today()
+        periodi = {
+            "mese corrente": (date(oggi.year, oggi.month, 1),
+                              date(oggi.year, oggi.month, monthrange(oggi.year, oggi.month)[1])),
+            "ultimi 90 giorni": (oggi - timedelta(days=90), oggi),
+            "ultimo anno": (oggi - timedelta(days=365), oggi),
+        }
+
+        print(f"{'periodo':<20}{'implementazione':<18}{'p50 ms':>10}{'p99 ms':>10}")
+        for nome, (da, a) in periodi.items():
+            def legacy():
+                with get_db_connection() as conn:
+                    return dashboard_legacy(conn, da, a)
+
+            def singola():
+                return dashboard(data_da=da.isoformat(), data_a=a.isoformat())
+
+            atteso, ottenuto = legacy()["kpi"], singola()["kpi"]
+            if atteso != ottenuto:
+                print(f"KPI diversi per {nome}: {atteso} != {ottenuto}")
+                return 1
+
+            for etichetta, funzione in (("8 query", legacy), ("query unica", singola)):
+                p50, p99 = percentili(misura(funzione, args.ripetizioni))
+                print(f"{nome:<20}{etichetta:<18}{p50:>10.2f}{p99:>10.2f}")
+
+        database.close_pool()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
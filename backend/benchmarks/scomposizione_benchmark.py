@@ -0,0 +1,62 @@
+"""Benchmark della scomposizione costi: calcolo singolo contro varianti batch
+
+Calcola la scomposizione di N viaggi e N periodi di utilizzo prima con una
+chiamata per scenario, poi con una sola chiamata batch, e verifica che i
+totali coincidano.
+
+Uso (dalla root del progetto):
+    python -m backend.benchmarks.scomposizione_benchmark --scenari 100000
+"""
+
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+
+from ..services.calcolatore_costi import CalcolatoreElettrodomestico, CalcolatoreVeicolo
+
+
+def _misura(funzione):
+    inizio = time.perf_counter()
+    risultato = funzione()
+    return risultato, time.perf_counter() - inizio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenari", type=int, default=100000)
+    args = parser.parse_args()
+
+    generatore = np.random.default_rng(0)
+    n = args.scenari
+
+    auto = CalcolatoreVeicolo("Auto", "benzina", 5.5, 0.08, 12000.0, date(2020, 1, 1))
+    km = np.round(generatore.uniform(1, 900, n), 1)
+    prezzi = np.round(generatore.uniform(1.4, 2.3, n), 3)
+    giorni = np.datetime64(auto.data_acquisto, 'D') + generatore.integers(0, 2500, n)
+
+    batch, durata_batch = _misura(lambda: auto.calcola_costi_viaggi(km, prezzi, giorni))
+    singoli, durata_singoli = _misura(lambda: [
+        auto.calcola_costo_viaggio(k, p, g)
+        for k, p, g in zip(km.tolist(), prezzi.tolist(), giorni.tolist())
+    ])
+    assert batch.importo_totale.tolist() == [r.importo_totale for r in singoli]
+    print(f"viaggi:  singoli {durata_singoli * 1000:.0f} ms, batch {durata_batch * 1000:.1f} ms "
+          f"({durata_singoli / durata_batch:.0f}x)")
+
+    frigo = CalcolatoreElettrodomestico("Frigo", 150, 24, 600.0, date(2023, 1, 1))
+    periodi = generatore.integers(1, 400, n)
+    prezzi_kwh = np.round(generatore.uniform(0.08, 0.45, n), 4)
+
+    batch, durata_batch = _misura(lambda: frigo.calcola_costi_periodi(periodi, prezzi_kwh))
+    singoli, durata_singoli = _misura(lambda: [
+        frigo.calcola_costo_periodo(g, p) for g, p in zip(periodi.tolist(), prezzi_kwh.tolist())
+    ])
+    assert batch.importo_totale.tolist() == [r.importo_totale for r in singoli]
+    print(f"periodi: singoli {durata_singoli * 1000:.0f} ms, batch {durata_batch * 1000:.1f} ms "
+          f"({durata_singoli / durata_batch:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,341 @@
 
 import sqlite3
 import os
+import queue
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from contextlib import contextmanager
 
+from .migrazioni import applica_migrazioni
+
 DB_PATH = os.getenv("DB_PATH", "data/lume.db")
 
+# Configurazione pool di connessioni
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# PRAGMA applicati a ogni nuova connessione del pool
+PRAGMA_CONNESSIONE = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA mmap_size = {int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+    f"PRAGMA cache_size = {int(os.getenv('DB_CACHE_SIZE', '-16000'))}",  # negativo = KiB
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+class ConnectionPool:
+    """Pool di connessioni SQLite pre-configurate e riutilizzabili.
+
+    Le connessioni vengono create pigramente fino a `size`, configurate una
+    sola volta con i PRAGMA di `PRAGMA_CONNESSIONE` e riconsegnate al pool
+    a fine richiesta invece di essere chiuse.
+    """
+
+    def __init__(self, db_path: str, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        if size < 1:
+            raise ValueError("La dimensione del pool deve essere almeno 1")
+
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._aperte = 0
+        self._chiuso = False
+
+        # Statistiche
+        self._richieste = 0
+        self._riutilizzi = 0
+        self._create = 0
+        self._scartate = 0
+        self._attese = 0
+        self._timeout = 0
+        self._in_uso = 0
+        self._picco_in_uso = 0
+        self._tempo_attesa_totale = 0.0
+
+    def _connetti(self) -> sqlite3.Connection:
+        """Apre e configura una nuova connessione"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMA_CONNESSIONE:
+            conn.execute(pragma)
+        return conn
+
+    @staticmethod
+    def _is_sana(conn: sqlite3.Connection) -> bool:
+        """Health check leggero su una connessione"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _scarta(self, conn: sqlite3.Connection):
+        """Chiude una connessione e libera il suo slot"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._aperte -= 1
+            self._scartate += 1
+
+    def acquire(self) -> sqlite3.Connection:
+        """Ottiene una connessione sana dal pool (bloccante fino a `timeout`)"""
+        if self._chiuso:
+            raise sqlite3.ProgrammingError("Il pool di connessioni è chiuso")
+
+        with self._lock:
+            self._richieste += 1
+
+        while True:
+            conn = None
+            nuova = False
+
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    if self._aperte < self.size:
+                        self._aperte += 1
+                        nuova = True
+
+                if nuova:
+                    try:
+                        conn = self._connetti()
+                    except Exception:
+                        with self._lock:
+                            self._aperte -= 1
+                        raise
+                    with self._lock:
+                        self._create += 1
+                else:
+                    inizio = time.perf_counter()
+                    with self._lock:
+                        self._attese += 1
+                    try:
+                        conn = self._idle.get(timeout=self.timeout)
+                    except queue.Empty:
+                        with self._lock:
+                            self._timeout += 1
+                        raise sqlite3.OperationalError(
+                            f"Pool di connessioni esaurito: nessuna connessione libera entro {self.timeout}s"
+                        )
+                    finally:
+                        with self._lock:
+                            self._tempo_attesa_totale += time.perf_counter() - inizio
+
+            if not nuova:
+                if not self._is_sana(conn):
+                    self._scarta(conn)
+                    continue
+                with self._lock:
+                    self._riutilizzi += 1
+
+            with self._lock:
+                self._in_uso += 1
+                self._picco_in_uso = max(self._picco_in_uso, self._in_uso)
+
+            return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Riconsegna una connessione al pool annullando transazioni pendenti"""
+        with self._lock:
+            self._in_uso -= 1
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._scarta(conn)
+            return
+
+        if self._chiuso:
+            self._scarta(conn)
+            return
+
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager che presta una connessione del pool"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def health_check(self) -> bool:
+        """Verifica che il database risponda con una connessione del pool"""
+        try:
+            with self.connection() as conn:
+                return self._is_sana(conn)
+        except sqlite3.Error:
+            return False
+
+    def stats(self) -> dict:
+        """Statistiche di utilizzo del pool"""
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "dimensione": self.size,
+                "aperte": self._aperte,
+                "libere": self._idle.qsize(),
+                "in_uso": self._in_uso,
+                "picco_in_uso": self._picco_in_uso,
+                "richieste": self._richieste,
+                "riutilizzi": self._riutilizzi,
+                "create": self._create,
+                "scartate": self._scartate,
+                "attese": self._attese,
+                "timeout": self._timeout,
+                "tempo_attesa_medio_ms": round(
+                    (self._tempo_attesa_totale / self._attese) * 1000, 3
+                ) if self._attese else 0.0
+            }
+
+    def close(self):
+        """Chiude tutte le connessioni libere; quelle in uso vengono chiuse al rilascio"""
+        self._chiuso = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._scarta(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Restituisce il pool globale, creandolo al primo utilizzo"""
+    global _pool
+
+    if _pool is None or _pool.db_path != DB_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.db_path != DB_PATH:
+                if _pool is not None:
+                    _pool.close()
+                _pool = ConnectionPool(DB_PATH)
+
+    return _pool
+
+
+def close_pool():
+    """Chiude il pool globale (shutdown applicazione o test)"""
+    global _pool, _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Thread pool su cui gira il lavoro SQLite bloccante.
+
+    Ha tanti worker quante connessioni nel pool: ogni worker può sempre
+    ottenere una connessione e la concorrenza scala con DB_POOL_SIZE.
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_pool().size,
+                    thread_name_prefix="lume-db"
+                )
+
+    return _executor
+
+
+async def run_in_db(func, *args, **kwargs):
+    """Esegue `func(conn, *args, **kwargs)` sul thread pool con una connessione del pool"""
+    def job():
+        with get_db_connection() as conn:
+            return func(conn, *args, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), job)
+
+
+def _fetch_one(conn, query: str, params):
+    row = conn.execute(query, params).fetchone()
+    return dict_from_row(row) if row else None
+
+
+def _fetch_all(conn, query: str, params):
+    return [dict_from_row(row) for row in conn.execute(query, params).fetchall()]
+
+
+def _execute(conn, query: str, params) -> dict:
+    cursor = conn.execute(query, params)
+    conn.commit()
+    return {"lastrowid": cursor.lastrowid, "rowcount": cursor.rowcount}
+
+
+async def fetch_one(query: str, params=()):
+    """Esegue una SELECT fuori dall'event loop e restituisce la prima riga come dict (o None)"""
+    return await run_in_db(_fetch_one, query, params)
+
+
+async def fetch_all(query: str, params=()):
+    """Esegue una SELECT fuori dall'event loop e restituisce tutte le righe come dict"""
+    return await run_in_db(_fetch_all, query, params)
+
+
+async def execute(query: str, params=()) -> dict:
+    """Esegue una scrittura fuori dall'event loop, con commit"""
+    return await run_in_db(_execute, query, params)
+
+
+def db_endpoint(func):
+    """Decoratore per handler sincroni che usano il database.
+
+    L'handler viene eseguito sul thread pool del database invece che
+    sull'event loop; FastAPI continua a leggere la firma originale.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(), functools.partial(func, *args, **kwargs)
+        )
+
+    return wrapper
+
+
+def pool_stats() -> dict:
+    """Statistiche del pool globale con esito dell'health check"""
+    pool = get_pool()
+    return {**pool.stats(), "sano": pool.health_check()}
+
 
 @contextmanager
 def get_db_connection():
-    """Context manager per connessione database"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
+    """Context manager per connessione database (presa in prestito dal pool)"""
+    with get_pool().connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 def dict_from_row(row):
@@ -25,60 +345,26 @@ def dict_from_row(row):
 
 
 def init_db():
-    """Inizializza il database con schema e seed data"""
-    # Crea directory data se non esiste
-    Path("data").mkdir(exist_ok=True)
-    
+    """Inizializza il database con schema, migrations e seed data
+
+    Con il database già aggiornato esegue una sola query (vedi migrazioni.py).
+    """
+    # Crea directory del database se non esiste
+    Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+
     with get_db_connection() as conn:
-        # Verifica se database esiste e ha tabelle
-        cursor = conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='conti'"
-        )
-        db_exists = cursor.fetchone() is not None
-        
-        if not db_exists:
-            # Database nuovo, esegui schema completo
-            print("Creating new database...")
-            with open("database/schema.sql", encoding='utf-8') as f:
-                conn.executescript(f.read())
+        esito = applica_migrazioni(conn)
+
+        if esito is None:
+            print("✓ Database up to date, no migrations to apply")
+            return
+
+        if esito['schema_creato']:
             print("  ✓ Schema created")
-        else:
-            print("Database already exists, skipping schema")
-        
-        # Esegui migrations se esistono
-        migrations_dir = Path("database/migrations")
-        if migrations_dir.exists():
-            migration_files = sorted(migrations_dir.glob("*.sql"))
-            for migration_file in migration_files:
-                print(f"Executing migration: {migration_file.name}")
-                try:
-                    with open(migration_file, encoding='utf-8') as f:
-                        conn.executescript(f.read())
-                    print(f"  ✓ {migration_file.name} completed")
-                except sqlite3.OperationalError as e:
-                    error_msg = str(e).lower()
-                    # Ignora errori per elementi già esistenti
-                    if any(phrase in error_msg for phrase in [
-                        "duplicate column name",
-                        "already exists",
-                        "table", 
-                        "index"
-                    ]):
-                        print(f"  → {migration_file.name} already applied")
-                    else:
-                        print(f"  ✗ Error in {migration_file.name}: {e}")
-                        raise
-        
-        # Verifica se database è vuoto (nessun dato)
-        cursor = conn.execute("SELECT COUNT(*) FROM conti")
-        if cursor.fetchone()[0] == 0:
-            # Esegui seed solo se vuoto
-            print("Database is empty, loading seed data...")
-            with open("database/seed_data.sql", encoding='utf-8') as f:
-                conn.executescript(f.read())
+        for migrazione in esito['migrazioni']:
+            stato = "already applied" if migrazione['gia_presente'] else "completed"
+            print(f"  ✓ {migrazione['nome']} {stato} ({migrazione['durata_ms']} ms)")
+        if esito['seed']:
             print("  ✓ Seed data loaded")
-        else:
-            print("Database has data, skipping seed")
-        
-        conn.commit()
+
         print("✓ Database initialized successfully")
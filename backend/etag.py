@@ -0,0 +1,94 @@
+"""ETag e GET condizionali per gli endpoint di lettura
+
+L'ETag di una risposta è un hash di percorso, parametri, giorno corrente e
+versioni delle tabelle da cui l'endpoint legge (contatori della migration
+015, più l'identità del database della migration 016). Si calcola con una
+lettura per chiave primaria, prima di eseguire l'handler: se il client
+invia lo stesso valore in If-None-Match la risposta è un 304 senza corpo e
+nessuna query pesante viene eseguita.
+
+Le tabelle di ogni gruppo di endpoint sono in TABELLE_PER_PERCORSO; i
+percorsi non elencati (o esclusi) non ricevono ETag. Le tabelle derivate da
+movimenti (aggregato mensile, variazioni giornaliere, indice full-text,
+componenti dei costi) non hanno un contatore proprio: le loro ricostruzioni
+incrementano la versione di movimenti.
+"""
+
+import hashlib
+from datetime import date
+from typing import Optional, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .database import run_in_db
+from .services.versioni import TABELLE_VERSIONATE, leggi_versioni
+
+# Prefisso del percorso -> tabelle lette dagli endpoint GET sotto di esso
+TABELLE_PER_PERCORSO = {
+    '/api/conti': ('conti', 'movimenti', 'categorie'),
+    '/api/movimenti': ('movimenti', 'categorie', 'conti', 'beni', 'budget', 'obiettivi_risparmio'),
+    '/api/analytics': TABELLE_VERSIONATE,
+    '/api/beni': ('beni', 'movimenti', 'categorie', 'conti'),
+    '/api/budget': ('budget', 'categorie', 'movimenti'),
+    '/api/obiettivi': ('obiettivi_risparmio', 'movimenti', 'categorie', 'conti'),
+    '/api/categorie': ('categorie', 'budget', 'movimenti', 'movimenti_ricorrenti'),
+    '/api/ricorrenze': ('movimenti_ricorrenti', 'categorie', 'conti'),
+}
+
+# Percorsi esclusi: risposte in streaming o con contenuto dipendente dall'ora
+PERCORSI_ESCLUSI = ('/api/movimenti/export',)
+
+# Il client può riusare la copia ma deve sempre rivalidarla
+CACHE_CONTROL = 'private, no-cache'
+
+
+def tabelle_per_percorso(percorso: str) -> Optional[Tuple[str, ...]]:
+    """Tabelle da cui dipende un percorso (None se senza ETag)"""
+    if percorso.startswith(PERCORSI_ESCLUSI):
+        return None
+    for prefisso, tabelle in TABELLE_PER_PERCORSO.items():
+        if percorso == prefisso or percorso.startswith(prefisso + '/'):
+            return ('_database',) + tuple(tabelle)
+    return None
+
+
+def calcola_etag(percorso: str, query: str, versioni: tuple, giorno: str) -> str:
+    """ETag forte di una risposta: i parametri sono normalizzati per ordine"""
+    parametri = sorted(parse_qsl(query, keep_blank_values=True))
+    chiave = f"{percorso}|{parametri}|{versioni}|{giorno}"
+    return '"' + hashlib.blake2b(chiave.encode('utf-8'), digest_size=16).hexdigest() + '"'
+
+
+def corrisponde(if_none_match: Optional[str], etag: str) -> bool:
+    """Confronto debole di If-None-Match con l'ETag (RFC 9110)"""
+    if not if_none_match:
+        return False
+    for valore in if_none_match.split(','):
+        valore = valore.strip()
+        if valore == '*' or valore.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+async def etag_middleware(request: Request, call_next):
+    """Middleware HTTP: 304 se il client ha già la versione corrente"""
+    if request.method not in ('GET', 'HEAD'):
+        return await call_next(request)
+
+    tabelle = tabelle_per_percorso(request.url.path)
+    if tabelle is None:
+        return await call_next(request)
+
+    versioni = await run_in_db(leggi_versioni, tabelle)
+    etag = calcola_etag(request.url.path, request.url.query, versioni, date.today().isoformat())
+
+    if corrisponde(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': CACHE_CONTROL})
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers['ETag'] = etag
+        response.headers.setdefault('Cache-Control', CACHE_CONTROL)
+    return response
@@ -1,56 +1,94 @@
+"""Applicazione FastAPI
+
+L'app è costruita da create_app() e l'import del modulo non ha effetti sul
+database: init_db() gira nel lifespan, all'avvio del server, e non a ogni
+import (test, script, reload di uvicorn). I moduli pesanti usati da un solo
+endpoint (numpy per /analytics/forecast) sono importati al primo utilizzo.
+
+Per misurare i tempi di avvio: python -m backend.benchmarks.avvio_benchmark
+"""
+
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-
-from .routes import conti, movimenti, analytics, beni, budget, obiettivi, categorie, ricorrenze
-from .database import init_db
-
-app = FastAPI(
-    title="Lume Finance API",
-    description="API per gestione finanze personali",
-    version="0.1.0"
-)
-
-# CORS per development e Capacitor mobile
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",  # Vite dev server
-        "http://localhost",        # Capacitor Android/iOS
-        "capacitor://localhost",   # Capacitor iOS
-        "ionic://localhost",       # Ionic
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Inizializza database
-init_db()
-
-# Registra routes
-app.include_router(conti.router, prefix="/api")
-app.include_router(movimenti.router, prefix="/api")
-app.include_router(analytics.router, prefix="/api")
-app.include_router(beni.router, prefix="/api")
-app.include_router(budget.router, prefix="/api")
-app.include_router(obiettivi.router, prefix="/api")
-app.include_router(categorie.router, prefix="/api")
-app.include_router(ricorrenze.router, prefix="/api")  # Sprint 4: Ricorrenze
-
-
-@app.get("/")
-async def root():
-    return {
-        "app": "Lume Finance",
-        "version": "0.1.0",
-        "status": "running"
-    }
+
+from .routes import conti, movimenti, analytics, beni, budget, obiettivi, categorie, ricorrenze, sync
+from .database import init_db, close_pool, pool_stats
+from .etag import etag_middleware
+
+ROUTERS = (conti, movimenti, analytics, beni, budget, obiettivi, categorie, ricorrenze, sync)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Inizializza database (una sola query se già aggiornato)
+    init_db()
+    yield
+    # Chiude le connessioni del pool allo spegnimento
+    close_pool()
+
+
+def create_app() -> FastAPI:
+    """Costruisce l'app con middleware e routes"""
+    app = FastAPI(
+        title="Lume Finance API",
+        description="API per gestione finanze personali",
+        version="0.1.0",
+        lifespan=lifespan
+    )
+
+    # CORS per development e Capacitor mobile
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:3000",  # Vite dev server
+            "http://localhost",        # Capacitor Android/iOS
+            "capacitor://localhost",   # Capacitor iOS
+            "ionic://localhost",       # Ionic
+        ],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # ETag e 304 per gli endpoint GET (If-None-Match)
+    app.middleware("http")(etag_middleware)
+
+    # Registra routes (ricorrenze: Sprint 4)
+    for modulo in ROUTERS:
+        app.include_router(modulo.router, prefix="/api")
+
+    @app.get("/")
+    async def root():
+        return {
+            "app": "Lume Finance",
+            "version": "0.1.0",
+            "status": "running"
+        }
+
+    @app.get("/api/health/db")
+    async def health_db():
+        """Stato e statistiche del pool di connessioni"""
+        return pool_stats()
+
+    @app.get("/api/health/cache")
+    async def health_cache():
+        """Statistiche della cache delle risposte analytics"""
+        return analytics.cache_analytics.stats()
+
+    return app
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(
-        "backend.main:app",
+        "backend.main:create_app",
+        factory=True,
         host="0.0.0.0",
         port=8000,
         reload=True
@@ -0,0 +1,180 @@
+"""Esecuzione delle migrations con registro schema_migrations
+
+Ogni file di database/migrations viene eseguito una sola volta e registrato
+in schema_migrations con checksum e durata. All'avvio un'unica query
+confronta i nomi registrati con quelli presenti nella cartella: se coincidono
+(e il database ha già schema e dati iniziali) non viene letto nessun file
+SQL, per cui il tempo di avvio non dipende dal numero di migrations.
+
+Le migrations da applicare vengono eseguite istruzione per istruzione dentro
+una transazione BEGIN IMMEDIATE: un secondo processo che parte insieme
+aspetta il lock, poi trova tutto registrato e non esegue nulla, e un errore
+a metà annulla la migration invece di lasciarla applicata a metà.
+
+Convenzione dei file (invariata): la prima istruzione non è idempotente
+(CREATE TABLE, ALTER TABLE ADD COLUMN). Se fallisce perché l'oggetto esiste
+già, la migration era già stata applicata (database creati prima del
+registro, o colonne già presenti in schema.sql) e il resto del file viene
+saltato; la migration viene comunque registrata.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+SCHEMA_PATH = Path("database/schema.sql")
+SEED_PATH = Path("database/seed_data.sql")
+MIGRATIONS_DIR = Path("database/migrations")
+
+# Errori che indicano una migration già applicata
+ERRORI_GIA_APPLICATA = ("duplicate column name", "already exists")
+
+# Attesa massima (ms) del lock se un altro processo sta applicando migrations
+TIMEOUT_LOCK_MS = int(os.getenv("DB_MIGRATIONS_LOCK_TIMEOUT", "300000"))
+
+_CREA_REGISTRO = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        nome TEXT PRIMARY KEY,
+        checksum TEXT NOT NULL,
+        applicata_il TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        durata_ms REAL NOT NULL,
+        gia_presente BOOLEAN NOT NULL DEFAULT 0
+    )
+"""
+
+
+def leggi_sql(percorso: Path) -> str:
+    return percorso.read_text(encoding='utf-8')
+
+
+def calcola_checksum(testo: str) -> str:
+    return hashlib.sha256(testo.encode('utf-8')).hexdigest()
+
+
+def istruzioni(script: str) -> Iterator[str]:
+    """Singole istruzioni di uno script SQL (i trigger BEGIN ... END restano interi)"""
+    corrente = ""
+    for riga in script.splitlines(keepends=True):
+        corrente += riga
+        if sqlite3.complete_statement(corrente):
+            yield corrente.strip()
+            corrente = ""
+
+    # Resto senza istruzioni complete (solo commenti o spazi)
+    resto = "\n".join(
+        riga for riga in corrente.splitlines() if not riga.strip().startswith("--")
+    ).strip()
+    if resto:
+        yield resto
+
+
+def migrazioni_su_disco(cartella: Path = MIGRATIONS_DIR) -> List[Path]:
+    return sorted(cartella.glob("*.sql")) if cartella.exists() else []
+
+
+def database_aggiornato(conn, nomi: List[str]) -> bool:
+    """Controllo rapido: schema, dati iniziali e tutte le migrations registrati"""
+    try:
+        registrate, ha_conti = conn.execute(
+            f"""
+            SELECT
+                (SELECT COUNT(*) FROM schema_migrations WHERE nome IN ({', '.join('?' * len(nomi))})),
+                EXISTS (SELECT 1 FROM conti)
+            """,
+            nomi
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # Registro (o schema) assente
+        return False
+
+    return bool(ha_conti) and registrate == len(nomi)
+
+
+def _esegui_script(conn, script: str) -> bool:
+    """Esegue le istruzioni dello script, False se risultava già applicato
+
+    Solo un errore sulla prima istruzione indica uno script già applicato:
+    lo stesso errore più avanti è una migration applicata a metà e viene
+    sollevato, invece di registrarla come completa.
+    """
+    for numero, istruzione in enumerate(istruzioni(script)):
+        try:
+            conn.execute(istruzione)
+        except sqlite3.OperationalError as e:
+            if numero == 0 and any(frase in str(e).lower() for frase in ERRORI_GIA_APPLICATA):
+                return False
+            raise
+    return True
+
+
+def applica_migrazioni(
+    conn,
+    cartella: Path = MIGRATIONS_DIR,
+    schema: Path = SCHEMA_PATH,
+    seed: Optional[Path] = SEED_PATH
+) -> Optional[dict]:
+    """Porta il database allo schema corrente
+
+    Restituisce None se il database era già aggiornato (nessun file letto),
+    altrimenti schema_creato, seed e l'esito di ogni migration eseguita
+    (nome, durata_ms, gia_presente). Tutto avviene in una transazione: se
+    una migration fallisce non resta applicato nulla e l'errore viene
+    sollevato.
+    """
+    file_migrazioni = migrazioni_su_disco(cartella)
+    nomi = [percorso.name for percorso in file_migrazioni]
+    if database_aggiornato(conn, nomi):
+        return None
+
+    # Un solo processo alla volta applica le migrations: gli altri aspettano
+    # il lock e poi ricontrollano il registro
+    timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+    conn.execute(f"PRAGMA busy_timeout = {TIMEOUT_LOCK_MS}")
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {timeout}")
+
+    esiti = []
+    try:
+        nuovo = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'conti'"
+        ).fetchone() is None
+        if nuovo:
+            _esegui_script(conn, leggi_sql(schema))
+
+        conn.execute(_CREA_REGISTRO)
+        applicate = dict(conn.execute("SELECT nome, checksum FROM schema_migrations").fetchall())
+
+        for percorso in file_migrazioni:
+            script = leggi_sql(percorso)
+            checksum = calcola_checksum(script)
+
+            if percorso.name in applicate:
+                if applicate[percorso.name] != checksum:
+                    print(f"  ! {percorso.name} modificata dopo essere stata applicata (checksum diverso)")
+                continue
+
+            inizio = time.perf_counter()
+            applicata = _esegui_script(conn, script)
+            durata = (time.perf_counter() - inizio) * 1000
+
+            conn.execute(
+                "INSERT INTO schema_migrations (nome, checksum, durata_ms, gia_presente) VALUES (?, ?, ?, ?)",
+                (percorso.name, checksum, durata, not applicata)
+            )
+            esiti.append({'nome': percorso.name, 'durata_ms': round(durata, 1), 'gia_presente': not applicata})
+
+        con_seed = seed is not None and conn.execute("SELECT COUNT(*) FROM conti").fetchone()[0] == 0
+        if con_seed:
+            _esegui_script(conn, leggi_sql(seed))
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return {'schema_creato': nuovo, 'migrazioni': esiti, 'seed': con_seed}
@@ -5,89 +5,71 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime, date, timedelta
 from calendar import monthrange
 from dateutil.relativedelta import relativedelta
+import json
+import os
 
-from ..database import get_db_connection, dict_from_row
+from .. import database
+from ..database import get_db_connection, dict_from_row, db_endpoint
+from ..services.aggregati_mensili import sorgente_mensile
+from ..services.cache import CacheRisposte, memorizza
+from ..services.spese_budget import calcola_spese
+from ..services.versioni import TABELLE_VERSIONATE
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+# Risposte già calcolate, valide finché le tabelle di dominio non cambiano
+cache_analytics = CacheRisposte(
+    max_elementi=int(os.getenv("ANALYTICS_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("ANALYTICS_CACHE_TTL", "300"))
+)
 
-@router.get("/dashboard")
-async def dashboard_summary(
-    data_da: Optional[str] = Query(None, description="Data inizio periodo (YYYY-MM-DD)"),
-    data_a: Optional[str] = Query(None, description="Data fine periodo (YYYY-MM-DD)")
-):
-    """Ottiene tutti i dati per la dashboard home con filtro periodo opzionale"""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Determina periodo
-        if data_da and data_a:
-            primo_giorno = datetime.fromisoformat(data_da).date()
-            ultimo_giorno = datetime.fromisoformat(data_a).date()
-        else:
-            oggi = date.today()
-            primo_giorno = date(oggi.year, oggi.month, 1)
-            ultimo_giorno = date(oggi.year, oggi.month, monthrange(oggi.year, oggi.month)[1])
-        
-        # 1. PATRIMONIO TOTALE
-        cursor.execute("SELECT SUM(saldo) FROM conti WHERE attivo = 1")
-        patrimonio_totale = cursor.fetchone()[0] or 0.0
-        
-        # 2. ENTRATE PERIODO
-        cursor.execute(
-            """
-            SELECT COALESCE(SUM(importo), 0) 
-            FROM movimenti 
-            WHERE tipo = 'entrata' 
-            AND date(data) >= ? 
-            AND date(data) <= ?
-            """,
-            (primo_giorno.isoformat(), ultimo_giorno.isoformat())
-        )
-        entrate_periodo = cursor.fetchone()[0] or 0.0
-        
-        # 3. USCITE PERIODO
-        cursor.execute(
-            """
-            SELECT COALESCE(SUM(importo), 0) 
-            FROM movimenti 
-            WHERE tipo = 'uscita' 
-            AND date(data) >= ? 
-            AND date(data) <= ?
-            """,
-            (primo_giorno.isoformat(), ultimo_giorno.isoformat())
-        )
-        uscite_periodo = cursor.fetchone()[0] or 0.0
-        
-        # 4. SALDO PERIODO
-        saldo_periodo = entrate_periodo - uscite_periodo
-        
-        # 5. SPESE PER CATEGORIA (periodo)
-        cursor.execute(
-            """
-            SELECT 
-                c.nome,
-                c.icona,
-                c.colore,
-                SUM(m.importo) as totale
-            FROM movimenti m
-            JOIN categorie c ON m.categoria_id = c.id
-            WHERE m.tipo = 'uscita'
-            AND date(m.data) >= ?
-            AND date(m.data) <= ?
+
+# Colonne di movimenti per la lista "ultimi movimenti" (m.*), per database
+_colonne_movimenti = {}
+
+
+def _get_colonne_movimenti(conn) -> List[str]:
+    """Colonne di movimenti come restituite da SELECT m.* (lette una sola volta)"""
+    if database.DB_PATH not in _colonne_movimenti:
+        cursor = conn.execute("SELECT * FROM movimenti LIMIT 0")
+        _colonne_movimenti[database.DB_PATH] = [col[0] for col in cursor.description]
+    return _colonne_movimenti[database.DB_PATH]
+
+
+def _json_object(alias: str, colonne: List[str]) -> str:
+    """Espressione json_object() con le colonne indicate"""
+    return "json_object(" + ", ".join(f"'{col}', {alias}.{col}" for col in colonne) + ")"
+
+
+def _query_dashboard(colonne_movimenti: List[str], sorgente: str) -> str:
+    """Costruisce l'unica query che calcola tutti i dati della dashboard"""
+    ultimi = _json_object("u", colonne_movimenti + ["categoria_nome", "categoria_icona", "conto_nome"])
+    colonne_ultimi = ", ".join(f"m.{col}" for col in colonne_movimenti)
+
+    return f"""
+        WITH periodo AS MATERIALIZED (
+            SELECT tipo, categoria_id, SUM(totale) AS totale
+            FROM {sorgente}
+            GROUP BY tipo, categoria_id
+        ),
+        kpi AS (
+            SELECT
+                COALESCE(SUM(CASE WHEN tipo = 'entrata' THEN totale END), 0) AS entrate,
+                COALESCE(SUM(CASE WHEN tipo = 'uscita' THEN totale END), 0) AS uscite
+            FROM periodo
+        ),
+        spese_categoria AS (
+            SELECT c.nome, c.icona, c.colore, SUM(p.totale) AS totale
+            FROM periodo p
+            JOIN categorie c ON p.categoria_id = c.id
+            WHERE p.tipo = 'uscita'
             GROUP BY c.id, c.nome, c.icona, c.colore
             ORDER BY totale DESC
             LIMIT 10
-            """,
-            (primo_giorno.isoformat(), ultimo_giorno.isoformat())
-        )
-        spese_per_categoria = [dict_from_row(row) for row in cursor.fetchall()]
-        
-        # 6. ULTIMI MOVIMENTI
-        cursor.execute(
-            """
+        ),
+        ultimi AS (
             SELECT 
-                m.*,
+                {colonne_ultimi},
                 c.nome as categoria_nome,
                 c.icona as categoria_icona,
                 co.nome as conto_nome
@@ -96,13 +78,8 @@ async def dashboard_summary(
             LEFT JOIN conti co ON m.conto_id = co.id
             ORDER BY m.data DESC
             LIMIT 10
-            """
-        )
-        ultimi_movimenti = [dict_from_row(row) for row in cursor.fetchall()]
-        
-        # 7. OBIETTIVI DI RISPARMIO
-        cursor.execute(
-            """
+        ),
+        obiettivi AS (
             SELECT 
                 id,
                 nome,
@@ -115,44 +92,89 @@ async def dashboard_summary(
             WHERE completato = 0
             ORDER BY priorita DESC, data_target ASC
             LIMIT 5
-            """
-        )
-        obiettivi = [dict_from_row(row) for row in cursor.fetchall()]
-        
-        # 8. CONTI ATTIVI
-        cursor.execute(
-            """
+        ),
+        conti_attivi AS (
             SELECT id, nome, tipo, saldo, valuta
             FROM conti
             WHERE attivo = 1
             ORDER BY saldo DESC
-            """
         )
-        conti_attivi = [dict_from_row(row) for row in cursor.fetchall()]
-        
-        return {
-            "kpi": {
-                "patrimonio_totale": round(patrimonio_totale, 2),
-                "entrate_mese": round(entrate_periodo, 2),
-                "uscite_mese": round(uscite_periodo, 2),
-                "saldo_mese": round(saldo_periodo, 2)
-            },
-            "spese_per_categoria": spese_per_categoria,
-            "ultimi_movimenti": ultimi_movimenti,
-            "obiettivi_risparmio": obiettivi,
-            "conti_attivi": conti_attivi,
-            "periodo": {
-                "data_da": primo_giorno.isoformat(),
-                "data_a": ultimo_giorno.isoformat(),
-                "mese": primo_giorno.month,
-                "anno": primo_giorno.year,
-                "mese_nome": primo_giorno.strftime("%B %Y")
-            }
+        SELECT
+            (SELECT COALESCE(SUM(saldo), 0) FROM conti_attivi) AS patrimonio_totale,
+            kpi.entrate,
+            kpi.uscite,
+            (SELECT json_group_array(json_object(
+                'nome', s.nome, 'icona', s.icona, 'colore', s.colore, 'totale', s.totale
+            )) FROM spese_categoria s) AS spese_per_categoria,
+            (SELECT json_group_array({ultimi}) FROM ultimi u) AS ultimi_movimenti,
+            (SELECT json_group_array({_json_object("o", [
+                "id", "nome", "importo_target", "importo_attuale",
+                "data_target", "priorita", "percentuale_completamento"
+            ])}) FROM obiettivi o) AS obiettivi_risparmio,
+            (SELECT json_group_array({_json_object("ca", [
+                "id", "nome", "tipo", "saldo", "valuta"
+            ])}) FROM conti_attivi ca) AS conti_attivi
+        FROM kpi
+    """
+
+
+@router.get("/dashboard")
+@db_endpoint
+@memorizza(cache_analytics, 'dashboard', TABELLE_VERSIONATE)
+def dashboard_summary(
+    data_da: Optional[str] = Query(None, description="Data inizio periodo (YYYY-MM-DD)"),
+    data_a: Optional[str] = Query(None, description="Data fine periodo (YYYY-MM-DD)")
+):
+    """Ottiene tutti i dati per la dashboard home con filtro periodo opzionale
+    
+    Tutti i blocchi sono calcolati da un'unica query: KPI e spese per
+    categoria leggono l'aggregato mensile (giorni ai bordi dai movimenti),
+    le liste vengono restituite come array JSON.
+    """
+    # Determina periodo
+    if data_da and data_a:
+        primo_giorno = datetime.fromisoformat(data_da).date()
+        ultimo_giorno = datetime.fromisoformat(data_a).date()
+    else:
+        oggi = date.today()
+        primo_giorno = date(oggi.year, oggi.month, 1)
+        ultimo_giorno = date(oggi.year, oggi.month, monthrange(oggi.year, oggi.month)[1])
+    
+    sorgente, params = sorgente_mensile(primo_giorno, ultimo_giorno)
+    
+    with get_db_connection() as conn:
+        query = _query_dashboard(_get_colonne_movimenti(conn), sorgente)
+        row = conn.execute(query, params).fetchone()
+    
+    entrate_periodo = row['entrate'] or 0.0
+    uscite_periodo = row['uscite'] or 0.0
+    saldo_periodo = entrate_periodo - uscite_periodo
+    
+    return {
+        "kpi": {
+            "patrimonio_totale": round(row['patrimonio_totale'] or 0.0, 2),
+            "entrate_mese": round(entrate_periodo, 2),
+            "uscite_mese": round(uscite_periodo, 2),
+            "saldo_mese": round(saldo_periodo, 2)
+        },
+        "spese_per_categoria": json.loads(row['spese_per_categoria']),
+        "ultimi_movimenti": json.loads(row['ultimi_movimenti']),
+        "obiettivi_risparmio": json.loads(row['obiettivi_risparmio']),
+        "conti_attivi": json.loads(row['conti_attivi']),
+        "periodo": {
+            "data_da": primo_giorno.isoformat(),
+            "data_a": ultimo_giorno.isoformat(),
+            "mese": primo_giorno.month,
+            "anno": primo_giorno.year,
+            "mese_nome": primo_giorno.strftime("%B %Y")
         }
+    }
 
 
 @router.get("/trend")
-async def trend_entrate_uscite(
+@db_endpoint
+@memorizza(cache_analytics, 'trend', TABELLE_VERSIONATE)
+def trend_entrate_uscite(
     period: str = Query("1m", description="Periodo: 1m, 3m, 6m, 1y")
 ):
     """Ottiene il trend di entrate/uscite per il periodo specificato
@@ -170,19 +192,21 @@ async def trend_entrate_uscite(
     }
     mesi = period_map.get(period, 6)
     
+    # Mesi interi dall'aggregato mensile, giorni del primo mese dai movimenti
+    sorgente, params = sorgente_mensile(date.today() - relativedelta(months=mesi))
+    
     with get_db_connection() as conn:
         cursor = conn.execute(
-            """
+            f"""
             SELECT 
-                strftime('%Y-%m', data) as mese,
-                SUM(CASE WHEN tipo = 'entrata' THEN importo ELSE 0 END) as entrate,
-                SUM(CASE WHEN tipo = 'uscita' THEN importo ELSE 0 END) as uscite
-            FROM movimenti
-            WHERE date(data) >= date('now', '-' || ? || ' months')
+                mese,
+                SUM(CASE WHEN tipo = 'entrata' THEN totale ELSE 0 END) as entrate,
+                SUM(CASE WHEN tipo = 'uscita' THEN totale ELSE 0 END) as uscite
+            FROM {sorgente}
             GROUP BY mese
             ORDER BY mese ASC
             """,
-            (mesi,)
+            params
         )
         
         rows = cursor.fetchall()
@@ -211,7 +235,9 @@ async def trend_entrate_uscite(
 
 
 @router.get("/comparison")
-async def comparison_period(
+@db_endpoint
+@memorizza(cache_analytics, 'comparison', TABELLE_VERSIONATE)
+def comparison_period(
     period: str = Query("month", description="Periodo: month, quarter, year")
 ):
     """Confronta il periodo corrente con il precedente
@@ -257,30 +283,30 @@ async def comparison_period(
             label_precedente = str(oggi.year - 1)
         
         # Dati periodo corrente
+        sorgente, params = sorgente_mensile(primo_corrente, ultimo_corrente)
         cursor = conn.execute(
-            """
+            f"""
             SELECT 
-                SUM(CASE WHEN tipo = 'entrata' THEN importo ELSE 0 END) as entrate,
-                SUM(CASE WHEN tipo = 'uscita' THEN importo ELSE 0 END) as uscite
-            FROM movimenti
-            WHERE date(data) >= ? AND date(data) <= ?
+                SUM(CASE WHEN tipo = 'entrata' THEN totale ELSE 0 END) as entrate,
+                SUM(CASE WHEN tipo = 'uscita' THEN totale ELSE 0 END) as uscite
+            FROM {sorgente}
             """,
-            (primo_corrente.isoformat(), ultimo_corrente.isoformat())
+            params
         )
         row_corrente = cursor.fetchone()
         entrate_corrente = row_corrente[0] or 0.0
         uscite_corrente = row_corrente[1] or 0.0
         
         # Dati periodo precedente
+        sorgente, params = sorgente_mensile(primo_precedente, ultimo_precedente)
         cursor = conn.execute(
-            """
+            f"""
             SELECT 
-                SUM(CASE WHEN tipo = 'entrata' THEN importo ELSE 0 END) as entrate,
-                SUM(CASE WHEN tipo = 'uscita' THEN importo ELSE 0 END) as uscite
-            FROM movimenti
-            WHERE date(data) >= ? AND date(data) <= ?
+                SUM(CASE WHEN tipo = 'entrata' THEN totale ELSE 0 END) as entrate,
+                SUM(CASE WHEN tipo = 'uscita' THEN totale ELSE 0 END) as uscite
+            FROM {sorgente}
             """,
-            (primo_precedente.isoformat(), ultimo_precedente.isoformat())
+            params
         )
         row_precedente = cursor.fetchone()
         entrate_precedente = row_precedente[0] or 0.0
@@ -303,18 +329,16 @@ async def comparison_period(
 
 
 @router.get("/budget-warnings")
-async def budget_warnings():
-    """Ottiene budget in attenzione o superati del mese corrente
+@db_endpoint
+@memorizza(cache_analytics, 'budget-warnings', TABELLE_VERSIONATE)
+def budget_warnings():
+    """Ottiene budget in attenzione o superati nel loro periodo corrente
     
     Returns data formatted for BudgetWarnings component:
     [{ categoria_nome, categoria_icona, limite, speso, percentuale }, ...]
     """
     
     with get_db_connection() as conn:
-        oggi = date.today()
-        primo_giorno = date(oggi.year, oggi.month, 1)
-        ultimo_giorno = date(oggi.year, oggi.month, monthrange(oggi.year, oggi.month)[1])
-        
         cursor = conn.execute(
             """
             SELECT 
@@ -331,47 +355,15 @@ async def budget_warnings():
             ORDER BY c.nome
             """
         )
+        budget_list = [dict_from_row(row) for row in cursor.fetchall()]
+        
+        # Spesa di tutti i budget attivi con una sola query (stessa regola di /budget)
+        spese = calcola_spese(conn, attivi_solo=True)
         
         warnings = []
         
-        for row in cursor.fetchall():
-            budget_dict = dict_from_row(row)
-            budget_id = budget_dict['id']
-            categoria_id = budget_dict['categoria_id']
-            
-            # Calcola spesa con logica prioritaria
-            # 1. Movimenti con budget_id esplicito
-            cursor_spesa = conn.execute(
-                """
-                SELECT COALESCE(SUM(importo), 0)
-                FROM movimenti
-                WHERE budget_id = ?
-                AND tipo = 'uscita'
-                AND date(data) >= ?
-                AND date(data) <= ?
-                """,
-                (budget_id, primo_giorno.isoformat(), ultimo_giorno.isoformat())
-            )
-            spesa_esplicita = cursor_spesa.fetchone()[0] or 0.0
-            
-            # 2. Movimenti con categoria (senza budget_id)
-            spesa_categoria = 0.0
-            if categoria_id:
-                cursor_spesa_cat = conn.execute(
-                    """
-                    SELECT COALESCE(SUM(importo), 0)
-                    FROM movimenti
-                    WHERE categoria_id = ?
-                    AND budget_id IS NULL
-                    AND tipo = 'uscita'
-                    AND date(data) >= ?
-                    AND date(data) <= ?
-                    """,
-                    (categoria_id, primo_giorno.isoformat(), ultimo_giorno.isoformat())
-                )
-                spesa_categoria = cursor_spesa_cat.fetchone()[0] or 0.0
-            
-            spesa_totale = spesa_esplicita + spesa_categoria
+        for budget_dict in budget_list:
+            spesa_totale = spese.get(budget_dict['id'], 0)
             percentuale = (spesa_totale / budget_dict['budget']) * 100 if budget_dict['budget'] > 0 else 0
             
             # Solo se >= 80% (attenzione o superato)
@@ -391,7 +383,9 @@ async def budget_warnings():
 
 
 @router.get("/top-spese")
-async def top_spese(
+@db_endpoint
+@memorizza(cache_analytics, 'top-spese', TABELLE_VERSIONATE)
+def top_spese(
     limit: int = Query(5, ge=1, le=20, description="Numero spese da restituire"),
     period: str = Query("month", description="Periodo: month, 3m, 6m, year")
 ):
@@ -436,8 +430,8 @@ async def top_spese(
             LEFT JOIN categorie c ON m.categoria_id = c.id
             LEFT JOIN conti co ON m.conto_id = co.id
             WHERE m.tipo = 'uscita'
-            AND date(m.data) >= ?
-            AND date(m.data) <= ?
+            AND m.data_giorno >= ?
+            AND m.data_giorno <= ?
             ORDER BY m.importo DESC
             LIMIT ?
             """,
@@ -448,7 +442,9 @@ async def top_spese(
 
 
 @router.get("/spese-categoria")
-async def spese_per_categoria(
+@db_endpoint
+@memorizza(cache_analytics, 'spese-categoria', TABELLE_VERSIONATE)
+def spese_per_categoria(
     mese: int = None,
     anno: int = None
 ):
@@ -462,24 +458,41 @@ async def spese_per_categoria(
     primo_giorno = date(anno, mese, 1)
     ultimo_giorno = date(anno, mese, monthrange(anno, mese)[1])
     
+    sorgente, params = sorgente_mensile(primo_giorno, ultimo_giorno, {'tipo': 'uscita'})
+    
     with get_db_connection() as conn:
         cursor = conn.execute(
-            """
+            f"""
             SELECT 
                 c.nome,
                 c.icona,
                 c.colore,
-                COUNT(m.id) as num_movimenti,
-                SUM(m.importo) as totale
-            FROM movimenti m
-            JOIN categorie c ON m.categoria_id = c.id
-            WHERE m.tipo = 'uscita'
-            AND date(m.data) >= ?
-            AND date(m.data) <= ?
+                SUM(a.conteggio) as num_movimenti,
+                SUM(a.totale) as totale
+            FROM {sorgente} a
+            JOIN categorie c ON a.categoria_id = c.id
             GROUP BY c.id, c.nome, c.icona, c.colore
             ORDER BY totale DESC
             """,
-            (primo_giorno.isoformat(), ultimo_giorno.isoformat())
+            params
         )
         
         return [dict_from_row(row) for row in cursor.fetchall()]
+
+
+@router.get("/forecast")
+@db_endpoint
+@memorizza(cache_analytics, 'forecast', ('movimenti_ricorrenti', 'conti'))
+def forecast(
+    mesi: int = Query(24, ge=1, le=120, description="Orizzonte della previsione in mesi"),
+    granularita: str = Query('mese', pattern='^(giorno|mese)$', description="Un punto per giorno o per fine mese")
+):
+    """Saldi previsti per conto e totali in base alle ricorrenze attive
+    
+    La cache è invalidata quando cambiano ricorrenze o conti (saldi).
+    """
+    # Importato qui: numpy pesa sull'avvio ed è usato solo da questo endpoint
+    from ..services.previsione import proietta
+
+    with get_db_connection() as conn:
+        return proietta(conn, mesi=mesi, granularita=granularita)
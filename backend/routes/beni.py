@@ -7,7 +7,9 @@ from dateutil.relativedelta import relativedelta
 from pydantic import BaseModel
 import json
 
-from ..database import get_db_connection, dict_from_row
+from ..database import get_db_connection, dict_from_row, db_endpoint
+from ..services.aggregati_mensili import sorgente_mensile
+from ..services.scomposizioni import totali_componenti
 
 router = APIRouter(prefix="/beni", tags=["Beni"])
 
@@ -91,7 +93,8 @@ class BeneUpdate(BaseModel):
 
 
 @router.get("")
-async def list_beni(
+@db_endpoint
+def list_beni(
     tipo: Optional[str] = None,
     stato: Optional[str] = None,
     search: Optional[str] = None
@@ -165,36 +168,70 @@ async def list_beni(
         return beni
 
 
+def _carica_bene(conn, bene_id: int) -> dict:
+    """Carica un bene con età e numero movimenti usando la connessione data"""
+    cursor = conn.execute("SELECT * FROM beni WHERE id = ?", (bene_id,))
+    row = cursor.fetchone()
+    
+    if not row:
+        raise HTTPException(status_code=404, detail="Bene non trovato")
+    
+    bene = dict_from_row(row)
+    
+    # Aggiungi età
+    data_acq = datetime.fromisoformat(bene['data_acquisto']).date()
+    oggi = date.today()
+    bene['eta_anni'] = round((oggi - data_acq).days / 365.25, 1)
+    bene['eta_mesi'] = round((oggi - data_acq).days / 30.44, 0)
+    
+    # Conta movimenti
+    cursor = conn.execute(
+        "SELECT COUNT(*) FROM movimenti WHERE bene_id = ?",
+        (bene_id,)
+    )
+    bene['num_movimenti'] = cursor.fetchone()[0]
+    
+    return bene
+
+
+@router.get("/componenti-costo")
+@db_endpoint
+def get_componenti_costo(
+    data_inizio: Optional[date] = Query(None, description="Primo giorno del periodo (incluso)"),
+    data_fine: Optional[date] = Query(None, description="Ultimo giorno del periodo (incluso)"),
+    tipo: Optional[str] = Query(None, description="Solo beni di questo tipo (es. veicolo)"),
+    bene_id: Optional[int] = Query(None, description="Solo questo bene")
+):
+    """Totali dei componenti di costo (carburante, usura, ammortamento, energia)
+
+    Somma in SQL le righe di scomposizioni_costi dei movimenti nel periodo,
+    complessive e per bene: ad esempio l'ammortamento di tutti i veicoli
+    nell'anno con tipo=veicolo e data_inizio al 1° gennaio.
+    """
+    if data_inizio and data_fine and data_inizio > data_fine:
+        raise HTTPException(status_code=400, detail="data_inizio successiva a data_fine")
+
+    with get_db_connection() as conn:
+        return totali_componenti(
+            conn,
+            data_inizio=data_inizio.isoformat() if data_inizio else None,
+            data_fine=data_fine.isoformat() if data_fine else None,
+            bene_id=bene_id,
+            tipo_bene=tipo
+        )
+
+
 @router.get("/{bene_id}")
-async def get_bene(bene_id: int):
+@db_endpoint
+def get_bene(bene_id: int):
     """Ottiene dettagli completi di un bene"""
     with get_db_connection() as conn:
-        cursor = conn.execute("SELECT * FROM beni WHERE id = ?", (bene_id,))
-        row = cursor.fetchone()
-        
-        if not row:
-            raise HTTPException(status_code=404, detail="Bene non trovato")
-        
-        bene = dict_from_row(row)
-        
-        # Aggiungi età
-        data_acq = datetime.fromisoformat(bene['data_acquisto']).date()
-        oggi = date.today()
-        bene['eta_anni'] = round((oggi - data_acq).days / 365.25, 1)
-        bene['eta_mesi'] = round((oggi - data_acq).days / 30.44, 0)
-        
-        # Conta movimenti
-        cursor = conn.execute(
-            "SELECT COUNT(*) FROM movimenti WHERE bene_id = ?",
-            (bene_id,)
-        )
-        bene['num_movimenti'] = cursor.fetchone()[0]
-        
-        return bene
+        return _carica_bene(conn, bene_id)
 
 
 @router.post("", status_code=201)
-async def create_bene(bene: BeneCreate):
+@db_endpoint
+def create_bene(bene: BeneCreate):
     """Crea un nuovo bene"""
     with get_db_connection() as conn:
         # Costruisci query dinamica
@@ -216,11 +253,12 @@ async def create_bene(bene: BeneCreate):
         conn.commit()
         bene_id = cursor.lastrowid
         
-        return await get_bene(bene_id)
+        return _carica_bene(conn, bene_id)
 
 
 @router.put("/{bene_id}")
-async def update_bene(bene_id: int, bene: BeneUpdate):
+@db_endpoint
+def update_bene(bene_id: int, bene: BeneUpdate):
     """Aggiorna un bene esistente"""
     with get_db_connection() as conn:
         cursor = conn.execute("SELECT * FROM beni WHERE id = ?", (bene_id,))
@@ -247,11 +285,12 @@ async def update_bene(bene_id: int, bene: BeneUpdate):
         )
         conn.commit()
         
-        return await get_bene(bene_id)
+        return _carica_bene(conn, bene_id)
 
 
 @router.delete("/{bene_id}")
-async def delete_bene(bene_id: int):
+@db_endpoint
+def delete_bene(bene_id: int):
     """Elimina un bene"""
     with get_db_connection() as conn:
         cursor = conn.execute("SELECT id FROM beni WHERE id = ?", (bene_id,))
@@ -266,7 +305,8 @@ async def delete_bene(bene_id: int):
 
 
 @router.get("/{bene_id}/movimenti")
-async def get_movimenti_bene(bene_id: int):
+@db_endpoint
+def get_movimenti_bene(bene_id: int):
     """Ottiene tutti i movimenti collegati a un bene"""
     with get_db_connection() as conn:
         cursor = conn.execute("SELECT id FROM beni WHERE id = ?", (bene_id,))
@@ -293,12 +333,14 @@ async def get_movimenti_bene(bene_id: int):
 
 
 @router.get("/{bene_id}/tco")
-async def get_tco_breakdown(bene_id: int):
+@db_endpoint
+def get_tco_breakdown(bene_id: int):
     """Calcola il TCO dettagliato di un bene
     
     Returns:
     {
       "costi_diretti": { "carburante": 5500, "manutenzione": 2800, ... },
+      "componenti": { "carburante": 5100, "usura": 960, "ammortamento": 480, ... },
       "ammortamento": 2720,
       "valore_residuo": 5000,
       "tco_totale": 12500,
@@ -401,6 +443,7 @@ async def get_tco_breakdown(bene_id: int):
         
         return {
             "costi_diretti": costi_diretti,
+            "componenti": totali_componenti(conn, bene_id=bene_id)['componenti'],
             "costi_fissi": round(costi_fissi_totali, 2),
             "ammortamento": ammortamento,
             "valore_residuo": valore_residuo,
@@ -411,7 +454,8 @@ async def get_tco_breakdown(bene_id: int):
 
 
 @router.get("/{bene_id}/costi-tempo")
-async def get_costi_tempo(
+@db_endpoint
+def get_costi_tempo(
     bene_id: int,
     period: str = Query("6m", description="Periodo: 1m, 3m, 6m, 1y, all")
 ):
@@ -429,23 +473,21 @@ async def get_costi_tempo(
         period_map = {"1m": 1, "3m": 3, "6m": 6, "1y": 12, "all": 999}
         mesi = period_map.get(period, 6)
         
-        query = """
-            SELECT 
-                strftime('%Y-%m', data) as mese,
-                SUM(importo) as totale
-            FROM movimenti
-            WHERE bene_id = ? AND tipo = 'uscita'
-        """
-        
-        params = [bene_id]
-        
-        if mesi < 999:
-            query += " AND date(data) >= date('now', '-' || ? || ' months')"
-            params.append(mesi)
+        # Mesi interi dall'aggregato mensile, giorni del primo mese dai movimenti
+        data_da = date.today() - relativedelta(months=mesi) if mesi < 999 else None
+        sorgente, params = sorgente_mensile(data_da, filtri={'bene_id': bene_id, 'tipo': 'uscita'})
         
-        query += " GROUP BY mese ORDER BY mese ASC"
-        
-        cursor = conn.execute(query, params)
+        cursor = conn.execute(
+            f"""
+            SELECT 
+                mese,
+                SUM(totale) as totale
+            FROM {sorgente}
+            GROUP BY mese
+            ORDER BY mese ASC
+            """,
+            params
+        )
         rows = cursor.fetchall()
         
         # Formatta risultati
@@ -1,12 +1,13 @@
 """API endpoints per gestione budget"""
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from pydantic import BaseModel
 import calendar
 
-from ..database import get_db_connection, dict_from_row
+from ..database import get_db_connection, dict_from_row, db_endpoint
+from ..services.spese_budget import calcola_spese, spese_mensili, stato_budget
 
 router = APIRouter(prefix="/budget", tags=["Budget"])
 
@@ -31,7 +32,8 @@ class BudgetUpdate(BaseModel):
 
 
 @router.get("")
-async def list_budget(attivi_solo: bool = True):
+@db_endpoint
+def list_budget(attivi_solo: bool = True):
     """Lista tutti i budget con calcolo spesa corrente e periodo"""
     with get_db_connection() as conn:
         query = """
@@ -52,39 +54,11 @@ async def list_budget(attivi_solo: bool = True):
         cursor = conn.execute(query)
         budget_list = [dict_from_row(row) for row in cursor.fetchall()]
         
-        # Calcola spesa corrente per ogni budget
+        # Spesa corrente di tutti i budget con una sola query
+        spese = calcola_spese(conn, attivi_solo=attivi_solo)
+        
         for budget in budget_list:
-            periodo_query = get_periodo_query(budget['periodo'])
-            
-            # PRIORITÀ 1: Movimenti con budget_id esplicito
-            cursor = conn.execute(
-                f"""
-                SELECT COALESCE(SUM(ABS(importo)), 0)
-                FROM movimenti
-                WHERE budget_id = ?
-                AND tipo = 'uscita'
-                AND {periodo_query}
-                """,
-                (budget['id'],)
-            )
-            spesa_budget_esplicito = cursor.fetchone()[0]
-            
-            # PRIORITÀ 2: Movimenti con categoria ma SENZA budget_id esplicito
-            cursor = conn.execute(
-                f"""
-                SELECT COALESCE(SUM(ABS(importo)), 0)
-                FROM movimenti
-                WHERE categoria_id = ?
-                AND budget_id IS NULL
-                AND tipo = 'uscita'
-                AND {periodo_query}
-                """,
-                (budget['categoria_id'],)
-            )
-            spesa_categoria = cursor.fetchone()[0]
-            
-            # Somma le due tipologie
-            spesa_corrente = spesa_budget_esplicito + spesa_categoria
+            spesa_corrente = spese.get(budget['id'], 0)
             
             budget['spesa_corrente'] = spesa_corrente
             budget['rimanente'] = budget['importo'] - spesa_corrente
@@ -94,13 +68,7 @@ async def list_budget(attivi_solo: bool = True):
             )
             
             # Determina stato usando soglia personalizzata
-            soglia = budget.get('soglia_avviso', 80)
-            if budget['percentuale_utilizzo'] >= 100:
-                budget['stato'] = 'superato'
-            elif budget['percentuale_utilizzo'] >= soglia:
-                budget['stato'] = 'attenzione'
-            else:
-                budget['stato'] = 'ok'
+            budget['stato'] = stato_budget(budget['percentuale_utilizzo'], budget.get('soglia_avviso'))
         
         # Ritorna struttura con periodo
         now = datetime.now()
@@ -138,8 +106,124 @@ async def get_budget_warnings():
     }
 
 
+def _mesi_storico(mesi: int) -> List[tuple]:
+    """Ultimi `mesi` mesi come (anno, mese), in ordine cronologico"""
+    now = datetime.now()
+    mesi_target = []
+    
+    for i in range(mesi):
+        # Calcola mese target
+        target_month = now.month - i
+        target_year = now.year
+        
+        while target_month <= 0:
+            target_month += 12
+            target_year -= 1
+        
+        mesi_target.append((target_year, target_month))
+    
+    mesi_target.reverse()
+    return mesi_target
+
+
+def _componi_storico(budget: dict, mesi_target: List[tuple], spese_per_mese: dict) -> dict:
+    """Storico di un budget con i mesi senza spesa riempiti a zero"""
+    history = []
+    for target_year, target_month in mesi_target:
+        spesa_mese = spese_per_mese.get(f"{target_year:04d}-{target_month:02d}", 0)
+        percentuale = (spesa_mese / budget['importo'] * 100) if budget['importo'] > 0 else 0
+        
+        history.append({
+            'mese': target_month,
+            'anno': target_year,
+            'mese_nome': calendar.month_name[target_month],
+            'spesa': spesa_mese,
+            'budget': budget['importo'],
+            'percentuale': percentuale,
+            'superato': spesa_mese > budget['importo']
+        })
+    
+    # Calcola statistiche
+    spese = [h['spesa'] for h in history]
+    media_spesa = sum(spese) / len(spese) if spese else 0
+    mesi_superati = sum(1 for h in history if h['superato'])
+    
+    return {
+        'budget': budget,
+        'history': history,
+        'statistiche': {
+            'media_spesa': media_spesa,
+            'mesi_superati': mesi_superati,
+            'mesi_analizzati': len(history)
+        }
+    }
+
+
+def _storici(conn, budget_list: List[dict], mesi: int) -> List[dict]:
+    """Storici di più budget con una sola query sulle spese"""
+    mesi_target = _mesi_storico(mesi)
+    if not mesi_target:
+        return [_componi_storico(budget, [], {}) for budget in budget_list]
+    
+    primo_anno, primo_mese = mesi_target[0]
+    ultimo_anno, ultimo_mese = mesi_target[-1]
+    spese = spese_mensili(
+        conn,
+        [budget['id'] for budget in budget_list],
+        f"{primo_anno:04d}-{primo_mese:02d}",
+        f"{ultimo_anno:04d}-{ultimo_mese:02d}"
+    )
+    
+    return [
+        _componi_storico(budget, mesi_target, spese.get(budget['id'], {}))
+        for budget in budget_list
+    ]
+
+
+@router.get("/history")
+@db_endpoint
+def get_budget_history_multi(
+    ids: Optional[str] = Query(None, description="ID budget separati da virgola (default: tutti gli attivi)"),
+    mesi: int = Query(6, ge=1, le=120)
+):
+    """Ottiene lo storico mensile di più budget in una volta (panoramica budget)"""
+    try:
+        budget_ids = [int(i) for i in ids.split(',') if i.strip()] if ids else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Parametro ids non valido")
+    
+    with get_db_connection() as conn:
+        query = """
+            SELECT b.*, c.nome as categoria_nome
+            FROM budget b
+            JOIN categorie c ON b.categoria_id = c.id
+        """
+        if budget_ids is None:
+            cursor = conn.execute(query + " WHERE b.attivo = 1 ORDER BY b.id")
+        else:
+            cursor = conn.execute(
+                query + f" WHERE b.id IN ({', '.join('?' * len(budget_ids))}) ORDER BY b.id",
+                budget_ids
+            )
+        budget_list = [dict_from_row(row) for row in cursor.fetchall()]
+        
+        if budget_ids is not None:
+            mancanti = set(budget_ids) - {b['id'] for b in budget_list}
+            if mancanti:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Budget non trovati: {', '.join(str(i) for i in sorted(mancanti))}"
+                )
+        
+        return {
+            'mesi': mesi,
+            'storici': _storici(conn, budget_list, mesi)
+        }
+
+
 @router.get("/{budget_id}/history")
-async def get_budget_history(budget_id: int, mesi: int = 6):
+@db_endpoint
+def get_budget_history(budget_id: int, mesi: int = 6):
     """Ottiene storico mensile spese per un budget"""
     with get_db_connection() as conn:
         # Verifica budget esiste
@@ -157,69 +241,7 @@ async def get_budget_history(budget_id: int, mesi: int = 6):
         if not budget_row:
             raise HTTPException(status_code=404, detail="Budget non trovato")
         
-        budget = dict_from_row(budget_row)
-        
-        # Calcola storico per gli ultimi N mesi
-        history = []
-        now = datetime.now()
-        
-        for i in range(mesi):
-            # Calcola mese target
-            target_month = now.month - i
-            target_year = now.year
-            
-            while target_month <= 0:
-                target_month += 12
-                target_year -= 1
-            
-            # Primo e ultimo giorno del mese
-            first_day = datetime(target_year, target_month, 1)
-            last_day_num = calendar.monthrange(target_year, target_month)[1]
-            last_day = datetime(target_year, target_month, last_day_num, 23, 59, 59)
-            
-            # Query spese del mese
-            cursor = conn.execute(
-                """
-                SELECT COALESCE(SUM(ABS(importo)), 0)
-                FROM movimenti
-                WHERE categoria_id = ?
-                AND tipo = 'uscita'
-                AND data >= ?
-                AND data <= ?
-                """,
-                (budget['categoria_id'], first_day.isoformat(), last_day.isoformat())
-            )
-            
-            spesa_mese = cursor.fetchone()[0]
-            percentuale = (spesa_mese / budget['importo'] * 100) if budget['importo'] > 0 else 0
-            
-            history.append({
-                'mese': target_month,
-                'anno': target_year,
-                'mese_nome': calendar.month_name[target_month],
-                'spesa': spesa_mese,
-                'budget': budget['importo'],
-                'percentuale': percentuale,
-                'superato': spesa_mese > budget['importo']
-            })
-        
-        # Inverti per avere ordine cronologico
-        history.reverse()
-        
-        # Calcola statistiche
-        spese = [h['spesa'] for h in history]
-        media_spesa = sum(spese) / len(spese) if spese else 0
-        mesi_superati = sum(1 for h in history if h['superato'])
-        
-        return {
-            'budget': budget,
-            'history': history,
-            'statistiche': {
-                'media_spesa': media_spesa,
-                'mesi_superati': mesi_superati,
-                'mesi_analizzati': len(history)
-            }
-        }
+        return _storici(conn, [dict_from_row(budget_row)], mesi)[0]
 
 
 @router.get("/riepilogo/{periodo}")
@@ -248,49 +270,40 @@ async def get_riepilogo(periodo: str = 'mensile'):
     }
 
 
-def get_periodo_query(periodo: str) -> str:
-    """Genera la condizione WHERE per il periodo"""
-    now = datetime.now()
+def _carica_budget(conn, budget_id: int) -> dict:
+    """Carica un budget con i dati della categoria usando la connessione data"""
+    cursor = conn.execute(
+        """
+        SELECT 
+            b.*,
+            c.nome as categoria_nome,
+            c.icona as categoria_icona,
+            c.colore as categoria_colore
+        FROM budget b
+        JOIN categorie c ON b.categoria_id = c.id
+        WHERE b.id = ?
+        """,
+        (budget_id,)
+    )
     
-    if periodo == 'settimanale':
-        start = now - timedelta(days=7)
-    elif periodo == 'mensile':
-        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    elif periodo == 'annuale':
-        start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-    else:
-        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Budget non trovato")
     
-    return f"data >= '{start.isoformat()}'"
+    return dict_from_row(row)
 
 
 @router.get("/{budget_id}")
-async def get_budget(budget_id: int):
+@db_endpoint
+def get_budget(budget_id: int):
     """Ottiene dettagli di un budget specifico"""
     with get_db_connection() as conn:
-        cursor = conn.execute(
-            """
-            SELECT 
-                b.*,
-                c.nome as categoria_nome,
-                c.icona as categoria_icona,
-                c.colore as categoria_colore
-            FROM budget b
-            JOIN categorie c ON b.categoria_id = c.id
-            WHERE b.id = ?
-            """,
-            (budget_id,)
-        )
-        
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Budget non trovato")
-        
-        return dict_from_row(row)
+        return _carica_budget(conn, budget_id)
 
 
 @router.post("", status_code=201)
-async def create_budget(budget: BudgetCreate):
+@db_endpoint
+def create_budget(budget: BudgetCreate):
     """Crea un nuovo budget"""
     with get_db_connection() as conn:
         # Verifica categoria esiste
@@ -334,11 +347,12 @@ async def create_budget(budget: BudgetCreate):
         conn.commit()
         budget_id = cursor.lastrowid
         
-        return await get_budget(budget_id)
+        return _carica_budget(conn, budget_id)
 
 
 @router.put("/{budget_id}")
-async def update_budget(budget_id: int, budget: BudgetUpdate):
+@db_endpoint
+def update_budget(budget_id: int, budget: BudgetUpdate):
     """Aggiorna un budget esistente"""
     with get_db_connection() as conn:
         # Verifica esistenza
@@ -366,11 +380,12 @@ async def update_budget(budget_id: int, budget: BudgetUpdate):
         
         conn.commit()
         
-        return await get_budget(budget_id)
+        return _carica_budget(conn, budget_id)
 
 
 @router.delete("/{budget_id}")
-async def delete_budget(budget_id: int):
+@db_endpoint
+def delete_budget(budget_id: int):
     """Elimina un budget"""
     with get_db_connection() as conn:
         cursor = conn.execute("SELECT id FROM budget WHERE id = ?", (budget_id,))
@@ -3,14 +3,15 @@
 from fastapi import APIRouter, HTTPException, status
 from typing import Optional
 
-from ..database import get_db_connection, dict_from_row
+from ..database import get_db_connection, dict_from_row, db_endpoint
 from ..models import Categoria
 
 router = APIRouter(prefix="/categorie", tags=["Categorie"])
 
 
 @router.get("")
-async def list_categorie(
+@db_endpoint
+def list_categorie(
     tipo: Optional[str] = None,
     include_system: bool = True,
     include_usage: bool = False
@@ -60,7 +61,8 @@ async def list_categorie(
 
 
 @router.get("/{categoria_id}")
-async def get_categoria(categoria_id: int):
+@db_endpoint
+def get_categoria(categoria_id: int):
     """Ottiene dettagli di una categoria specifica con conteggio movimenti"""
     with get_db_connection() as conn:
         cursor = conn.execute(
@@ -87,7 +89,8 @@ async def get_categoria(categoria_id: int):
 
 
 @router.get("/{categoria_id}/usage")
-async def get_categoria_usage(categoria_id: int):
+@db_endpoint
+def get_categoria_usage(categoria_id: int):
     """
     Ottiene statistiche di utilizzo di una categoria.
     """
@@ -138,7 +141,8 @@ async def get_categoria_usage(categoria_id: int):
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
-async def create_categoria(categoria: Categoria):
+@db_endpoint
+def create_categoria(categoria: Categoria):
     """
     Crea una nuova categoria personalizzata.
     """
@@ -186,7 +190,8 @@ async def create_categoria(categoria: Categoria):
 
 
 @router.put("/{categoria_id}")
-async def update_categoria(categoria_id: int, categoria: Categoria):
+@db_endpoint
+def update_categoria(categoria_id: int, categoria: Categoria):
     """
     Aggiorna una categoria personalizzata.
     Solo le categorie custom (is_system=0) possono essere modificate.
@@ -254,7 +259,8 @@ async def update_categoria(categoria_id: int, categoria: Categoria):
 
 
 @router.delete("/{categoria_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_categoria(categoria_id: int):
+@db_endpoint
+def delete_categoria(categoria_id: int):
     """
     Elimina una categoria personalizzata.
     Solo le categorie custom (is_system=0) e non in uso possono essere eliminate.
@@ -5,12 +5,25 @@ from typing import List, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
-from ..database import get_db_connection, dict_from_row
+from ..database import get_db_connection, dict_from_row, db_endpoint
 from ..models import Conto, TipoConto
+from ..services.contabilita import inserisci_movimento, transazione
+from ..services.paginazione import clausole_keyset, pagina_keyset
+from ..services.riconciliazione import riconcilia
+from ..services.saldi import storico_conto, storico_patrimonio
 
 router = APIRouter(prefix="/conti", tags=["Conti"])
 
 
+def _data_inizio(periodo: str) -> str:
+    """Primo giorno del periodo dei grafici ('7d', '30d', '90d', '365d', 'all')"""
+    if periodo == 'all':
+        return '2000-01-01'
+    giorni_map = {'7d': 7, '30d': 30, '90d': 90, '365d': 365}
+    giorni = giorni_map.get(periodo, 30)
+    return (datetime.now() - timedelta(days=giorni)).strftime('%Y-%m-%d')
+
+
 class TrasferimentoRequest(BaseModel):
     """Modello per richiesta trasferimento tra conti"""
     conto_origine_id: int
@@ -21,7 +34,8 @@ class TrasferimentoRequest(BaseModel):
 
 
 @router.get("", response_model=List[Conto])
-async def lista_conti(attivi_solo: bool = True):
+@db_endpoint
+def lista_conti(attivi_solo: bool = True):
     """Ottiene la lista di tutti i conti"""
     with get_db_connection() as conn:
         query = "SELECT * FROM conti"
@@ -35,8 +49,40 @@ async def lista_conti(attivi_solo: bool = True):
         return [dict_from_row(row) for row in rows]
 
 
+@router.get("/patrimonio-storico")
+@db_endpoint
+def patrimonio_storico(periodo: str = Query('30d', pattern='^(7d|30d|90d|365d|all)$')):
+    """
+    Andamento del patrimonio netto (somma dei saldi dei conti attivi).
+    
+    Parametri:
+    - periodo: '7d', '30d', '90d', '365d', 'all'
+    """
+    with get_db_connection() as conn:
+        storico = storico_patrimonio(conn, _data_inizio(periodo))
+    
+    return {"periodo": periodo, **storico}
+
+
+@router.post("/riconciliazione")
+@db_endpoint
+def riconciliazione_saldi(
+    completa: bool = Query(False, description="Ricalcola da tutti i movimenti invece che dall'ultimo checkpoint"),
+    correggi: bool = Query(False, description="Sostituisce i saldi errati con quelli calcolati")
+):
+    """
+    Verifica i saldi dei conti ricalcolandoli da saldo iniziale e movimenti.
+    
+    Restituisce i conti con saldo diverso da quello calcolato; con
+    correggi=true i saldi vengono allineati.
+    """
+    with get_db_connection() as conn:
+        return riconcilia(conn, completa=completa, correggi=correggi)
+
+
 @router.get("/{conto_id}", response_model=Conto)
-async def dettaglio_conto(conto_id: int):
+@db_endpoint
+def dettaglio_conto(conto_id: int):
     """Ottiene i dettagli di un conto specifico"""
     with get_db_connection() as conn:
         cursor = conn.execute("SELECT * FROM conti WHERE id = ?", (conto_id,))
@@ -52,7 +98,8 @@ async def dettaglio_conto(conto_id: int):
 
 
 @router.post("", response_model=Conto, status_code=status.HTTP_201_CREATED)
-async def crea_conto(conto: Conto):
+@db_endpoint
+def crea_conto(conto: Conto):
     """Crea un nuovo conto"""
     with get_db_connection() as conn:
         cursor = conn.execute(
@@ -74,7 +121,8 @@ async def crea_conto(conto: Conto):
 
 
 @router.put("/{conto_id}", response_model=Conto)
-async def aggiorna_conto(conto_id: int, conto: Conto):
+@db_endpoint
+def aggiorna_conto(conto_id: int, conto: Conto):
     """Aggiorna un conto esistente"""
     with get_db_connection() as conn:
         cursor = conn.execute("SELECT id FROM conti WHERE id = ?", (conto_id,))
@@ -84,15 +132,18 @@ async def aggiorna_conto(conto_id: int, conto: Conto):
                 detail=f"Conto {conto_id} non trovato"
             )
         
+        # Un saldo impostato a mano è una rettifica del saldo iniziale:
+        # la differenza viene riportata su saldo_iniziale (valori vecchi a destra)
         conn.execute(
             """
             UPDATE conti 
             SET nome = ?, tipo = ?, saldo = ?, valuta = ?, 
-                descrizione = ?, attivo = ?
+                descrizione = ?, attivo = ?,
+                saldo_iniziale = saldo_iniziale + ? - saldo
             WHERE id = ?
             """,
             (conto.nome, conto.tipo.value, conto.saldo, conto.valuta,
-             conto.descrizione, conto.attivo, conto_id)
+             conto.descrizione, conto.attivo, conto.saldo, conto_id)
         )
         
         conn.commit()
@@ -104,7 +155,8 @@ async def aggiorna_conto(conto_id: int, conto: Conto):
 
 
 @router.delete("/{conto_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def elimina_conto(conto_id: int):
+@db_endpoint
+def elimina_conto(conto_id: int):
     """Elimina un conto (soft delete - imposta attivo=0)"""
     with get_db_connection() as conn:
         cursor = conn.execute("SELECT id FROM conti WHERE id = ?", (conto_id,))
@@ -119,7 +171,8 @@ async def elimina_conto(conto_id: int):
 
 
 @router.get("/{conto_id}/saldo")
-async def saldo_conto(conto_id: int):
+@db_endpoint
+def saldo_conto(conto_id: int):
     """Ottiene il saldo corrente di un conto"""
     with get_db_connection() as conn:
         cursor = conn.execute(
@@ -146,7 +199,8 @@ async def saldo_conto(conto_id: int):
 # ============================================================================
 
 @router.post("/trasferimento", status_code=status.HTTP_201_CREATED)
-async def crea_trasferimento(trasferimento: TrasferimentoRequest):
+@db_endpoint
+def crea_trasferimento(trasferimento: TrasferimentoRequest):
     """
     Crea un trasferimento tra due conti in modo atomico.
     
@@ -185,47 +239,23 @@ async def crea_trasferimento(trasferimento: TrasferimentoRequest):
             )
         
         try:
-            # Movimento USCITA dal conto origine
-            cursor_uscita = conn.execute(
-                """
-                INSERT INTO movimenti (data, importo, tipo, conto_id, descrizione)
-                VALUES (?, ?, 'uscita', ?, ?)
-                """,
-                (
-                    data_movimento,
-                    -abs(trasferimento.importo),
-                    trasferimento.conto_origine_id,
-                    f"[TRASFERIMENTO] {trasferimento.descrizione}"
-                )
-            )
-            movimento_uscita_id = cursor_uscita.lastrowid
-            
-            # Movimento ENTRATA nel conto destinazione
-            cursor_entrata = conn.execute(
-                """
-                INSERT INTO movimenti (data, importo, tipo, conto_id, descrizione)
-                VALUES (?, ?, 'entrata', ?, ?)
-                """,
-                (
-                    data_movimento,
-                    abs(trasferimento.importo),
-                    trasferimento.conto_destinazione_id,
-                    f"[TRASFERIMENTO] {trasferimento.descrizione}"
-                )
-            )
-            movimento_entrata_id = cursor_entrata.lastrowid
-            
-            # Aggiorna saldi
-            conn.execute(
-                "UPDATE conti SET saldo = saldo - ? WHERE id = ?",
-                (abs(trasferimento.importo), trasferimento.conto_origine_id)
-            )
-            conn.execute(
-                "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
-                (abs(trasferimento.importo), trasferimento.conto_destinazione_id)
-            )
-            
-            conn.commit()
+            # Movimenti USCITA dal conto origine ed ENTRATA nel conto
+            # destinazione, con i saldi, in un solo commit
+            with transazione(conn):
+                movimento_uscita_id = inserisci_movimento(conn, {
+                    'data': data_movimento,
+                    'importo': -abs(trasferimento.importo),
+                    'tipo': 'uscita',
+                    'conto_id': trasferimento.conto_origine_id,
+                    'descrizione': f"[TRASFERIMENTO] {trasferimento.descrizione}"
+                })
+                movimento_entrata_id = inserisci_movimento(conn, {
+                    'data': data_movimento,
+                    'importo': abs(trasferimento.importo),
+                    'tipo': 'entrata',
+                    'conto_id': trasferimento.conto_destinazione_id,
+                    'descrizione': f"[TRASFERIMENTO] {trasferimento.descrizione}"
+                })
             
             return {
                 "success": True,
@@ -237,7 +267,6 @@ async def crea_trasferimento(trasferimento: TrasferimentoRequest):
             }
             
         except Exception as e:
-            conn.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Errore durante la creazione del trasferimento: {str(e)}"
@@ -245,7 +274,8 @@ async def crea_trasferimento(trasferimento: TrasferimentoRequest):
 
 
 @router.get("/{conto_id}/saldo-storico")
-async def saldo_storico(
+@db_endpoint
+def saldo_storico(
     conto_id: int,
     periodo: str = Query('30d', regex='^(7d|30d|90d|365d|all)$')
 ):
@@ -255,7 +285,8 @@ async def saldo_storico(
     Parametri:
     - periodo: '7d', '30d', '90d', '365d', 'all'
     
-    Restituisce array di punti [data, saldo]
+    Restituisce array di punti [data, saldo a fine giornata], uno per ogni
+    giorno con movimenti più il punto di oggi
     """
     with get_db_connection() as conn:
         # Verifica esistenza conto
@@ -272,77 +303,51 @@ async def saldo_storico(
             )
         
         saldo_corrente = row[0]
-        
-        # Calcola data iniziale in base al periodo
-        if periodo == 'all':
-            data_inizio = '2000-01-01'
-        else:
-            giorni_map = {'7d': 7, '30d': 30, '90d': 90, '365d': 365}
-            giorni = giorni_map.get(periodo, 30)
-            data_inizio = (datetime.now() - timedelta(days=giorni)).strftime('%Y-%m-%d')
-        
-        # Query per ottenere movimenti del periodo
-        cursor = conn.execute(
-            """
-            SELECT DATE(data) as giorno, SUM(importo) as variazione
-            FROM movimenti
-            WHERE conto_id = ? AND data >= ?
-            GROUP BY DATE(data)
-            ORDER BY giorno ASC
-            """,
-            (conto_id, data_inizio)
-        )
-        
-        movimenti_giornalieri = cursor.fetchall()
-        
-        # Costruisci lo storico partendo dal saldo corrente e andando indietro
-        storico = []
-        saldo_temp = saldo_corrente
-        
-        # Aggiungi punto corrente
-        storico.append({
-            "data": datetime.now().strftime('%Y-%m-%d'),
-            "saldo": round(saldo_corrente, 2)
-        })
-        
-        # Ricostruisci storico andando indietro
-        for giorno, variazione in reversed(movimenti_giornalieri):
-            saldo_temp -= variazione
-            storico.insert(0, {
-                "data": giorno,
-                "saldo": round(saldo_temp, 2)
-            })
+        punti = storico_conto(conn, conto_id, saldo_corrente, _data_inizio(periodo))
         
         return {
             "conto_id": conto_id,
             "periodo": periodo,
             "saldo_corrente": saldo_corrente,
-            "punti": storico
+            "punti": punti
         }
 
 
 @router.get("/{conto_id}/movimenti")
-async def movimenti_per_conto(
+@db_endpoint
+def movimenti_per_conto(
     conto_id: int,
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
-    tipo: Optional[str] = Query(None, regex='^(entrata|uscita)$')
+    tipo: Optional[str] = Query(None, regex='^(entrata|uscita)$'),
+    cursor: Optional[str] = Query(None),
+    include_total: Optional[bool] = Query(None)
 ):
     """
     Ottiene i movimenti di un conto specifico con paginazione.
     
     Parametri:
-    - page: numero pagina (default 1)
+    - page: numero pagina (default 1), ignorato se è presente cursor
     - per_page: risultati per pagina (default 20, max 100)
     - tipo: filtro per tipo movimento ('entrata' o 'uscita')
+    - cursor: next_cursor della pagina precedente (paginazione keyset su (data, id))
+    - include_total: calcola total/total_pages (default: sì con page, no con cursor)
     """
+    if include_total is None:
+        include_total = cursor is None
+    
+    try:
+        condizione, order_clause, params_cursore = clausole_keyset('data', 'desc', cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
     with get_db_connection() as conn:
         # Verifica esistenza conto
-        cursor = conn.execute(
+        cursor_db = conn.execute(
             "SELECT id, nome FROM conti WHERE id = ?",
             (conto_id,)
         )
-        conto = cursor.fetchone()
+        conto = cursor_db.fetchone()
         
         if not conto:
             raise HTTPException(
@@ -358,15 +363,18 @@ async def movimenti_per_conto(
             where_clause += " AND m.tipo = ?"
             params.append(tipo)
         
-        # Count totale
-        count_query = f"""
-            SELECT COUNT(*) FROM movimenti m {where_clause}
-        """
-        cursor = conn.execute(count_query, params)
-        total = cursor.fetchone()[0]
+        # Count totale (opzionale)
+        total = None
+        if include_total:
+            count_query = f"""
+                SELECT COUNT(*) FROM movimenti m {where_clause}
+            """
+            total = conn.execute(count_query, params).fetchone()[0]
         
-        # Query movimenti
-        offset = (page - 1) * per_page
+        # Query movimenti: con cursore si riparte dalla chiave, senza OFFSET
+        if condizione:
+            where_clause += f" AND {condizione}"
+        offset = 0 if cursor else (page - 1) * per_page
         query = f"""
             SELECT 
                 m.*,
@@ -377,19 +385,22 @@ async def movimenti_per_conto(
             LEFT JOIN categorie c ON m.categoria_id = c.id
             LEFT JOIN conti co ON m.conto_id = co.id
             {where_clause}
-            ORDER BY m.data DESC
+            ORDER BY {order_clause}
             LIMIT ? OFFSET ?
         """
         
-        cursor = conn.execute(query, params + [per_page, offset])
-        movimenti = [dict_from_row(row) for row in cursor.fetchall()]
-        
-        return {
-            "conto_id": conto_id,
-            "conto_nome": conto[1],
-            "items": movimenti,
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": (total + per_page - 1) // per_page
-        }
+        cursor_db = conn.execute(query, params + params_cursore + [per_page + 1, offset])
+        movimenti = [dict_from_row(row) for row in cursor_db.fetchall()]
+    
+    movimenti, next_cursor = pagina_keyset(movimenti, per_page, 'data', 'desc')
+    
+    return {
+        "conto_id": conto_id,
+        "conto_nome": conto[1],
+        "items": movimenti,
+        "total": total,
+        "page": None if cursor else page,
+        "per_page": per_page,
+        "total_pages": (total + per_page - 1) // per_page if total is not None else None,
+        "next_cursor": next_cursor
+    }
@@ -1,12 +1,19 @@
 """API endpoints per gestione movimenti"""
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel
 
-from ..database import get_db_connection, dict_from_row
+from ..database import get_db_connection, dict_from_row, db_endpoint
+from ..services.contabilita import aggiorna_movimento, elimina_movimento, inserisci_movimento, transazione
 from ..services.cost_calculator import CostCalculator
+from ..services.esportazione import comprimi_gzip, genera_csv
+from ..services.importazione import FORMATI, ErroreEstratto, formato_da_nome, importa_estratto, leggi_estratto
+from ..services.movimenti_bulk import ErroreImportazione, importa_movimenti
+from ..services.paginazione import ORDINAMENTI_KEYSET, clausole_keyset, pagina_keyset
+from ..services.ricerca import cerca
 
 router = APIRouter(prefix="/movimenti", tags=["Movimenti"])
 
@@ -20,6 +27,7 @@ class MovimentoCreate(BaseModel):
     budget_id: Optional[int] = None
     obiettivo_id: Optional[int] = None  # NEW: Link to savings goal
     descrizione: str
+    note: Optional[str] = None
     ricorrente: bool = False
     # Campi per scomposizione costi
     bene_id: Optional[int] = None
@@ -29,6 +37,28 @@ class MovimentoCreate(BaseModel):
     tariffa_kwh: Optional[float] = None
 
 
+class MovimentoBulk(BaseModel):
+    data: str
+    importo: float
+    tipo: str
+    categoria_id: Optional[int] = None
+    conto_id: Optional[int] = None
+    budget_id: Optional[int] = None
+    obiettivo_id: Optional[int] = None
+    descrizione: str
+    note: Optional[str] = None
+    ricorrente: bool = False
+    bene_id: Optional[int] = None
+    km_percorsi: Optional[float] = None
+    ore_utilizzo: Optional[float] = None
+    prezzo_carburante_al_litro: Optional[float] = None
+    tariffa_kwh: Optional[float] = None
+
+
+class MovimentiBulkRequest(BaseModel):
+    movimenti: List[MovimentoBulk]
+
+
 class MovimentoUpdate(BaseModel):
     data: Optional[str] = None
     importo: Optional[float] = None
@@ -38,35 +68,59 @@ class MovimentoUpdate(BaseModel):
     budget_id: Optional[int] = None
     obiettivo_id: Optional[int] = None  # NEW: Update goal link
     descrizione: Optional[str] = None
+    note: Optional[str] = None
     ricorrente: Optional[bool] = None
 
 
 @router.get("")
-async def list_movimenti(
-    page: int = Query(1, ge=1, description="Numero pagina (parte da 1)"),
+@db_endpoint
+def list_movimenti(
+    page: int = Query(1, ge=1, description="Numero pagina (parte da 1), ignorato se è presente cursor"),
     per_page: int = Query(50, ge=1, le=100, description="Elementi per pagina (max 100)"),
     order_by: Optional[str] = Query(None, description="Campo ordinamento: data, importo, categoria"),
-    order_dir: Optional[str] = Query("desc", description="Direzione: asc o desc")
+    order_dir: Optional[str] = Query("desc", description="Direzione: asc o desc"),
+    cursor: Optional[str] = Query(None, description="Cursore opaco restituito come next_cursor dalla pagina precedente"),
+    include_total: Optional[bool] = Query(None, description="Calcola total/total_pages (default: sì con page, no con cursor)")
 ):
-    """Lista movimenti con paginazione e ordinamento"""
-    with get_db_connection() as conn:
-        # Conteggio totale
-        cursor = conn.execute("SELECT COUNT(*) FROM movimenti")
-        total = cursor.fetchone()[0]
-        
-        # Calcola offset
+    """Lista movimenti con paginazione e ordinamento
+    
+    Ordinando per data o importo ogni risposta contiene next_cursor: passandolo
+    come cursor la pagina successiva costa come la prima (paginazione keyset
+    su (data, id) o (importo, id)). L'ordinamento per categoria usa ancora
+    page/OFFSET.
+    """
+    order_dir = "asc" if (order_dir or "").lower() == "asc" else "desc"
+    ordine = order_by or "data"
+    keyset = ordine in ORDINAMENTI_KEYSET
+    
+    if cursor and not keyset:
+        raise HTTPException(status_code=400, detail="cursor supportato solo con order_by data o importo")
+    if include_total is None:
+        include_total = cursor is None
+    
+    params = []
+    where_clause = ""
+    
+    if keyset:
+        try:
+            condizione, order_clause, params = clausole_keyset(ordine, order_dir, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if condizione:
+            where_clause = f"WHERE {condizione}"
+        # Con cursore si riparte dalla chiave, senza OFFSET
+        offset = 0 if cursor else (page - 1) * per_page
+    else:
+        order_clause = f"c.nome {order_dir.upper()}, m.id {order_dir.upper()}"
         offset = (page - 1) * per_page
+    
+    with get_db_connection() as conn:
+        # Conteggio totale (opzionale: è un full scan dell'indice)
+        total = None
+        if include_total:
+            total = conn.execute("SELECT COUNT(*) FROM movimenti").fetchone()[0]
         
-        # Costruisci ORDER BY
-        order_clause = "m.data DESC"  # Default
-        if order_by == "data":
-            order_clause = f"m.data {order_dir.upper()}"
-        elif order_by == "importo":
-            order_clause = f"m.importo {order_dir.upper()}"
-        elif order_by == "categoria":
-            order_clause = f"c.nome {order_dir.upper()}"
-        
-        cursor = conn.execute(
+        cursor_db = conn.execute(
             f"""
             SELECT 
                 m.*,
@@ -88,98 +142,94 @@ async def list_movimenti(
             LEFT JOIN budget bg ON m.budget_id = bg.id
             LEFT JOIN categorie cat_bg ON bg.categoria_id = cat_bg.id
             LEFT JOIN obiettivi_risparmio ob ON m.obiettivo_id = ob.id
+            {where_clause}
             ORDER BY {order_clause}
             LIMIT ? OFFSET ?
             """,
-            (per_page, offset)
+            params + [per_page + 1, offset]
         )
         
-        items = [dict_from_row(row) for row in cursor.fetchall()]
-        
-        return {
-            "items": items,
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "total_pages": (total + per_page - 1) // per_page
-        }
+        items = [dict_from_row(row) for row in cursor_db.fetchall()]
+    
+    if keyset:
+        items, next_cursor = pagina_keyset(items, per_page, ordine, order_dir)
+    else:
+        next_cursor = None
+        items = items[:per_page]
+    
+    return {
+        "items": items,
+        "total": total,
+        "page": None if cursor else page,
+        "per_page": per_page,
+        "total_pages": (total + per_page - 1) // per_page if total is not None else None,
+        "next_cursor": next_cursor
+    }
 
 
 @router.get("/export")
-async def export_movimenti_csv():
-    """Esporta tutti i movimenti in formato CSV"""
-    from fastapi.responses import StreamingResponse
-    import io
-    import csv
+def export_movimenti_csv(
+    request: Request,
+    data_da: Optional[str] = Query(None, description="Data inizio (YYYY-MM-DD)"),
+    data_a: Optional[str] = Query(None, description="Data fine inclusa (YYYY-MM-DD)"),
+    conto_id: Optional[int] = Query(None, description="Solo movimenti di questo conto"),
+    categoria_id: Optional[int] = Query(None, description="Solo movimenti di questa categoria")
+):
+    """Esporta i movimenti in formato CSV, in streaming
+    
+    Le righe vengono lette e inviate a blocchi; se il client accetta gzip
+    la risposta viene compressa al volo.
+    """
+    for valore in (data_da, data_a):
+        if valore:
+            try:
+                datetime.strptime(valore, '%Y-%m-%d')
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Data non valida: {valore}")
+    
+    contenuto = genera_csv(data_da, data_a, conto_id, categoria_id)
+    headers = {
+        "Content-Disposition": f"attachment; filename=movimenti_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        "Vary": "Accept-Encoding"
+    }
+    
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        contenuto = comprimi_gzip(contenuto)
+        headers["Content-Encoding"] = "gzip"
     
+    return StreamingResponse(contenuto, media_type="text/csv; charset=utf-8", headers=headers)
+
+
+@router.get("/search")
+@db_endpoint
+def search_movimenti(
+    q: str = Query(..., min_length=1, description="Parole da cercare (anche iniziali di parola)"),
+    data_da: Optional[date] = Query(None, description="Data minima (YYYY-MM-DD)"),
+    data_a: Optional[date] = Query(None, description="Data massima (YYYY-MM-DD)"),
+    tipo: Optional[str] = Query(None, pattern='^(entrata|uscita|trasferimento)$'),
+    conto_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=100, description="Risultati per pagina (max 100)"),
+    offset: int = Query(0, ge=0)
+):
+    """Ricerca full-text su descrizione, note, categoria e conto
+    
+    Risultati ordinati per rilevanza; ogni parola cerca anche come prefisso
+    ("esse" trova "Esselunga") e gli accenti sono ignorati.
+    """
     with get_db_connection() as conn:
-        cursor = conn.execute(
-            """
-            SELECT 
-                m.id,
-                m.data,
-                m.tipo,
-                m.importo,
-                c.nome as categoria,
-                co.nome as conto,
-                m.descrizione,
-                m.ricorrente,
-                b.nome as bene,
-                ob.nome as obiettivo,
-                m.km_percorsi,
-                m.ore_utilizzo
-            FROM movimenti m
-            LEFT JOIN categorie c ON m.categoria_id = c.id
-            LEFT JOIN conti co ON m.conto_id = co.id
-            LEFT JOIN beni b ON m.bene_id = b.id
-            LEFT JOIN obiettivi_risparmio ob ON m.obiettivo_id = ob.id
-            ORDER BY m.data DESC
-            """
-        )
-        
-        rows = cursor.fetchall()
-        
-        # Crea CSV in memoria
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Header
-        writer.writerow([
-            'ID', 'Data', 'Tipo', 'Importo (€)', 'Categoria', 
-            'Conto', 'Descrizione', 'Ricorrente', 'Bene', 'Obiettivo',
-            'Km Percorsi', 'Ore Utilizzo'
-        ])
-        
-        # Dati
-        for row in rows:
-            writer.writerow([
-                row[0],  # id
-                row[1],  # data
-                row[2].capitalize(),  # tipo
-                f"{row[3]:.2f}",  # importo
-                row[4] or '',  # categoria
-                row[5] or '',  # conto
-                row[6],  # descrizione
-                'Sì' if row[7] else 'No',  # ricorrente
-                row[8] or '',  # bene
-                row[9] or '',  # obiettivo (NEW)
-                f"{row[10]:.1f}" if row[10] else '',  # km
-                f"{row[11]:.1f}" if row[11] else ''  # ore
-            ])
-        
-        output.seek(0)
-        
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=movimenti_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            }
-        )
+        items, altri = cerca(conn, q, data_da, data_a, tipo, conto_id, limit, offset)
+    
+    return {
+        "items": items,
+        "limit": limit,
+        "offset": offset,
+        "has_more": altri
+    }
 
 
 @router.get("/categorie")
-async def list_categorie(tipo: Optional[str] = None):
+@db_endpoint
+def list_categorie(tipo: Optional[str] = None):
     """Lista tutte le categorie, opzionalmente filtrate per tipo"""
     with get_db_connection() as conn:
         if tipo:
@@ -193,44 +243,51 @@ async def list_categorie(tipo: Optional[str] = None):
         return [dict_from_row(row) for row in cursor.fetchall()]
 
 
+def _carica_movimento(conn, movimento_id: int) -> dict:
+    """Carica un movimento con i dati collegati usando la connessione data"""
+    cursor = conn.execute(
+        """
+        SELECT 
+            m.*,
+            c.nome as categoria_nome,
+            c.icona as categoria_icona,
+            co.nome as conto_nome,
+            b.nome as bene_nome,
+            b.tipo as bene_tipo,
+            bg.id as budget_id,
+            cat_bg.nome as budget_categoria_nome,
+            ob.nome as obiettivo_nome,
+            ob.importo_target as obiettivo_target
+        FROM movimenti m
+        LEFT JOIN categorie c ON m.categoria_id = c.id
+        LEFT JOIN conti co ON m.conto_id = co.id
+        LEFT JOIN beni b ON m.bene_id = b.id
+        LEFT JOIN budget bg ON m.budget_id = bg.id
+        LEFT JOIN categorie cat_bg ON bg.categoria_id = cat_bg.id
+        LEFT JOIN obiettivi_risparmio ob ON m.obiettivo_id = ob.id
+        WHERE m.id = ?
+        """,
+        (movimento_id,)
+    )
+    
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Movimento non trovato")
+    
+    return dict_from_row(row)
+
+
 @router.get("/{movimento_id}")
-async def get_movimento(movimento_id: int):
+@db_endpoint
+def get_movimento(movimento_id: int):
     """Ottiene dettagli di un movimento specifico"""
     with get_db_connection() as conn:
-        cursor = conn.execute(
-            """
-            SELECT 
-                m.*,
-                c.nome as categoria_nome,
-                c.icona as categoria_icona,
-                co.nome as conto_nome,
-                b.nome as bene_nome,
-                b.tipo as bene_tipo,
-                bg.id as budget_id,
-                cat_bg.nome as budget_categoria_nome,
-                ob.nome as obiettivo_nome,
-                ob.importo_target as obiettivo_target
-            FROM movimenti m
-            LEFT JOIN categorie c ON m.categoria_id = c.id
-            LEFT JOIN conti co ON m.conto_id = co.id
-            LEFT JOIN beni b ON m.bene_id = b.id
-            LEFT JOIN budget bg ON m.budget_id = bg.id
-            LEFT JOIN categorie cat_bg ON bg.categoria_id = cat_bg.id
-            LEFT JOIN obiettivi_risparmio ob ON m.obiettivo_id = ob.id
-            WHERE m.id = ?
-            """,
-            (movimento_id,)
-        )
-        
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Movimento non trovato")
-        
-        return dict_from_row(row)
+        return _carica_movimento(conn, movimento_id)
 
 
 @router.get("/{movimento_id}/scomposizione")
-async def get_scomposizione(movimento_id: int):
+@db_endpoint
+def get_scomposizione(movimento_id: int):
     """Ottiene scomposizione costi di un movimento collegato a un bene"""
     with get_db_connection() as conn:
         # Recupera movimento
@@ -256,6 +313,15 @@ async def get_scomposizione(movimento_id: int):
             import json
             return json.loads(movimento['scomposizione_json'])
         
+        # Movimenti senza scomposizione salvata (es. importati prima che fosse
+        # calcolata): calcolata al momento dai km/ore, senza salvarla
+        try:
+            scomposizione = CostCalculator(conn).calcola_scomposizioni(movimento['bene_id'], [movimento])[0]
+        except ValueError:
+            scomposizione = None
+        if scomposizione:
+            return scomposizione
+        
         raise HTTPException(
             status_code=404, 
             detail="Scomposizione non disponibile per questo movimento"
@@ -263,7 +329,8 @@ async def get_scomposizione(movimento_id: int):
 
 
 @router.post("", status_code=201)
-async def create_movimento(movimento: MovimentoCreate):
+@db_endpoint
+def create_movimento(movimento: MovimentoCreate):
     """Crea un nuovo movimento con scomposizione automatica se collegato a bene"""
     
     # NEW: Validate obiettivo_id can only be used with 'entrata'
@@ -274,142 +341,173 @@ async def create_movimento(movimento: MovimentoCreate):
         )
     
     with get_db_connection() as conn:
-        # Verifica budget se specificato
-        if movimento.budget_id:
-            cursor = conn.execute(
-                "SELECT id, attivo FROM budget WHERE id = ?",
-                (movimento.budget_id,)
-            )
-            budget_row = cursor.fetchone()
+        # Verifiche e scrittura nella stessa transazione: budget, obiettivo e
+        # bene letti qui non possono cambiare prima della scrittura
+        with transazione(conn):
+            # Verifica budget se specificato
+            if movimento.budget_id:
+                cursor = conn.execute(
+                    "SELECT id, attivo FROM budget WHERE id = ?",
+                    (movimento.budget_id,)
+                )
+                budget_row = cursor.fetchone()
             
-            if not budget_row:
-                raise HTTPException(status_code=404, detail="Budget non trovato")
+                if not budget_row:
+                    raise HTTPException(status_code=404, detail="Budget non trovato")
             
-            if not budget_row[1]:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Il budget selezionato non è attivo"
-                )
+                if not budget_row[1]:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Il budget selezionato non è attivo"
+                    )
         
-        # NEW: Verify obiettivo exists if specified
-        if movimento.obiettivo_id:
-            cursor = conn.execute(
-                "SELECT id, completato FROM obiettivi_risparmio WHERE id = ?",
-                (movimento.obiettivo_id,)
-            )
-            obiettivo_row = cursor.fetchone()
+            # NEW: Verify obiettivo exists if specified
+            if movimento.obiettivo_id:
+                cursor = conn.execute(
+                    "SELECT id, completato FROM obiettivi_risparmio WHERE id = ?",
+                    (movimento.obiettivo_id,)
+                )
+                obiettivo_row = cursor.fetchone()
             
-            if not obiettivo_row:
-                raise HTTPException(status_code=404, detail="Obiettivo non trovato")
+                if not obiettivo_row:
+                    raise HTTPException(status_code=404, detail="Obiettivo non trovato")
             
-            if obiettivo_row[1]:  # completato
-                raise HTTPException(
-                    status_code=400,
-                    detail="Non puoi allocare fondi a un obiettivo già completato"
-                )
+                if obiettivo_row[1]:  # completato
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Non puoi allocare fondi a un obiettivo già completato"
+                    )
         
-        scomposizione_data = None
+            scomposizione_data = None
         
-        # Se collegato a bene, calcola scomposizione
-        if movimento.bene_id:
-            calculator = CostCalculator(conn)
+            # Se collegato a bene, calcola scomposizione
+            if movimento.bene_id:
+                calculator = CostCalculator(conn)
             
-            # Verifica tipo bene
-            cursor = conn.execute(
-                "SELECT tipo FROM beni WHERE id = ?",
-                (movimento.bene_id,)
-            )
-            bene_row = cursor.fetchone()
+                # Verifica tipo bene (parametri dalla cache dei beni)
+                bene = calculator.parametri_bene(movimento.bene_id)
             
-            if not bene_row:
-                raise HTTPException(status_code=404, detail="Bene non trovato")
+                if not bene:
+                    raise HTTPException(status_code=404, detail="Bene non trovato")
             
-            bene_tipo = bene_row[0]
+                bene_tipo = bene.tipo
             
-            try:
-                if bene_tipo == 'veicolo':
-                    if not movimento.km_percorsi:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="km_percorsi richiesto per veicoli"
-                        )
+                try:
+                    if bene_tipo == 'veicolo':
+                        if not movimento.km_percorsi:
+                            raise HTTPException(
+                                status_code=400,
+                                detail="km_percorsi richiesto per veicoli"
+                            )
                     
-                    scomposizione_data = calculator.calcola_costo_veicolo(
-                        bene_id=movimento.bene_id,
-                        km_percorsi=movimento.km_percorsi,
-                        costo_carburante=movimento.importo,
-                        prezzo_carburante_al_litro=movimento.prezzo_carburante_al_litro
-                    )
-                
-                elif bene_tipo == 'elettrodomestico':
-                    if not movimento.ore_utilizzo:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="ore_utilizzo richiesto per elettrodomestici"
+                        scomposizione_data = calculator.calcola_costo_veicolo(
+                            bene_id=movimento.bene_id,
+                            km_percorsi=movimento.km_percorsi,
+                            costo_carburante=movimento.importo,
+                            prezzo_carburante_al_litro=movimento.prezzo_carburante_al_litro
                         )
+                
+                    elif bene_tipo == 'elettrodomestico':
+                        if not movimento.ore_utilizzo:
+                            raise HTTPException(
+                                status_code=400,
+                                detail="ore_utilizzo richiesto per elettrodomestici"
+                            )
                     
-                    scomposizione_data = calculator.calcola_costo_elettrodomestico(
-                        bene_id=movimento.bene_id,
-                        ore_utilizzo=movimento.ore_utilizzo,
-                        tariffa_kwh=movimento.tariffa_kwh or 0.25
-                    )
+                        scomposizione_data = calculator.calcola_costo_elettrodomestico(
+                            bene_id=movimento.bene_id,
+                            ore_utilizzo=movimento.ore_utilizzo,
+                            tariffa_kwh=movimento.tariffa_kwh or 0.25
+                        )
             
-            except ValueError as e:
-                raise HTTPException(status_code=400, detail=str(e))
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
         
-        # Inserisci movimento (NEW: include obiettivo_id)
-        import json
-        cursor = conn.execute(
-            """
-            INSERT INTO movimenti 
-            (data, importo, tipo, categoria_id, conto_id, budget_id, obiettivo_id, descrizione, ricorrente, 
-             bene_id, km_percorsi, ore_utilizzo, scomposizione_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                movimento.data,
-                movimento.importo,
-                movimento.tipo,
-                movimento.categoria_id,
-                movimento.conto_id,
-                movimento.budget_id,
-                movimento.obiettivo_id,  # NEW
-                movimento.descrizione,
-                movimento.ricorrente,
-                movimento.bene_id,
-                movimento.km_percorsi,
-                movimento.ore_utilizzo,
-                json.dumps(scomposizione_data) if scomposizione_data else None
-            )
-        )
-        
-        conn.commit()
-        movimento_id = cursor.lastrowid
-        
-        # Aggiorna saldo conto
-        if movimento.conto_id:
-            if movimento.tipo == 'entrata':
-                conn.execute(
-                    "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
-                    (movimento.importo, movimento.conto_id)
-                )
-            elif movimento.tipo == 'uscita':
-                conn.execute(
-                    "UPDATE conti SET saldo = saldo - ? WHERE id = ?",
-                    (movimento.importo, movimento.conto_id)
-                )
-            conn.commit()
+            # Inserisci movimento e aggiorna saldo conto (un solo commit)
+            import json
+            movimento_id = inserisci_movimento(conn, {
+                'data': movimento.data,
+                'importo': movimento.importo,
+                'tipo': movimento.tipo,
+                'categoria_id': movimento.categoria_id,
+                'conto_id': movimento.conto_id,
+                'budget_id': movimento.budget_id,
+                'obiettivo_id': movimento.obiettivo_id,
+                'descrizione': movimento.descrizione,
+                'note': movimento.note,
+                'ricorrente': movimento.ricorrente,
+                'bene_id': movimento.bene_id,
+                'km_percorsi': movimento.km_percorsi,
+                'ore_utilizzo': movimento.ore_utilizzo,
+                'scomposizione_json': json.dumps(scomposizione_data) if scomposizione_data else None
+            })
         
         # Ritorna movimento creato con scomposizione
-        result = await get_movimento(movimento_id)
+        result = _carica_movimento(conn, movimento_id)
         if scomposizione_data:
             result['scomposizione'] = scomposizione_data
         
         return result
 
 
+@router.post("/bulk", status_code=201)
+@db_endpoint
+def bulk_create_movimenti(richiesta: MovimentiBulkRequest):
+    """Importa molti movimenti in una sola transazione
+    
+    Tutto-o-niente: se una riga non è valida risponde 422 con l'elenco degli
+    errori (indice della riga e motivi) e non scrive nulla. I saldi dei conti
+    vengono aggiornati una volta per conto. La scomposizione dei costi è
+    calcolata per le righe collegate a un bene che hanno km_percorsi
+    (veicoli) o ore_utilizzo (elettrodomestici).
+    """
+    if not richiesta.movimenti:
+        raise HTTPException(status_code=400, detail="Nessun movimento da importare")
+    
+    with get_db_connection() as conn:
+        try:
+            return importa_movimenti(conn, (m.model_dump() for m in richiesta.movimenti))
+        except ErroreImportazione as e:
+            raise HTTPException(
+                status_code=422,
+                detail={'messaggio': str(e), 'errori': e.errori}
+            )
+
+
+@router.post("/import", status_code=201)
+@db_endpoint
+def import_estratto_conto(
+    conto_id: int = Query(..., description="Conto a cui appartiene l'estratto"),
+    file: UploadFile = File(..., description="Estratto conto CSV, OFX/QFX o CAMT.053"),
+    formato: Optional[str] = Query(None, description="csv, ofx o camt (default: dall'estensione del file)"),
+    categoria_id: Optional[int] = Query(None, description="Categoria assegnata ai movimenti importati"),
+    codifica: Optional[str] = Query(None, description="Codifica del testo per CSV/OFX")
+):
+    """Importa un estratto conto bancario saltando i movimenti già importati
+    
+    Il file viene letto in streaming e scritto a lotti; reimportare lo stesso
+    estratto non crea duplicati. In caso di errore di formato i lotti già
+    scritti restano (vedi `stato` nel dettaglio dell'errore).
+    """
+    formato = formato or formato_da_nome(file.filename or '')
+    if formato not in FORMATI:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato non riconosciuto, specificare formato tra: {', '.join(FORMATI)}"
+        )
+    
+    with get_db_connection() as conn:
+        try:
+            return importa_estratto(
+                conn, leggi_estratto(file.file, formato, codifica), conto_id, categoria_id=categoria_id
+            )
+        except ErroreEstratto as e:
+            raise HTTPException(status_code=400, detail={'messaggio': str(e), 'stato': e.stato})
+
+
 @router.put("/{movimento_id}")
-async def update_movimento(movimento_id: int, movimento: MovimentoUpdate):
+@db_endpoint
+def update_movimento(movimento_id: int, movimento: MovimentoUpdate):
     """Aggiorna un movimento esistente"""
     
     # NEW: Validate obiettivo_id
@@ -420,166 +518,63 @@ async def update_movimento(movimento_id: int, movimento: MovimentoUpdate):
         )
     
     with get_db_connection() as conn:
-        # Verifica esistenza
-        cursor = conn.execute(
-            "SELECT importo, tipo, conto_id FROM movimenti WHERE id = ?",
-            (movimento_id,)
-        )
-        existing = cursor.fetchone()
-        
-        if not existing:
-            raise HTTPException(status_code=404, detail="Movimento non trovato")
-        
-        old_importo, old_tipo, old_conto_id = existing
-        
-        # Verifica budget se specificato
-        if movimento.budget_id:
-            cursor = conn.execute(
-                "SELECT id, attivo FROM budget WHERE id = ?",
-                (movimento.budget_id,)
-            )
-            budget_row = cursor.fetchone()
+        # Verifiche e scrittura nella stessa transazione: budget, obiettivo e
+        # bene letti qui non possono cambiare prima della scrittura
+        with transazione(conn):
+            # Verifica budget se specificato
+            if movimento.budget_id:
+                cursor = conn.execute(
+                    "SELECT id, attivo FROM budget WHERE id = ?",
+                    (movimento.budget_id,)
+                )
+                budget_row = cursor.fetchone()
             
-            if not budget_row:
-                raise HTTPException(status_code=404, detail="Budget non trovato")
+                if not budget_row:
+                    raise HTTPException(status_code=404, detail="Budget non trovato")
             
-            if not budget_row[1]:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Il budget selezionato non è attivo"
-                )
+                if not budget_row[1]:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Il budget selezionato non è attivo"
+                    )
         
-        # NEW: Verify obiettivo if specified
-        if movimento.obiettivo_id:
-            cursor = conn.execute(
-                "SELECT id, completato FROM obiettivi_risparmio WHERE id = ?",
-                (movimento.obiettivo_id,)
-            )
-            obiettivo_row = cursor.fetchone()
+            # NEW: Verify obiettivo if specified
+            if movimento.obiettivo_id:
+                cursor = conn.execute(
+                    "SELECT id, completato FROM obiettivi_risparmio WHERE id = ?",
+                    (movimento.obiettivo_id,)
+                )
+                obiettivo_row = cursor.fetchone()
             
-            if not obiettivo_row:
-                raise HTTPException(status_code=404, detail="Obiettivo non trovato")
-        
-        # Costruisci query update dinamica
-        updates = []
-        params = []
-        
-        if movimento.data is not None:
-            updates.append("data = ?")
-            params.append(movimento.data)
-        
-        if movimento.importo is not None:
-            updates.append("importo = ?")
-            params.append(movimento.importo)
-        
-        if movimento.tipo is not None:
-            updates.append("tipo = ?")
-            params.append(movimento.tipo)
-        
-        if movimento.categoria_id is not None:
-            updates.append("categoria_id = ?")
-            params.append(movimento.categoria_id)
-        
-        if movimento.conto_id is not None:
-            updates.append("conto_id = ?")
-            params.append(movimento.conto_id)
-        
-        if movimento.budget_id is not None:
-            updates.append("budget_id = ?")
-            params.append(movimento.budget_id)
-        
-        # NEW: Update obiettivo_id
-        if movimento.obiettivo_id is not None:
-            updates.append("obiettivo_id = ?")
-            params.append(movimento.obiettivo_id)
-        
-        if movimento.descrizione is not None:
-            updates.append("descrizione = ?")
-            params.append(movimento.descrizione)
-        
-        if movimento.ricorrente is not None:
-            updates.append("ricorrente = ?")
-            params.append(movimento.ricorrente)
-        
-        if not updates:
-            raise HTTPException(status_code=400, detail="Nessun campo da aggiornare")
-        
-        params.append(movimento_id)
+                if not obiettivo_row:
+                    raise HTTPException(status_code=404, detail="Obiettivo non trovato")
+        
+            # Campi da aggiornare (solo quelli presenti nella richiesta)
+            campi = {
+                campo: valore
+                for campo, valore in movimento.model_dump().items()
+                if valore is not None
+            }
         
-        conn.execute(
-            f"UPDATE movimenti SET {', '.join(updates)} WHERE id = ?",
-            params
-        )
-        conn.commit()
+            if not campi:
+                raise HTTPException(status_code=400, detail="Nessun campo da aggiornare")
         
-        # Aggiorna saldi se necessario
-        new_importo = movimento.importo if movimento.importo is not None else old_importo
-        new_tipo = movimento.tipo if movimento.tipo is not None else old_tipo
-        new_conto_id = movimento.conto_id if movimento.conto_id is not None else old_conto_id
+            # Aggiorna movimento e saldi in un solo commit
+            if not aggiorna_movimento(conn, movimento_id, campi):
+                raise HTTPException(status_code=404, detail="Movimento non trovato")
         
-        if old_conto_id and (movimento.importo is not None or movimento.tipo is not None):
-            # Ripristina vecchio saldo
-            if old_tipo == 'entrata':
-                conn.execute(
-                    "UPDATE conti SET saldo = saldo - ? WHERE id = ?",
-                    (old_importo, old_conto_id)
-                )
-            elif old_tipo == 'uscita':
-                conn.execute(
-                    "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
-                    (old_importo, old_conto_id)
-                )
-            
-            # Applica nuovo saldo
-            if new_tipo == 'entrata':
-                conn.execute(
-                    "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
-                    (new_importo, new_conto_id)
-                )
-            elif new_tipo == 'uscita':
-                conn.execute(
-                    "UPDATE conti SET saldo = saldo - ? WHERE id = ?",
-                    (new_importo, new_conto_id)
-                )
-            
-            conn.commit()
-        
-        return await get_movimento(movimento_id)
+        return _carica_movimento(conn, movimento_id)
 
 
 @router.delete("/{movimento_id}")
-async def delete_movimento(movimento_id: int):
+@db_endpoint
+def delete_movimento(movimento_id: int):
     """Elimina un movimento"""
     
     with get_db_connection() as conn:
-        # Recupera dati per aggiornare saldo
-        cursor = conn.execute(
-            "SELECT importo, tipo, conto_id FROM movimenti WHERE id = ?",
-            (movimento_id,)
-        )
-        row = cursor.fetchone()
-        
-        if not row:
-            raise HTTPException(status_code=404, detail="Movimento non trovato")
-        
-        importo, tipo, conto_id = row
-        
-        # Elimina movimento
-        conn.execute("DELETE FROM movimenti WHERE id = ?", (movimento_id,))
-        conn.commit()
-        
-        # Aggiorna saldo conto
-        if conto_id:
-            if tipo == 'entrata':
-                conn.execute(
-                    "UPDATE conti SET saldo = saldo - ? WHERE id = ?",
-                    (importo, conto_id)
-                )
-            elif tipo == 'uscita':
-                conn.execute(
-                    "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
-                    (importo, conto_id)
-                )
-            conn.commit()
+        # Elimina movimento e aggiorna saldo conto in un solo commit
+        with transazione(conn):
+            if not elimina_movimento(conn, movimento_id):
+                raise HTTPException(status_code=404, detail="Movimento non trovato")
         
         return {"message": "Movimento eliminato con successo"}
@@ -5,7 +5,7 @@ from typing import Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
-from ..database import get_db_connection, dict_from_row
+from ..database import get_db_connection, dict_from_row, db_endpoint
 
 router = APIRouter(prefix="/obiettivi", tags=["Obiettivi"])
 
@@ -102,7 +102,8 @@ def calculate_obiettivo_stats(conn, obiettivo: dict) -> dict:
 
 
 @router.get("")
-async def list_obiettivi(completati: bool = False):
+@db_endpoint
+def list_obiettivi(completati: bool = False):
     """Lista tutti gli obiettivi con stats complete"""
     with get_db_connection() as conn:
         if completati:
@@ -132,7 +133,8 @@ async def list_obiettivi(completati: bool = False):
 
 
 @router.get("/tutti")
-async def list_obiettivi_tutti():
+@db_endpoint
+def list_obiettivi_tutti():
     """Lista tutti gli obiettivi (attivi e completati) con stats complete"""
     with get_db_connection() as conn:
         cursor = conn.execute(
@@ -150,32 +152,39 @@ async def list_obiettivi_tutti():
         return [calculate_obiettivo_stats(conn, obj) for obj in obiettivi]
 
 
+def _carica_obiettivo(conn, obiettivo_id: int) -> dict:
+    """Carica un obiettivo con statistiche complete usando la connessione data"""
+    cursor = conn.execute(
+        """
+        SELECT o.*, c.nome as categoria_nome, c.icona as categoria_icona
+        FROM obiettivi_risparmio o
+        LEFT JOIN categorie c ON o.categoria_id = c.id
+        WHERE o.id = ?
+        """,
+        (obiettivo_id,)
+    )
+    
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Obiettivo non trovato")
+    
+    obiettivo = dict_from_row(row)
+    
+    # Calculate complete stats
+    return calculate_obiettivo_stats(conn, obiettivo)
+
+
 @router.get("/{obiettivo_id}")
-async def get_obiettivo(obiettivo_id: int):
+@db_endpoint
+def get_obiettivo(obiettivo_id: int):
     """Ottiene dettagli di un obiettivo specifico con stats complete"""
     with get_db_connection() as conn:
-        cursor = conn.execute(
-            """
-            SELECT o.*, c.nome as categoria_nome, c.icona as categoria_icona
-            FROM obiettivi_risparmio o
-            LEFT JOIN categorie c ON o.categoria_id = c.id
-            WHERE o.id = ?
-            """,
-            (obiettivo_id,)
-        )
-        
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Obiettivo non trovato")
-        
-        obiettivo = dict_from_row(row)
-        
-        # Calculate complete stats
-        return calculate_obiettivo_stats(conn, obiettivo)
+        return _carica_obiettivo(conn, obiettivo_id)
 
 
 @router.get("/{obiettivo_id}/contributi")
-async def get_contributi(obiettivo_id: int):
+@db_endpoint
+def get_contributi(obiettivo_id: int):
     """Ottiene lista contributi (movimenti) per un obiettivo"""
     with get_db_connection() as conn:
         # Verifica obiettivo esiste
@@ -216,7 +225,8 @@ async def get_contributi(obiettivo_id: int):
 
 
 @router.post("", status_code=201)
-async def create_obiettivo(obiettivo: ObiettivoCreate):
+@db_endpoint
+def create_obiettivo(obiettivo: ObiettivoCreate):
     """Crea un nuovo obiettivo"""
     with get_db_connection() as conn:
         # Verifica categoria se specificata
@@ -247,11 +257,12 @@ async def create_obiettivo(obiettivo: ObiettivoCreate):
         conn.commit()
         obiettivo_id = cursor.lastrowid
         
-        return await get_obiettivo(obiettivo_id)
+        return _carica_obiettivo(conn, obiettivo_id)
 
 
 @router.put("/{obiettivo_id}")
-async def update_obiettivo(obiettivo_id: int, obiettivo: ObiettivoUpdate):
+@db_endpoint
+def update_obiettivo(obiettivo_id: int, obiettivo: ObiettivoUpdate):
     """Aggiorna un obiettivo esistente"""
     with get_db_connection() as conn:
         # Verifica esistenza
@@ -280,7 +291,7 @@ async def update_obiettivo(obiettivo_id: int, obiettivo: ObiettivoUpdate):
             params.append(value)
         
         if not updates:
-            return await get_obiettivo(obiettivo_id)
+            return _carica_obiettivo(conn, obiettivo_id)
         
         params.append(obiettivo_id)
         
@@ -291,11 +302,12 @@ async def update_obiettivo(obiettivo_id: int, obiettivo: ObiettivoUpdate):
         
         conn.commit()
         
-        return await get_obiettivo(obiettivo_id)
+        return _carica_obiettivo(conn, obiettivo_id)
 
 
 @router.delete("/{obiettivo_id}")
-async def delete_obiettivo(obiettivo_id: int):
+@db_endpoint
+def delete_obiettivo(obiettivo_id: int):
     """Elimina un obiettivo"""
     with get_db_connection() as conn:
         cursor = conn.execute(
@@ -2,10 +2,12 @@
 
 from fastapi import APIRouter, HTTPException, status, Query
 from typing import List, Optional
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 
-from ..database import get_db_connection, dict_from_row
+from ..database import get_db_connection, dict_from_row, db_endpoint
 from ..models import MovimentoRicorrente, FrequenzaRicorrenza
+from ..services.contabilita import inserisci_movimento, transazione
+from ..services.esecuzione_ricorrenze import prossima_occorrenza
 
 router = APIRouter(prefix="/ricorrenze", tags=["Ricorrenze"])
 
@@ -24,54 +26,18 @@ def calcola_prossima_data(ricorrenza: MovimentoRicorrente, data_base: date = Non
     if data_base is None:
         data_base = date.today()
     
-    if ricorrenza.frequenza == FrequenzaRicorrenza.GIORNALIERA:
-        return data_base + timedelta(days=1)
-    
-    elif ricorrenza.frequenza == FrequenzaRicorrenza.SETTIMANALE:
-        if ricorrenza.giorno_settimana is None:
-            raise ValueError("giorno_settimana richiesto per frequenza settimanale")
-        giorni_da_aggiungere = (ricorrenza.giorno_settimana - data_base.weekday()) % 7
-        if giorni_da_aggiungere == 0:
-            giorni_da_aggiungere = 7
-        return data_base + timedelta(days=giorni_da_aggiungere)
-    
-    elif ricorrenza.frequenza == FrequenzaRicorrenza.MENSILE:
-        if ricorrenza.giorno_mese is None:
-            raise ValueError("giorno_mese richiesto per frequenza mensile")
-        
-        prossimo_mese = data_base.month + 1
-        prossimo_anno = data_base.year
-        if prossimo_mese > 12:
-            prossimo_mese = 1
-            prossimo_anno += 1
-        
-        # Gestisci mesi con meno giorni
-        giorno = min(ricorrenza.giorno_mese, 28)  # Sicuro per tutti i mesi
-        if prossimo_mese in [1, 3, 5, 7, 8, 10, 12]:
-            giorno = min(ricorrenza.giorno_mese, 31)
-        elif prossimo_mese == 2:
-            # Anno bisestile
-            if prossimo_anno % 4 == 0 and (prossimo_anno % 100 != 0 or prossimo_anno % 400 == 0):
-                giorno = min(ricorrenza.giorno_mese, 29)
-            else:
-                giorno = min(ricorrenza.giorno_mese, 28)
-        else:
-            giorno = min(ricorrenza.giorno_mese, 30)
-        
-        return date(prossimo_anno, prossimo_mese, giorno)
-    
-    elif ricorrenza.frequenza == FrequenzaRicorrenza.ANNUALE:
-        if ricorrenza.giorno_mese is None or ricorrenza.mese is None:
-            raise ValueError("giorno_mese e mese richiesti per frequenza annuale")
-        
-        prossimo_anno = data_base.year + 1
-        return date(prossimo_anno, ricorrenza.mese, ricorrenza.giorno_mese)
-    
-    return data_base
+    return prossima_occorrenza(
+        ricorrenza.frequenza,
+        data_base,
+        giorno_mese=ricorrenza.giorno_mese,
+        giorno_settimana=ricorrenza.giorno_settimana,
+        mese=ricorrenza.mese
+    )
 
 
 @router.get("", response_model=List[dict])
-async def lista_ricorrenze(
+@db_endpoint
+def lista_ricorrenze(
     attivo: Optional[bool] = None,
     tipo: Optional[str] = None,
     frequenza: Optional[str] = None,
@@ -128,7 +94,8 @@ async def lista_ricorrenze(
 
 
 @router.get("/{ricorrenza_id}")
-async def dettaglio_ricorrenza(ricorrenza_id: int):
+@db_endpoint
+def dettaglio_ricorrenza(ricorrenza_id: int):
     """Ottiene i dettagli di una ricorrenza specifica"""
     with get_db_connection() as conn:
         query = """
@@ -155,7 +122,8 @@ async def dettaglio_ricorrenza(ricorrenza_id: int):
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
-async def crea_ricorrenza(ricorrenza: MovimentoRicorrente):
+@db_endpoint
+def crea_ricorrenza(ricorrenza: MovimentoRicorrente):
     """Crea una nuova ricorrenza"""
     # Validazione campi obbligatori per frequenza
     if ricorrenza.frequenza == FrequenzaRicorrenza.SETTIMANALE and ricorrenza.giorno_settimana is None:
@@ -224,7 +192,8 @@ async def crea_ricorrenza(ricorrenza: MovimentoRicorrente):
 
 
 @router.put("/{ricorrenza_id}")
-async def aggiorna_ricorrenza(ricorrenza_id: int, ricorrenza: MovimentoRicorrente):
+@db_endpoint
+def aggiorna_ricorrenza(ricorrenza_id: int, ricorrenza: MovimentoRicorrente):
     """Aggiorna una ricorrenza esistente"""
     with get_db_connection() as conn:
         # Verifica esistenza
@@ -284,7 +253,8 @@ async def aggiorna_ricorrenza(ricorrenza_id: int, ricorrenza: MovimentoRicorrent
 
 
 @router.delete("/{ricorrenza_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def elimina_ricorrenza(ricorrenza_id: int):
+@db_endpoint
+def elimina_ricorrenza(ricorrenza_id: int):
     """Elimina una ricorrenza"""
     with get_db_connection() as conn:
         cursor = conn.execute(
@@ -305,7 +275,8 @@ async def elimina_ricorrenza(ricorrenza_id: int):
 
 
 @router.post("/{ricorrenza_id}/toggle")
-async def toggle_ricorrenza(ricorrenza_id: int):
+@db_endpoint
+def toggle_ricorrenza(ricorrenza_id: int):
     """
     Attiva/Disattiva una ricorrenza (pausa/riprendi).
     """
@@ -340,71 +311,55 @@ async def toggle_ricorrenza(ricorrenza_id: int):
 
 
 @router.post("/{ricorrenza_id}/esegui")
-async def esegui_ricorrenza_manuale(ricorrenza_id: int):
+@db_endpoint
+def esegui_ricorrenza_manuale(ricorrenza_id: int):
     """
     Esegue manualmente una ricorrenza (crea movimento e aggiorna prossima_data).
     """
     with get_db_connection() as conn:
-        # Ottieni ricorrenza
-        cursor = conn.execute(
-            "SELECT * FROM movimenti_ricorrenti WHERE id = ?",
-            (ricorrenza_id,)
-        )
-        row = cursor.fetchone()
-        
-        if not row:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Ricorrenza {ricorrenza_id} non trovata"
-            )
-        
-        ric_dict = dict_from_row(row)
-        
-        # Crea movimento
-        importo_movimento = ric_dict['importo'] if ric_dict['tipo'] == 'entrata' else -abs(ric_dict['importo'])
-        
-        cursor = conn.execute(
-            """
-            INSERT INTO movimenti (
-                data, importo, tipo, conto_id, categoria_id,
-                budget_id, obiettivo_id, bene_id, descrizione, note
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                datetime.now().isoformat(),
-                importo_movimento,
-                ric_dict['tipo'],
-                ric_dict['conto_id'],
-                ric_dict['categoria_id'],
-                ric_dict['budget_id'],
-                ric_dict['obiettivo_id'],
-                ric_dict['bene_id'],
-                f"[AUTO] {ric_dict['descrizione']}",
-                ric_dict['note']
+        # Lettura della ricorrenza, movimento, saldo e prossima data in un solo commit
+        with transazione(conn):
+            row = conn.execute(
+                "SELECT * FROM movimenti_ricorrenti WHERE id = ?",
+                (ricorrenza_id,)
+            ).fetchone()
+
+            if not row:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Ricorrenza {ricorrenza_id} non trovata"
+                )
+
+            ric_dict = dict_from_row(row)
+
+            # Crea movimento e aggiorna saldo conto
+            importo_movimento = (
+                ric_dict['importo'] if ric_dict['tipo'] == 'entrata' else -abs(ric_dict['importo'])
             )
-        )
-        movimento_id = cursor.lastrowid
-        
-        # Aggiorna saldo conto se presente
-        if ric_dict['conto_id']:
+
+            movimento_id = inserisci_movimento(conn, {
+                'data': datetime.now().isoformat(),
+                'importo': importo_movimento,
+                'tipo': ric_dict['tipo'],
+                'conto_id': ric_dict['conto_id'],
+                'categoria_id': ric_dict['categoria_id'],
+                'budget_id': ric_dict['budget_id'],
+                'obiettivo_id': ric_dict['obiettivo_id'],
+                'bene_id': ric_dict['bene_id'],
+                'descrizione': f"[AUTO] {ric_dict['descrizione']}",
+                'note': ric_dict['note'],
+            })
+
+            # Calcola prossima data
+            ric_obj = MovimentoRicorrente(**ric_dict)
+            prossima = calcola_prossima_data(ric_obj, date.today())
+
+            # Aggiorna ricorrenza
             conn.execute(
-                "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
-                (importo_movimento, ric_dict['conto_id'])
+                "UPDATE movimenti_ricorrenti SET prossima_data = ? WHERE id = ?",
+                (prossima.isoformat(), ricorrenza_id)
             )
-        
-        # Calcola prossima data
-        ric_obj = MovimentoRicorrente(**ric_dict)
-        prossima = calcola_prossima_data(ric_obj, date.today())
-        
-        # Aggiorna ricorrenza
-        conn.execute(
-            "UPDATE movimenti_ricorrenti SET prossima_data = ? WHERE id = ?",
-            (prossima.isoformat(), ricorrenza_id)
-        )
-        
-        conn.commit()
-        
+
         return {
             "success": True,
             "movimento_id": movimento_id,
@@ -0,0 +1,35 @@
+"""API endpoint per la sincronizzazione incrementale del client mobile"""
+
+from fastapi import APIRouter, HTTPException, status, Query
+from typing import Optional
+
+from ..database import get_db_connection, db_endpoint
+from ..services.sincronizzazione import modifiche, LIMITE_PREDEFINITO, LIMITE_MASSIMO
+
+router = APIRouter(prefix="/sync", tags=["Sincronizzazione"])
+
+
+@router.get("")
+@db_endpoint
+def sync(
+    token: Optional[str] = Query(None, description="Token restituito dalla sincronizzazione precedente"),
+    limit: int = Query(LIMITE_PREDEFINITO, ge=1, le=LIMITE_MASSIMO, description="Modifiche per pagina")
+):
+    """Record modificati ed eliminati dopo il token
+    
+    Senza token restituisce tutti i record. Se reset è true il client deve
+    sostituire i propri dati; se has_more è true deve richiamare subito
+    l'endpoint con il nuovo token.
+    """
+    with get_db_connection() as conn:
+        try:
+            risultato = modifiche(conn, token, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return {
+        "token": risultato['token'],
+        "reset": risultato['reset'],
+        "has_more": risultato['altre'],
+        "tabelle": risultato['tabelle']
+    }
@@ -5,7 +5,8 @@ from .calcolatore_costi import (
     CalcolatoreElettrodomestico,
     RipartitoreUtenze,
     ComponenteCosto,
-    RisultatoScomposizione
+    RisultatoScomposizione,
+    RisultatoScomposizioneBatch
 )
 
 __all__ = [
@@ -13,5 +14,6 @@ __all__ = [
     'CalcolatoreElettrodomestico',
     'RipartitoreUtenze',
     'ComponenteCosto',
-    'RisultatoScomposizione'
+    'RisultatoScomposizione',
+    'RisultatoScomposizioneBatch'
 ]
\ No newline at end of file
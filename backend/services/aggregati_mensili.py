@@ -0,0 +1,200 @@
+"""Lettura e ricostruzione dell'aggregato mensile dei movimenti
+
+La tabella movimenti_mensili (migration 010) è mantenuta dai trigger su
+movimenti. I periodi che coprono mesi interi vengono letti dall'aggregato,
+mentre i giorni ai bordi di un periodo che inizia o finisce a metà mese
+vengono letti dai movimenti grezzi tramite l'indice su data_giorno.
+
+Uso da riga di comando:
+    python -m backend.services.aggregati_mensili rebuild
+"""
+
+import sys
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .versioni import incrementa_versione
+
+# Colonne della chiave dell'aggregato oltre a mese e tipo (NULL salvato come 0)
+COLONNE_CHIAVE = ('categoria_id', 'conto_id', 'bene_id', 'budget_id', 'obiettivo_id')
+
+# Stessa espressione usata dai trigger della migration 010
+_MESE_SQL = "IFNULL(strftime('%Y-%m', data), substr(data, 1, 7))"
+
+
+def ricostruisci(conn) -> int:
+    """Rigenera da zero l'aggregato mensile, restituisce il numero di gruppi"""
+    colonne = ", ".join(COLONNE_CHIAVE)
+    colonne_raw = ", ".join(f"IFNULL({col}, 0)" for col in COLONNE_CHIAVE)
+
+    with conn:
+        conn.execute("DELETE FROM movimenti_mensili")
+        conn.execute(
+            f"""
+            INSERT INTO movimenti_mensili (
+                mese, tipo, {colonne}, totale, totale_abs, conteggio
+            )
+            SELECT {_MESE_SQL}, tipo, {colonne_raw},
+                   SUM(importo), SUM(ABS(importo)), COUNT(*)
+            FROM movimenti
+            GROUP BY 1, 2, 3, 4, 5, 6, 7
+            """
+        )
+        # Le risposte in cache e gli ETag dipendono dalla versione di movimenti
+        incrementa_versione(conn, 'movimenti')
+
+    return conn.execute("SELECT COUNT(*) FROM movimenti_mensili").fetchone()[0]
+
+
+def aggiungi_movimenti(conn, id_da: int) -> None:
+    """Somma all'aggregato i movimenti con id > id_da, raggruppati
+
+    Equivale a far scattare il trigger di inserimento della migration 010 su
+    ogni riga, ma con un solo UPSERT per gruppo: usato dalle importazioni
+    massive, che sospendono il trigger nella stessa transazione.
+    """
+    colonne = ", ".join(COLONNE_CHIAVE)
+    colonne_raw = ", ".join(f"IFNULL({col}, 0)" for col in COLONNE_CHIAVE)
+
+    conn.execute(
+        f"""
+        INSERT INTO movimenti_mensili (
+            mese, tipo, {colonne}, totale, totale_abs, conteggio
+        )
+        SELECT {_MESE_SQL}, tipo, {colonne_raw},
+               SUM(importo), SUM(ABS(importo)), COUNT(*)
+        FROM movimenti
+        WHERE id > ?
+        GROUP BY 1, 2, 3, 4, 5, 6, 7
+        ON CONFLICT (mese, tipo, {colonne}) DO UPDATE SET
+            totale = totale + excluded.totale,
+            totale_abs = totale_abs + excluded.totale_abs,
+            conteggio = conteggio + excluded.conteggio
+        """,
+        (id_da,)
+    )
+
+
+def dividi_periodo(
+    data_da: Optional[date],
+    data_a: Optional[date]
+) -> Tuple[Optional[Tuple[Optional[str], Optional[str]]], List[Tuple[str, str]]]:
+    """Divide il periodo [data_da, data_a] in mesi interi e giorni ai bordi
+
+    Restituisce (mesi, giorni): `mesi` è la coppia (mese_da, mese_a) in
+    formato 'YYYY-MM' da leggere dall'aggregato (None se nessun mese è
+    intero, estremi None se il periodo è aperto), `giorni` è la lista degli
+    intervalli (da, a) da leggere dai movimenti grezzi.
+    """
+    giorni = []
+
+    inizio_pieni = data_da
+    if data_da is not None and data_da.day != 1:
+        ultimo = monthrange(data_da.year, data_da.month)[1]
+        inizio_pieni = date(data_da.year, data_da.month, ultimo) + timedelta(days=1)
+
+    fine_pieni = data_a
+    if data_a is not None and data_a.day != monthrange(data_a.year, data_a.month)[1]:
+        fine_pieni = date(data_a.year, data_a.month, 1) - timedelta(days=1)
+
+    if inizio_pieni is not None and fine_pieni is not None and inizio_pieni > fine_pieni:
+        # Nessun mese intero: tutto il periodo viene dai movimenti
+        return None, [(data_da.isoformat(), data_a.isoformat())]
+
+    if inizio_pieni != data_da:
+        giorni.append((data_da.isoformat(), (inizio_pieni - timedelta(days=1)).isoformat()))
+    if fine_pieni != data_a:
+        giorni.append(((fine_pieni + timedelta(days=1)).isoformat(), data_a.isoformat()))
+
+    mesi = (
+        inizio_pieni.strftime('%Y-%m') if inizio_pieni else None,
+        fine_pieni.strftime('%Y-%m') if fine_pieni else None
+    )
+    return mesi, giorni
+
+
+def sorgente_mensile(
+    data_da: Optional[date] = None,
+    data_a: Optional[date] = None,
+    filtri: Optional[Dict[str, object]] = None
+) -> Tuple[str, list]:
+    """Sottoquery con le righe aggregate per mese del periodo richiesto
+
+    Le righe hanno le colonne mese, tipo, categoria_id, conto_id, bene_id,
+    budget_id, obiettivo_id, totale, totale_abs e conteggio; vanno
+    raggruppate dal chiamante. `filtri` mappa colonna -> valore (None per
+    i movimenti senza riferimento) e si applica a entrambe le sorgenti.
+    """
+    filtri = filtri or {}
+    for col in filtri:
+        if col != 'tipo' and col not in COLONNE_CHIAVE:
+            raise ValueError(f"Filtro non supportato: {col}")
+
+    mesi, giorni = dividi_periodo(data_da, data_a)
+    parti = []
+    params = []
+
+    if mesi is not None:
+        condizioni = []
+        if mesi[0]:
+            condizioni.append("mese >= ?")
+            params.append(mesi[0])
+        if mesi[1]:
+            condizioni.append("mese <= ?")
+            params.append(mesi[1])
+        for col, valore in filtri.items():
+            condizioni.append(f"{col} = ?")
+            params.append(0 if valore is None else valore)
+
+        where = f"WHERE {' AND '.join(condizioni)}" if condizioni else ""
+        parti.append(
+            f"""
+            SELECT mese, tipo, {', '.join(COLONNE_CHIAVE)}, totale, totale_abs, conteggio
+            FROM movimenti_mensili
+            {where}
+            """
+        )
+
+    for da, a in giorni:
+        condizioni = ["data_giorno >= ?", "data_giorno <= ?"]
+        params.extend([da, a])
+        for col, valore in filtri.items():
+            if valore is None:
+                condizioni.append(f"{col} IS NULL")
+            else:
+                condizioni.append(f"{col} = ?")
+                params.append(valore)
+
+        colonne_raw = ", ".join(f"IFNULL({col}, 0) AS {col}" for col in COLONNE_CHIAVE)
+        parti.append(
+            f"""
+            SELECT {_MESE_SQL} AS mese, tipo, {colonne_raw},
+                   importo AS totale, ABS(importo) AS totale_abs, 1 AS conteggio
+            FROM movimenti
+            WHERE {' AND '.join(condizioni)}
+            """
+        )
+
+    return "(" + " UNION ALL ".join(parti) + ")", params
+
+
+def main(argv=None):
+    """Entry point da riga di comando"""
+    argv = sys.argv[1:] if argv is None else argv
+
+    if argv != ['rebuild']:
+        print("Uso: python -m backend.services.aggregati_mensili rebuild")
+        return 2
+
+    from ..database import get_db_connection
+
+    with get_db_connection() as conn:
+        gruppi = ricostruisci(conn)
+
+    print(f"✓ Aggregato mensile ricostruito: {gruppi} gruppi")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Cache in-process delle risposte JSON con invalidazione per versione
+
+Le risposte vengono salvate già serializzate, insieme alle versioni delle
+tabelle da cui dipendono (services/versioni). Una lettura è valida solo se
+le versioni correnti sono identiche: qualunque scrittura su quelle tabelle
+la invalida, senza dover sapere quali chiavi toccare. Il TTL è una rete di
+sicurezza, il limite di elementi è gestito in ordine LRU.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Callable, Hashable, Iterable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from .. import database
+from .versioni import leggi_versioni
+
+
+class CacheRisposte:
+    """Cache LRU con TTL di corpi di risposta, validati da una versione"""
+
+    def __init__(self, max_elementi: int = 256, ttl: float = 300.0):
+        if max_elementi < 1:
+            raise ValueError("La cache deve contenere almeno un elemento")
+
+        self.max_elementi = max_elementi
+        self.ttl = ttl
+
+        self._elementi = OrderedDict()  # chiave -> (scadenza, versione, corpo)
+        self._lock = threading.Lock()
+
+        # Statistiche
+        self._hit = 0
+        self._miss = 0
+        self._invalidate = 0
+        self._scadute = 0
+        self._espulse = 0
+
+    def leggi(self, chiave: Hashable, versione: tuple) -> Optional[bytes]:
+        """Corpo salvato per la chiave se ancora valido per `versione`"""
+        with self._lock:
+            elemento = self._elementi.get(chiave)
+            if elemento is None:
+                self._miss += 1
+                return None
+
+            scadenza, versione_salvata, corpo = elemento
+            if versione_salvata != versione:
+                del self._elementi[chiave]
+                self._invalidate += 1
+                self._miss += 1
+                return None
+            if scadenza < time.monotonic():
+                del self._elementi[chiave]
+                self._scadute += 1
+                self._miss += 1
+                return None
+
+            self._elementi.move_to_end(chiave)
+            self._hit += 1
+            return corpo
+
+    def scrivi(self, chiave: Hashable, versione: tuple, corpo: bytes):
+        """Salva un corpo, espellendo il meno usato di recente se serve"""
+        with self._lock:
+            self._elementi[chiave] = (time.monotonic() + self.ttl, versione, corpo)
+            self._elementi.move_to_end(chiave)
+            while len(self._elementi) > self.max_elementi:
+                self._elementi.popitem(last=False)
+                self._espulse += 1
+
+    def svuota(self):
+        """Rimuove tutti gli elementi (le statistiche restano)"""
+        with self._lock:
+            self._elementi.clear()
+
+    def stats(self) -> dict:
+        """Statistiche di utilizzo"""
+        with self._lock:
+            richieste = self._hit + self._miss
+            return {
+                "elementi": len(self._elementi),
+                "max_elementi": self.max_elementi,
+                "ttl": self.ttl,
+                "hit": self._hit,
+                "miss": self._miss,
+                "hit_rate": round(self._hit / richieste, 4) if richieste else None,
+                "invalidate": self._invalidate,
+                "scadute": self._scadute,
+                "espulse": self._espulse,
+            }
+
+
+def memorizza(cache: CacheRisposte, nome: str, tabelle: Iterable[str]) -> Callable:
+    """Decoratore per handler sincroni che restituiscono dati JSON
+
+    La chiave è (database, nome, giorno corrente, parametri): il giorno entra
+    nella chiave perché i periodi di default dipendono dalla data. Le versioni
+    vengono lette prima di calcolare la risposta, così una scrittura
+    concorrente produce al più un miss in più, mai un dato vecchio.
+    """
+    tabelle = tuple(tabelle)
+
+    def decoratore(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            chiave = (database.DB_PATH, nome, date.today(), args, tuple(sorted(kwargs.items())))
+
+            with database.get_db_connection() as conn:
+                versione = leggi_versioni(conn, tabelle)
+
+            corpo = cache.leggi(chiave, versione)
+            esito = "HIT"
+            if corpo is None:
+                esito = "MISS"
+                corpo = JSONResponse(content=jsonable_encoder(func(*args, **kwargs))).body
+                cache.scrivi(chiave, versione, corpo)
+
+            return Response(content=corpo, media_type="application/json", headers={"X-Cache": esito})
+
+        return wrapper
+
+    return decoratore
@@ -4,13 +4,24 @@ Questo modulo calcola la scomposizione dettagliata dei costi per:
 - Veicoli (carburante, usura, ammortamento)
 - Elettrodomestici (consumo elettrico, ammortamento)
 - Utenze (ripartizione per centro di costo)
+
+Le varianti batch (calcola_costi_viaggi, calcola_costi_periodi) calcolano
+molti scenari in una chiamata con numpy e restituiscono i risultati in
+colonne, con gli stessi valori del calcolo singolo. numpy è importato solo
+da queste varianti, per non pesare sull'avvio dell'API.
 """
 
 from dataclasses import dataclass
 from datetime import datetime, date
-from typing import List, Optional, Dict
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Union
 from decimal import Decimal
 
+if TYPE_CHECKING:
+    import numpy as np
+
+# Valore singolo o sequenza di valori (uno per scenario)
+Valori = Union[float, Sequence[float], "np.ndarray"]
+
 
 @dataclass
 class ComponenteCosto:
@@ -32,6 +43,79 @@ class RisultatoScomposizione:
     note: Optional[str] = None
 
 
+@dataclass
+class RisultatoScomposizioneBatch:
+    """Scomposizione di N scenari in colonne (array di lunghezza N)
+
+    componenti e percentuali sono indicizzati per nome del componente,
+    parametri per nome del parametro, con gli stessi valori arrotondati di
+    RisultatoScomposizione. Con totale zero la percentuale è NaN (il calcolo
+    singolo solleva ZeroDivisionError).
+    """
+    importo_totale: "np.ndarray"
+    componenti: Dict[str, "np.ndarray"]
+    percentuali: Dict[str, "np.ndarray"]
+    parametri: Dict[str, "np.ndarray"]
+    bene_id: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.importo_totale)
+
+
+def _arrotonda(valori: "np.ndarray", cifre: int) -> "np.ndarray":
+    """Come round(valore, cifre) su ogni elemento, con lo stesso risultato
+
+    np.round moltiplica per 10**cifre e arrotonda il prodotto, che può
+    differire da round() quando il valore è quasi a metà tra due
+    arrotondamenti: quei pochi casi sono ricalcolati con round().
+    """
+    import numpy as np
+
+    scala = 10.0 ** cifre
+    scalati = valori * scala
+    risultato = np.rint(scalati) / scala
+
+    dubbi = (np.abs(scalati - np.floor(scalati) - 0.5) < 1e-6) | (np.abs(scalati) >= 2.0 ** 31)
+    for i in np.flatnonzero(dubbi):
+        risultato.flat[i] = round(float(valori.flat[i]), cifre)
+    return risultato
+
+
+def _giorni_da(date_viaggi, origine: date) -> "np.ndarray":
+    """Giorni trascorsi da `origine` per ogni data (date o array datetime64)"""
+    import numpy as np
+
+    if isinstance(date_viaggi, date):
+        date_viaggi = [date_viaggi]
+    elif isinstance(date_viaggi, np.datetime64):
+        date_viaggi = np.asarray(date_viaggi)
+
+    if isinstance(date_viaggi, np.ndarray) and np.issubdtype(date_viaggi.dtype, np.datetime64):
+        return (date_viaggi.astype('datetime64[D]') - np.datetime64(origine, 'D')).astype(np.int64)
+
+    # toordinal() è molto più rapido della conversione numpy di oggetti date
+    ordinali = np.fromiter((giorno.toordinal() for giorno in date_viaggi), dtype=np.int64)
+    return ordinali - origine.toordinal()
+
+
+def _componi_batch(componenti: Dict[str, "np.ndarray"], parametri: Dict[str, "np.ndarray"]) -> RisultatoScomposizioneBatch:
+    """Totali e percentuali come nel calcolo singolo (somma dei valori arrotondati)"""
+    import numpy as np
+
+    totale = sum(componenti.values())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentuali = {
+            nome: _arrotonda((valore / totale) * 100, 1)
+            for nome, valore in componenti.items()
+        }
+    return RisultatoScomposizioneBatch(
+        importo_totale=_arrotonda(totale, 2),
+        componenti=componenti,
+        percentuali=percentuali,
+        parametri=parametri
+    )
+
+
 class CalcolatoreVeicolo:
     """Calcola costi disaggregati per veicoli"""
     
@@ -140,6 +224,67 @@ class CalcolatoreVeicolo:
             componenti=componenti,
             note=f"Viaggio di {km_percorsi} km con {self.nome_veicolo}"
         )
+
+    def calcola_costi_viaggi(self,
+                             km_percorsi: Valori,
+                             prezzi_carburante_al_litro: Valori,
+                             date_viaggi: Optional[Union[date, Sequence[date]]] = None) -> RisultatoScomposizioneBatch:
+        """
+        Scomposizione di molti viaggi in una chiamata (es. tutti i rifornimenti).
+
+        Args:
+            km_percorsi: Chilometri di ogni viaggio
+            prezzi_carburante_al_litro: Prezzo carburante per viaggio, o uno solo per tutti (€/L)
+            date_viaggi: Data di ogni viaggio, o una sola per tutti (default: oggi)
+
+        Returns:
+            RisultatoScomposizioneBatch con gli stessi valori di calcola_costo_viaggio
+        """
+        import numpy as np
+
+        if date_viaggi is None:
+            date_viaggi = [date.today()]
+        # atleast_1d: con soli scalari il risultato resta un lotto di un viaggio
+        km, prezzi, giorni_eta = np.broadcast_arrays(*np.atleast_1d(
+            np.asarray(km_percorsi, dtype=float),
+            np.asarray(prezzi_carburante_al_litro, dtype=float),
+            _giorni_da(date_viaggi, self.data_acquisto)
+        ))
+
+        # 1. CARBURANTE
+        litri_consumati = (km / 100) * self.consumo_medio
+        costo_carburante = litri_consumati * prezzi
+
+        # 2. USURA E MANUTENZIONE
+        costo_usura = km * self.costo_manutenzione_per_km
+
+        # 3. AMMORTAMENTO: il deprezzamento dipende solo dal giorno, calcolato
+        # una volta per giorno distinto con la stessa potenza del calcolo singolo
+        giorni_distinti, posizioni = np.unique(giorni_eta, return_inverse=True)
+        fattore = (100 - self.tasso_ammortamento) / 100
+        valore_residuo = np.array([
+            self.prezzo_acquisto * fattore ** (giorni / 365.25) for giorni in giorni_distinti.tolist()
+        ], dtype=float)[posizioni.reshape(giorni_eta.shape)]
+        anni_eta = giorni_eta / 365.25
+        km_totali_stimati = self.durata_anni * 15000  # Stima media 15.000 km/anno
+        costo_ammortamento_per_km = (self.prezzo_acquisto - valore_residuo) / km_totali_stimati
+        costo_ammortamento = km * costo_ammortamento_per_km
+
+        return _componi_batch(
+            {
+                "Carburante": _arrotonda(costo_carburante, 2),
+                "Usura e Manutenzione": _arrotonda(costo_usura, 2),
+                "Ammortamento": _arrotonda(costo_ammortamento, 2),
+            },
+            {
+                "km_percorsi": km,
+                "litri_consumati": _arrotonda(litri_consumati, 2),
+                "prezzo_litro": prezzi,
+                "anni_eta": _arrotonda(anni_eta, 1),
+                "valore_residuo": _arrotonda(valore_residuo, 2),
+                "costo_ammortamento_per_km": _arrotonda(costo_ammortamento_per_km, 4),
+            }
+        )
     
     def calcola_costo_mensile_stimato(self, 
                                       km_mese: float,
@@ -246,6 +391,56 @@ class CalcolatoreElettrodomestico:
             componenti=componenti,
             note=f"Consumo {self.nome} per {giorni} giorni ({round(kwh_consumati, 2)} kWh)"
         )
+
+    def calcola_costi_periodi(self,
+                              giorni: Valori,
+                              prezzi_kwh: Valori,
+                              ore_effettive_totali: Optional[Valori] = None) -> RisultatoScomposizioneBatch:
+        """
+        Scomposizione di molti periodi di utilizzo in una chiamata.
+
+        Args:
+            giorni: Giorni di ogni periodo
+            prezzi_kwh: Prezzo elettricità per periodo, o uno solo per tutti (€/kWh)
+            ore_effettive_totali: Ore effettive per periodo; None (o NaN per
+                un periodo) usa la media giornaliera
+
+        Returns:
+            RisultatoScomposizioneBatch con gli stessi valori di calcola_costo_periodo
+        """
+        import numpy as np
+
+        if ore_effettive_totali is None:
+            ore_effettive_totali = np.nan
+        # atleast_1d: con soli scalari il risultato resta un lotto di un periodo
+        giorni, prezzi, ore_effettive = np.broadcast_arrays(*np.atleast_1d(
+            np.asarray(giorni, dtype=np.int64),
+            np.asarray(prezzi_kwh, dtype=float),
+            np.asarray(ore_effettive_totali, dtype=float)
+        ))
+
+        # 1. CONSUMO ELETTRICO
+        ore_totali = np.where(np.isnan(ore_effettive), self.ore_giorno * giorni, ore_effettive)
+        kwh_consumati = (self.potenza_watt / 1000) * ore_totali
+        costo_elettricita = kwh_consumati * prezzi
+
+        # 2. AMMORTAMENTO
+        giorni_vita_utile = self.durata_anni * 365
+        costo_ammortamento_giornaliero = self.prezzo_acquisto / giorni_vita_utile
+        costo_ammortamento = costo_ammortamento_giornaliero * giorni
+
+        return _componi_batch(
+            {
+                "Consumo Elettrico": _arrotonda(costo_elettricita, 2),
+                "Ammortamento": _arrotonda(costo_ammortamento, 2),
+            },
+            {
+                "giorni": giorni,
+                "ore_utilizzo": _arrotonda(ore_totali, 1),
+                "kwh_consumati": _arrotonda(kwh_consumati, 2),
+                "prezzo_kwh": prezzi,
+            }
+        )
     
     def calcola_costo_mensile(self, prezzo_kwh: float) -> RisultatoScomposizione:
         """Calcola il costo mensile medio"""
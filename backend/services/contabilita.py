@@ -0,0 +1,124 @@
+"""Scritture dei movimenti con i relativi saldi, in una sola transazione
+
+Ogni operazione su un movimento (inserimento, modifica, eliminazione)
+aggiorna nella stessa transazione il saldo del conto; aggregati, indice di
+ricerca, versioni, registro delle modifiche e variazioni giornaliere sono
+aggiornati dai trigger sugli stessi statement. Con `transazione` il chiamante
+raggruppa validazioni e scritture e paga un solo commit (un solo fsync):
+un errore a metà annulla tutto e il saldo non può divergere dai movimenti.
+
+Le funzioni di scrittura non fanno commit: vanno chiamate dentro
+`transazione` (o in una transazione aperta dal chiamante).
+"""
+
+from contextlib import contextmanager
+from typing import Mapping, Optional
+
+
+@contextmanager
+def transazione(conn):
+    """Transazione di scrittura con un solo commit, rollback su eccezione
+
+    BEGIN IMMEDIATE prende subito il lock di scrittura, così le letture fatte
+    dentro la transazione non possono essere superate da un'altra scrittura.
+    Se la connessione è già in una transazione, commit e rollback restano al
+    chiamante.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def effetto_saldo(tipo: str, importo: float) -> float:
+    """Variazione del saldo del conto dovuta a un movimento
+
+    Stessa regola della migration 018: l'importo delle uscite è salvato
+    positivo o negativo a seconda del percorso di scrittura, i trasferimenti
+    sono registrati come coppie uscita/entrata e il tipo 'trasferimento' non
+    muove il saldo.
+    """
+    if tipo == 'entrata':
+        return abs(importo)
+    if tipo == 'uscita':
+        return -abs(importo)
+    return 0.0
+
+
+def _sposta_saldo(conn, conto_id: Optional[int], variazione: float) -> None:
+    if conto_id and variazione:
+        conn.execute(
+            "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
+            (variazione, conto_id)
+        )
+
+
+def inserisci_movimento(conn, valori: Mapping[str, object]) -> int:
+    """Inserisce un movimento (colonna -> valore) e aggiorna il saldo del conto"""
+    colonne = list(valori)
+    cursor = conn.execute(
+        f"""
+        INSERT INTO movimenti ({', '.join(colonne)})
+        VALUES ({', '.join('?' * len(colonne))})
+        """,
+        [valori[colonna] for colonna in colonne]
+    )
+
+    _sposta_saldo(conn, valori.get('conto_id'), effetto_saldo(valori['tipo'], valori['importo']))
+    return cursor.lastrowid
+
+
+def aggiorna_movimento(conn, movimento_id: int, campi: Mapping[str, object]) -> bool:
+    """Aggiorna i campi di un movimento e sposta il saldo di conseguenza
+
+    Il saldo viene corretto quando cambiano importo, tipo o conto: l'effetto
+    vecchio è tolto dal conto vecchio e quello nuovo aggiunto al conto nuovo.
+    Restituisce False se il movimento non esiste.
+    """
+    vecchio = conn.execute(
+        "SELECT importo, tipo, conto_id FROM movimenti WHERE id = ?",
+        (movimento_id,)
+    ).fetchone()
+    if not vecchio:
+        return False
+
+    colonne = list(campi)
+    conn.execute(
+        f"UPDATE movimenti SET {', '.join(f'{colonna} = ?' for colonna in colonne)} WHERE id = ?",
+        [campi[colonna] for colonna in colonne] + [movimento_id]
+    )
+
+    importo, tipo, conto_id = vecchio
+    nuovo_importo = campi.get('importo', importo)
+    nuovo_tipo = campi.get('tipo', tipo)
+    nuovo_conto_id = campi.get('conto_id', conto_id)
+
+    effetto = effetto_saldo(tipo, importo)
+    nuovo_effetto = effetto_saldo(nuovo_tipo, nuovo_importo)
+    if conto_id != nuovo_conto_id or effetto != nuovo_effetto:
+        _sposta_saldo(conn, conto_id, -effetto)
+        _sposta_saldo(conn, nuovo_conto_id, nuovo_effetto)
+
+    return True
+
+
+def elimina_movimento(conn, movimento_id: int) -> bool:
+    """Elimina un movimento e ne annulla l'effetto sul saldo (False se non esiste)"""
+    vecchio = conn.execute(
+        "SELECT importo, tipo, conto_id FROM movimenti WHERE id = ?",
+        (movimento_id,)
+    ).fetchone()
+    if not vecchio:
+        return False
+
+    importo, tipo, conto_id = vecchio
+    conn.execute("DELETE FROM movimenti WHERE id = ?", (movimento_id,))
+    _sposta_saldo(conn, conto_id, -effetto_saldo(tipo, importo))
+    return True
@@ -1,16 +1,270 @@
-"""Servizio per calcolo scomposizione costi dettagliati"""
+"""Servizio per calcolo scomposizione costi dettagliati
 
-from typing import Dict, List, Optional
+I parametri dei beni (consumi, prezzo, ammortamento) sono letti una volta e
+tenuti in cache_beni, validi finché non cambia la versione della tabella
+beni (migration 015): qualunque modifica o eliminazione di un bene li
+invalida. Il calcolo per movimento è quindi solo aritmetica, e
+calcola_scomposizioni lo applica a molti movimenti dello stesso bene con
+un solo controllo di versione.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional
 from datetime import datetime, date
 import sqlite3
 
+from .. import database
+from .versioni import leggi_versioni
+
+
+@dataclass(frozen=True)
+class ParametriBene:
+    """Colonne di beni usate dalla scomposizione costi"""
+    id: int
+    nome: str
+    tipo: str
+    prezzo_acquisto: float
+    data_acquisto: date
+    veicolo_tipo_carburante: Optional[str]
+    veicolo_consumo_medio: Optional[float]
+    veicolo_costo_manutenzione_per_km: Optional[float]
+    elettrodomestico_potenza: Optional[float]
+    elettrodomestico_ore_medie_giorno: Optional[float]
+    durata_anni_stimata: Optional[int]
+    tasso_ammortamento: Optional[float]
+
+
+class CacheParametriBeni:
+    """Parametri dei beni per id, validi per una versione della tabella beni"""
+
+    def __init__(self):
+        self._chiave = None  # (database, versione beni)
+        self._beni: Dict[int, ParametriBene] = {}
+        self._lock = threading.Lock()
+
+        # Statistiche
+        self._hit = 0
+        self._miss = 0
+
+    def parametri(self, conn, bene_id: int) -> Optional[ParametriBene]:
+        """Parametri del bene (None se non esiste), letti dal database solo se cambiati"""
+        chiave = (database.DB_PATH, leggi_versioni(conn, ('beni',)))
+
+        with self._lock:
+            if self._chiave != chiave:
+                self._chiave = chiave
+                self._beni = {}
+            if bene_id in self._beni:
+                self._hit += 1
+                return self._beni[bene_id]
+            self._miss += 1
+
+        row = conn.execute(
+            f"SELECT {', '.join(ParametriBene.__dataclass_fields__)} FROM beni WHERE id = ?",
+            (bene_id,)
+        ).fetchone()
+        if not row:
+            return None
+
+        valori = list(row)
+        valori[4] = datetime.fromisoformat(valori[4]).date()
+        parametri = ParametriBene(*valori)
+
+        with self._lock:
+            if self._chiave == chiave:
+                self._beni[bene_id] = parametri
+        return parametri
+
+    def svuota(self):
+        with self._lock:
+            self._chiave = None
+            self._beni = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"beni": len(self._beni), "hit": self._hit, "miss": self._miss}
+
+
+# Cache condivisa da tutte le istanze di CostCalculator
+cache_beni = CacheParametriBeni()
+
+
+def _scomposizione_veicolo(
+    bene: ParametriBene,
+    km_percorsi: float,
+    costo_carburante: float,
+    prezzo_carburante_al_litro: Optional[float],
+    oggi: date
+) -> Dict:
+    """Scomposizione costi di un utilizzo del veicolo (solo calcolo)"""
+    tipo_carburante = bene.veicolo_tipo_carburante
+    consumo_medio = bene.veicolo_consumo_medio
+    costo_manutenzione_per_km = bene.veicolo_costo_manutenzione_per_km
+    prezzo_acquisto = bene.prezzo_acquisto
+    tasso_ammortamento = bene.tasso_ammortamento
+
+    scomposizione = []
+
+    # 1. COSTO CARBURANTE
+    scomposizione.append({
+        "tipo": "carburante",
+        "descrizione": f"Carburante ({tipo_carburante})",
+        "importo": round(costo_carburante, 2),
+        "dettagli": {
+            "km_percorsi": km_percorsi,
+            "consumo_medio": consumo_medio,
+            "tipo_carburante": tipo_carburante,
+            "litri_consumati": round((km_percorsi * consumo_medio) / 100, 2) if consumo_medio else None,
+            "prezzo_al_litro": prezzo_carburante_al_litro
+        }
+    })
+
+    # 2. USURA E MANUTENZIONE
+    costo_usura = km_percorsi * (costo_manutenzione_per_km or 0.08)
+    scomposizione.append({
+        "tipo": "usura",
+        "descrizione": "Usura e manutenzione",
+        "importo": round(costo_usura, 2),
+        "dettagli": {
+            "km_percorsi": km_percorsi,
+            "costo_per_km": costo_manutenzione_per_km or 0.08,
+            "include": [
+                "Cambio olio",
+                "Filtri",
+                "Pneumatici",
+                "Freni",
+                "Revisioni"
+            ]
+        }
+    })
+
+    # 3. AMMORTAMENTO
+    anni_utilizzo = (oggi - bene.data_acquisto).days / 365.25
+    costo_ammortamento_annuo = prezzo_acquisto * ((tasso_ammortamento or 15) / 100)
+    costo_ammortamento_per_km = costo_ammortamento_annuo / 15000  # Media 15.000 km/anno
+    costo_ammortamento = km_percorsi * costo_ammortamento_per_km
+
+    valore_residuo = prezzo_acquisto * (1 - ((tasso_ammortamento or 15) / 100) * anni_utilizzo)
+    valore_residuo = max(valore_residuo, prezzo_acquisto * 0.15)  # Minimo 15% valore iniziale
+
+    scomposizione.append({
+        "tipo": "ammortamento",
+        "descrizione": "Ammortamento veicolo",
+        "importo": round(costo_ammortamento, 2),
+        "dettagli": {
+            "prezzo_acquisto": prezzo_acquisto,
+            "valore_residuo": round(valore_residuo, 2),
+            "anni_utilizzo": round(anni_utilizzo, 2),
+            "tasso_annuo": tasso_ammortamento or 15,
+            "km_percorsi": km_percorsi
+        }
+    })
+
+    # Totale
+    totale = sum(item["importo"] for item in scomposizione)
+
+    return {
+        "bene_id": bene.id,
+        "bene_nome": bene.nome,
+        "bene_tipo": "veicolo",
+        "costo_diretto": costo_carburante,
+        "costo_totale": round(totale, 2),
+        "costo_nascosto": round(totale - costo_carburante, 2),
+        "scomposizione": scomposizione,
+        "riepilogo": {
+            "costo_per_km": round(totale / km_percorsi, 2) if km_percorsi > 0 else 0
+        }
+    }
+
+
+def _scomposizione_elettrodomestico(
+    bene: ParametriBene,
+    ore_utilizzo: float,
+    tariffa_kwh: float,
+    oggi: date
+) -> Dict:
+    """Scomposizione costi di un utilizzo dell'elettrodomestico (solo calcolo)"""
+    prezzo_acquisto = bene.prezzo_acquisto
+    potenza_watt = bene.elettrodomestico_potenza
+    ore_medie_giorno = bene.elettrodomestico_ore_medie_giorno
+    durata_anni = bene.durata_anni_stimata
+
+    scomposizione = []
+
+    # 1. CONSUMO ENERGETICO
+    kwh_consumati = (potenza_watt * ore_utilizzo) / 1000
+    costo_energia = kwh_consumati * tariffa_kwh
+
+    scomposizione.append({
+        "tipo": "energia",
+        "descrizione": "Consumo elettrico",
+        "importo": round(costo_energia, 2),
+        "dettagli": {
+            "potenza_watt": potenza_watt,
+            "ore_utilizzo": ore_utilizzo,
+            "kwh_consumati": round(kwh_consumati, 2),
+            "tariffa_kwh": tariffa_kwh
+        }
+    })
+
+    # 2. AMMORTAMENTO
+    anni_utilizzo = (oggi - bene.data_acquisto).days / 365.25
+    ore_vita_totale = (durata_anni or 10) * 365 * (ore_medie_giorno or 1)
+    costo_per_ora = prezzo_acquisto / ore_vita_totale
+    costo_ammortamento = ore_utilizzo * costo_per_ora
+
+    ore_utilizzo_totali = anni_utilizzo * 365 * (ore_medie_giorno or 1)
+    percentuale_vita = min((ore_utilizzo_totali / ore_vita_totale) * 100, 100)
+
+    scomposizione.append({
+        "tipo": "ammortamento",
+        "descrizione": "Ammortamento elettrodomestico",
+        "importo": round(costo_ammortamento, 2),
+        "dettagli": {
+            "prezzo_acquisto": prezzo_acquisto,
+            "durata_stimata_anni": durata_anni or 10,
+            "ore_vita_totale": round(ore_vita_totale, 0),
+            "percentuale_vita_utilizzata": round(percentuale_vita, 1),
+            "ore_utilizzo": ore_utilizzo
+        }
+    })
+
+    # Totale
+    totale = sum(item["importo"] for item in scomposizione)
+
+    return {
+        "bene_id": bene.id,
+        "bene_nome": bene.nome,
+        "bene_tipo": "elettrodomestico",
+        "costo_diretto": round(costo_energia, 2),
+        "costo_totale": round(totale, 2),
+        "costo_nascosto": round(totale - costo_energia, 2),
+        "scomposizione": scomposizione,
+        "riepilogo": {
+            "costo_per_ora": round(totale / ore_utilizzo, 4) if ore_utilizzo > 0 else 0,
+            "consumo_mensile_stimato": round(kwh_consumati * 30 / ore_utilizzo, 2) if ore_utilizzo > 0 and ore_medie_giorno else 0
+        }
+    }
+
 
 class CostCalculator:
     """Calcolatore costi per veicoli ed elettrodomestici"""
-    
-    def __init__(self, conn: sqlite3.Connection):
+
+    def __init__(self, conn: sqlite3.Connection, cache: CacheParametriBeni = cache_beni):
         self.conn = conn
-    
+        self.cache = cache
+
+    def parametri_bene(self, bene_id: int) -> Optional[ParametriBene]:
+        """Parametri del bene dalla cache (None se non esiste)"""
+        return self.cache.parametri(self.conn, bene_id)
+
+    def _bene(self, bene_id: int, tipo: str, errore: str) -> ParametriBene:
+        bene = self.parametri_bene(bene_id)
+        if bene is None or bene.tipo != tipo:
+            raise ValueError(errore)
+        return bene
+
     def calcola_costo_veicolo(
         self,
         bene_id: int,
@@ -19,113 +273,11 @@ class CostCalculator:
         prezzo_carburante_al_litro: Optional[float] = None
     ) -> Dict:
         """Calcola scomposizione costi per utilizzo veicolo"""
-        
-        # Recupera dati veicolo
-        cursor = self.conn.execute(
-            """
-            SELECT 
-                nome,
-                prezzo_acquisto,
-                data_acquisto,
-                veicolo_tipo_carburante,
-                veicolo_consumo_medio,
-                veicolo_costo_manutenzione_per_km,
-                durata_anni_stimata,
-                tasso_ammortamento
-            FROM beni
-            WHERE id = ? AND tipo = 'veicolo'
-            """,
-            (bene_id,)
+        bene = self._bene(bene_id, 'veicolo', "Veicolo non trovato")
+        return _scomposizione_veicolo(
+            bene, km_percorsi, costo_carburante, prezzo_carburante_al_litro, datetime.now().date()
         )
-        
-        row = cursor.fetchone()
-        if not row:
-            raise ValueError("Veicolo non trovato")
-        
-        (
-            nome,
-            prezzo_acquisto,
-            data_acquisto,
-            tipo_carburante,
-            consumo_medio,
-            costo_manutenzione_per_km,
-            durata_anni,
-            tasso_ammortamento
-        ) = row
-        
-        scomposizione = []
-        
-        # 1. COSTO CARBURANTE
-        scomposizione.append({
-            "tipo": "carburante",
-            "descrizione": f"Carburante ({tipo_carburante})",
-            "importo": round(costo_carburante, 2),
-            "dettagli": {
-                "km_percorsi": km_percorsi,
-                "consumo_medio": consumo_medio,
-                "tipo_carburante": tipo_carburante,
-                "litri_consumati": round((km_percorsi * consumo_medio) / 100, 2) if consumo_medio else None,
-                "prezzo_al_litro": prezzo_carburante_al_litro
-            }
-        })
-        
-        # 2. USURA E MANUTENZIONE
-        costo_usura = km_percorsi * (costo_manutenzione_per_km or 0.08)
-        scomposizione.append({
-            "tipo": "usura",
-            "descrizione": "Usura e manutenzione",
-            "importo": round(costo_usura, 2),
-            "dettagli": {
-                "km_percorsi": km_percorsi,
-                "costo_per_km": costo_manutenzione_per_km or 0.08,
-                "include": [
-                    "Cambio olio",
-                    "Filtri",
-                    "Pneumatici",
-                    "Freni",
-                    "Revisioni"
-                ]
-            }
-        })
-        
-        # 3. AMMORTAMENTO
-        anni_utilizzo = (datetime.now().date() - datetime.fromisoformat(data_acquisto).date()).days / 365.25
-        costo_ammortamento_annuo = prezzo_acquisto * ((tasso_ammortamento or 15) / 100)
-        costo_ammortamento_per_km = costo_ammortamento_annuo / 15000  # Media 15.000 km/anno
-        costo_ammortamento = km_percorsi * costo_ammortamento_per_km
-        
-        valore_residuo = prezzo_acquisto * (1 - ((tasso_ammortamento or 15) / 100) * anni_utilizzo)
-        valore_residuo = max(valore_residuo, prezzo_acquisto * 0.15)  # Minimo 15% valore iniziale
-        
-        scomposizione.append({
-            "tipo": "ammortamento",
-            "descrizione": "Ammortamento veicolo",
-            "importo": round(costo_ammortamento, 2),
-            "dettagli": {
-                "prezzo_acquisto": prezzo_acquisto,
-                "valore_residuo": round(valore_residuo, 2),
-                "anni_utilizzo": round(anni_utilizzo, 2),
-                "tasso_annuo": tasso_ammortamento or 15,
-                "km_percorsi": km_percorsi
-            }
-        })
-        
-        # Totale
-        totale = sum(item["importo"] for item in scomposizione)
-        
-        return {
-            "bene_id": bene_id,
-            "bene_nome": nome,
-            "bene_tipo": "veicolo",
-            "costo_diretto": costo_carburante,
-            "costo_totale": round(totale, 2),
-            "costo_nascosto": round(totale - costo_carburante, 2),
-            "scomposizione": scomposizione,
-            "riepilogo": {
-                "costo_per_km": round(totale / km_percorsi, 2) if km_percorsi > 0 else 0
-            }
-        }
-    
+
     def calcola_costo_elettrodomestico(
         self,
         bene_id: int,
@@ -133,89 +285,40 @@ class CostCalculator:
         tariffa_kwh: float = 0.25
     ) -> Dict:
         """Calcola scomposizione costi per utilizzo elettrodomestico"""
-        
-        # Recupera dati elettrodomestico
-        cursor = self.conn.execute(
-            """
-            SELECT 
-                nome,
-                prezzo_acquisto,
-                data_acquisto,
-                elettrodomestico_potenza,
-                elettrodomestico_ore_medie_giorno,
-                durata_anni_stimata
-            FROM beni
-            WHERE id = ? AND tipo = 'elettrodomestico'
-            """,
-            (bene_id,)
-        )
-        
-        row = cursor.fetchone()
-        if not row:
-            raise ValueError("Elettrodomestico non trovato")
-        
-        (
-            nome,
-            prezzo_acquisto,
-            data_acquisto,
-            potenza_watt,
-            ore_medie_giorno,
-            durata_anni
-        ) = row
-        
-        scomposizione = []
-        
-        # 1. CONSUMO ENERGETICO
-        kwh_consumati = (potenza_watt * ore_utilizzo) / 1000
-        costo_energia = kwh_consumati * tariffa_kwh
-        
-        scomposizione.append({
-            "tipo": "energia",
-            "descrizione": "Consumo elettrico",
-            "importo": round(costo_energia, 2),
-            "dettagli": {
-                "potenza_watt": potenza_watt,
-                "ore_utilizzo": ore_utilizzo,
-                "kwh_consumati": round(kwh_consumati, 2),
-                "tariffa_kwh": tariffa_kwh
-            }
-        })
-        
-        # 2. AMMORTAMENTO
-        anni_utilizzo = (datetime.now().date() - datetime.fromisoformat(data_acquisto).date()).days / 365.25
-        ore_vita_totale = (durata_anni or 10) * 365 * (ore_medie_giorno or 1)
-        costo_per_ora = prezzo_acquisto / ore_vita_totale
-        costo_ammortamento = ore_utilizzo * costo_per_ora
-        
-        ore_utilizzo_totali = anni_utilizzo * 365 * (ore_medie_giorno or 1)
-        percentuale_vita = min((ore_utilizzo_totali / ore_vita_totale) * 100, 100)
-        
-        scomposizione.append({
-            "tipo": "ammortamento",
-            "descrizione": "Ammortamento elettrodomestico",
-            "importo": round(costo_ammortamento, 2),
-            "dettagli": {
-                "prezzo_acquisto": prezzo_acquisto,
-                "durata_stimata_anni": durata_anni or 10,
-                "ore_vita_totale": round(ore_vita_totale, 0),
-                "percentuale_vita_utilizzata": round(percentuale_vita, 1),
-                "ore_utilizzo": ore_utilizzo
-            }
-        })
-        
-        # Totale
-        totale = sum(item["importo"] for item in scomposizione)
-        
-        return {
-            "bene_id": bene_id,
-            "bene_nome": nome,
-            "bene_tipo": "elettrodomestico",
-            "costo_diretto": round(costo_energia, 2),
-            "costo_totale": round(totale, 2),
-            "costo_nascosto": round(totale - costo_energia, 2),
-            "scomposizione": scomposizione,
-            "riepilogo": {
-                "costo_per_ora": round(totale / ore_utilizzo, 4) if ore_utilizzo > 0 else 0,
-                "consumo_mensile_stimato": round(kwh_consumati * 30 / ore_utilizzo, 2) if ore_utilizzo > 0 and ore_medie_giorno else 0
-            }
-        }
+        bene = self._bene(bene_id, 'elettrodomestico', "Elettrodomestico non trovato")
+        return _scomposizione_elettrodomestico(bene, ore_utilizzo, tariffa_kwh, datetime.now().date())
+
+    def calcola_scomposizioni(
+        self,
+        bene_id: int,
+        movimenti: Iterable[Mapping]
+    ) -> List[Optional[Dict]]:
+        """Scomposizione di molti movimenti dello stesso bene
+
+        Ogni movimento ha importo e km_percorsi (con prezzo_carburante_al_litro
+        opzionale) per i veicoli, ore_utilizzo (con tariffa_kwh opzionale) per
+        gli elettrodomestici. Il risultato è None per i movimenti senza il dato
+        richiesto e per i beni di altro tipo. ValueError se il bene non esiste.
+        """
+        bene = self.parametri_bene(bene_id)
+        if bene is None:
+            raise ValueError("Bene non trovato")
+
+        oggi = datetime.now().date()
+        risultati = []
+        for movimento in movimenti:
+            scomposizione = None
+            if bene.tipo == 'veicolo' and movimento.get('km_percorsi'):
+                scomposizione = _scomposizione_veicolo(
+                    bene,
+                    movimento['km_percorsi'],
+                    movimento['importo'],
+                    movimento.get('prezzo_carburante_al_litro'),
+                    oggi
+                )
+            elif bene.tipo == 'elettrodomestico' and movimento.get('ore_utilizzo'):
+                scomposizione = _scomposizione_elettrodomestico(
+                    bene, movimento['ore_utilizzo'], movimento.get('tariffa_kwh') or 0.25, oggi
+                )
+            risultati.append(scomposizione)
+        return risultati
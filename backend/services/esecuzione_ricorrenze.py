@@ -0,0 +1,171 @@
+"""Esecuzione in blocco dei movimenti ricorrenti scaduti
+
+Per ogni ricorrenza attiva con prossima_data <= oggi genera tutte le
+occorrenze mancanti, dalla prossima_data fino a oggi (o a data_fine), con la
+data in cui sarebbero dovute avvenire: dopo giorni di fermo del server
+nessuna occorrenza va persa. Movimenti, variazioni dei saldi (una per conto)
+e nuove prossima_data sono scritti in una sola transazione con executemany.
+
+Una ricorrenza con configurazione non valida (es. mensile senza giorno_mese)
+viene saltata e riportata negli errori, senza bloccare le altre.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .contabilita import effetto_saldo, transazione
+
+# Occorrenze generate al massimo per ricorrenza in un'esecuzione: le
+# successive restano in attesa (prossima_data) per l'esecuzione seguente
+MAX_OCCORRENZE = 1000
+
+_COLONNE_RICORRENZA = (
+    'id', 'descrizione', 'importo', 'tipo', 'frequenza', 'giorno_mese',
+    'giorno_settimana', 'mese', 'data_fine', 'prossima_data', 'conto_id',
+    'categoria_id', 'budget_id', 'obiettivo_id', 'bene_id', 'note'
+)
+
+
+def _giorni_nel_mese(anno: int, mese: int) -> int:
+    if mese == 2:
+        bisestile = anno % 4 == 0 and (anno % 100 != 0 or anno % 400 == 0)
+        return 29 if bisestile else 28
+    return 31 if mese in (1, 3, 5, 7, 8, 10, 12) else 30
+
+
+def prossima_occorrenza(
+    frequenza: str,
+    data_base: date,
+    giorno_mese: Optional[int] = None,
+    giorno_settimana: Optional[int] = None,
+    mese: Optional[int] = None
+) -> date:
+    """Occorrenza successiva a data_base secondo la frequenza
+
+    Nei mesi più corti il giorno_mese viene limitato all'ultimo giorno del
+    mese. ValueError se mancano i campi richiesti dalla frequenza.
+    """
+    if frequenza == 'giornaliera':
+        return data_base + timedelta(days=1)
+
+    if frequenza == 'settimanale':
+        if giorno_settimana is None:
+            raise ValueError("giorno_settimana richiesto per frequenza settimanale")
+        giorni_da_aggiungere = (giorno_settimana - data_base.weekday()) % 7
+        if giorni_da_aggiungere == 0:
+            giorni_da_aggiungere = 7
+        return data_base + timedelta(days=giorni_da_aggiungere)
+
+    if frequenza == 'mensile':
+        if giorno_mese is None:
+            raise ValueError("giorno_mese richiesto per frequenza mensile")
+        prossimo_mese = data_base.month + 1
+        prossimo_anno = data_base.year
+        if prossimo_mese > 12:
+            prossimo_mese = 1
+            prossimo_anno += 1
+        giorno = min(giorno_mese, _giorni_nel_mese(prossimo_anno, prossimo_mese))
+        return date(prossimo_anno, prossimo_mese, giorno)
+
+    if frequenza == 'annuale':
+        if giorno_mese is None or mese is None:
+            raise ValueError("giorno_mese e mese richiesti per frequenza annuale")
+        prossimo_anno = data_base.year + 1
+        return date(prossimo_anno, mese, min(giorno_mese, _giorni_nel_mese(prossimo_anno, mese)))
+
+    return data_base
+
+
+def occorrenze_scadute(ricorrenza: dict, oggi: date) -> Tuple[List[date], date]:
+    """Date delle occorrenze da eseguire e nuova prossima_data"""
+    limite = oggi
+    if ricorrenza['data_fine']:
+        limite = min(limite, date.fromisoformat(str(ricorrenza['data_fine'])[:10]))
+
+    occorrenze = []
+    prossima = date.fromisoformat(str(ricorrenza['prossima_data'])[:10])
+    while prossima <= limite and len(occorrenze) < MAX_OCCORRENZE:
+        occorrenze.append(prossima)
+        prossima = prossima_occorrenza(
+            ricorrenza['frequenza'], prossima,
+            ricorrenza['giorno_mese'], ricorrenza['giorno_settimana'], ricorrenza['mese']
+        )
+    return occorrenze, prossima
+
+
+def esegui_ricorrenze(conn, oggi: Optional[date] = None) -> dict:
+    """Esegue tutte le occorrenze scadute di tutte le ricorrenze attive
+
+    Restituisce ricorrenze (eseguite), movimenti (inseriti) ed errori
+    ({'ricorrenza_id', 'errore'} per le ricorrenze saltate).
+    """
+    oggi = oggi or date.today()
+
+    with transazione(conn):
+        righe = conn.execute(
+            f"""
+            SELECT {', '.join(_COLONNE_RICORRENZA)}
+            FROM movimenti_ricorrenti
+            WHERE attivo = 1
+            AND prossima_data <= ?
+            AND (data_fine IS NULL OR prossima_data <= data_fine)
+            ORDER BY prossima_data, id
+            """,
+            (oggi.isoformat(),)
+        ).fetchall()
+
+        movimenti = []
+        prossime = []
+        delta_saldi: Dict[int, float] = {}
+        errori = []
+
+        for riga in righe:
+            ricorrenza = dict(zip(_COLONNE_RICORRENZA, riga))
+            try:
+                occorrenze, prossima = occorrenze_scadute(ricorrenza, oggi)
+            except ValueError as e:
+                errori.append({'ricorrenza_id': ricorrenza['id'], 'errore': str(e)})
+                continue
+
+            importo = ricorrenza['importo'] if ricorrenza['tipo'] == 'entrata' else -abs(ricorrenza['importo'])
+            for giorno in occorrenze:
+                movimenti.append((
+                    giorno.isoformat(), importo, ricorrenza['tipo'], ricorrenza['conto_id'],
+                    ricorrenza['categoria_id'], ricorrenza['budget_id'], ricorrenza['obiettivo_id'],
+                    ricorrenza['bene_id'], f"[AUTO] {ricorrenza['descrizione']}", ricorrenza['note']
+                ))
+
+            conto_id = ricorrenza['conto_id']
+            if conto_id:
+                delta_saldi[conto_id] = (
+                    delta_saldi.get(conto_id, 0)
+                    + effetto_saldo(ricorrenza['tipo'], importo) * len(occorrenze)
+                )
+            prossime.append((prossima.isoformat(), ricorrenza['id']))
+
+        # In ordine di data, come se fossero stati eseguiti giorno per giorno
+        movimenti.sort(key=lambda movimento: movimento[0])
+        conn.executemany(
+            """
+            INSERT INTO movimenti (
+                data, importo, tipo, conto_id, categoria_id,
+                budget_id, obiettivo_id, bene_id, descrizione, note, ricorrente
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+            """,
+            movimenti
+        )
+        conn.executemany(
+            "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
+            [(round(delta, 2), conto_id) for conto_id, delta in delta_saldi.items() if delta]
+        )
+        conn.executemany(
+            "UPDATE movimenti_ricorrenti SET prossima_data = ? WHERE id = ?",
+            prossime
+        )
+
+    return {
+        'ricorrenze': len(prossime),
+        'movimenti': len(movimenti),
+        'errori': errori,
+    }
@@ -0,0 +1,134 @@
+"""Esportazione CSV dei movimenti in streaming
+
+Le righe vengono lette a blocchi con fetchmany e trasformate in chunk CSV
+man mano che il client le consuma: la memoria resta costante qualunque sia
+la dimensione dell'esportazione. La compressione gzip avviene sugli stessi
+chunk, senza bufferizzare l'intero file.
+"""
+
+import csv
+import io
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from ..database import get_db_connection
+
+# Righe lette dal database per ogni chunk
+DIMENSIONE_BLOCCO = 1000
+
+INTESTAZIONE_CSV = [
+    'ID', 'Data', 'Tipo', 'Importo (€)', 'Categoria',
+    'Conto', 'Descrizione', 'Ricorrente', 'Bene', 'Obiettivo',
+    'Km Percorsi', 'Ore Utilizzo'
+]
+
+
+def _riga_csv(row) -> list:
+    """Converte una riga del database nei campi CSV"""
+    return [
+        row[0],  # id
+        row[1],  # data
+        row[2].capitalize(),  # tipo
+        f"{row[3]:.2f}",  # importo
+        row[4] or '',  # categoria
+        row[5] or '',  # conto
+        row[6],  # descrizione
+        'Sì' if row[7] else 'No',  # ricorrente
+        row[8] or '',  # bene
+        row[9] or '',  # obiettivo
+        f"{row[10]:.1f}" if row[10] else '',  # km
+        f"{row[11]:.1f}" if row[11] else ''  # ore
+    ]
+
+
+def query_esportazione(
+    data_da: Optional[str] = None,
+    data_a: Optional[str] = None,
+    conto_id: Optional[int] = None,
+    categoria_id: Optional[int] = None
+) -> tuple:
+    """Query e parametri dell'esportazione con i filtri richiesti"""
+    condizioni = []
+    params = []
+
+    if data_da:
+        condizioni.append("m.data_giorno >= ?")
+        params.append(data_da)
+    if data_a:
+        condizioni.append("m.data_giorno <= ?")
+        params.append(data_a)
+    if conto_id is not None:
+        condizioni.append("m.conto_id = ?")
+        params.append(conto_id)
+    if categoria_id is not None:
+        condizioni.append("m.categoria_id = ?")
+        params.append(categoria_id)
+
+    where = f"WHERE {' AND '.join(condizioni)}" if condizioni else ""
+    query = f"""
+        SELECT
+            m.id,
+            m.data,
+            m.tipo,
+            m.importo,
+            c.nome as categoria,
+            co.nome as conto,
+            m.descrizione,
+            m.ricorrente,
+            b.nome as bene,
+            ob.nome as obiettivo,
+            m.km_percorsi,
+            m.ore_utilizzo
+        FROM movimenti m
+        LEFT JOIN categorie c ON m.categoria_id = c.id
+        LEFT JOIN conti co ON m.conto_id = co.id
+        LEFT JOIN beni b ON m.bene_id = b.id
+        LEFT JOIN obiettivi_risparmio ob ON m.obiettivo_id = ob.id
+        {where}
+        ORDER BY m.data DESC, m.id DESC
+    """
+    return query, params
+
+
+def genera_csv(
+    data_da: Optional[str] = None,
+    data_a: Optional[str] = None,
+    conto_id: Optional[int] = None,
+    categoria_id: Optional[int] = None,
+    dimensione_blocco: int = DIMENSIONE_BLOCCO
+) -> Iterator[bytes]:
+    """Genera l'esportazione CSV a chunk codificati in UTF-8
+
+    La connessione viene presa dal pool alla prima iterazione e restituita
+    quando il generatore termina o viene chiuso (client disconnesso).
+    """
+    query, params = query_esportazione(data_da, data_a, conto_id, categoria_id)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(INTESTAZIONE_CSV)
+    yield buffer.getvalue().encode('utf-8')
+
+    with get_db_connection() as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(dimensione_blocco)
+            if not rows:
+                break
+
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(_riga_csv(row) for row in rows)
+            yield buffer.getvalue().encode('utf-8')
+
+
+def comprimi_gzip(chunks: Iterable[bytes], livello: int = 6) -> Iterator[bytes]:
+    """Comprime in gzip un flusso di chunk, uno alla volta"""
+    compressore = zlib.compressobj(livello, zlib.DEFLATED, 31)  # 31 = formato gzip
+
+    for chunk in chunks:
+        compresso = compressore.compress(chunk)
+        if compresso:
+            yield compresso
+
+    yield compressore.flush()
@@ -0,0 +1,493 @@
+"""Importazione in streaming degli estratti conto (CSV, OFX, CAMT.053)
+
+Ogni formato ha un parser a generatore che legge il file un pezzo alla volta
+e produce righe normalizzate {'riga', 'data', 'importo', 'descrizione'} con
+importo con segno (negativo = uscita) e data ISO 'YYYY-MM-DD'. La memoria
+usata resta costante anche con file da centinaia di MB.
+
+importa_estratto consuma le righe a lotti: ogni lotto è una transazione che
+inserisce i movimenti, salta i duplicati e aggiorna il saldo del conto.
+I duplicati sono riconosciuti dall'impronta (migration 013), un hash di
+(conto_id, data, importo, descrizione, occorrenza): reimportare lo stesso
+file costa un probe sull'indice UNIQUE per riga. L'occorrenza distingue due
+movimenti identici nello stesso giorno e si azzera al cambio di data, per
+cui l'estratto deve essere in ordine cronologico (crescente o decrescente),
+come lo sono gli export bancari; un estratto non ordinato viene rifiutato.
+
+Uso da riga di comando:
+    python -m backend.services.importazione estratto.csv --conto 1
+"""
+
+import argparse
+import codecs
+import csv
+import hashlib
+import html
+import io
+import sys
+import time
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional
+
+from .saldi import EFFETTO_SQL
+
+FORMATI = ('csv', 'ofx', 'camt')
+
+# Movimenti scritti per transazione
+DIMENSIONE_LOTTO = 5000
+
+# Byte letti per volta dai parser OFX e CAMT
+DIMENSIONE_BLOCCO = 64 * 1024
+
+DESCRIZIONE_PREDEFINITA = 'Movimento importato'
+
+# Nomi di colonna riconosciuti nei CSV (confronto senza maiuscole)
+COLONNE_CSV = {
+    'data': ('data', 'data operazione', 'data contabile', 'data valuta', 'date', 'booking date'),
+    'importo': ('importo', 'importo (€)', 'importo eur', 'amount'),
+    'descrizione': ('descrizione', 'causale', 'descrizione operazione', 'description'),
+    'dare': ('dare', 'uscite', 'addebiti', 'debit'),
+    'avere': ('avere', 'entrate', 'accrediti', 'credit'),
+}
+
+_FORMATI_DATA = ('%d/%m/%Y', '%d.%m.%Y', '%d-%m-%Y', '%d/%m/%y', '%Y%m%d')
+
+
+class ErroreEstratto(ValueError):
+    """Estratto conto non leggibile; `stato` è l'avanzamento al momento dell'errore"""
+
+    def __init__(self, messaggio: str, stato: Optional[dict] = None):
+        super().__init__(messaggio)
+        self.stato = stato
+
+
+# ---------------------------------------------------------------------------
+# Conversione dei campi
+# ---------------------------------------------------------------------------
+
+def converti_importo(testo: str) -> Decimal:
+    """Importo da testo: accetta '1.234,56', '1,234.56', '-12,5', '€ 3'"""
+    pulito = (testo or '').strip().replace('€', '').replace('EUR', '').replace(' ', '').replace("'", '')
+    if pulito.endswith('-'):
+        pulito = '-' + pulito[:-1]
+
+    virgola = pulito.rfind(',')
+    punto = pulito.rfind('.')
+    if virgola > punto:
+        # Virgola decimale, eventuali punti come separatori delle migliaia
+        pulito = pulito.replace('.', '').replace(',', '.')
+    else:
+        pulito = pulito.replace(',', '')
+
+    try:
+        importo = Decimal(pulito)
+    except InvalidOperation:
+        raise ValueError(f"importo non valido: {testo!r}")
+    if not importo.is_finite():
+        raise ValueError(f"importo non valido: {testo!r}")
+    return importo
+
+
+def converti_data(testo: str) -> str:
+    """Data ISO 'YYYY-MM-DD' da ISO, gg/mm/aaaa, gg.mm.aaaa o AAAAMMGG[hhmmss]"""
+    pulito = (testo or '').strip()
+
+    if len(pulito) >= 10 and pulito[4] == '-':
+        try:
+            return date.fromisoformat(pulito[:10]).isoformat()
+        except ValueError:
+            pass
+    if len(pulito) > 8 and pulito[:8].isdigit():
+        pulito = pulito[:8]  # OFX: 20260105120000[-5:EST]
+
+    for formato in _FORMATI_DATA:
+        try:
+            return datetime.strptime(pulito, formato).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"data non valida: {testo!r}")
+
+
+def _riga(numero: int, data: str, importo, descrizione: str) -> dict:
+    return {
+        'riga': numero,
+        'data': converti_data(data),
+        'importo': importo if isinstance(importo, Decimal) else converti_importo(importo),
+        'descrizione': ' '.join((descrizione or '').split()) or DESCRIZIONE_PREDEFINITA,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Parser
+# ---------------------------------------------------------------------------
+
+def _colonna(intestazione: list, campo: str, mappatura: Dict[str, str]) -> Optional[int]:
+    """Posizione della colonna di un campo (None se assente)"""
+    nomi = [nome.strip().lower() for nome in intestazione]
+    candidati = (mappatura[campo],) if campo in mappatura else COLONNE_CSV[campo]
+    for candidato in candidati:
+        if candidato.strip().lower() in nomi:
+            return nomi.index(candidato.strip().lower())
+    return None
+
+
+def leggi_csv(
+    testo: Iterable[str],
+    mappatura: Optional[Dict[str, str]] = None,
+    delimitatore: Optional[str] = None
+) -> Iterator[dict]:
+    """Righe di un estratto CSV (una riga di file alla volta)
+
+    `mappatura` associa i campi data, importo, descrizione, dare e avere ai
+    nomi di colonna del file; senza mappatura vengono cercati i nomi più
+    comuni. Se manca la colonna importo si usa avere - dare. Il delimitatore
+    (';', ',' o tabulazione) viene dedotto dall'intestazione.
+    """
+    mappatura = mappatura or {}
+    righe = iter(testo)
+
+    prima = next(righe, None)
+    if prima is None:
+        return
+    if delimitatore is None:
+        delimitatore = max(';,\t', key=prima.count)
+
+    lettore = csv.reader(_concatena(prima, righe), delimiter=delimitatore)
+    intestazione = next(lettore)
+    colonne = {campo: _colonna(intestazione, campo, mappatura) for campo in COLONNE_CSV}
+
+    if colonne['data'] is None:
+        raise ErroreEstratto("colonna data non trovata nell'intestazione")
+    if colonne['importo'] is None and colonne['dare'] is None and colonne['avere'] is None:
+        raise ErroreEstratto("colonna importo (o dare/avere) non trovata nell'intestazione")
+
+    def valore(campi, campo):
+        indice = colonne[campo]
+        return campi[indice].strip() if indice is not None and indice < len(campi) else ''
+
+    for numero, campi in enumerate(lettore, start=2):
+        if not any(campo.strip() for campo in campi):
+            continue
+        try:
+            if colonne['importo'] is not None:
+                importo = converti_importo(valore(campi, 'importo'))
+            else:
+                dare = valore(campi, 'dare')
+                avere = valore(campi, 'avere')
+                importo = (
+                    (converti_importo(avere) if avere else Decimal(0))
+                    - (converti_importo(dare).copy_abs() if dare else Decimal(0))
+                )
+            yield _riga(numero, valore(campi, 'data'), importo, valore(campi, 'descrizione'))
+        except ValueError as e:
+            raise ErroreEstratto(f"riga {numero}: {e}")
+
+
+def _concatena(prima: str, resto: Iterator[str]) -> Iterator[str]:
+    yield prima
+    yield from resto
+
+
+def _token_sgml(file: BinaryIO, codifica: str) -> Iterator[tuple]:
+    """Coppie (tag, valore) di un file OFX 1.x (SGML) o 2.x (XML), a blocchi"""
+    decoder = codecs.getincrementaldecoder(codifica)(errors='replace')
+    resto = ''
+
+    while True:
+        blocco = file.read(DIMENSIONE_BLOCCO)
+        testo = resto + decoder.decode(blocco, final=not blocco)
+        parti = testo.split('<')
+        resto = parti.pop() if blocco else ''
+
+        for parte in parti:
+            tag, _, valore = parte.partition('>')
+            if tag:
+                yield tag.strip().upper(), html.unescape(valore.strip())
+
+        if not blocco:
+            return
+
+
+def leggi_ofx(file: BinaryIO, codifica: str = 'latin-1') -> Iterator[dict]:
+    """Righe di un estratto OFX/QFX (blocchi <STMTTRN>)
+
+    Un blocco si chiude con </STMTTRN>, con l'apertura del successivo o con
+    la fine della lista: alcuni export SGML omettono le chiusure.
+    """
+    transazione = None
+    numero = 0
+
+    def chiudi(transazione):
+        descrizione = transazione.get('NAME', '')
+        memo = transazione.get('MEMO', '')
+        if memo and memo != descrizione:
+            descrizione = f"{descrizione} - {memo}" if descrizione else memo
+        try:
+            return _riga(numero, transazione.get('DTPOSTED', ''), transazione.get('TRNAMT', ''), descrizione)
+        except ValueError as e:
+            raise ErroreEstratto(f"transazione {numero}: {e}")
+
+    for tag, valore in _token_sgml(file, codifica):
+        if transazione is not None and tag in ('STMTTRN', '/STMTTRN', '/BANKTRANLIST'):
+            numero += 1
+            yield chiudi(transazione)
+            transazione = None
+
+        if tag == 'STMTTRN':
+            transazione = {}
+        elif transazione is not None and not tag.startswith('/'):
+            transazione[tag] = valore
+
+
+def _locale(tag: str) -> str:
+    """Nome del tag XML senza namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _figlio(elemento, *percorso):
+    """Primo discendente lungo `percorso` (nomi senza namespace), o None"""
+    for nome in percorso:
+        if elemento is None:
+            return None
+        elemento = next((e for e in elemento if _locale(e.tag) == nome), None)
+    return elemento
+
+
+def _testo(elemento, *percorso) -> str:
+    trovato = _figlio(elemento, *percorso)
+    return (trovato.text or '').strip() if trovato is not None else ''
+
+
+def leggi_camt(file: BinaryIO) -> Iterator[dict]:
+    """Righe di un estratto CAMT.053 (elementi <Ntry>) con iterparse
+
+    Ogni <Ntry> viene staccato dall'albero appena letto, così la memoria non
+    cresce con il numero di movimenti.
+    """
+    antenati = []
+    numero = 0
+
+    for evento, elemento in ET.iterparse(file, events=('start', 'end')):
+        if evento == 'start':
+            antenati.append(elemento)
+            continue
+
+        antenati.pop()
+        if _locale(elemento.tag) != 'Ntry':
+            continue
+
+        numero += 1
+        try:
+            importo = converti_importo(_testo(elemento, 'Amt')).copy_abs()
+            if _testo(elemento, 'CdtDbtInd') == 'DBIT':
+                importo = -importo
+
+            data = (
+                _testo(elemento, 'BookgDt', 'Dt') or _testo(elemento, 'BookgDt', 'DtTm')
+                or _testo(elemento, 'ValDt', 'Dt') or _testo(elemento, 'ValDt', 'DtTm')
+            )
+
+            dettagli = _figlio(elemento, 'NtryDtls', 'TxDtls')
+            descrizione = ' '.join(
+                e.text.strip() for e in (dettagli.iter() if dettagli is not None else ())
+                if _locale(e.tag) == 'Ustrd' and e.text
+            ) or _testo(dettagli, 'AddtlTxInf') or _testo(elemento, 'AddtlNtryInf')
+
+            yield _riga(numero, data, importo, descrizione)
+        except ValueError as e:
+            raise ErroreEstratto(f"movimento {numero}: {e}")
+        finally:
+            if antenati:
+                antenati[-1].remove(elemento)
+
+
+def formato_da_nome(nome_file: str) -> Optional[str]:
+    """Formato dedotto dall'estensione del file"""
+    estensione = nome_file.rsplit('.', 1)[-1].lower() if '.' in nome_file else ''
+    return {'csv': 'csv', 'txt': 'csv', 'ofx': 'ofx', 'qfx': 'ofx', 'xml': 'camt', '053': 'camt'}.get(estensione)
+
+
+def leggi_estratto(file: BinaryIO, formato: str, codifica: Optional[str] = None) -> Iterator[dict]:
+    """Parser del formato richiesto su un file aperto in binario"""
+    if formato == 'csv':
+        testo = io.TextIOWrapper(file, encoding=codifica or 'utf-8-sig', newline='')
+        return leggi_csv(testo)
+    if formato == 'ofx':
+        return leggi_ofx(file, codifica or 'latin-1')
+    if formato == 'camt':
+        return leggi_camt(file)
+    raise ErroreEstratto(f"formato non supportato: {formato!r} (ammessi: {', '.join(FORMATI)})")
+
+
+# ---------------------------------------------------------------------------
+# Importazione
+# ---------------------------------------------------------------------------
+
+def impronta(conto_id: int, data: str, importo: Decimal, descrizione: str, occorrenza: int) -> str:
+    """Hash che identifica un movimento di estratto conto"""
+    chiave = f"{conto_id}|{data}|{importo.quantize(Decimal('0.01'))}|{descrizione.casefold()}|{occorrenza}"
+    return hashlib.blake2b(chiave.encode('utf-8'), digest_size=16).hexdigest()
+
+
+_QUERY_INSERT = """
+    INSERT INTO movimenti (data, importo, tipo, categoria_id, conto_id, descrizione, impronta)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (impronta) WHERE impronta IS NOT NULL DO NOTHING
+"""
+
+
+def importa_estratto(
+    conn,
+    righe: Iterable[dict],
+    conto_id: int,
+    categoria_id: Optional[int] = None,
+    dimensione_lotto: int = DIMENSIONE_LOTTO,
+    avanzamento: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """Importa le righe di un estratto conto a lotti, saltando i duplicati
+
+    Ogni lotto è una transazione: un errore di lettura a metà file lascia
+    importati i lotti precedenti, e ripetere l'importazione dopo aver
+    corretto il file li salta come duplicati. `avanzamento` riceve lo stato
+    (lette, inserite, duplicate, lotti) dopo ogni lotto.
+
+    L'estratto deve essere in ordine cronologico (crescente o decrescente):
+    le occorrenze sono contate solo per la data corrente, per cui una data
+    che ricompare più avanti produrrebbe impronte già usate e le sue righe
+    verrebbero scartate come duplicate. Un cambio di verso solleva
+    ErroreEstratto prima di scrivere il lotto che lo contiene. RuntimeError
+    se la connessione ha già una transazione aperta.
+    """
+    if conn.in_transaction:
+        raise RuntimeError("importa_estratto richiede una connessione senza transazioni aperte")
+
+    if conn.execute("SELECT 1 FROM conti WHERE id = ?", (conto_id,)).fetchone() is None:
+        raise ErroreEstratto(f"conto {conto_id} non trovato")
+    if categoria_id is not None and conn.execute(
+        "SELECT 1 FROM categorie WHERE id = ?", (categoria_id,)
+    ).fetchone() is None:
+        raise ErroreEstratto(f"categoria {categoria_id} non trovata")
+
+    inizio = time.perf_counter()
+    stato = {'lette': 0, 'inserite': 0, 'duplicate': 0, 'lotti': 0, 'variazione_saldo': 0.0}
+    occorrenze = {}
+    data_corrente = None
+    verso = 0  # 1 crescente, -1 decrescente, 0 non ancora noto
+    righe = iter(righe)
+
+    while True:
+        try:
+            lotto = list(islice(righe, dimensione_lotto))
+        except ErroreEstratto as e:
+            e.stato = dict(stato)
+            raise
+
+        if not lotto:
+            break
+
+        valori = []
+        for riga in lotto:
+            if riga['data'] != data_corrente:
+                if data_corrente is not None:
+                    passo = 1 if riga['data'] > data_corrente else -1
+                    if verso and passo != verso:
+                        raise ErroreEstratto(
+                            f"riga {riga['riga']}: estratto non in ordine cronologico "
+                            f"({riga['data']} dopo {data_corrente})",
+                            dict(stato)
+                        )
+                    verso = passo
+                data_corrente = riga['data']
+                occorrenze.clear()
+
+            chiave = (riga['importo'], riga['descrizione'].casefold())
+            occorrenze[chiave] = occorrenze.get(chiave, 0) + 1
+
+            importo = riga['importo']
+            valori.append((
+                riga['data'],
+                float(abs(importo)),
+                'uscita' if importo < 0 else 'entrata',
+                categoria_id,
+                conto_id,
+                riga['descrizione'],
+                impronta(conto_id, riga['data'], importo, riga['descrizione'], occorrenze[chiave])
+            ))
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ultimo_id = conn.execute("SELECT IFNULL(MAX(id), 0) FROM movimenti").fetchone()[0]
+            conn.executemany(_QUERY_INSERT, valori)
+
+            inserite, variazione = conn.execute(
+                f"""
+                SELECT COUNT(*), IFNULL(SUM({EFFETTO_SQL}), 0)
+                FROM movimenti
+                WHERE id > ?
+                """,
+                (ultimo_id,)
+            ).fetchone()
+            if variazione:
+                conn.execute(
+                    "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
+                    (round(variazione, 2), conto_id)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        stato['lette'] += len(valori)
+        stato['inserite'] += inserite
+        stato['duplicate'] += len(valori) - inserite
+        stato['lotti'] += 1
+        stato['variazione_saldo'] = round(stato['variazione_saldo'] + variazione, 2)
+
+        if avanzamento:
+            avanzamento(dict(stato))
+
+    stato['durata_ms'] = round((time.perf_counter() - inizio) * 1000, 1)
+    return stato
+
+
+def main(argv=None):
+    """Entry point da riga di comando"""
+    parser = argparse.ArgumentParser(description="Importa un estratto conto CSV, OFX o CAMT.053")
+    parser.add_argument('file', help="File dell'estratto conto")
+    parser.add_argument('--conto', type=int, required=True, help="ID del conto")
+    parser.add_argument('--categoria', type=int, default=None, help="Categoria da assegnare ai movimenti")
+    parser.add_argument('--formato', choices=FORMATI, default=None, help="Default: dedotto dall'estensione")
+    parser.add_argument('--codifica', default=None, help="Codifica del testo (CSV/OFX)")
+    parser.add_argument('--lotto', type=int, default=DIMENSIONE_LOTTO, help="Movimenti per transazione")
+    args = parser.parse_args(argv)
+
+    formato = args.formato or formato_da_nome(args.file)
+    if formato is None:
+        parser.error("formato non riconosciuto, usare --formato")
+
+    from ..database import get_db_connection
+
+    def stampa(stato):
+        print(f"  lotto {stato['lotti']}: {stato['lette']} lette, "
+              f"{stato['inserite']} inserite, {stato['duplicate']} duplicate")
+
+    try:
+        with open(args.file, 'rb') as file, get_db_connection() as conn:
+            stato = importa_estratto(
+                conn, leggi_estratto(file, formato, args.codifica), args.conto,
+                categoria_id=args.categoria, dimensione_lotto=args.lotto, avanzamento=stampa
+            )
+    except ErroreEstratto as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✓ Importazione completata: {stato['inserite']} movimenti inseriti, "
+          f"{stato['duplicate']} duplicati saltati in {stato['durata_ms']:.0f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""Importazione massiva di movimenti in una sola transazione
+
+Pensata per caricare lo storico (migliaia o milioni di righe) senza passare
+da POST /movimenti riga per riga:
+- le foreign key sono validate contro gli insiemi di ID caricati una volta
+  sola, non con una SELECT per riga, dentro la stessa transazione
+  dell'inserimento;
+- l'importazione è tutto-o-niente: se anche una sola riga non è valida non
+  viene scritto nulla e vengono restituiti gli errori;
+- le righe sono inserite con executemany, ordinate per data, dentro un'unica
+  transazione BEGIN IMMEDIATE;
+- i saldi dei conti sono aggiornati con un solo UPDATE per conto, con la
+  somma netta di contabilita.effetto_saldo delle righe importate.
+
+Quando il lotto è grande almeno quanto la tabella, gli indici secondari di
+movimenti vengono eliminati e ricreati nella stessa transazione: costruire
+un indice da zero costa molto meno che aggiornarlo riga per riga. Allo
+stesso modo i trigger di inserimento (aggregato mensile, indice full-text,
+versione della tabella, componenti dei costi) vengono sospesi e il loro
+effetto applicato una volta sola per tutto il lotto. Chi legge durante
+l'importazione vede lo stato precedente (WAL), mai quello intermedio.
+
+La scomposizione dei costi è calcolata per le righe collegate a un bene,
+raggruppate per bene: i parametri di ogni bene sono letti una volta sola
+(cost_calculator.cache_beni) e il calcolo per riga è solo aritmetica.
+"""
+
+import json
+import math
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from .aggregati_mensili import aggiungi_movimenti
+from .contabilita import effetto_saldo
+from .cost_calculator import CostCalculator
+from .ricerca import indicizza_movimenti
+from .saldi import aggiungi_variazioni
+from .scomposizioni import materializza
+from .sincronizzazione import registra_movimenti
+from .versioni import incrementa_versione
+
+TIPI_VALIDI = ('entrata', 'uscita', 'trasferimento')
+
+# Numero massimo di errori riportati al chiamante
+MAX_ERRORI = 100
+
+# Sotto questa dimensione del lotto gli indici non vengono mai ricostruiti
+SOGLIA_RICOSTRUZIONE = 10000
+
+# Trigger di inserimento sospesi durante i lotti grandi, con la funzione che
+# applica in blocco lo stesso effetto ai movimenti con id > ultimo_id
+def _versione_movimenti(conn, id_da: int) -> None:
+    incrementa_versione(conn, 'movimenti')
+
+
+TRIGGER_DIFFERITI = {
+    'movimenti_mensili_insert': aggiungi_movimenti,     # migration 010
+    'movimenti_fts_insert': indicizza_movimenti,        # migration 014
+    'versione_movimenti_insert': _versione_movimenti,   # migration 015
+    'registro_movimenti_insert': registra_movimenti,    # migration 017
+    'saldi_giornalieri_insert': aggiungi_variazioni,    # migration 018
+    'scomposizioni_costi_insert': materializza,         # migration 020
+}
+
+_COLONNE_INSERT = (
+    'data', 'importo', 'tipo', 'categoria_id', 'conto_id', 'budget_id',
+    'obiettivo_id', 'descrizione', 'note', 'ricorrente', 'bene_id',
+    'km_percorsi', 'ore_utilizzo', 'scomposizione_json'
+)
+
+_QUERY_INSERT = f"""
+    INSERT INTO movimenti ({', '.join(_COLONNE_INSERT)})
+    VALUES ({', '.join('?' * len(_COLONNE_INSERT))})
+"""
+
+
+class ErroreImportazione(ValueError):
+    """Righe non valide: nessun movimento è stato importato"""
+
+    def __init__(self, errori: List[dict], totale: int):
+        self.errori = errori
+        self.totale = totale
+        super().__init__(f"{totale} righe non valide, nessun movimento importato")
+
+
+def _carica_riferimenti(conn) -> dict:
+    """Insiemi di ID validi per le foreign key, con gli stati rilevanti"""
+    return {
+        'conto_id': {row[0] for row in conn.execute("SELECT id FROM conti")},
+        'categoria_id': {row[0] for row in conn.execute("SELECT id FROM categorie")},
+        'bene_id': {row[0] for row in conn.execute("SELECT id FROM beni")},
+        'budget_id': {
+            row[0]: bool(row[1]) for row in conn.execute("SELECT id, attivo FROM budget")
+        },
+        'obiettivo_id': {
+            row[0]: bool(row[1])
+            for row in conn.execute("SELECT id, completato FROM obiettivi_risparmio")
+        },
+    }
+
+
+def _valida_riga(riga: Mapping, riferimenti: dict) -> List[str]:
+    """Errori di una riga (lista vuota se valida)"""
+    errori = []
+
+    tipo = riga.get('tipo')
+    if tipo not in TIPI_VALIDI:
+        errori.append(f"tipo non valido: {tipo!r}")
+
+    data = riga.get('data')
+    try:
+        datetime.fromisoformat(data)
+    except (TypeError, ValueError):
+        errori.append(f"data non valida: {data!r}")
+
+    importo = riga.get('importo')
+    if isinstance(importo, bool) or not isinstance(importo, (int, float)) or not math.isfinite(importo):
+        errori.append(f"importo non valido: {importo!r}")
+
+    if not riga.get('descrizione'):
+        errori.append("descrizione obbligatoria")
+
+    for colonna in ('conto_id', 'categoria_id', 'bene_id', 'budget_id', 'obiettivo_id'):
+        valore = riga.get(colonna)
+        if valore is not None and valore not in riferimenti[colonna]:
+            errori.append(f"{colonna} {valore} non trovato")
+
+    budget_id = riga.get('budget_id')
+    if budget_id in riferimenti['budget_id'] and not riferimenti['budget_id'][budget_id]:
+        errori.append(f"budget {budget_id} non attivo")
+
+    obiettivo_id = riga.get('obiettivo_id')
+    if obiettivo_id is not None:
+        if tipo != 'entrata':
+            errori.append("obiettivo_id può essere usato solo con movimenti di tipo 'entrata'")
+        if riferimenti['obiettivo_id'].get(obiettivo_id):
+            errori.append(f"obiettivo {obiettivo_id} già completato")
+
+    return errori
+
+
+def _scomposizioni(conn, righe: List[Mapping]) -> List[Optional[str]]:
+    """scomposizione_json di ogni riga (None se senza bene o senza km/ore)"""
+    per_bene = {}
+    for indice, riga in enumerate(righe):
+        if riga.get('bene_id') is not None:
+            per_bene.setdefault(riga['bene_id'], []).append(indice)
+
+    risultati = [None] * len(righe)
+    calculator = CostCalculator(conn)
+    for bene_id, indici in per_bene.items():
+        scomposizioni = calculator.calcola_scomposizioni(bene_id, [righe[i] for i in indici])
+        for indice, scomposizione in zip(indici, scomposizioni):
+            if scomposizione:
+                risultati[indice] = json.dumps(scomposizione)
+    return risultati
+
+
+def _indici_secondari(conn) -> List[tuple]:
+    """Indici di movimenti ricreabili (nome, sql): esclusi autoindex e UNIQUE"""
+    righe = conn.execute(
+        """
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND tbl_name = 'movimenti' AND sql IS NOT NULL
+        """
+    ).fetchall()
+    return [
+        (nome, sql) for nome, sql in righe
+        if not sql.lstrip().upper().startswith('CREATE UNIQUE')
+    ]
+
+
+def _trigger_differiti(conn) -> List[tuple]:
+    """Trigger di TRIGGER_DIFFERITI presenti nello schema (nome, sql)"""
+    righe = conn.execute(
+        f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'trigger' AND name IN ({', '.join('?' * len(TRIGGER_DIFFERITI))})
+        """,
+        tuple(TRIGGER_DIFFERITI)
+    ).fetchall()
+    return [(nome, sql) for nome, sql in righe]
+
+
+def importa_movimenti(
+    conn,
+    righe: Iterable[Mapping],
+    ricostruisci_indici: Optional[bool] = None
+) -> Dict[str, object]:
+    """Valida e inserisce un lotto di movimenti in una sola transazione
+
+    `ricostruisci_indici` forza (True) o esclude (False) l'eliminazione e
+    ricreazione degli indici secondari; con None decide la dimensione del
+    lotto rispetto alla tabella. Solleva ErroreImportazione se una riga non
+    è valida, RuntimeError se la connessione ha già una transazione aperta
+    (il lotto non può essere annullato insieme al lavoro del chiamante).
+    """
+    if conn.in_transaction:
+        raise RuntimeError("importa_movimenti richiede una connessione senza transazioni aperte")
+
+    inizio = time.perf_counter()
+    righe = list(righe)
+
+    # Le foreign key sono validate dentro la transazione, con il lock di
+    # scrittura già preso: il controllo per riga è superfluo e nessuno può
+    # eliminare un riferimento prima dell'inserimento (il PRAGMA non ha
+    # effetto dentro una transazione, va impostato prima)
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+
+    indici = []
+    trigger = []
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            riferimenti = _carica_riferimenti(conn)
+
+            errori = []
+            totale_errori = 0
+            for indice, riga in enumerate(righe):
+                errori_riga = _valida_riga(riga, riferimenti)
+                if errori_riga:
+                    totale_errori += 1
+                    if len(errori) < MAX_ERRORI:
+                        errori.append({'riga': indice, 'errori': errori_riga})
+
+            if totale_errori:
+                raise ErroreImportazione(errori, totale_errori)
+
+            # Ordinare per data rende gli inserimenti negli indici quasi sequenziali
+            righe.sort(key=lambda riga: riga['data'])
+
+            scomposizioni = _scomposizioni(conn, righe)
+
+            valori = []
+            delta_saldi = {}
+            for riga, scomposizione in zip(righe, scomposizioni):
+                valori.append((
+                    riga['data'],
+                    riga['importo'],
+                    riga['tipo'],
+                    riga.get('categoria_id'),
+                    riga.get('conto_id'),
+                    riga.get('budget_id'),
+                    riga.get('obiettivo_id'),
+                    riga['descrizione'],
+                    riga.get('note'),
+                    bool(riga.get('ricorrente', False)),
+                    riga.get('bene_id'),
+                    riga.get('km_percorsi'),
+                    riga.get('ore_utilizzo'),
+                    scomposizione
+                ))
+
+                conto_id = riga.get('conto_id')
+                if conto_id is not None:
+                    delta_saldi[conto_id] = (
+                        delta_saldi.get(conto_id, 0) + effetto_saldo(riga['tipo'], riga['importo'])
+                    )
+
+            ultimo_id = conn.execute("SELECT IFNULL(MAX(id), 0) FROM movimenti").fetchone()[0]
+            if ricostruisci_indici is None:
+                ricostruisci_indici = len(valori) >= max(ultimo_id, SOGLIA_RICOSTRUZIONE)
+
+            if ricostruisci_indici:
+                indici = _indici_secondari(conn)
+                for nome, _ in indici:
+                    conn.execute(f'DROP INDEX "{nome}"')
+                trigger = _trigger_differiti(conn)
+                for nome, _ in trigger:
+                    conn.execute(f'DROP TRIGGER "{nome}"')
+
+            conn.executemany(_QUERY_INSERT, valori)
+
+            if ricostruisci_indici:
+                for _, sql in indici:
+                    conn.execute(sql)
+                for nome, sql in trigger:
+                    TRIGGER_DIFFERITI[nome](conn, ultimo_id)
+                    conn.execute(sql)
+
+            conn.executemany(
+                "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
+                [(round(delta, 2), conto_id) for conto_id, delta in delta_saldi.items() if delta]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+
+    durata = time.perf_counter() - inizio
+    return {
+        'inseriti': len(valori),
+        'saldi_aggiornati': {conto_id: round(delta, 2) for conto_id, delta in delta_saldi.items()},
+        'indici_ricostruiti': len(indici),
+        'durata_ms': round(durata * 1000, 1),
+        'righe_al_secondo': round(len(valori) / durata) if durata > 0 else None,
+    }
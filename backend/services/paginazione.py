@@ -0,0 +1,73 @@
+"""Paginazione a cursore (keyset) per le liste di movimenti
+
+Invece di LIMIT/OFFSET, che deve scorrere tutte le righe delle pagine
+precedenti, ogni pagina riparte dall'ultima chiave di ordinamento vista:
+(valore, id) < (ultimo_valore, ultimo_id) per l'ordine decrescente. Con un
+indice sulla colonna di ordinamento il costo di una pagina è costante.
+
+Il cursore è opaco per il client: JSON codificato in base64 url-safe.
+"""
+
+import base64
+import json
+from typing import List, Optional, Tuple
+
+# Campi ordinabili a cursore -> colonna SQL (alias m = movimenti)
+ORDINAMENTI_KEYSET = {
+    'data': 'm.data',
+    'importo': 'm.importo',
+}
+
+
+def codifica_cursore(ordine: str, direzione: str, valore, id_movimento: int) -> str:
+    """Cursore opaco che punta dopo la riga (valore, id)"""
+    payload = json.dumps([ordine, direzione, valore, id_movimento], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodifica_cursore(cursore: str, ordine: str, direzione: str) -> Tuple[object, int]:
+    """Restituisce (valore, id) dal cursore; ValueError se non valido o di un altro ordinamento"""
+    try:
+        padding = '=' * (-len(cursore) % 4)
+        dati = json.loads(base64.urlsafe_b64decode(cursore + padding).decode('utf-8'))
+        ordine_cursore, direzione_cursore, valore, id_movimento = dati
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError("Cursore non valido")
+
+    if (ordine_cursore, direzione_cursore) != (ordine, direzione):
+        raise ValueError("Il cursore appartiene a un ordinamento diverso")
+    if not isinstance(id_movimento, int):
+        raise ValueError("Cursore non valido")
+
+    return valore, id_movimento
+
+
+def clausole_keyset(
+    ordine: str,
+    direzione: str,
+    cursore: Optional[str]
+) -> Tuple[str, str, list]:
+    """Condizione WHERE (o stringa vuota), ORDER BY e parametri per una pagina"""
+    if ordine not in ORDINAMENTI_KEYSET:
+        raise ValueError(f"Ordinamento non supportato a cursore: {ordine}")
+
+    colonna = ORDINAMENTI_KEYSET[ordine]
+    direzione_sql = "DESC" if direzione == "desc" else "ASC"
+    order_by = f"{colonna} {direzione_sql}, m.id {direzione_sql}"
+
+    if not cursore:
+        return "", order_by, []
+
+    valore, id_movimento = decodifica_cursore(cursore, ordine, direzione)
+    operatore = "<" if direzione == "desc" else ">"
+    return f"({colonna}, m.id) {operatore} (?, ?)", order_by, [valore, id_movimento]
+
+
+def pagina_keyset(righe: List[dict], per_page: int, ordine: str, direzione: str) -> Tuple[List[dict], Optional[str]]:
+    """Taglia le righe lette (per_page + 1) e calcola il cursore della pagina successiva"""
+    if len(righe) <= per_page:
+        return righe, None
+
+    righe = righe[:per_page]
+    ultima = righe[-1]
+    return righe, codifica_cursore(ordine, direzione, ultima[ordine], ultima['id'])
@@ -0,0 +1,204 @@
+"""Previsione dei saldi dalle ricorrenze attive
+
+Espande tutte le ricorrenze attive in occorrenze future fino all'orizzonte
+richiesto e le somma ai saldi correnti dei conti attivi. L'espansione è
+vettoriale (numpy) su tutte le ricorrenze insieme: dopo la prima occorrenza
+ogni ricorrenza è una progressione regolare, in giorni (giornaliera,
+settimanale) o in mesi con il giorno limitato alla fine del mese (mensile,
+annuale), e le variazioni per (conto, giorno) si accumulano con un solo
+bincount. Le occorrenze già scadute e non ancora eseguite sono contate
+oggi, perché lo scheduler le eseguirà al prossimo giro.
+"""
+
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from .contabilita import effetto_saldo
+from .esecuzione_ricorrenze import prossima_occorrenza
+
+# Passo della progressione dopo la prima occorrenza: (giorni, mesi)
+_PASSI = {
+    'giornaliera': (1, 0),
+    'settimanale': (7, 0),
+    'mensile': (0, 1),
+    'annuale': (0, 12),
+}
+
+
+def _espandi(quanti: np.ndarray):
+    """(indice della ricorrenza, numero dell'occorrenza) per ogni occorrenza"""
+    indici = np.repeat(np.arange(len(quanti)), quanti)
+    inizi = np.repeat(np.cumsum(quanti) - quanti, quanti)
+    return indici, np.arange(int(quanti.sum())) - inizi
+
+
+def _occorrenze_in_giorni(prime, passi, limiti):
+    """Offset (giorni da oggi) delle progressioni a passo fisso in giorni"""
+    quanti = np.where(prime <= limiti, (limiti - prime) // passi + 1, 0)
+    indici, k = _espandi(quanti)
+    return indici, prime[indici] + k * passi[indici]
+
+
+def _occorrenze_in_mesi(mesi_primi, giorni_mese, passi, limiti, oggi):
+    """Offset delle progressioni mensili/annuali, giorno limitato al mese"""
+    oggi_np = np.datetime64(oggi, 'D')
+    mesi_limite = (oggi_np + limiti).astype('datetime64[M]')
+    quanti = np.where(
+        mesi_limite >= mesi_primi,
+        (mesi_limite - mesi_primi).astype(np.int64) // passi + 1,
+        0
+    )
+    indici, k = _espandi(quanti)
+
+    mesi = mesi_primi[indici] + k * passi[indici]
+    inizio_mese = mesi.astype('datetime64[D]')
+    giorni_nel_mese = ((mesi + 1).astype('datetime64[D]') - inizio_mese).astype(np.int64)
+    giorni = inizio_mese + np.minimum(giorni_mese[indici], giorni_nel_mese) - 1
+    offset = (giorni - oggi_np).astype(np.int64)
+
+    dentro = offset <= limiti[indici]
+    return indici[dentro], offset[dentro]
+
+
+def _date_punti(oggi: date, giorni: int, granularita: str) -> np.ndarray:
+    """Offset dei punti restituiti: oggi, poi ogni giorno o ogni fine mese"""
+    if granularita == 'giorno':
+        return np.arange(giorni + 1)
+
+    oggi_np = np.datetime64(oggi, 'D')
+    mesi = np.arange(
+        oggi_np.astype('datetime64[M]'),
+        (oggi_np + giorni).astype('datetime64[M]') + 1
+    )
+    fine_mese = ((mesi + 1).astype('datetime64[D]') - 1 - oggi_np).astype(np.int64)
+    return np.unique(np.concatenate(([0], np.minimum(fine_mese, giorni))))
+
+
+def proietta(conn, mesi: int = 24, granularita: str = 'mese', oggi: Optional[date] = None) -> dict:
+    """Saldi previsti per conto e totali, per i prossimi `mesi` mesi
+
+    Restituisce per ogni conto attivo i punti (data, saldo) e il saldo minimo
+    previsto, più la curva del totale. `granularita` è 'mese' (fine di ogni
+    mese) o 'giorno'.
+    """
+    oggi = oggi or date.today()
+    giorni = (oggi + relativedelta(months=mesi) - oggi).days
+
+    conti = conn.execute(
+        "SELECT id, nome, saldo FROM conti WHERE attivo = 1 ORDER BY id"
+    ).fetchall()
+    posizione = {row[0]: i for i, row in enumerate(conti)}
+
+    ricorrenze = conn.execute(
+        """
+        SELECT conto_id, importo, tipo, frequenza, giorno_mese, giorno_settimana,
+               mese, prossima_data, data_fine
+        FROM movimenti_ricorrenti
+        WHERE attivo = 1 AND conto_id IS NOT NULL
+        AND (data_fine IS NULL OR data_fine >= prossima_data)
+        """
+    ).fetchall()
+
+    # Prima occorrenza (prossima_data) e inizio della progressione regolare,
+    # calcolati per ricorrenza; il resto è vettoriale
+    conto_idx, effetti, primi, secondi, limiti = [], [], [], [], []
+    giorni_passo, mesi_passo, giorni_mese = [], [], []
+    for conto_id, importo, tipo, frequenza, giorno_mese, giorno_settimana, mese, prossima, fine in ricorrenze:
+        if conto_id not in posizione or frequenza not in _PASSI:
+            continue
+        prima = date.fromisoformat(str(prossima)[:10])
+        try:
+            seconda = prossima_occorrenza(frequenza, prima, giorno_mese, giorno_settimana, mese)
+        except ValueError:
+            continue
+
+        limite = giorni
+        if fine:
+            limite = min(limite, (date.fromisoformat(str(fine)[:10]) - oggi).days)
+
+        conto_idx.append(posizione[conto_id])
+        effetti.append(effetto_saldo(tipo, importo))
+        primi.append((prima - oggi).days)
+        secondi.append(seconda)
+        limiti.append(limite)
+        giorni_passo.append(_PASSI[frequenza][0])
+        mesi_passo.append(_PASSI[frequenza][1])
+        giorni_mese.append(giorno_mese or seconda.day)
+
+    n_giorni = giorni + 1
+    variazioni = np.zeros(len(conti) * n_giorni)
+
+    if conto_idx:
+        conto_idx = np.array(conto_idx)
+        effetti = np.array(effetti, dtype=float)
+        limiti = np.array(limiti)
+        giorni_passo = np.array(giorni_passo)
+        mesi_passo = np.array(mesi_passo)
+        oggi_np = np.datetime64(oggi, 'D')
+        secondi_np = np.array(secondi, dtype='datetime64[D]')
+
+        # Prima occorrenza
+        prime = np.array(primi)
+        indici = [np.flatnonzero(prime <= limiti)]
+        offset = [prime[indici[0]]]
+
+        # Progressioni in giorni
+        in_giorni = np.flatnonzero(giorni_passo > 0)
+        i, o = _occorrenze_in_giorni(
+            (secondi_np[in_giorni] - oggi_np).astype(np.int64), giorni_passo[in_giorni], limiti[in_giorni]
+        )
+        indici.append(in_giorni[i])
+        offset.append(o)
+
+        # Progressioni in mesi
+        in_mesi = np.flatnonzero(mesi_passo > 0)
+        i, o = _occorrenze_in_mesi(
+            secondi_np[in_mesi].astype('datetime64[M]'), np.array(giorni_mese)[in_mesi],
+            mesi_passo[in_mesi], limiti[in_mesi], oggi
+        )
+        indici.append(in_mesi[i])
+        offset.append(o)
+
+        indici = np.concatenate(indici)
+        offset = np.clip(np.concatenate(offset), 0, None)
+        variazioni = np.bincount(
+            conto_idx[indici] * n_giorni + offset,
+            weights=effetti[indici],
+            minlength=len(conti) * n_giorni
+        )
+
+    saldi = np.array([row[2] for row in conti], dtype=float)
+    curve = saldi[:, None] + np.cumsum(variazioni.reshape(len(conti), n_giorni), axis=1)
+    totale = curve.sum(axis=0)
+
+    punti = _date_punti(oggi, giorni, granularita)
+    date_punti = [str(d) for d in np.datetime64(oggi, 'D') + punti]
+
+    def _curva(valori) -> List[dict]:
+        return [
+            {'data': data_punto, 'saldo': saldo}
+            for data_punto, saldo in zip(date_punti, np.round(valori[punti], 2).tolist())
+        ]
+
+    return {
+        'data_inizio': oggi.isoformat(),
+        'data_fine': date_punti[-1],
+        'conti': [
+            {
+                'conto_id': conto_id,
+                'nome': nome,
+                'saldo_corrente': saldo,
+                'saldo_minimo': round(float(curve[i].min()), 2),
+                'punti': _curva(curve[i]),
+            }
+            for i, (conto_id, nome, saldo) in enumerate(conti)
+        ],
+        'totale': {
+            'saldo_corrente': round(float(saldi.sum()), 2),
+            'saldo_minimo': round(float(totale.min()), 2) if len(conti) else 0.0,
+            'punti': _curva(totale) if len(conti) else [],
+        },
+    }
@@ -0,0 +1,153 @@
+"""Ricerca full-text sui movimenti
+
+Interroga la tabella FTS5 movimenti_fts (migration 014), che indicizza
+descrizione, note, nome della categoria e nome del conto di ogni movimento.
+Il testo dell'utente non viene mai passato a MATCH così com'è: ogni parola
+diventa un termine tra virgolette con ricerca per prefisso, e i termini sono
+in AND. I risultati sono ordinati per rilevanza su tutte le corrispondenze
+(bm25 come rank di FTS5, con la descrizione che pesa più di note, categoria
+e conto), per cui anche i movimenti vecchi più pertinenti compaiono e la
+paginazione prosegue fino all'ultimo risultato.
+
+Uso da riga di comando:
+    python -m backend.services.ricerca rebuild
+"""
+
+import re
+import sys
+from datetime import date
+from typing import List, Optional, Tuple
+
+from .versioni import incrementa_versione
+
+# Pesi bm25 delle colonne: descrizione, note, categoria, conto
+PESI_COLONNE = (10.0, 5.0, 2.0, 1.0)
+
+_PAROLA = re.compile(r'\w+', re.UNICODE)
+
+_QUERY_INDICIZZA = """
+    INSERT INTO movimenti_fts (rowid, descrizione, note, categoria, conto)
+    SELECT m.id, m.descrizione, m.note, c.nome, co.nome
+    FROM movimenti m
+    LEFT JOIN categorie c ON m.categoria_id = c.id
+    LEFT JOIN conti co ON m.conto_id = co.id
+    WHERE m.id > ?
+"""
+
+
+def espressione_fts(testo: str) -> Optional[str]:
+    """Espressione MATCH sicura dal testo libero (None se non ci sono parole)
+
+    "spesa coop" -> '"spesa"* "coop"*': tutte le parole, ciascuna anche come
+    prefisso. Operatori e sintassi FTS5 nel testo vengono ignorati.
+    """
+    parole = _PAROLA.findall(testo or '')
+    if not parole:
+        return None
+    return ' '.join(f'"{parola}"*' for parola in parole)
+
+
+def indicizza_movimenti(conn, id_da: int) -> None:
+    """Aggiunge all'indice i movimenti con id > id_da
+
+    Equivale al trigger di inserimento della migration 014 con un solo
+    INSERT ... SELECT: usato dalle importazioni massive.
+    """
+    conn.execute(_QUERY_INDICIZZA, (id_da,))
+
+
+def ricostruisci(conn) -> int:
+    """Rigenera da zero l'indice full-text, restituisce i movimenti indicizzati"""
+    with conn:
+        conn.execute("DELETE FROM movimenti_fts")
+        conn.execute(_QUERY_INDICIZZA, (0,))
+        conn.execute("INSERT INTO movimenti_fts (movimenti_fts) VALUES ('optimize')")
+        # Le risposte in cache e gli ETag dipendono dalla versione di movimenti
+        incrementa_versione(conn, 'movimenti')
+
+    return conn.execute("SELECT COUNT(*) FROM movimenti_fts").fetchone()[0]
+
+
+def cerca(
+    conn,
+    testo: str,
+    data_da: Optional[date] = None,
+    data_a: Optional[date] = None,
+    tipo: Optional[str] = None,
+    conto_id: Optional[int] = None,
+    limite: int = 50,
+    offset: int = 0
+) -> Tuple[List[dict], bool]:
+    """Movimenti che corrispondono al testo, in ordine di rilevanza
+
+    Restituisce (risultati, altri): `altri` indica se esistono risultati
+    oltre `limite`.
+    """
+    espressione = espressione_fts(testo)
+    if espressione is None:
+        return [], False
+
+    condizioni = ["movimenti_fts MATCH ?"]
+    params = [espressione]
+
+    if data_da:
+        condizioni.append("m.data_giorno >= ?")
+        params.append(data_da.isoformat())
+    if data_a:
+        condizioni.append("m.data_giorno <= ?")
+        params.append(data_a.isoformat())
+    if tipo:
+        condizioni.append("m.tipo = ?")
+        params.append(tipo)
+    if conto_id is not None:
+        condizioni.append("m.conto_id = ?")
+        params.append(conto_id)
+
+    # rank con la funzione bm25 pesata: FTS5 calcola il punteggio di ogni
+    # corrispondenza e l'ordinamento copre tutti i risultati, non solo i più recenti
+    condizioni.insert(1, "movimenti_fts.rank MATCH ?")
+    params.insert(1, f"bm25({', '.join(str(peso) for peso in PESI_COLONNE)})")
+
+    cursor = conn.execute(
+        f"""
+        SELECT
+            m.*,
+            c.nome as categoria_nome,
+            c.icona as categoria_icona,
+            c.colore as categoria_colore,
+            co.nome as conto_nome,
+            movimenti_fts.rank AS punteggio
+        FROM movimenti_fts
+        JOIN movimenti m ON m.id = movimenti_fts.rowid
+        LEFT JOIN categorie c ON m.categoria_id = c.id
+        LEFT JOIN conti co ON m.conto_id = co.id
+        WHERE {' AND '.join(condizioni)}
+        ORDER BY movimenti_fts.rank, m.data DESC
+        LIMIT ? OFFSET ?
+        """,
+        params + [limite + 1, offset]
+    )
+
+    risultati = [dict(row) for row in cursor.fetchall()]
+    return risultati[:limite], len(risultati) > limite
+
+
+def main(argv=None):
+    """Entry point da riga di comando"""
+    argv = sys.argv[1:] if argv is None else argv
+
+    if argv != ['rebuild']:
+        print("Uso: python -m backend.services.ricerca rebuild")
+        return 2
+
+    from ..database import get_db_connection
+
+    with get_db_connection() as conn:
+        indicizzati = ricostruisci(conn)
+
+    print(f"✓ Indice full-text ricostruito: {indicizzati} movimenti")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
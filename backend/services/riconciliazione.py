@@ -0,0 +1,192 @@
+"""Riconciliazione dei saldi dei conti con i movimenti
+
+Il saldo atteso di un conto è saldo_iniziale (migration 019) più l'effetto
+dei suoi movimenti. La verifica completa lo ricalcola con un solo passaggio
+raggruppato su tutti i movimenti; quella incrementale (predefinita) riparte
+dal seq del registro_modifiche salvato dall'esecuzione precedente e verifica
+solo i conti toccati da allora, sommando le variazioni giornaliere
+(migration 018) invece dei movimenti.
+
+La verifica incrementale vede i movimenti inseriti o modificati e i conti
+aggiornati dopo il checkpoint; una modifica fatta fuori dall'applicazione che
+sposta un movimento da un conto a un altro senza toccare i saldi è trovata
+solo dalla verifica completa.
+
+Uso da riga di comando:
+    python -m backend.services.riconciliazione [--completa] [--correggi]
+"""
+
+import argparse
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .contabilita import transazione
+from .saldi import EFFETTO_SQL
+
+# Differenze più piccole sono arrotondamenti, non discrepanze
+TOLLERANZA = 0.005
+
+
+def _checkpoint(conn) -> Optional[int]:
+    row = conn.execute("SELECT seq FROM riconciliazioni ORDER BY id DESC LIMIT 1").fetchone()
+    return row[0] if row else None
+
+
+def _ultimo_seq(conn) -> int:
+    return conn.execute("SELECT IFNULL(MAX(seq), 0) FROM registro_modifiche").fetchone()[0]
+
+
+def _somme_da_movimenti(conn) -> Dict[int, float]:
+    """Effetto dei movimenti per conto, con un passaggio sulla tabella"""
+    return dict(conn.execute(
+        f"""
+        SELECT conto_id, SUM({EFFETTO_SQL})
+        FROM movimenti
+        WHERE conto_id IS NOT NULL
+        GROUP BY conto_id
+        """
+    ).fetchall())
+
+
+def _conti_toccati(conn, seq: int) -> Optional[List[int]]:
+    """Conti modificati dopo seq (None se serve verificarli tutti)
+
+    Un movimento eliminato non ha più il conto da cui è uscito: in quel caso
+    si verificano tutti i conti, comunque senza leggere i movimenti. Il + su
+    tabella impedisce l'uso dell'indice (tabella, riga_id), che scorrerebbe
+    tutto il registro invece dei soli seq successivi al checkpoint.
+    """
+    eliminati = conn.execute(
+        """
+        SELECT 1 FROM registro_modifiche
+        WHERE seq > ? AND +tabella = 'movimenti' AND operazione = 'delete'
+        LIMIT 1
+        """,
+        (seq,)
+    ).fetchone()
+    if eliminati:
+        return None
+
+    return [row[0] for row in conn.execute(
+        """
+        SELECT riga_id FROM registro_modifiche
+        WHERE seq > ? AND +tabella = 'conti' AND operazione = 'upsert'
+        UNION
+        SELECT m.conto_id
+        FROM registro_modifiche r
+        JOIN movimenti m ON m.id = r.riga_id
+        WHERE r.seq > ? AND +r.tabella = 'movimenti' AND r.operazione = 'upsert'
+        AND m.conto_id IS NOT NULL
+        """,
+        (seq, seq)
+    )]
+
+
+def _somme_da_variazioni(conn, conti: Optional[List[int]]) -> Dict[int, float]:
+    """Effetto dei movimenti per conto dalle variazioni giornaliere"""
+    if conti is None:
+        return dict(conn.execute(
+            "SELECT conto_id, SUM(variazione) FROM saldi_giornalieri GROUP BY conto_id"
+        ).fetchall())
+
+    somme = {}
+    for conto_id in conti:
+        somme[conto_id] = conn.execute(
+            "SELECT IFNULL(SUM(variazione), 0) FROM saldi_giornalieri WHERE conto_id = ?",
+            (conto_id,)
+        ).fetchone()[0]
+    return somme
+
+
+def riconcilia(conn, completa: bool = False, correggi: bool = False) -> dict:
+    """Confronta i saldi con i movimenti, correggendo le differenze se richiesto
+
+    Senza un'esecuzione precedente la verifica è sempre completa. Lettura,
+    correzioni e checkpoint sono nella stessa transazione.
+    """
+    inizio = time.perf_counter()
+
+    with transazione(conn):
+        checkpoint = None if completa else _checkpoint(conn)
+        completa = checkpoint is None
+
+        if completa:
+            conti = None
+            somme = _somme_da_movimenti(conn)
+        else:
+            conti = _conti_toccati(conn, checkpoint)
+            somme = _somme_da_variazioni(conn, conti)
+
+        query = "SELECT id, nome, saldo, saldo_iniziale FROM conti"
+        params = []
+        if conti is not None:
+            query += f" WHERE id IN ({', '.join('?' * len(conti))})"
+            params = conti
+        righe = conn.execute(query + " ORDER BY id", params).fetchall()
+
+        discrepanze = []
+        for conto_id, nome, saldo, saldo_iniziale in righe:
+            atteso = round(saldo_iniziale + (somme.get(conto_id) or 0), 2)
+            if abs(saldo - atteso) > TOLLERANZA:
+                discrepanze.append({
+                    'conto_id': conto_id,
+                    'nome': nome,
+                    'saldo': saldo,
+                    'saldo_calcolato': atteso,
+                    'differenza': round(saldo - atteso, 2),
+                })
+
+        if correggi and discrepanze:
+            conn.executemany(
+                "UPDATE conti SET saldo = ? WHERE id = ?",
+                [(d['saldo_calcolato'], d['conto_id']) for d in discrepanze]
+            )
+
+        seq = _ultimo_seq(conn)
+        conn.execute(
+            """
+            INSERT INTO riconciliazioni (seq, completa, conti_verificati, discrepanze, corrette)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (seq, completa, len(righe), len(discrepanze), bool(correggi and discrepanze))
+        )
+
+    return {
+        'completa': completa,
+        'checkpoint': seq,
+        'conti_verificati': len(righe),
+        'discrepanze': discrepanze,
+        'corrette': bool(correggi and discrepanze),
+        'durata_ms': round((time.perf_counter() - inizio) * 1000, 1),
+    }
+
+
+def main(argv=None):
+    """Entry point da riga di comando"""
+    parser = argparse.ArgumentParser(
+        description="Verifica (e corregge) i saldi dei conti ricalcolandoli dai movimenti"
+    )
+    parser.add_argument('--completa', action='store_true',
+                        help="ricalcola da tutti i movimenti invece che dall'ultimo checkpoint")
+    parser.add_argument('--correggi', action='store_true',
+                        help="sostituisce i saldi errati con quelli calcolati")
+    args = parser.parse_args(argv)
+
+    from ..database import get_db_connection
+
+    with get_db_connection() as conn:
+        esito = riconcilia(conn, completa=args.completa, correggi=args.correggi)
+
+    tipo = "completa" if esito['completa'] else "incrementale"
+    print(f"✓ Verifica {tipo}: {esito['conti_verificati']} conti in {esito['durata_ms']} ms")
+    for d in esito['discrepanze']:
+        print(f"  ✗ {d['nome']} (#{d['conto_id']}): saldo {d['saldo']:.2f}, "
+              f"calcolato {d['saldo_calcolato']:.2f} ({d['differenza']:+.2f})")
+    if esito['corrette']:
+        print(f"  → {len(esito['discrepanze'])} saldi corretti")
+    return 1 if esito['discrepanze'] and not esito['corrette'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,20 @@
 """Scheduler per esecuzione automatica movimenti ricorrenti"""
 
 import logging
-from datetime import datetime, date
+from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
-from ..database import get_db_connection, dict_from_row
-from ..models import MovimentoRicorrente, FrequenzaRicorrenza
-from ..routes.ricorrenze import calcola_prossima_data
+from ..database import get_db_connection
+from .esecuzione_ricorrenze import esegui_ricorrenze
 
 logger = logging.getLogger(__name__)
 
 
 def esegui_ricorrenze_scadute():
     """
-    Esegue tutte le ricorrenze con prossima_data <= oggi.
+    Esegue tutte le ricorrenze con prossima_data <= oggi, comprese le
+    occorrenze perse mentre il server era spento.
     
     Chiamato automaticamente dal cron job.
     """
@@ -25,96 +25,21 @@ def esegui_ricorrenze_scadute():
     
     try:
         with get_db_connection() as conn:
-            # Trova ricorrenze da eseguire
-            query = """
-                SELECT * FROM movimenti_ricorrenti
-                WHERE attivo = 1
-                AND prossima_data <= ?
-                AND (data_fine IS NULL OR data_fine >= ?)
-                ORDER BY prossima_data ASC
-            """
-            
-            oggi = date.today().isoformat()
-            cursor = conn.execute(query, (oggi, oggi))
-            ricorrenze = cursor.fetchall()
-            
-            if not ricorrenze:
-                logger.info("\u2714\ufe0f Nessuna ricorrenza da eseguire oggi")
-                return
-            
-            logger.info(f"\ud83d\udd0d Trovate {len(ricorrenze)} ricorrenze da eseguire")
-            
-            eseguite = 0
-            errori = 0
-            
-            for row in ricorrenze:
-                ric_dict = dict_from_row(row)
-                ric_id = ric_dict['id']
-                
-                try:
-                    logger.info(f"\n  \u27a1\ufe0f Esecuzione ricorrenza #{ric_id}: {ric_dict['descrizione']}")
-                    
-                    # Crea movimento
-                    importo_movimento = ric_dict['importo'] if ric_dict['tipo'] == 'entrata' else -abs(ric_dict['importo'])
-                    
-                    cursor = conn.execute(
-                        """
-                        INSERT INTO movimenti (
-                            data, importo, tipo, conto_id, categoria_id,
-                            budget_id, obiettivo_id, bene_id, descrizione, note, ricorrente
-                        )
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-                        """,
-                        (
-                            datetime.now().isoformat(),
-                            importo_movimento,
-                            ric_dict['tipo'],
-                            ric_dict['conto_id'],
-                            ric_dict['categoria_id'],
-                            ric_dict['budget_id'],
-                            ric_dict['obiettivo_id'],
-                            ric_dict['bene_id'],
-                            f"[AUTO] {ric_dict['descrizione']}",
-                            ric_dict['note']
-                        )
-                    )
-                    movimento_id = cursor.lastrowid
-                    logger.info(f"    \u2714\ufe0f Movimento creato: ID={movimento_id}")
-                    
-                    # Aggiorna saldo conto se presente
-                    if ric_dict['conto_id']:
-                        conn.execute(
-                            "UPDATE conti SET saldo = saldo + ? WHERE id = ?",
-                            (importo_movimento, ric_dict['conto_id'])
-                        )
-                        logger.info(f"    \ud83d\udcb0 Saldo conto aggiornato: {importo_movimento:+.2f}\u20ac")
-                    
-                    # Calcola prossima data
-                    ric_obj = MovimentoRicorrente(**ric_dict)
-                    prossima = calcola_prossima_data(ric_obj, date.today())
-                    
-                    # Aggiorna ricorrenza
-                    conn.execute(
-                        "UPDATE movimenti_ricorrenti SET prossima_data = ? WHERE id = ?",
-                        (prossima.isoformat(), ric_id)
-                    )
-                    logger.info(f"    \ud83d\uddd3\ufe0f Prossima esecuzione: {prossima}")
-                    
-                    eseguite += 1
-                    
-                except Exception as e:
-                    logger.error(f"    \u274c Errore durante esecuzione ricorrenza #{ric_id}: {str(e)}")
-                    errori += 1
-            
-            # Commit finale
-            conn.commit()
-            
-            logger.info("\n" + "=" * 60)
-            logger.info(f"RIEPILOGO ESECUZIONE:")
-            logger.info(f"  \u2714\ufe0f Eseguite con successo: {eseguite}")
-            if errori > 0:
-                logger.warning(f"  \u274c Errori: {errori}")
-            logger.info("=" * 60)
+            esito = esegui_ricorrenze(conn)
+        
+        if not esito['ricorrenze'] and not esito['errori']:
+            logger.info("\u2714\ufe0f Nessuna ricorrenza da eseguire oggi")
+            return
+        
+        for errore in esito['errori']:
+            logger.error(f"    \u274c Errore durante esecuzione ricorrenza #{errore['ricorrenza_id']}: {errore['errore']}")
+        
+        logger.info("\n" + "=" * 60)
+        logger.info(f"RIEPILOGO ESECUZIONE:")
+        logger.info(f"  \u2714\ufe0f Eseguite con successo: {esito['ricorrenze']} ricorrenze, {esito['movimenti']} movimenti")
+        if esito['errori']:
+            logger.warning(f"  \u274c Errori: {len(esito['errori'])}")
+        logger.info("=" * 60)
             
     except Exception as e:
         logger.error(f"\u274c ERRORE CRITICO durante esecuzione ricorrenze: {str(e)}")
@@ -0,0 +1,147 @@
+"""Storico dei saldi dalle variazioni giornaliere
+
+La tabella saldi_giornalieri (migration 018) contiene l'effetto netto dei
+movimenti di ogni giorno sul saldo di ogni conto. Il saldo a fine giornata
+si ottiene dal saldo corrente togliendo le variazioni dei giorni successivi
+(una somma a finestra in SQL), così lo storico di un periodo legge solo le
+righe del periodo, una per giorno con movimenti.
+
+Uso da riga di comando:
+    python -m backend.services.saldi rebuild
+"""
+
+import sys
+from datetime import date
+from typing import List, Optional
+
+from .versioni import incrementa_versione
+
+# Effetto di un movimento sul saldo: stessa espressione dei trigger della
+# migration 018 (l'importo delle uscite è salvato sia positivo sia negativo)
+EFFETTO_SQL = "CASE tipo WHEN 'entrata' THEN ABS(importo) WHEN 'uscita' THEN -ABS(importo) ELSE 0 END"
+
+_QUERY_AGGIUNGI = f"""
+    INSERT INTO saldi_giornalieri (conto_id, giorno, variazione, conteggio)
+    SELECT conto_id, data_giorno, SUM({EFFETTO_SQL}), COUNT(*)
+    FROM movimenti
+    WHERE id > ? AND conto_id IS NOT NULL AND data_giorno IS NOT NULL
+    GROUP BY conto_id, data_giorno
+    ON CONFLICT (conto_id, giorno) DO UPDATE SET
+        variazione = variazione + excluded.variazione,
+        conteggio = conteggio + excluded.conteggio
+"""
+
+
+def ricostruisci(conn) -> int:
+    """Rigenera da zero le variazioni giornaliere, restituisce le righe"""
+    with conn:
+        conn.execute("DELETE FROM saldi_giornalieri")
+        conn.execute(_QUERY_AGGIUNGI, (0,))
+        # Le risposte in cache e gli ETag dipendono dalla versione di movimenti
+        incrementa_versione(conn, 'movimenti')
+
+    return conn.execute("SELECT COUNT(*) FROM saldi_giornalieri").fetchone()[0]
+
+
+def aggiungi_variazioni(conn, id_da: int) -> None:
+    """Somma alle variazioni giornaliere i movimenti con id > id_da
+
+    Equivale al trigger di inserimento della migration 018 con un solo
+    UPSERT per (conto, giorno): usato dalle importazioni massive.
+    """
+    conn.execute(_QUERY_AGGIUNGI, (id_da,))
+
+
+def _punti(righe, saldo_corrente: float, oggi: str) -> List[dict]:
+    """Punti (data, saldo a fine giornata) fino a oggi, più il punto di oggi
+
+    `righe` sono (giorno, variazione, variazioni dei giorni successivi) in
+    ordine di giorno; i giorni futuri servono solo a ricavare il saldo di oggi.
+    """
+    punti = []
+    saldo_oggi = saldo_corrente
+    for giorno, variazione, successive in righe:
+        saldo = saldo_corrente - (successive or 0)
+        if giorno > oggi:
+            saldo_oggi = saldo - variazione
+            break
+        punti.append({"data": giorno, "saldo": round(saldo, 2)})
+
+    if not punti or punti[-1]["data"] != oggi:
+        punti.append({"data": oggi, "saldo": round(saldo_oggi, 2)})
+    return punti
+
+
+def storico_conto(conn, conto_id: int, saldo_corrente: float, data_inizio: str,
+                  oggi: Optional[str] = None) -> List[dict]:
+    """Saldo di fine giornata del conto per i giorni con movimenti da data_inizio"""
+    righe = conn.execute(
+        """
+        SELECT
+            giorno,
+            variazione,
+            SUM(variazione) OVER (
+                ORDER BY giorno DESC ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+            )
+        FROM saldi_giornalieri
+        WHERE conto_id = ? AND giorno >= ?
+        ORDER BY giorno
+        """,
+        (conto_id, data_inizio)
+    ).fetchall()
+
+    return _punti(righe, saldo_corrente, oggi or date.today().isoformat())
+
+
+def storico_patrimonio(conn, data_inizio: str, oggi: Optional[str] = None) -> dict:
+    """Patrimonio netto (somma dei saldi dei conti attivi) nel tempo"""
+    patrimonio = conn.execute(
+        "SELECT IFNULL(SUM(saldo), 0) FROM conti WHERE attivo = 1"
+    ).fetchone()[0]
+
+    righe = conn.execute(
+        """
+        WITH giorni AS (
+            SELECT s.giorno, SUM(s.variazione) AS variazione
+            FROM conti c
+            JOIN saldi_giornalieri s ON s.conto_id = c.id AND s.giorno >= ?
+            WHERE c.attivo = 1
+            GROUP BY s.giorno
+        )
+        SELECT
+            giorno,
+            variazione,
+            SUM(variazione) OVER (
+                ORDER BY giorno DESC ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+            )
+        FROM giorni
+        ORDER BY giorno
+        """,
+        (data_inizio,)
+    ).fetchall()
+
+    return {
+        "patrimonio_corrente": round(patrimonio, 2),
+        "punti": _punti(righe, patrimonio, oggi or date.today().isoformat())
+    }
+
+
+def main(argv=None):
+    """Entry point da riga di comando"""
+    argv = sys.argv[1:] if argv is None else argv
+
+    if argv != ['rebuild']:
+        print("Uso: python -m backend.services.saldi rebuild")
+        return 2
+
+    from ..database import get_db_connection
+
+    with get_db_connection() as conn:
+        righe = ricostruisci(conn)
+
+    print(f"✓ Variazioni giornaliere ricostruite: {righe} righe")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
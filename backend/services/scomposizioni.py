@@ -0,0 +1,189 @@
+"""Componenti della scomposizione costi in tabella
+
+La tabella scomposizioni_costi (migration 020) contiene una riga per
+componente di ogni movimento con scomposizione_json, mantenuta dai trigger
+su movimenti. I totali per componente (es. l'ammortamento di tutti i veicoli
+nell'anno) sono una sola query con SUM, senza decodificare i JSON.
+
+La ricostruzione procede a blocchi di id di movimenti, ciascuno nella propria
+breve transazione: su storici grandi non tiene il lock di scrittura per
+tutta la durata e la memoria usata non dipende dal numero di movimenti.
+
+Uso da riga di comando:
+    python -m backend.services.scomposizioni rebuild [dimensione_blocco]
+"""
+
+import sys
+from typing import Dict, List, Optional
+
+from .versioni import incrementa_versione
+
+# Righe inserite per ogni movimento con id > ? e <= ?: stessa espressione
+# dei trigger della migration 020
+_QUERY_MATERIALIZZA = """
+    INSERT INTO scomposizioni_costi (
+        movimento_id, bene_id, nome_componente, valore_componente,
+        percentuale_totale, metodo_calcolo, parametri_calcolo
+    )
+    SELECT
+        m.id,
+        m.bene_id,
+        json_extract(c.value, '$.tipo'),
+        json_extract(c.value, '$.importo'),
+        CASE WHEN json_extract(m.scomposizione_json, '$.costo_totale') != 0
+            THEN ROUND(json_extract(c.value, '$.importo') * 100.0 / json_extract(m.scomposizione_json, '$.costo_totale'), 1)
+        END,
+        json_extract(c.value, '$.descrizione'),
+        json_extract(c.value, '$.dettagli')
+    FROM movimenti m, json_each(m.scomposizione_json, '$.scomposizione') c
+    WHERE m.id > ? AND m.id <= ?
+    AND m.scomposizione_json IS NOT NULL AND json_valid(m.scomposizione_json)
+"""
+
+# Movimenti per blocco nella ricostruzione
+BLOCCO_PREDEFINITO = 5000
+
+
+def materializza(conn, id_da: int) -> None:
+    """Inserisce i componenti dei movimenti con id > id_da
+
+    Equivale al trigger di inserimento della migration 020 con un solo
+    INSERT ... SELECT: usato dalle importazioni massive.
+    """
+    conn.execute(_QUERY_MATERIALIZZA, (id_da, sys.maxsize))
+
+
+def ricostruisci(conn, blocco: int = BLOCCO_PREDEFINITO) -> int:
+    """Rigenera i componenti dai JSON a blocchi di id, restituisce le righe"""
+    if blocco < 1:
+        raise ValueError("La dimensione del blocco deve essere positiva")
+
+    ultimo_id = conn.execute("SELECT IFNULL(MAX(id), 0) FROM movimenti").fetchone()[0]
+
+    with conn:
+        # Componenti di movimenti che non esistono più (o oltre l'ultimo id)
+        conn.execute(
+            "DELETE FROM scomposizioni_costi WHERE movimento_id > ? OR movimento_id NOT IN (SELECT id FROM movimenti)",
+            (ultimo_id,)
+        )
+
+    for inizio in range(0, ultimo_id, blocco):
+        with conn:
+            conn.execute(
+                "DELETE FROM scomposizioni_costi WHERE movimento_id > ? AND movimento_id <= ?",
+                (inizio, inizio + blocco)
+            )
+            conn.execute(_QUERY_MATERIALIZZA, (inizio, inizio + blocco))
+
+    # Le risposte in cache e gli ETag dipendono dalla versione di movimenti
+    with conn:
+        incrementa_versione(conn, 'movimenti')
+
+    return conn.execute("SELECT COUNT(*) FROM scomposizioni_costi").fetchone()[0]
+
+
+def totali_componenti(
+    conn,
+    data_inizio: Optional[str] = None,
+    data_fine: Optional[str] = None,
+    bene_id: Optional[int] = None,
+    tipo_bene: Optional[str] = None
+) -> Dict[str, object]:
+    """Somme dei componenti per bene e complessive nel periodo
+
+    Restituisce totale, componenti ({nome: totale}) e beni (per ogni bene
+    nome, tipo, totale, componenti e movimenti con scomposizione).
+    """
+    filtri = []
+    params = []
+    if data_inizio:
+        filtri.append("m.data_giorno >= ?")
+        params.append(data_inizio)
+    if data_fine:
+        filtri.append("m.data_giorno <= ?")
+        params.append(data_fine)
+    if bene_id is not None:
+        filtri.append("s.bene_id = ?")
+        params.append(bene_id)
+    if tipo_bene:
+        filtri.append("b.tipo = ?")
+        params.append(tipo_bene)
+
+    sorgente = f"""
+        FROM scomposizioni_costi s
+        JOIN movimenti m ON m.id = s.movimento_id
+        LEFT JOIN beni b ON b.id = s.bene_id
+        {'WHERE ' + ' AND '.join(filtri) if filtri else ''}
+    """
+
+    righe = conn.execute(
+        f"""
+        SELECT
+            s.bene_id,
+            b.nome,
+            b.tipo,
+            s.nome_componente,
+            SUM(s.valore_componente) AS totale
+        {sorgente}
+        GROUP BY s.bene_id, s.nome_componente
+        ORDER BY s.bene_id, s.nome_componente
+        """,
+        params
+    ).fetchall()
+
+    # Movimenti distinti per bene: i componenti possono stare su movimenti diversi
+    movimenti_per_bene = dict(conn.execute(
+        f"SELECT s.bene_id, COUNT(DISTINCT s.movimento_id) {sorgente} GROUP BY s.bene_id",
+        params
+    ).fetchall())
+
+    componenti: Dict[str, float] = {}
+    beni: Dict[Optional[int], dict] = {}
+    for id_bene, nome, tipo, componente, totale in righe:
+        componenti[componente] = componenti.get(componente, 0) + totale
+        bene = beni.setdefault(id_bene, {
+            'bene_id': id_bene, 'nome': nome, 'tipo': tipo,
+            'totale': 0, 'componenti': {}, 'movimenti': movimenti_per_bene[id_bene]
+        })
+        bene['componenti'][componente] = round(totale, 2)
+        bene['totale'] += totale
+
+    lista_beni: List[dict] = []
+    for bene in beni.values():
+        bene['totale'] = round(bene['totale'], 2)
+        lista_beni.append(bene)
+
+    return {
+        'totale': round(sum(componenti.values()), 2),
+        'componenti': {nome: round(totale, 2) for nome, totale in componenti.items()},
+        'beni': lista_beni,
+    }
+
+
+def main(argv=None):
+    """Entry point da riga di comando"""
+    argv = sys.argv[1:] if argv is None else argv
+
+    blocco = BLOCCO_PREDEFINITO
+    if len(argv) == 2:
+        try:
+            blocco = int(argv[1])
+        except ValueError:
+            blocco = 0
+
+    if not argv or argv[0] != 'rebuild' or len(argv) > 2 or blocco < 1:
+        print("Uso: python -m backend.services.scomposizioni rebuild [dimensione_blocco]")
+        print(f"  dimensione_blocco: intero positivo (default: {BLOCCO_PREDEFINITO})")
+        return 2
+
+    from ..database import get_db_connection
+
+    with get_db_connection() as conn:
+        righe = ricostruisci(conn, blocco)
+
+    print(f"✓ Scomposizioni ricostruite: {righe} componenti")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
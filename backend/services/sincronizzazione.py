@@ -0,0 +1,134 @@
+"""Sincronizzazione incrementale per il client mobile
+
+Il registro_modifiche (migration 017) contiene, per ogni record delle
+tabelle sincronizzate, l'ultima modifica con un seq crescente. Il client
+conserva il token ricevuto e al giro successivo chiede solo ciò che è
+cambiato dopo quel seq: record inseriti o modificati (con i dati correnti) e
+id dei record eliminati.
+
+Il token è "identità:seq", dove l'identità è quella casuale del database
+(migration 016): se il database è stato ricreato, o il token non è più
+valido, la risposta ha reset = True e contiene tutti i record, e il client
+deve sostituire i propri dati invece di applicare le differenze.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+TABELLE_SINCRONIZZATE = (
+    'movimenti', 'conti', 'categorie', 'budget',
+    'obiettivi_risparmio', 'beni', 'movimenti_ricorrenti'
+)
+
+# Modifiche restituite al massimo per richiesta
+LIMITE_PREDEFINITO = 1000
+LIMITE_MASSIMO = 10000
+
+# Id per singola SELECT ... IN (...) (limite dei parametri di SQLite)
+_BLOCCO_ID = 500
+
+
+def _identita(conn) -> int:
+    row = conn.execute(
+        "SELECT versione FROM versioni_tabelle WHERE tabella = '_database'"
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def codifica_token(identita: int, seq: int) -> str:
+    return f"{identita}:{seq}"
+
+
+def decodifica_token(token: Optional[str]) -> Tuple[Optional[int], int]:
+    """(identità, seq) dal token; (None, 0) senza token. ValueError se malformato"""
+    if not token:
+        return None, 0
+    try:
+        identita, seq = token.split(':')
+        return int(identita), int(seq)
+    except ValueError:
+        raise ValueError("Token di sincronizzazione non valido")
+
+
+def _righe(conn, tabella: str, ids: List[int]) -> List[dict]:
+    """Record correnti di una tabella per id, a blocchi"""
+    righe = []
+    for inizio in range(0, len(ids), _BLOCCO_ID):
+        blocco = ids[inizio:inizio + _BLOCCO_ID]
+        cursor = conn.execute(
+            f"SELECT * FROM {tabella} WHERE id IN ({', '.join('?' * len(blocco))}) ORDER BY id",
+            blocco
+        )
+        righe.extend(dict(row) for row in cursor.fetchall())
+    return righe
+
+
+def registra_movimenti(conn, id_da: int) -> None:
+    """Registra come inseriti i movimenti con id > id_da
+
+    Equivale al trigger di inserimento della migration 017 con un solo
+    INSERT ... SELECT: usato dalle importazioni massive.
+    """
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO registro_modifiche (tabella, riga_id, operazione)
+        SELECT 'movimenti', id, 'upsert' FROM movimenti WHERE id > ?
+        """,
+        (id_da,)
+    )
+
+
+def modifiche(conn, token: Optional[str] = None, limite: int = LIMITE_PREDEFINITO) -> Dict[str, object]:
+    """Modifiche successive al token, al massimo `limite` per chiamata
+
+    Restituisce token (da usare alla chiamata successiva), reset, altre
+    (True se ci sono altre modifiche da scaricare subito) e, per ogni tabella
+    con modifiche, {'aggiornati': [record], 'eliminati': [id]}. Tutto è letto
+    in una transazione, così record e token sono coerenti tra loro.
+    """
+    identita_client, seq = decodifica_token(token)
+
+    with conn:
+        conn.execute("BEGIN")
+        identita = _identita(conn)
+        ultimo_seq = conn.execute("SELECT IFNULL(MAX(seq), 0) FROM registro_modifiche").fetchone()[0]
+
+        reset = identita_client != identita or seq > ultimo_seq
+        if reset:
+            seq = 0
+
+        registro = conn.execute(
+            """
+            SELECT seq, tabella, riga_id, operazione
+            FROM registro_modifiche
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+            """,
+            (seq, limite + 1)
+        ).fetchall()
+
+        altre = len(registro) > limite
+        registro = registro[:limite]
+
+        aggiornati = {}
+        eliminati = {}
+        for _, tabella, riga_id, operazione in registro:
+            destinazione = aggiornati if operazione == 'upsert' else eliminati
+            destinazione.setdefault(tabella, []).append(riga_id)
+
+        tabelle = {}
+        for tabella in TABELLE_SINCRONIZZATE:
+            if tabella not in aggiornati and tabella not in eliminati:
+                continue
+            tabelle[tabella] = {
+                'aggiornati': _righe(conn, tabella, aggiornati.get(tabella, [])),
+                'eliminati': eliminati.get(tabella, []),
+            }
+
+    nuovo_seq = registro[-1][0] if registro else seq
+    return {
+        'token': codifica_token(identita, nuovo_seq),
+        'reset': reset and token is not None,
+        'altre': altre,
+        'tabelle': tabelle,
+    }
@@ -0,0 +1,162 @@
+"""Calcolo della spesa corrente dei budget
+
+La spesa di un budget nel suo periodo (settimanale, mensile, annuale) è la
+somma delle uscite con regola di priorità:
+1. movimenti con budget_id esplicito uguale al budget;
+2. movimenti della categoria del budget SENZA budget_id esplicito.
+
+Tutti i budget vengono calcolati con una sola query raggruppata: i periodi
+che iniziano il primo del mese leggono l'aggregato mensile, il periodo
+settimanale legge i movimenti tramite gli indici su data_giorno.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+
+
+def inizio_periodo(periodo: str, oggi: Optional[date] = None) -> date:
+    """Primo giorno del periodo corrente di un budget"""
+    oggi = oggi or date.today()
+
+    if periodo == 'settimanale':
+        return oggi - timedelta(days=7)
+    if periodo == 'annuale':
+        return oggi.replace(month=1, day=1)
+    return oggi.replace(day=1)
+
+
+_QUERY_SPESE = """
+    WITH b AS (
+        SELECT
+            id,
+            categoria_id,
+            CASE periodo
+                WHEN 'settimanale' THEN :settimanale
+                WHEN 'annuale' THEN :annuale
+                ELSE :mensile
+            END AS inizio
+        FROM budget
+        WHERE {filtro}
+    ),
+    b_mesi AS (
+        SELECT id, categoria_id, substr(inizio, 1, 7) AS mese_inizio
+        FROM b
+        WHERE substr(inizio, 9, 2) = '01'
+    ),
+    b_giorni AS (
+        SELECT id, categoria_id, inizio
+        FROM b
+        WHERE substr(inizio, 9, 2) <> '01'
+    ),
+    spese AS (
+        -- PRIORITÀ 1: budget_id esplicito
+        SELECT bm.id, a.totale_abs AS spesa
+        FROM b_mesi bm
+        JOIN movimenti_mensili a
+            ON a.budget_id = bm.id AND a.tipo = 'uscita' AND a.mese >= bm.mese_inizio
+        UNION ALL
+        SELECT bg.id, ABS(m.importo)
+        FROM b_giorni bg
+        JOIN movimenti m
+            ON m.budget_id = bg.id AND m.tipo = 'uscita' AND m.data_giorno >= bg.inizio
+
+        -- PRIORITÀ 2: categoria del budget senza budget_id esplicito
+        UNION ALL
+        SELECT bm.id, a.totale_abs
+        FROM b_mesi bm
+        JOIN movimenti_mensili a
+            ON a.categoria_id = bm.categoria_id AND a.budget_id = 0
+            AND a.tipo = 'uscita' AND a.mese >= bm.mese_inizio
+        UNION ALL
+        SELECT bg.id, ABS(m.importo)
+        FROM b_giorni bg
+        JOIN movimenti m
+            ON m.categoria_id = bg.categoria_id AND m.budget_id IS NULL
+            AND m.tipo = 'uscita' AND m.data_giorno >= bg.inizio
+    )
+    SELECT b.id, COALESCE(SUM(spese.spesa), 0) AS spesa
+    FROM b
+    LEFT JOIN spese ON spese.id = b.id
+    GROUP BY b.id
+"""
+
+
+def calcola_spese(
+    conn,
+    attivi_solo: bool = True,
+    budget_ids: Optional[Iterable[int]] = None,
+    oggi: Optional[date] = None
+) -> Dict[int, float]:
+    """Spesa corrente per budget (id -> importo) con una sola query"""
+    filtri = []
+    params = {
+        'settimanale': inizio_periodo('settimanale', oggi).isoformat(),
+        'mensile': inizio_periodo('mensile', oggi).isoformat(),
+        'annuale': inizio_periodo('annuale', oggi).isoformat(),
+    }
+
+    if attivi_solo:
+        filtri.append("attivo = 1")
+    if budget_ids is not None:
+        ids = [int(budget_id) for budget_id in budget_ids]
+        if not ids:
+            return {}
+        segnaposti = []
+        for i, budget_id in enumerate(ids):
+            params[f"id{i}"] = budget_id
+            segnaposti.append(f":id{i}")
+        filtri.append(f"id IN ({', '.join(segnaposti)})")
+
+    query = _QUERY_SPESE.format(filtro=" AND ".join(filtri) or "1 = 1")
+    cursor = conn.execute(query, params)
+
+    return {row[0]: round(row[1], 2) for row in cursor.fetchall()}
+
+
+def stato_budget(percentuale_utilizzo: float, soglia: Optional[int]) -> str:
+    """Stato di un budget: 'superato', 'attenzione' oppure 'ok'"""
+    if percentuale_utilizzo >= 100:
+        return 'superato'
+    if percentuale_utilizzo >= (soglia if soglia is not None else 80):
+        return 'attenzione'
+    return 'ok'
+
+
+def spese_mensili(
+    conn,
+    budget_ids: Iterable[int],
+    mese_da: str,
+    mese_a: str
+) -> Dict[int, Dict[str, float]]:
+    """Spesa per budget e mese ('YYYY-MM') in un solo passaggio raggruppato
+
+    Stessa regola di priorità di calcola_spese, letta dall'aggregato
+    mensile. I mesi senza spesa non compaiono: il riempimento dei buchi è
+    compito del chiamante.
+    """
+    ids = [int(budget_id) for budget_id in budget_ids]
+    if not ids:
+        return {}
+
+    cursor = conn.execute(
+        f"""
+        WITH b AS (
+            SELECT id, categoria_id
+            FROM budget
+            WHERE id IN ({', '.join('?' * len(ids))})
+        )
+        SELECT b.id, a.mese, SUM(a.totale_abs)
+        FROM b
+        JOIN movimenti_mensili a
+            ON a.tipo = 'uscita'
+            AND a.mese >= ? AND a.mese <= ?
+            AND (a.budget_id = b.id OR (a.budget_id = 0 AND a.categoria_id = b.categoria_id))
+        GROUP BY b.id, a.mese
+        """,
+        (*ids, mese_da, mese_a)
+    )
+
+    spese = {budget_id: {} for budget_id in ids}
+    for budget_id, mese, spesa in cursor.fetchall():
+        spese[budget_id][mese] = round(spesa, 2)
+    return spese
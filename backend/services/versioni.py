@@ -0,0 +1,31 @@
+"""Lettura dei contatori di versione delle tabelle (migration 015)
+
+I contatori sono incrementati dai trigger a ogni scrittura: confrontare le
+versioni lette in due momenti dice se i dati di quelle tabelle sono cambiati.
+"""
+
+from typing import Iterable, Tuple
+
+# Tabelle con contatore di versione
+TABELLE_VERSIONATE = (
+    'movimenti', 'conti', 'categorie', 'budget',
+    'obiettivi_risparmio', 'beni', 'movimenti_ricorrenti'
+)
+
+
+def leggi_versioni(conn, tabelle: Iterable[str] = TABELLE_VERSIONATE) -> Tuple[int, ...]:
+    """Versioni correnti delle tabelle richieste, nello stesso ordine"""
+    tabelle = tuple(tabelle)
+    righe = dict(conn.execute(
+        f"SELECT tabella, versione FROM versioni_tabelle WHERE tabella IN ({', '.join('?' * len(tabelle))})",
+        tabelle
+    ).fetchall())
+    return tuple(righe.get(tabella, 0) for tabella in tabelle)
+
+
+def incrementa_versione(conn, tabella: str) -> None:
+    """Incrementa a mano una versione (scritture con i trigger sospesi)"""
+    conn.execute(
+        "UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = ?",
+        (tabella,)
+    )
@@ -0,0 +1,52 @@
+"""Fixture condivise per i test del backend"""
+
+from pathlib import Path
+
+import pytest
+
+from backend import database
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Database SQLite temporaneo con schema, migrations e seed applicati"""
+    monkeypatch.chdir(ROOT_DIR)
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "lume_test.db"))
+    database.close_pool()
+
+    database.init_db()
+
+    yield database.DB_PATH
+
+    database.close_pool()
+
+
+@pytest.fixture
+def client(db):
+    """TestClient sull'app completa (lifespan compreso), collegato al database temporaneo"""
+    from fastapi.testclient import TestClient
+
+    from backend.main import create_app
+
+    app = create_app()
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def query_tracciate(monkeypatch):
+    """Registra le query eseguite dalle connessioni del pool (create da qui in poi)"""
+    eseguite = []
+    connetti = database.ConnectionPool._connetti
+
+    def connetti_tracciata(self):
+        conn = connetti(self)
+        conn.set_trace_callback(eseguite.append)
+        return conn
+
+    monkeypatch.setattr(database.ConnectionPool, "_connetti", connetti_tracciata)
+    database.close_pool()
+    return eseguite
@@ -0,0 +1,126 @@
+"""Test per l'aggregato mensile dei movimenti"""
+
+from datetime import date
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.services.aggregati_mensili import dividi_periodo, ricostruisci, sorgente_mensile
+
+
+def _aggregato(conn):
+    return [
+        (r[0], r[1], r[2], r[3], r[4], r[5], r[6], round(r[7], 6), round(r[8], 6), r[9])
+        for r in conn.execute("SELECT * FROM movimenti_mensili ORDER BY 1, 2, 3, 4, 5, 6, 7")
+    ]
+
+
+def _inserisci(conn, data, importo, tipo, categoria_id=None, conto_id=None, bene_id=None):
+    cursor = conn.execute(
+        """
+        INSERT INTO movimenti (data, importo, tipo, categoria_id, conto_id, bene_id, descrizione)
+        VALUES (?, ?, ?, ?, ?, ?, 'test')
+        """,
+        (data, importo, tipo, categoria_id, conto_id, bene_id)
+    )
+    return cursor.lastrowid
+
+
+class TestDividiPeriodo:
+    """Test per la divisione in mesi interi e giorni ai bordi"""
+
+    def test_mesi_interi(self):
+        assert dividi_periodo(date(2026, 1, 1), date(2026, 3, 31)) == (("2026-01", "2026-03"), [])
+
+    def test_bordi_parziali(self):
+        mesi, giorni = dividi_periodo(date(2026, 1, 15), date(2026, 4, 10))
+
+        assert mesi == ("2026-02", "2026-03")
+        assert giorni == [("2026-01-15", "2026-01-31"), ("2026-04-01", "2026-04-10")]
+
+    def test_stesso_mese_parziale(self):
+        assert dividi_periodo(date(2026, 2, 3), date(2026, 2, 20)) == (None, [("2026-02-03", "2026-02-20")])
+
+    def test_periodo_aperto(self):
+        assert dividi_periodo(date(2025, 12, 17), None) == (("2026-01", None), [("2025-12-17", "2025-12-31")])
+        assert dividi_periodo(None, None) == ((None, None), [])
+
+
+class TestTrigger:
+    """L'aggregato resta identico a una ricostruzione completa"""
+
+    def test_insert_update_delete(self, db):
+        with get_db_connection() as conn:
+            conti = [r[0] for r in conn.execute("SELECT id FROM conti")]
+            categorie = [r[0] for r in conn.execute("SELECT id FROM categorie")]
+
+            ids = [
+                _inserisci(conn, "2026-01-05", 100.0, "uscita", categorie[0], conti[0]),
+                _inserisci(conn, "2026-01-20 10:30:00", 40.5, "uscita", categorie[0], conti[0]),
+                _inserisci(conn, "2026-02-01", 2500.0, "entrata", None, conti[1]),
+                _inserisci(conn, "2026-02-14", -30.0, "uscita", categorie[1], None),
+            ]
+            conn.execute("UPDATE movimenti SET importo = 55.25, data = '2026-03-02' WHERE id = ?", (ids[0],))
+            conn.execute("UPDATE movimenti SET categoria_id = ? WHERE id = ?", (categorie[2], ids[1]))
+            conn.execute("UPDATE movimenti SET descrizione = 'solo testo' WHERE id = ?", (ids[2],))
+            conn.execute("DELETE FROM movimenti WHERE id = ?", (ids[3],))
+            conn.commit()
+
+            incrementale = _aggregato(conn)
+            ricostruisci(conn)
+
+            assert incrementale == _aggregato(conn)
+            assert conn.execute(
+                "SELECT COUNT(*) FROM movimenti_mensili WHERE conteggio <= 0"
+            ).fetchone()[0] == 0
+
+    def test_foreign_key_set_null(self, db):
+        """ON DELETE SET NULL sul conto sposta il movimento nel gruppo senza conto"""
+        with get_db_connection() as conn:
+            conto_id = conn.execute(
+                "INSERT INTO conti (nome, tipo, saldo) VALUES ('Temporaneo', 'corrente', 0)"
+            ).lastrowid
+            _inserisci(conn, "2026-05-10", 12.0, "uscita", conto_id=conto_id)
+            conn.execute("DELETE FROM conti WHERE id = ?", (conto_id,))
+            conn.commit()
+
+            incrementale = _aggregato(conn)
+            ricostruisci(conn)
+            assert incrementale == _aggregato(conn)
+
+
+class TestSorgenteMensile:
+    """La lettura ibrida coincide con l'aggregazione sui movimenti grezzi"""
+
+    @pytest.mark.parametrize("data_da, data_a", [
+        (date(2026, 1, 1), date(2026, 2, 28)),
+        (date(2026, 1, 10), date(2026, 3, 15)),
+        (date(2026, 2, 10), date(2026, 2, 20)),
+    ])
+    def test_totali_come_movimenti(self, db, data_da, data_a):
+        with get_db_connection() as conn:
+            for giorno in range(1, 29):
+                _inserisci(conn, f"2026-01-{giorno:02d}", giorno * 1.5, "uscita")
+                _inserisci(conn, f"2026-02-{giorno:02d}", giorno * 2.0, "uscita")
+                _inserisci(conn, f"2026-03-{giorno:02d}", giorno * 0.5, "entrata")
+            conn.commit()
+
+            sorgente, params = sorgente_mensile(data_da, data_a)
+            ibrido = conn.execute(
+                f"SELECT tipo, SUM(totale), SUM(conteggio) FROM {sorgente} GROUP BY tipo ORDER BY tipo",
+                params
+            ).fetchall()
+            grezzo = conn.execute(
+                """
+                SELECT tipo, SUM(importo), COUNT(*) FROM movimenti
+                WHERE data_giorno >= ? AND data_giorno <= ?
+                GROUP BY tipo ORDER BY tipo
+                """,
+                (data_da.isoformat(), data_a.isoformat())
+            ).fetchall()
+
+            assert [(t, round(s, 6), c) for t, s, c in ibrido] == [(t, round(s, 6), c) for t, s, c in grezzo]
+
+    def test_filtro_non_supportato(self):
+        with pytest.raises(ValueError):
+            sorgente_mensile(filtri={'descrizione': 'x'})
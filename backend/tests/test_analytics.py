@@ -0,0 +1,46 @@
+"""Test per gli endpoint analytics"""
+
+from datetime import date
+
+from backend.database import get_db_connection
+from backend.benchmarks.dashboard_benchmark import dashboard_legacy, popola
+from backend.routes.analytics import dashboard_summary
+
+
+class TestDashboard:
+    """Test per /analytics/dashboard calcolata con una sola query"""
+
+    def test_risposta_uguale_alle_query_separate(self, db):
+        popola(2000, anni=1)
+        da, a = date.today().replace(day=1), date.today()
+
+        # Handler originale, sotto db_endpoint e cache
+        risposta = dashboard_summary.__wrapped__.__wrapped__(data_da=da.isoformat(), data_a=a.isoformat())
+        with get_db_connection() as conn:
+            atteso = dashboard_legacy(conn, da, a)
+
+        assert risposta["kpi"] == atteso["kpi"]
+        assert risposta["ultimi_movimenti"] == atteso["ultimi_movimenti"]
+        assert risposta["obiettivi_risparmio"] == atteso["obiettivi_risparmio"]
+        assert risposta["conti_attivi"] == atteso["conti_attivi"]
+        assert [c["nome"] for c in risposta["spese_per_categoria"]] == \
+            [c["nome"] for c in atteso["spese_per_categoria"]]
+        assert [round(c["totale"], 2) for c in risposta["spese_per_categoria"]] == \
+            [round(c["totale"], 2) for c in atteso["spese_per_categoria"]]
+
+    def test_un_solo_statement(self, client, query_tracciate):
+        client.get("/api/analytics/dashboard")  # colonne di movimenti già lette
+        query_tracciate.clear()
+
+        risposta = client.get("/api/analytics/dashboard?data_da=2026-01-10&data_a=2026-03-20")
+
+        assert risposta.status_code == 200
+        assert set(risposta.json()) == {
+            "kpi", "spese_per_categoria", "ultimi_movimenti", "obiettivi_risparmio", "conti_attivi", "periodo"
+        }
+        # Escluse le letture delle versioni fatte da ETag e cache
+        query = [
+            sql for sql in query_tracciate
+            if not sql.startswith("PRAGMA") and sql != "SELECT 1" and "versioni_tabelle" not in sql
+        ]
+        assert len(query) == 1
@@ -0,0 +1,88 @@
+"""Test per l'esecuzione del lavoro SQLite fuori dall'event loop"""
+
+import asyncio
+import threading
+
+from backend import database
+from backend.database import db_endpoint, fetch_all, fetch_one, execute
+
+
+class TestDbEndpoint:
+    """Test per il decoratore db_endpoint"""
+
+    def test_handler_su_thread_pool(self, db):
+        """L'handler gira su un thread del pool database, non sull'event loop"""
+        @db_endpoint
+        def handler(valore: int):
+            return valore, threading.current_thread().name
+
+        valore, thread = asyncio.run(handler(3))
+
+        assert valore == 3
+        assert thread.startswith("lume-db")
+
+    def test_richieste_concorrenti(self, db):
+        """Più richieste concorrenti non bloccano il loop e non esauriscono il pool"""
+        @db_endpoint
+        def handler():
+            with database.get_db_connection() as conn:
+                return conn.execute("SELECT COUNT(*) FROM conti").fetchone()[0]
+
+        async def main():
+            return await asyncio.gather(*(handler() for _ in range(50)))
+
+        risultati = asyncio.run(main())
+
+        assert len(set(risultati)) == 1
+        assert database.get_pool().stats()["aperte"] <= database.DB_POOL_SIZE
+
+
+class TestHelperAsync:
+    """Test per fetch_one, fetch_all ed execute"""
+
+    def test_lettura_e_scrittura(self, db):
+        async def main():
+            risultato = await execute(
+                "INSERT INTO conti (nome, tipo, saldo) VALUES (?, ?, ?)",
+                ("Conto test", "corrente", 10.0)
+            )
+            conto = await fetch_one("SELECT * FROM conti WHERE id = ?", (risultato["lastrowid"],))
+            conti = await fetch_all("SELECT id FROM conti")
+            return conto, conti
+
+        conto, conti = asyncio.run(main())
+
+        assert conto["nome"] == "Conto test"
+        assert any(c["id"] == conto["id"] for c in conti)
+
+    def test_riga_assente(self, db):
+        assert asyncio.run(fetch_one("SELECT * FROM conti WHERE id = ?", (999999,))) is None
+
+
+class TestRoutes:
+    """Le routes convertite rispondono correttamente"""
+
+    def test_crea_e_legge_conto(self, client):
+        risposta = client.post("/api/conti", json={"nome": "Conto test", "tipo": "corrente", "saldo": 100})
+
+        assert risposta.status_code in (200, 201)
+        conto = risposta.json()
+        assert client.get(f"/api/conti/{conto['id']}").json()["nome"] == "Conto test"
+
+    def test_budget_warnings_su_handler_decorato(self, client):
+        """Gli handler async che riusano handler decorati continuano a funzionare"""
+        assert client.get("/api/budget/warnings").status_code == 200
+
+    def test_crea_e_legge_movimento(self, client):
+        conto_id = client.get("/api/conti").json()[0]["id"]
+        risposta = client.post("/api/movimenti", json={
+            "data": "2026-10-01",
+            "descrizione": "Spesa test",
+            "importo": 12.5,
+            "tipo": "uscita",
+            "conto_id": conto_id
+        })
+
+        assert risposta.status_code == 201
+        movimento = risposta.json()
+        assert client.get(f"/api/movimenti/{movimento['id']}").json()["data_giorno"] == "2026-10-01"
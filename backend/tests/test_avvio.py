@@ -0,0 +1,39 @@
+"""Test per la costruzione dell'app e l'avvio"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from backend import database
+from backend.main import create_app
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+
+class TestAvvio:
+
+    def test_import_senza_effetti(self, tmp_path):
+        """Importare l'app non tocca il database e non carica numpy"""
+        percorso = tmp_path / "non_creato.db"
+        risultato = subprocess.run(
+            [sys.executable, "-c", "import sys, backend.main; print('numpy' in sys.modules)"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+            env={"DB_PATH": str(percorso), "PATH": ""}
+        )
+
+        assert risultato.stdout.strip() == "False"
+        assert not percorso.exists()
+
+    def test_lifespan_inizializza_database(self, tmp_path, monkeypatch):
+        from fastapi.testclient import TestClient
+
+        monkeypatch.chdir(ROOT_DIR)
+        monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "lume_test.db"))
+        database.close_pool()
+
+        with TestClient(create_app()) as client:
+            assert client.get("/api/conti").status_code == 200
+            assert database._pool is not None
+
+        # Shutdown: pool chiuso
+        assert database._pool is None
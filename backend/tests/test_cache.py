@@ -0,0 +1,81 @@
+"""Test per la cache delle risposte analytics"""
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.routes.analytics import cache_analytics
+from backend.services.cache import CacheRisposte
+from backend.services.versioni import leggi_versioni
+
+
+class TestCacheRisposte:
+
+    def test_versione_diversa_invalida(self):
+        cache = CacheRisposte()
+        cache.scrivi("k", (1, 2), b"{}")
+
+        assert cache.leggi("k", (1, 2)) == b"{}"
+        assert cache.leggi("k", (1, 3)) is None
+        assert cache.stats()["invalidate"] == 1
+
+    def test_espulsione_lru(self):
+        cache = CacheRisposte(max_elementi=2)
+        cache.scrivi("a", (0,), b"a")
+        cache.scrivi("b", (0,), b"b")
+        cache.leggi("a", (0,))
+        cache.scrivi("c", (0,), b"c")
+
+        assert cache.leggi("b", (0,)) is None
+        assert cache.leggi("a", (0,)) == b"a"
+        assert cache.stats()["espulse"] == 1
+
+    def test_ttl(self):
+        cache = CacheRisposte(ttl=-1)
+        cache.scrivi("k", (0,), b"{}")
+
+        assert cache.leggi("k", (0,)) is None
+        assert cache.stats()["scadute"] == 1
+
+
+class TestVersioni:
+
+    def test_scritture_incrementano_la_versione(self, db):
+        with get_db_connection() as conn:
+            prima = leggi_versioni(conn, ("movimenti", "conti"))
+            conn.execute(
+                "INSERT INTO movimenti (data, importo, tipo, descrizione) VALUES ('2026-03-01', 5, 'uscita', 'x')"
+            )
+            conn.commit()
+            dopo = leggi_versioni(conn, ("movimenti", "conti"))
+
+        assert dopo[0] == prima[0] + 1
+        assert dopo[1] == prima[1]
+
+
+class TestEndpointAnalytics:
+
+    @pytest.fixture(autouse=True)
+    def cache_vuota(self):
+        cache_analytics.svuota()
+
+    def test_hit_e_invalidazione_su_scrittura(self, client):
+        url = "/api/analytics/dashboard?data_da=2026-03-01&data_a=2026-03-31"
+
+        prima = client.get(url)
+        seconda = client.get(url)
+        assert (prima.headers["X-Cache"], seconda.headers["X-Cache"]) == ("MISS", "HIT")
+        assert seconda.json() == prima.json()
+
+        client.post("/api/movimenti", json={
+            "data": "2026-03-05", "importo": 40, "tipo": "uscita", "descrizione": "Spesa"
+        })
+        terza = client.get(url)
+
+        assert terza.headers["X-Cache"] == "MISS"
+        assert terza.json()["kpi"]["uscite_mese"] == prima.json()["kpi"]["uscite_mese"] + 40
+
+    def test_chiave_per_parametri(self, client):
+        client.get("/api/analytics/trend?period=1m")
+        risposta = client.get("/api/analytics/trend?period=3m")
+
+        assert risposta.headers["X-Cache"] == "MISS"
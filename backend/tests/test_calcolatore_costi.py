@@ -1,7 +1,10 @@
 """Test per il Calcolatore Costi"""
 
+import math
+import random
+
 import pytest
-from datetime import date
+from datetime import date, timedelta
 from backend.services.calcolatore_costi import (
     CalcolatoreVeicolo,
     CalcolatoreElettrodomestico,
@@ -131,6 +134,74 @@ class TestCalcolatoreElettrodomestico:
         assert comp_elettrico.valore == 5.0
 
 
+def _confronta(batch, risultati):
+    """Verifica che il risultato batch coincida esattamente con i calcoli singoli"""
+    assert len(batch) == len(risultati)
+    for i, risultato in enumerate(risultati):
+        assert batch.importo_totale[i] == risultato.importo_totale
+        for componente in risultato.componenti:
+            assert batch.componenti[componente.nome][i] == componente.valore
+            assert batch.percentuali[componente.nome][i] == componente.percentuale
+            for nome, valore in componente.parametri.items():
+                if nome in batch.parametri:
+                    assert batch.parametri[nome][i] == valore, (nome, i)
+
+
+class TestCalcoloBatch:
+    """Le varianti batch danno gli stessi valori del calcolo singolo"""
+
+    def setup_method(self):
+        self.casuale = random.Random(42)
+        self.auto = CalcolatoreVeicolo("Auto", "diesel", 4.8, 0.07, 21500.0, date(2019, 5, 20))
+        self.lavatrice = CalcolatoreElettrodomestico("Lavatrice", 2000, 1.5, 500.0, date(2023, 1, 1))
+
+    def test_viaggi_come_calcolo_singolo(self):
+        km = [round(self.casuale.uniform(1, 900), 1) for _ in range(2000)]
+        prezzi = [round(self.casuale.uniform(1.4, 2.3), 3) for _ in range(2000)]
+        giorni = [date(2019, 5, 20) + timedelta(days=self.casuale.randint(0, 2600)) for _ in range(2000)]
+
+        batch = self.auto.calcola_costi_viaggi(km, prezzi, giorni)
+
+        _confronta(batch, [
+            self.auto.calcola_costo_viaggio(k, p, g) for k, p, g in zip(km, prezzi, giorni)
+        ])
+
+    def test_prezzo_unico(self):
+        batch = self.auto.calcola_costi_viaggi([100, 250], 1.85, [date(2024, 3, 1), date(2025, 3, 1)])
+
+        _confronta(batch, [
+            self.auto.calcola_costo_viaggio(100, 1.85, date(2024, 3, 1)),
+            self.auto.calcola_costo_viaggio(250, 1.85, date(2025, 3, 1)),
+        ])
+
+    def test_periodi_come_calcolo_singolo(self):
+        giorni = [self.casuale.randint(1, 400) for _ in range(2000)]
+        prezzi = [round(self.casuale.uniform(0.08, 0.45), 4) for _ in range(2000)]
+        ore = [self.casuale.choice([None, round(self.casuale.uniform(0, 300), 1)]) for _ in range(2000)]
+
+        batch = self.lavatrice.calcola_costi_periodi(
+            giorni, prezzi, [math.nan if o is None else o for o in ore]
+        )
+
+        _confronta(batch, [
+            self.lavatrice.calcola_costo_periodo(g, p, o) for g, p, o in zip(giorni, prezzi, ore)
+        ])
+
+    def test_solo_scalari(self):
+        viaggio = self.auto.calcola_costi_viaggi(120, 1.85, date(2024, 3, 1))
+        periodo = self.lavatrice.calcola_costi_periodi(30, 0.25)
+
+        assert len(viaggio) == 1 and len(periodo) == 1
+        _confronta(viaggio, [self.auto.calcola_costo_viaggio(120, 1.85, date(2024, 3, 1))])
+        _confronta(periodo, [self.lavatrice.calcola_costo_periodo(30, 0.25)])
+
+    def test_totale_zero(self):
+        batch = self.lavatrice.calcola_costi_periodi([0], 0.25)
+
+        assert batch.importo_totale[0] == 0
+        assert math.isnan(batch.percentuali["Ammortamento"][0])
+
+
 class TestRipartitoreUtenze:
     """Test per RipartitoreUtenze"""
     
@@ -0,0 +1,139 @@
+"""Test per le scritture atomiche di movimenti e saldi"""
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.services import contabilita
+
+
+@pytest.fixture
+def conti(client):
+    return [
+        client.post("/api/conti", json={"nome": nome, "tipo": "corrente", "saldo": 1000}).json()["id"]
+        for nome in ("Principale", "Secondario")
+    ]
+
+
+def _saldi(conti):
+    with get_db_connection() as conn:
+        return [
+            conn.execute("SELECT saldo FROM conti WHERE id = ?", (conto_id,)).fetchone()[0]
+            for conto_id in conti
+        ]
+
+
+def _commit(query):
+    return sum(1 for q in query if q.strip().upper() == "COMMIT")
+
+
+class TestScritture:
+
+    def test_ciclo_di_vita_del_movimento(self, client, conti):
+        movimento = client.post("/api/movimenti", json={
+            "data": "2026-03-05", "importo": 40, "tipo": "uscita", "descrizione": "Spesa", "conto_id": conti[0]
+        }).json()
+        assert _saldi(conti) == [960, 1000]
+
+        client.put(f"/api/movimenti/{movimento['id']}", json={"importo": 50})
+        assert _saldi(conti) == [950, 1000]
+
+        client.put(f"/api/movimenti/{movimento['id']}", json={"conto_id": conti[1]})
+        assert _saldi(conti) == [1000, 950]
+
+        client.put(f"/api/movimenti/{movimento['id']}", json={"tipo": "entrata"})
+        assert _saldi(conti) == [1000, 1050]
+
+        client.delete(f"/api/movimenti/{movimento['id']}")
+        assert _saldi(conti) == [1000, 1000]
+
+    def test_un_solo_commit_per_scrittura(self, client, conti, query_tracciate):
+        movimento = client.post("/api/movimenti", json={
+            "data": "2026-03-05", "importo": 40, "tipo": "uscita", "descrizione": "Spesa", "conto_id": conti[0]
+        }).json()
+        assert _commit(query_tracciate) == 1
+
+        query_tracciate.clear()
+        client.put(f"/api/movimenti/{movimento['id']}", json={"importo": 45})
+        assert _commit(query_tracciate) == 1
+
+        query_tracciate.clear()
+        client.delete(f"/api/movimenti/{movimento['id']}")
+        assert _commit(query_tracciate) == 1
+
+    def test_errore_annulla_tutto(self, client, conti, monkeypatch):
+        def fallisce(*args):
+            raise RuntimeError("disco pieno")
+
+        monkeypatch.setattr(contabilita, "_sposta_saldo", fallisce)
+        with get_db_connection() as conn:
+            with pytest.raises(RuntimeError):
+                with contabilita.transazione(conn):
+                    contabilita.inserisci_movimento(conn, {
+                        "data": "2026-03-05", "importo": 40, "tipo": "uscita",
+                        "descrizione": "Spesa", "conto_id": conti[0]
+                    })
+
+            assert conn.execute("SELECT COUNT(*) FROM movimenti WHERE descrizione = 'Spesa'").fetchone()[0] == 0
+        assert _saldi(conti) == [1000, 1000]
+
+    def test_verifiche_dentro_la_transazione(self, client, conti, query_tracciate):
+        risposta = client.post("/api/movimenti", json={
+            "data": "2026-03-05", "importo": 40, "tipo": "uscita", "descrizione": "Spesa",
+            "conto_id": conti[0], "budget_id": 999999
+        })
+
+        assert risposta.status_code == 404
+        query = [q.strip() for q in query_tracciate]
+        verifica = next(i for i, q in enumerate(query) if "FROM budget" in q)
+        assert "BEGIN IMMEDIATE" in query[:verifica]
+        assert _commit(query_tracciate) == 0
+
+    def test_movimento_inesistente(self, client):
+        assert client.put("/api/movimenti/999999", json={"importo": 1}).status_code == 404
+        assert client.delete("/api/movimenti/999999").status_code == 404
+
+
+class TestEsecuzioneManuale:
+
+    def _ricorrenza(self, conto_id):
+        with get_db_connection() as conn:
+            ricorrenza_id = conn.execute(
+                """
+                INSERT INTO movimenti_ricorrenti (
+                    descrizione, importo, tipo, frequenza, giorno_mese, prossima_data, conto_id
+                )
+                VALUES ('Affitto', 700, 'uscita', 'mensile', 1, '2026-03-01', ?)
+                """,
+                (conto_id,)
+            ).lastrowid
+            conn.commit()
+        return ricorrenza_id
+
+    def test_movimento_e_saldo_in_un_commit(self, client, conti, query_tracciate):
+        ricorrenza_id = self._ricorrenza(conti[0])
+        query_tracciate.clear()
+
+        risposta = client.post(f"/api/ricorrenze/{ricorrenza_id}/esegui")
+
+        assert risposta.status_code == 200
+        assert _saldi(conti) == [300, 1000]
+        assert _commit(query_tracciate) == 1
+
+    def test_errore_annulla_tutto(self, client, conti, monkeypatch):
+        ricorrenza_id = self._ricorrenza(conti[0])
+
+        def fallisce(*args):
+            raise RuntimeError("disco pieno")
+
+        monkeypatch.setattr(contabilita, "_sposta_saldo", fallisce)
+        with pytest.raises(RuntimeError):
+            client.post(f"/api/ricorrenze/{ricorrenza_id}/esegui")
+
+        with get_db_connection() as conn:
+            assert conn.execute(
+                "SELECT COUNT(*) FROM movimenti WHERE descrizione = '[AUTO] Affitto'"
+            ).fetchone()[0] == 0
+            assert conn.execute(
+                "SELECT prossima_data FROM movimenti_ricorrenti WHERE id = ?", (ricorrenza_id,)
+            ).fetchone()[0] == '2026-03-01'
+        assert _saldi(conti) == [1000, 1000]
@@ -0,0 +1,88 @@
+"""Test per la cache dei parametri dei beni nella scomposizione costi"""
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.services.cost_calculator import CostCalculator, cache_beni
+
+
+@pytest.fixture
+def veicolo(client):
+    cache_beni.svuota()
+    return client.post("/api/beni", json={
+        "nome": "Panda", "tipo": "veicolo", "data_acquisto": "2022-01-01", "prezzo_acquisto": 12000,
+        "veicolo_tipo_carburante": "benzina", "veicolo_consumo_medio": 5.5,
+        "veicolo_costo_manutenzione_per_km": 0.08, "tasso_ammortamento": 15
+    }).json()['id']
+
+
+def _rifornimento(client, veicolo, km=300):
+    return client.post("/api/movimenti", json={
+        "data": "2026-03-05", "importo": 40, "tipo": "uscita", "descrizione": "Rifornimento",
+        "bene_id": veicolo, "km_percorsi": km
+    })
+
+
+def _letture_beni(query):
+    return sum(1 for q in query if "FROM beni" in q)
+
+
+class TestCacheBeni:
+
+    def test_beni_letti_una_volta(self, client, veicolo, query_tracciate):
+        _rifornimento(client, veicolo)
+        assert _letture_beni(query_tracciate) == 1
+
+        query_tracciate.clear()
+        risposta = _rifornimento(client, veicolo)
+
+        assert risposta.status_code == 201
+        assert risposta.json()['scomposizione']['bene_nome'] == "Panda"
+        assert _letture_beni(query_tracciate) == 0
+
+    def test_modifica_invalida(self, client, veicolo):
+        prima = _rifornimento(client, veicolo).json()['scomposizione']
+
+        client.put(f"/api/beni/{veicolo}", json={"veicolo_costo_manutenzione_per_km": 0.2})
+        dopo = _rifornimento(client, veicolo).json()['scomposizione']
+
+        assert prima['scomposizione'][1]['importo'] == 24.0
+        assert dopo['scomposizione'][1]['importo'] == 60.0
+
+    def test_eliminazione_invalida(self, client, veicolo):
+        _rifornimento(client, veicolo)
+
+        client.delete(f"/api/beni/{veicolo}")
+
+        assert _rifornimento(client, veicolo).status_code == 404
+
+
+class TestCalcolaScomposizioni:
+
+    def test_come_calcolo_singolo(self, client, veicolo):
+        movimenti = [
+            {"importo": 40, "km_percorsi": 300, "prezzo_carburante_al_litro": 1.9},
+            {"importo": 25, "km_percorsi": None},
+            {"importo": 55, "km_percorsi": 480},
+        ]
+        with get_db_connection() as conn:
+            calculator = CostCalculator(conn)
+            risultati = calculator.calcola_scomposizioni(veicolo, movimenti)
+
+            assert risultati[1] is None
+            assert risultati[0] == calculator.calcola_costo_veicolo(veicolo, 300, 40, 1.9)
+            assert risultati[2] == calculator.calcola_costo_veicolo(veicolo, 480, 55)
+
+    def test_importazione_massiva(self, client, veicolo):
+        risposta = client.post("/api/movimenti/bulk", json={"movimenti": [
+            {"data": "2026-03-0%d" % giorno, "importo": 40, "tipo": "uscita", "descrizione": "Rifornimento",
+             "bene_id": veicolo, "km_percorsi": 300}
+            for giorno in range(1, 6)
+        ]})
+        assert risposta.status_code == 201
+
+        movimenti = client.get(f"/api/beni/{veicolo}/movimenti").json()
+        assert len(movimenti) == 5
+        for movimento in movimenti:
+            scomposizione = client.get(f"/api/movimenti/{movimento['id']}/scomposizione").json()
+            assert scomposizione['costo_diretto'] == 40
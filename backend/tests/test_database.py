@@ -0,0 +1,133 @@
+"""Test per il pool di connessioni SQLite"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from backend import database
+from backend.database import ConnectionPool, get_db_connection
+
+
+class TestConnectionPool:
+    """Test per ConnectionPool"""
+
+    def test_pragma_applicati(self, tmp_path):
+        """Ogni connessione nasce con i PRAGMA configurati"""
+        pool = ConnectionPool(str(tmp_path / "pragma.db"), size=1)
+
+        with pool.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+            assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+        pool.close()
+
+    def test_riutilizzo_connessione(self, tmp_path):
+        """La stessa connessione viene riutilizzata tra richieste successive"""
+        pool = ConnectionPool(str(tmp_path / "reuse.db"), size=2)
+
+        with pool.connection() as conn1:
+            pass
+        with pool.connection() as conn2:
+            pass
+
+        assert conn1 is conn2
+        stats = pool.stats()
+        assert stats["create"] == 1
+        assert stats["riutilizzi"] == 1
+        assert stats["in_uso"] == 0
+
+        pool.close()
+
+    def test_rollback_al_rilascio(self, tmp_path):
+        """Le modifiche non committate non sopravvivono al rilascio"""
+        pool = ConnectionPool(str(tmp_path / "rollback.db"), size=1)
+
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.commit()
+            conn.execute("INSERT INTO t VALUES (1)")
+
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+        pool.close()
+
+    def test_connessione_non_sana_scartata(self, tmp_path):
+        """Una connessione chiusa viene sostituita al checkout"""
+        pool = ConnectionPool(str(tmp_path / "health.db"), size=1)
+
+        with pool.connection() as conn:
+            pass
+        conn.close()
+
+        with pool.connection() as nuova:
+            assert nuova is not conn
+            assert nuova.execute("SELECT 1").fetchone()[0] == 1
+
+        assert pool.stats()["scartate"] == 1
+        pool.close()
+
+    def test_timeout_pool_esaurito(self, tmp_path):
+        """Con il pool pieno l'acquisizione fallisce dopo il timeout"""
+        pool = ConnectionPool(str(tmp_path / "timeout.db"), size=1, timeout=0.05)
+
+        conn = pool.acquire()
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire()
+        pool.release(conn)
+
+        assert pool.stats()["timeout"] == 1
+        pool.close()
+
+    def test_dimensione_massima_rispettata(self, tmp_path):
+        """Sotto carico concorrente non si superano `size` connessioni"""
+        pool = ConnectionPool(str(tmp_path / "concurrency.db"), size=3)
+        barriera = threading.Barrier(8)
+
+        def lavoro():
+            barriera.wait()
+            for _ in range(20):
+                with pool.connection() as conn:
+                    conn.execute("SELECT 1").fetchone()
+
+        threads = [threading.Thread(target=lavoro) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = pool.stats()
+        assert stats["create"] <= 3
+        assert stats["picco_in_uso"] <= 3
+        assert stats["richieste"] == 160
+        pool.close()
+
+
+class TestPoolGlobale:
+    """Test per il pool usato dalle routes"""
+
+    def test_get_db_connection_usa_pool(self, db):
+        """get_db_connection presta connessioni del pool globale"""
+        with get_db_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM conti").fetchone()[0] > 0
+
+        stats = database.pool_stats()
+        assert stats["db_path"] == db
+        assert stats["sano"] is True
+        assert stats["in_uso"] == 0
+
+    def test_ricorrenze_con_foreign_keys(self, db):
+        """Con foreign_keys=ON le ricorrenze restano inseribili"""
+        with get_db_connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO movimenti_ricorrenti (descrizione, importo, tipo, frequenza, giorno_mese, prossima_data)
+                VALUES ('Affitto', 750, 'uscita', 'mensile', 5, '2026-11-05')
+                """
+            )
+            conn.commit()
+
+            assert conn.execute("SELECT COUNT(*) FROM movimenti_ricorrenti").fetchone()[0] == 1
@@ -0,0 +1,107 @@
+"""Test per l'esecuzione in blocco delle ricorrenze"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.services.esecuzione_ricorrenze import esegui_ricorrenze, prossima_occorrenza
+
+OGGI = date(2026, 3, 20)
+
+
+@pytest.fixture
+def conto(db):
+    with get_db_connection() as conn:
+        conto_id = conn.execute(
+            "INSERT INTO conti (nome, tipo, saldo) VALUES ('Ricorrenze', 'corrente', 1000)"
+        ).lastrowid
+        conn.commit()
+    return conto_id
+
+
+def _ricorrenza(conto_id, frequenza, prossima_data, importo=10.0, tipo='uscita', **campi):
+    colonne = {
+        'descrizione': f"Ricorrenza {frequenza}", 'importo': importo, 'tipo': tipo,
+        'frequenza': frequenza, 'prossima_data': prossima_data, 'conto_id': conto_id, **campi
+    }
+    with get_db_connection() as conn:
+        ricorrenza_id = conn.execute(
+            f"INSERT INTO movimenti_ricorrenti ({', '.join(colonne)}) VALUES ({', '.join('?' * len(colonne))})",
+            list(colonne.values())
+        ).lastrowid
+        conn.commit()
+    return ricorrenza_id
+
+
+def _stato(conto_id, ricorrenza_id):
+    with get_db_connection() as conn:
+        date_movimenti = [r[0] for r in conn.execute(
+            "SELECT data FROM movimenti WHERE conto_id = ? AND ricorrente = 1 ORDER BY id", (conto_id,)
+        )]
+        saldo = conn.execute("SELECT saldo FROM conti WHERE id = ?", (conto_id,)).fetchone()[0]
+        prossima = conn.execute(
+            "SELECT prossima_data FROM movimenti_ricorrenti WHERE id = ?", (ricorrenza_id,)
+        ).fetchone()[0]
+    return date_movimenti, saldo, prossima
+
+
+class TestProssimaOccorrenza:
+
+    def test_fine_mese_limitata(self):
+        assert prossima_occorrenza('mensile', date(2026, 1, 31), giorno_mese=31) == date(2026, 2, 28)
+        assert prossima_occorrenza('mensile', date(2026, 2, 28), giorno_mese=31) == date(2026, 3, 31)
+
+    def test_settimanale(self):
+        assert prossima_occorrenza('settimanale', date(2026, 3, 16), giorno_settimana=0) == date(2026, 3, 23)
+
+
+class TestRecupero:
+
+    def test_occorrenze_perse(self, conto):
+        ricorrenza = _ricorrenza(conto, 'mensile', '2025-12-15', giorno_mese=15)
+
+        with get_db_connection() as conn:
+            esito = esegui_ricorrenze(conn, OGGI)
+
+        assert esito == {'ricorrenze': 1, 'movimenti': 4, 'errori': []}
+        assert _stato(conto, ricorrenza) == (
+            ['2025-12-15', '2026-01-15', '2026-02-15', '2026-03-15'], 960, '2026-04-15'
+        )
+
+    def test_data_fine_e_giornaliera(self, conto):
+        ricorrenza = _ricorrenza(
+            conto, 'giornaliera', (OGGI - timedelta(days=9)).isoformat(),
+            importo=5, tipo='entrata', data_fine=(OGGI - timedelta(days=5)).isoformat()
+        )
+
+        with get_db_connection() as conn:
+            esegui_ricorrenze(conn, OGGI)
+            esito_ripetuto = esegui_ricorrenze(conn, OGGI)
+
+        date_movimenti, saldo, prossima = _stato(conto, ricorrenza)
+        assert len(date_movimenti) == 5
+        assert saldo == 1025
+        assert prossima == (OGGI - timedelta(days=4)).isoformat()
+        assert esito_ripetuto['movimenti'] == 0
+
+    def test_ricorrenza_non_valida_non_blocca_le_altre(self, conto):
+        errata = _ricorrenza(conto, 'mensile', '2026-03-01')
+        valida = _ricorrenza(conto, 'settimanale', '2026-03-16', giorno_settimana=0)
+
+        with get_db_connection() as conn:
+            esito = esegui_ricorrenze(conn, OGGI)
+
+        assert esito['errori'][0]['ricorrenza_id'] == errata
+        assert _stato(conto, valida) == (['2026-03-16'], 990, '2026-03-23')
+
+    def test_un_solo_commit(self, conto, query_tracciate):
+        for i in range(20):
+            _ricorrenza(conto, 'settimanale', '2026-01-05', giorno_settimana=0)
+        query_tracciate.clear()
+
+        with get_db_connection() as conn:
+            esito = esegui_ricorrenze(conn, OGGI)
+
+        assert esito['movimenti'] == 20 * 11
+        assert sum(1 for q in query_tracciate if q.strip().upper() == "COMMIT") == 1
@@ -0,0 +1,87 @@
+"""Test per l'esportazione CSV in streaming"""
+
+import csv
+import gzip
+import io
+
+import pytest
+
+from backend import database
+from backend.database import get_db_connection
+from backend.services.esportazione import comprimi_gzip, genera_csv
+
+
+@pytest.fixture
+def movimenti_export(db):
+    with get_db_connection() as conn:
+        conti = [r[0] for r in conn.execute("SELECT id FROM conti LIMIT 2")]
+        conn.executemany(
+            """
+            INSERT INTO movimenti (data, importo, tipo, conto_id, descrizione)
+            VALUES (?, ?, 'uscita', ?, ?)
+            """,
+            [(f"2026-03-{1 + i % 28:02d}", 1.5 * i, conti[i % 2], f"Spesa {i}") for i in range(95)]
+        )
+        conn.commit()
+    return conti
+
+
+def _righe(testo: str) -> list:
+    return list(csv.reader(io.StringIO(testo)))
+
+
+class TestGeneraCsv:
+
+    def test_chunk_per_blocco(self, movimenti_export):
+        chunks = list(genera_csv(data_da="2026-03-01", data_a="2026-03-31", dimensione_blocco=10))
+
+        assert len(chunks) == 1 + 10  # intestazione + 95 righe a blocchi di 10
+        righe = _righe(b"".join(chunks).decode("utf-8"))
+        assert righe[0][0] == "ID"
+        assert len(righe) == 96
+
+    def test_connessione_rilasciata_alla_chiusura(self, movimenti_export):
+        generatore = genera_csv(dimensione_blocco=10)
+        next(generatore)
+        next(generatore)
+        assert database.get_pool().stats()["in_uso"] == 1
+
+        generatore.close()
+        assert database.get_pool().stats()["in_uso"] == 0
+
+    def test_gzip_incrementale(self, movimenti_export):
+        originale = b"".join(genera_csv())
+        compresso = b"".join(comprimi_gzip(genera_csv()))
+
+        assert gzip.decompress(compresso) == originale
+
+
+class TestEndpointExport:
+
+    def test_filtri(self, client, movimenti_export):
+        risposta = client.get(
+            f"/api/movimenti/export?conto_id={movimenti_export[0]}&data_da=2026-03-01&data_a=2026-03-10",
+            headers={"Accept-Encoding": "identity"}
+        )
+
+        assert risposta.status_code == 200
+        assert "content-encoding" not in risposta.headers
+        righe = _righe(risposta.text)[1:]
+        with get_db_connection() as conn:
+            attese = conn.execute(
+                """
+                SELECT COUNT(*) FROM movimenti
+                WHERE conto_id = ? AND data_giorno BETWEEN '2026-03-01' AND '2026-03-10'
+                """,
+                (movimenti_export[0],)
+            ).fetchone()[0]
+        assert len(righe) == attese > 0
+
+    def test_gzip_negoziato(self, client, movimenti_export):
+        risposta = client.get("/api/movimenti/export", headers={"Accept-Encoding": "gzip"})
+
+        assert risposta.headers["content-encoding"] == "gzip"
+        assert _righe(risposta.text)[0][0] == "ID"
+
+    def test_data_non_valida(self, client):
+        assert client.get("/api/movimenti/export?data_da=marzo").status_code == 400
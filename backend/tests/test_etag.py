@@ -0,0 +1,76 @@
+"""Test per ETag e GET condizionali"""
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.etag import calcola_etag, corrisponde, tabelle_per_percorso
+from backend.services import aggregati_mensili, ricerca, saldi, scomposizioni
+
+
+class TestFunzioni:
+
+    def test_parametri_normalizzati(self):
+        assert calcola_etag("/api/conti", "a=1&b=2", (1, 2), "2026-03-01") == \
+            calcola_etag("/api/conti", "b=2&a=1", (1, 2), "2026-03-01")
+        assert calcola_etag("/api/conti", "a=1", (1, 2), "2026-03-01") != \
+            calcola_etag("/api/conti", "a=1", (1, 3), "2026-03-01")
+
+    def test_if_none_match(self):
+        assert corrisponde('"x", "abc"', '"abc"')
+        assert corrisponde('W/"abc"', '"abc"')
+        assert corrisponde('*', '"abc"')
+        assert not corrisponde(None, '"abc"')
+
+    def test_percorsi(self):
+        assert 'conti' in tabelle_per_percorso("/api/conti/3/saldo")
+        assert tabelle_per_percorso("/api/contiX") is None
+        assert tabelle_per_percorso("/api/movimenti/export") is None
+
+
+class TestMiddleware:
+
+    def test_304_se_invariato(self, client):
+        prima = client.get("/api/conti")
+        etag = prima.headers["ETag"]
+
+        seconda = client.get("/api/conti", headers={"If-None-Match": etag})
+
+        assert seconda.status_code == 304
+        assert seconda.content == b""
+        assert seconda.headers["ETag"] == etag
+
+    def test_scrittura_cambia_etag(self, client):
+        etag = client.get("/api/conti").headers["ETag"]
+
+        client.post("/api/movimenti", json={
+            "data": "2026-03-05", "importo": 40, "tipo": "uscita", "descrizione": "Spesa", "conto_id": 1
+        })
+        risposta = client.get("/api/conti", headers={"If-None-Match": etag})
+
+        assert risposta.status_code == 200
+        assert risposta.headers["ETag"] != etag
+
+    def test_tabelle_non_lette_non_invalidano(self, client):
+        etag = client.get("/api/ricorrenze").headers["ETag"]
+
+        client.post("/api/movimenti", json={
+            "data": "2026-03-05", "importo": 40, "tipo": "uscita", "descrizione": "Spesa"
+        })
+
+        assert client.get("/api/ricorrenze", headers={"If-None-Match": etag}).status_code == 304
+
+    @pytest.mark.parametrize("modulo", [aggregati_mensili, saldi, ricerca, scomposizioni])
+    def test_ricostruzione_cambia_etag(self, client, modulo):
+        """Le tabelle derivate rigenerate invalidano le risposte che le leggono"""
+        etag = client.get("/api/analytics/dashboard").headers["ETag"]
+
+        with get_db_connection() as conn:
+            modulo.ricostruisci(conn)
+
+        assert client.get("/api/analytics/dashboard", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_errori_senza_etag(self, client):
+        risposta = client.get("/api/conti/999999")
+
+        assert risposta.status_code == 404
+        assert "ETag" not in risposta.headers
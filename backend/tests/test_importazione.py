@@ -0,0 +1,196 @@
+"""Test per l'importazione degli estratti conto"""
+
+import io
+from decimal import Decimal
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.services.importazione import (
+    ErroreEstratto,
+    converti_data,
+    converti_importo,
+    importa_estratto,
+    leggi_camt,
+    leggi_csv,
+    leggi_estratto,
+    leggi_ofx,
+)
+
+CSV_ESTRATTO = """Data operazione;Descrizione;Dare;Avere
+02/03/2026;Spesa  Esselunga;45,30;
+02/03/2026;Caffè;1,20;
+02/03/2026;Caffè;1,20;
+05/03/2026;Stipendio marzo;;2.500,00
+"""
+
+OFX_ESTRATTO = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260302120000[-5:EST]<TRNAMT>-45.30<NAME>Esselunga<MEMO>Spesa &amp; casa
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260305<TRNAMT>2500.00<NAME>Stipendio
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+CAMT_ESTRATTO = """<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">
+<BkToCstmrStmt><Stmt>
+<Ntry><Amt Ccy="EUR">45.30</Amt><CdtDbtInd>DBIT</CdtDbtInd><BookgDt><Dt>2026-03-02</Dt></BookgDt>
+<NtryDtls><TxDtls><RmtInf><Ustrd>Spesa Esselunga</Ustrd></RmtInf></TxDtls></NtryDtls></Ntry>
+<Ntry><Amt Ccy="EUR">2500.00</Amt><CdtDbtInd>CRDT</CdtDbtInd><BookgDt><DtTm>2026-03-05T08:00:00</DtTm></BookgDt>
+<AddtlNtryInf>Stipendio marzo</AddtlNtryInf></Ntry>
+</Stmt></BkToCstmrStmt>
+</Document>
+"""
+
+
+@pytest.fixture
+def conto(db):
+    with get_db_connection() as conn:
+        return conn.execute("SELECT id, saldo FROM conti LIMIT 1").fetchone()
+
+
+def _saldo(conto_id):
+    with get_db_connection() as conn:
+        return conn.execute("SELECT saldo FROM conti WHERE id = ?", (conto_id,)).fetchone()[0]
+
+
+class TestConversioni:
+
+    @pytest.mark.parametrize("testo, atteso", [
+        ("1.234,56", "1234.56"), ("1,234.56", "1234.56"), ("-12,5", "-12.5"),
+        ("€ 3", "3"), ("45,30-", "-45.30"),
+    ])
+    def test_importo(self, testo, atteso):
+        assert converti_importo(testo) == Decimal(atteso)
+
+    @pytest.mark.parametrize("testo", ["2026-03-02", "2026-03-02T10:00:00", "02/03/2026", "02.03.2026", "20260302120000"])
+    def test_data(self, testo):
+        assert converti_data(testo) == "2026-03-02"
+
+
+class TestParser:
+
+    def test_csv_dare_avere(self):
+        righe = list(leggi_csv(io.StringIO(CSV_ESTRATTO)))
+
+        assert [r['importo'] for r in righe] == [Decimal("-45.30"), Decimal("-1.20"), Decimal("-1.20"), Decimal("2500.00")]
+        assert righe[0]['descrizione'] == "Spesa Esselunga"
+        assert righe[3]['data'] == "2026-03-05"
+
+    def test_csv_errore_con_numero_riga(self):
+        with pytest.raises(ErroreEstratto, match="riga 3"):
+            list(leggi_csv(io.StringIO("data,importo,descrizione\n2026-03-01,1,a\n2026-03-01,abc,b\n")))
+
+    def test_ofx_sgml(self):
+        righe = list(leggi_ofx(io.BytesIO(OFX_ESTRATTO.encode("latin-1"))))
+
+        assert [(r['data'], r['importo']) for r in righe] == [
+            ("2026-03-02", Decimal("-45.30")), ("2026-03-05", Decimal("2500.00"))
+        ]
+        assert righe[0]['descrizione'] == "Esselunga - Spesa & casa"
+
+    def test_camt(self):
+        righe = list(leggi_camt(io.BytesIO(CAMT_ESTRATTO.encode("utf-8"))))
+
+        assert [(r['data'], r['importo'], r['descrizione']) for r in righe] == [
+            ("2026-03-02", Decimal("-45.30"), "Spesa Esselunga"),
+            ("2026-03-05", Decimal("2500.00"), "Stipendio marzo"),
+        ]
+
+
+class TestImportaEstratto:
+
+    def test_reimportazione_senza_duplicati(self, conto):
+        conto_id, saldo_iniziale = conto
+
+        def importa():
+            with get_db_connection() as conn:
+                file = io.BytesIO(CSV_ESTRATTO.encode("utf-8"))
+                return importa_estratto(conn, leggi_estratto(file, "csv"), conto_id)
+
+        prima = importa()
+        seconda = importa()
+
+        # I due caffè identici dello stesso giorno sono movimenti distinti
+        assert (prima['inserite'], prima['duplicate']) == (4, 0)
+        assert (seconda['inserite'], seconda['duplicate']) == (0, 4)
+        assert _saldo(conto_id) == pytest.approx(saldo_iniziale + 2500 - 45.30 - 2.40)
+
+    def test_avanzamento_per_lotto(self, conto):
+        righe = [
+            {'riga': i, 'data': f"2026-03-{1 + i // 10:02d}", 'importo': Decimal(-i - 1), 'descrizione': "Spesa"}
+            for i in range(25)
+        ]
+        stati = []
+
+        with get_db_connection() as conn:
+            stato = importa_estratto(conn, righe, conto[0], dimensione_lotto=10, avanzamento=stati.append)
+
+        assert [s['lette'] for s in stati] == [10, 20, 25]
+        assert stato['inserite'] == 25
+
+    def test_errore_lascia_lotti_precedenti(self, conto):
+        testo = "data,importo,descrizione\n" + "2026-03-01,-1,a\n" * 3 + "xx,-1,b\n"
+
+        with get_db_connection() as conn:
+            with pytest.raises(ErroreEstratto) as exc:
+                importa_estratto(conn, leggi_csv(io.StringIO(testo)), conto[0], dimensione_lotto=2)
+            importati = conn.execute("SELECT COUNT(*) FROM movimenti WHERE impronta IS NOT NULL").fetchone()[0]
+
+        assert exc.value.stato['inserite'] == 2
+        assert importati == 2
+
+    def test_estratto_decrescente(self, conto):
+        testo = "data,importo,descrizione\n2026-03-05,-1,Caffè\n2026-03-02,-1,Caffè\n2026-03-02,-1,Caffè\n"
+
+        with get_db_connection() as conn:
+            stato = importa_estratto(conn, leggi_csv(io.StringIO(testo)), conto[0])
+
+        assert (stato['inserite'], stato['duplicate']) == (3, 0)
+
+    def test_data_che_ricompare(self, conto):
+        """Una data che torna dopo un'altra non viene scambiata per duplicati: l'estratto è rifiutato"""
+        testo = "data,importo,descrizione\n" + "\n".join([
+            "2026-03-02,-1,Caffè", "2026-03-05,-1,Caffè", "2026-03-02,-1,Caffè"
+        ]) + "\n"
+
+        with get_db_connection() as conn:
+            with pytest.raises(ErroreEstratto, match="ordine cronologico"):
+                importa_estratto(conn, leggi_csv(io.StringIO(testo)), conto[0])
+            importati = conn.execute("SELECT COUNT(*) FROM movimenti WHERE impronta IS NOT NULL").fetchone()[0]
+
+        assert importati == 0
+
+    def test_transazione_aperta_del_chiamante(self, conto):
+        conto_id, saldo_iniziale = conto
+
+        with get_db_connection() as conn:
+            conn.execute("UPDATE conti SET saldo = saldo + 1 WHERE id = ?", (conto_id,))
+            with pytest.raises(RuntimeError):
+                importa_estratto(conn, leggi_csv(io.StringIO(CSV_ESTRATTO)), conto_id)
+            assert conn.in_transaction
+            conn.rollback()
+
+        assert _saldo(conto_id) == saldo_iniziale
+
+
+class TestEndpointImport:
+
+    def test_upload_camt(self, client, conto):
+        file = {'file': ("estratto.xml", CAMT_ESTRATTO.encode("utf-8"), "application/xml")}
+
+        risposta = client.post(f"/api/movimenti/import?conto_id={conto[0]}", files=file)
+
+        assert risposta.status_code == 201
+        assert risposta.json()['inserite'] == 2
+        movimenti = client.get("/api/movimenti?order_by=data&order_dir=asc").json()['items']
+        assert [(m['tipo'], m['importo']) for m in movimenti] == [('uscita', 45.3), ('entrata', 2500.0)]
+
+    def test_formato_sconosciuto(self, client, conto):
+        file = {'file': ("estratto.pdf", b"%PDF", "application/pdf")}
+
+        risposta = client.post(f"/api/movimenti/import?conto_id={conto[0]}", files=file)
+
+        assert risposta.status_code == 400
@@ -0,0 +1,142 @@
+"""Test per l'esecuzione delle migrations con registro schema_migrations"""
+
+import sqlite3
+
+import pytest
+
+from backend import database, migrazioni
+
+
+def _connetti(percorso):
+    conn = sqlite3.connect(percorso)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+class TestRegistro:
+
+    def test_tutte_registrate(self, db):
+        conn = _connetti(db)
+        registrate = dict(conn.execute("SELECT nome, checksum FROM schema_migrations").fetchall())
+
+        su_disco = migrazioni.migrazioni_su_disco()
+        assert set(registrate) == {percorso.name for percorso in su_disco}
+        for percorso in su_disco:
+            assert registrate[percorso.name] == migrazioni.calcola_checksum(migrazioni.leggi_sql(percorso))
+
+    def test_avvio_aggiornato_non_legge_file(self, db, monkeypatch):
+        letti = []
+        leggi = migrazioni.leggi_sql
+        monkeypatch.setattr(migrazioni, "leggi_sql", lambda percorso: letti.append(percorso) or leggi(percorso))
+        database.close_pool()
+
+        database.init_db()
+
+        conn = _connetti(db)
+        assert migrazioni.applica_migrazioni(conn) is None
+        assert letti == []
+
+    def test_nuova_migration_applicata_una_volta(self, db, tmp_path):
+        cartella = tmp_path / "migrations"
+        cartella.mkdir()
+        for percorso in migrazioni.migrazioni_su_disco():
+            (cartella / percorso.name).write_text(percorso.read_text(encoding='utf-8'), encoding='utf-8')
+        (cartella / "999_prova.sql").write_text(
+            "CREATE TABLE prova (id INTEGER PRIMARY KEY);\n"
+            "INSERT INTO prova (id) VALUES (1);\n",
+            encoding='utf-8'
+        )
+        conn = _connetti(db)
+
+        esito = migrazioni.applica_migrazioni(conn, cartella)
+
+        assert [m['nome'] for m in esito['migrazioni']] == ["999_prova.sql"]
+        assert esito['migrazioni'][0]['durata_ms'] >= 0
+        assert not esito['schema_creato'] and not esito['seed']
+        assert migrazioni.applica_migrazioni(conn, cartella) is None
+        assert conn.execute("SELECT COUNT(*) FROM prova").fetchone()[0] == 1
+
+    def test_database_senza_registro(self, db):
+        conn = _connetti(db)
+        mensili = conn.execute("SELECT * FROM movimenti_mensili ORDER BY 1, 2, 3").fetchall()
+        conn.execute("DROP TABLE schema_migrations")
+        conn.commit()
+
+        esito = migrazioni.applica_migrazioni(conn)
+
+        assert len(esito['migrazioni']) == len(migrazioni.migrazioni_su_disco())
+        gia_presenti = {m['nome'] for m in esito['migrazioni'] if m['gia_presente']}
+        assert '010_movimenti_mensili.sql' in gia_presenti
+        # I backfill dopo la prima istruzione non vengono rieseguiti
+        assert conn.execute("SELECT * FROM movimenti_mensili ORDER BY 1, 2, 3").fetchall() == mensili
+
+    def test_errore_annulla_tutto(self, db, tmp_path):
+        cartella = tmp_path / "migrations"
+        cartella.mkdir()
+        (cartella / "001_ok.sql").write_text("CREATE TABLE prova (id INTEGER);", encoding='utf-8')
+        (cartella / "002_errata.sql").write_text(
+            "CREATE TABLE prova_due (id INTEGER);\nINSERT INTO inesistente VALUES (1);",
+            encoding='utf-8'
+        )
+        conn = _connetti(db)
+
+        with pytest.raises(sqlite3.OperationalError):
+            migrazioni.applica_migrazioni(conn, cartella)
+
+        tabelle = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert 'prova' not in tabelle and 'prova_due' not in tabelle
+        assert conn.execute(
+            "SELECT COUNT(*) FROM schema_migrations WHERE nome = '001_ok.sql'"
+        ).fetchone()[0] == 0
+
+    def test_errore_dopo_la_prima_istruzione(self, db, tmp_path):
+        """Una colonna duplicata a metà file è un errore, non una migration già applicata"""
+        cartella = tmp_path / "migrations"
+        cartella.mkdir()
+        (cartella / "001_a_meta.sql").write_text(
+            "CREATE TABLE prova (id INTEGER);\nALTER TABLE conti ADD COLUMN saldo REAL;",
+            encoding='utf-8'
+        )
+        conn = _connetti(db)
+
+        with pytest.raises(sqlite3.OperationalError, match="duplicate column name"):
+            migrazioni.applica_migrazioni(conn, cartella)
+
+        assert conn.execute(
+            "SELECT COUNT(*) FROM schema_migrations WHERE nome = '001_a_meta.sql'"
+        ).fetchone()[0] == 0
+
+
+class TestIstruzioni:
+
+    def test_trigger_restano_interi(self):
+        script = """
+            -- commento
+            CREATE TABLE a (id INTEGER);
+            CREATE TRIGGER t AFTER INSERT ON a BEGIN
+                UPDATE a SET id = id; SELECT 1;
+            END;
+            -- fine
+        """
+
+        assert len(list(migrazioni.istruzioni(script))) == 2
+
+
+class TestRiparazioneBudget:
+
+    def test_obiettivo_id_gia_presente(self, db, tmp_path):
+        """Database con obiettivo_id aggiunto da migrate.py: le colonne di budget e obiettivi vengono create"""
+        conn = _connetti(tmp_path / "legacy.db")
+        conn.executescript(migrazioni.leggi_sql(migrazioni.SCHEMA_PATH))
+        conn.execute("ALTER TABLE movimenti ADD COLUMN obiettivo_id INTEGER")
+        conn.commit()
+
+        esito = migrazioni.applica_migrazioni(conn, seed=None)
+
+        gia_presenti = {m['nome'] for m in esito['migrazioni'] if m['gia_presente']}
+        assert '008_add_obiettivo_id_to_movimenti.sql' in gia_presenti
+        assert '008_repair_budget_obiettivi_columns.sql' not in gia_presenti
+        colonne_budget = {row[1] for row in conn.execute("PRAGMA table_info(budget)")}
+        colonne_obiettivi = {row[1] for row in conn.execute("PRAGMA table_info(obiettivi_risparmio)")}
+        assert {'data_fine', 'soglia_avviso', 'descrizione'} <= colonne_budget
+        assert {'descrizione', 'categoria_id'} <= colonne_obiettivi
@@ -0,0 +1,137 @@
+"""Test per l'importazione massiva dei movimenti"""
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.services.aggregati_mensili import ricostruisci
+from backend.services.movimenti_bulk import ErroreImportazione, importa_movimenti
+from backend.services.riconciliazione import riconcilia
+
+
+@pytest.fixture
+def conti(db):
+    with get_db_connection() as conn:
+        return {r[0]: r[1] for r in conn.execute("SELECT id, saldo FROM conti LIMIT 2")}
+
+
+def _movimenti(conti_ids, n):
+    return [
+        {
+            'data': f"2026-0{1 + i % 3}-{1 + i % 28:02d}",
+            'importo': 10.0 + i % 7,
+            'tipo': ('entrata', 'uscita', 'trasferimento')[i % 3],
+            'conto_id': conti_ids[i % len(conti_ids)],
+            'descrizione': f"Movimento {i}",
+        }
+        for i in range(n)
+    ]
+
+
+def _saldi(conn):
+    return {r[0]: r[1] for r in conn.execute("SELECT id, saldo FROM conti")}
+
+
+def _aggregato(conn):
+    return conn.execute("SELECT * FROM movimenti_mensili ORDER BY 1, 2, 3, 4, 5, 6, 7").fetchall()
+
+
+class TestImportaMovimenti:
+
+    def test_inserisce_e_aggiorna_saldi(self, conti):
+        righe = _movimenti(list(conti), 300)
+        attesi = dict(conti)
+        for riga in righe:
+            if riga['tipo'] != 'trasferimento':
+                attesi[riga['conto_id']] += riga['importo'] if riga['tipo'] == 'entrata' else -riga['importo']
+
+        with get_db_connection() as conn:
+            risultato = importa_movimenti(conn, righe)
+            saldi = _saldi(conn)
+            assert conn.execute("SELECT COUNT(*) FROM movimenti").fetchone()[0] == 300
+
+        assert risultato['inseriti'] == 300
+        for conto_id, saldo in attesi.items():
+            assert saldi[conto_id] == pytest.approx(saldo)
+
+    def test_uscita_con_importo_negativo(self, conti):
+        conto_id = next(iter(conti))
+        righe = [
+            {'data': '2026-01-10', 'importo': -25.0, 'tipo': 'uscita', 'conto_id': conto_id, 'descrizione': 'Spesa'},
+            {'data': '2026-01-11', 'importo': 40.0, 'tipo': 'uscita', 'conto_id': conto_id, 'descrizione': 'Spesa'},
+        ]
+
+        with get_db_connection() as conn:
+            risultato = importa_movimenti(conn, righe)
+            saldi = _saldi(conn)
+            esito = riconcilia(conn, completa=True)
+
+        assert risultato['saldi_aggiornati'][conto_id] == -65.0
+        assert saldi[conto_id] == pytest.approx(conti[conto_id] - 65.0)
+        assert esito['discrepanze'] == []
+
+    def test_righe_non_valide_nessuna_scrittura(self, conti):
+        righe = _movimenti(list(conti), 10)
+        righe[3]['conto_id'] = 999999
+        righe[5]['tipo'] = 'regalo'
+        righe[7]['data'] = '31/02/2026'
+
+        with get_db_connection() as conn:
+            with pytest.raises(ErroreImportazione) as exc:
+                importa_movimenti(conn, righe)
+            assert conn.execute("SELECT COUNT(*) FROM movimenti").fetchone()[0] == 0
+            saldi = _saldi(conn)
+
+        assert all(saldi[conto_id] == saldo for conto_id, saldo in conti.items())
+
+        assert [e['riga'] for e in exc.value.errori] == [3, 5, 7]
+
+    def test_transazione_aperta_del_chiamante(self, conti):
+        conto_id = next(iter(conti))
+
+        with get_db_connection() as conn:
+            conn.execute("UPDATE conti SET saldo = saldo + 1 WHERE id = ?", (conto_id,))
+            with pytest.raises(RuntimeError):
+                importa_movimenti(conn, _movimenti([conto_id], 3))
+            assert conn.in_transaction
+            conn.rollback()
+
+            assert conn.execute("SELECT COUNT(*) FROM movimenti").fetchone()[0] == 0
+            assert _saldi(conn)[conto_id] == conti[conto_id]
+
+    def test_ricostruzione_indici_mantiene_aggregato(self, conti):
+        with get_db_connection() as conn:
+            indici_prima = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'movimenti' ORDER BY 1"
+            ).fetchall()
+
+            risultato = importa_movimenti(conn, _movimenti(list(conti), 500), ricostruisci_indici=True)
+
+            indici_dopo = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'movimenti' ORDER BY 1"
+            ).fetchall()
+            aggregato_trigger = _aggregato(conn)
+            ricostruisci(conn)
+            assert _aggregato(conn) == aggregato_trigger
+            assert conn.execute("SELECT COUNT(*) FROM movimenti_fts").fetchone()[0] == 500
+
+        assert risultato['indici_ricostruiti'] > 0
+        assert indici_dopo == indici_prima
+
+
+class TestEndpointBulk:
+
+    def test_crea_movimenti(self, client, conti):
+        risposta = client.post("/api/movimenti/bulk", json={'movimenti': _movimenti(list(conti), 50)})
+
+        assert risposta.status_code == 201
+        assert risposta.json()['inseriti'] == 50
+        assert client.get("/api/movimenti?per_page=1").json()['total'] == 50
+
+    def test_obiettivo_solo_con_entrata(self, client, conti):
+        righe = _movimenti(list(conti), 2)
+        righe[1].update(tipo='uscita', obiettivo_id=1)
+
+        risposta = client.post("/api/movimenti/bulk", json={'movimenti': righe})
+
+        assert risposta.status_code == 422
+        assert risposta.json()['detail']['errori'][0]['riga'] == 1
@@ -0,0 +1,127 @@
+"""Test per la paginazione a cursore dei movimenti"""
+
+import sqlite3
+
+import pytest
+
+from backend import database
+from backend.database import get_db_connection
+from backend.services.paginazione import clausole_keyset, codifica_cursore, decodifica_cursore
+
+
+@pytest.fixture
+def movimenti_conto(db):
+    """Un conto con 57 movimenti, alcuni con stessa data e stesso importo"""
+    with get_db_connection() as conn:
+        conto_id = conn.execute(
+            "INSERT INTO conti (nome, tipo, saldo) VALUES ('Paginazione', 'corrente', 0)"
+        ).lastrowid
+        conn.executemany(
+            """
+            INSERT INTO movimenti (data, importo, tipo, conto_id, descrizione)
+            VALUES (?, ?, ?, ?, 'test')
+            """,
+            [
+                (f"2026-0{1 + i % 9}-{1 + i % 5:02d}", float(i % 7), 'uscita' if i % 3 else 'entrata', conto_id)
+                for i in range(57)
+            ]
+        )
+        conn.commit()
+    return conto_id
+
+
+def _scorri(client, url):
+    """Segue i next_cursor fino alla fine, restituisce gli id visti"""
+    ids = []
+    risposta = client.get(url).json()
+    while True:
+        ids.extend(m["id"] for m in risposta["items"])
+        if not risposta["next_cursor"]:
+            return ids
+        separatore = "&" if "?" in url else "?"
+        risposta = client.get(f"{url}{separatore}cursor={risposta['next_cursor']}").json()
+
+
+class TestCursore:
+
+    def test_andata_e_ritorno(self):
+        cursore = codifica_cursore('data', 'desc', '2026-01-01 10:00:00', 42)
+
+        assert decodifica_cursore(cursore, 'data', 'desc') == ('2026-01-01 10:00:00', 42)
+
+    def test_ordinamento_diverso(self):
+        cursore = codifica_cursore('importo', 'asc', 12.5, 3)
+
+        with pytest.raises(ValueError):
+            decodifica_cursore(cursore, 'data', 'desc')
+
+    def test_cursore_corrotto(self):
+        with pytest.raises(ValueError):
+            decodifica_cursore("non-un-cursore", 'data', 'desc')
+
+
+class TestListaMovimenti:
+
+    @pytest.mark.parametrize("order_by, order_dir, chiave", [
+        ("data", "desc", lambda m: (m[0], m[1])),
+        ("importo", "asc", lambda m: (m[2], m[1])),
+    ])
+    def test_cursore_copre_tutte_le_righe(self, client, movimenti_conto, order_by, order_dir, chiave):
+        ids = _scorri(client, f"/api/movimenti?per_page=10&order_by={order_by}&order_dir={order_dir}")
+
+        with get_db_connection() as conn:
+            righe = conn.execute("SELECT data, id, importo FROM movimenti").fetchall()
+        attesi = [r[1] for r in sorted(righe, key=chiave, reverse=order_dir == "desc")]
+
+        assert ids == attesi
+
+    def test_totale_opzionale(self, client, movimenti_conto):
+        prima = client.get("/api/movimenti?per_page=5").json()
+        assert prima["total"] is not None and prima["next_cursor"]
+
+        seconda = client.get(f"/api/movimenti?per_page=5&cursor={prima['next_cursor']}").json()
+        assert seconda["total"] is None and seconda["page"] is None
+        assert len(seconda["items"]) == 5
+
+    def test_cursore_non_valido(self, client):
+        assert client.get("/api/movimenti?cursor=xyz").status_code == 400
+        assert client.get("/api/movimenti?order_by=categoria&cursor=xyz").status_code == 400
+
+    def test_ordinamento_categoria_con_pagine(self, client, movimenti_conto):
+        risposta = client.get("/api/movimenti?order_by=categoria&per_page=10&page=2").json()
+
+        assert len(risposta["items"]) == 10
+        assert risposta["next_cursor"] is None
+
+
+class TestMovimentiPerConto:
+
+    def test_cursore_per_conto(self, client, movimenti_conto):
+        ids = _scorri(client, f"/api/conti/{movimenti_conto}/movimenti?per_page=7&tipo=uscita")
+
+        with get_db_connection() as conn:
+            attesi = [r[0] for r in conn.execute(
+                "SELECT id FROM movimenti WHERE conto_id = ? AND tipo = 'uscita' ORDER BY data DESC, id DESC",
+                (movimenti_conto,)
+            )]
+
+        assert ids == attesi
+
+
+class TestPianoKeyset:
+    """La pagina successiva non scorre le righe precedenti"""
+
+    @pytest.mark.parametrize("ordine, direzione", [("data", "desc"), ("importo", "asc")])
+    def test_usa_indice(self, db, ordine, direzione):
+        condizione, order_by, params = clausole_keyset(
+            ordine, direzione, codifica_cursore(ordine, direzione, "2026-01-01" if ordine == "data" else 5.0, 10)
+        )
+        conn = sqlite3.connect(database.DB_PATH)
+        piano = [r[3] for r in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT m.* FROM movimenti m WHERE {condizione} ORDER BY {order_by} LIMIT 20",
+            params
+        )]
+        conn.close()
+
+        assert any("USING INDEX" in riga for riga in piano), piano
+        assert not any("TEMP B-TREE" in riga for riga in piano), piano
@@ -0,0 +1,100 @@
+"""Test per la previsione dei saldi dalle ricorrenze"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.routes.analytics import cache_analytics
+from backend.services.esecuzione_ricorrenze import prossima_occorrenza
+from backend.services.previsione import proietta
+
+OGGI = date(2026, 3, 20)
+
+RICORRENZE = [
+    # frequenza, importo, tipo, prossima_data, campi
+    ('mensile', 2500, 'entrata', '2026-03-27', {'giorno_mese': 27}),
+    ('mensile', 800, 'uscita', '2026-03-31', {'giorno_mese': 31}),
+    ('settimanale', 60, 'uscita', '2026-03-16', {'giorno_settimana': 0}),
+    ('giornaliera', 3, 'uscita', '2026-03-22', {'data_fine': '2026-05-10'}),
+    ('annuale', 400, 'uscita', '2026-02-28', {'giorno_mese': 29, 'mese': 2}),
+]
+
+
+@pytest.fixture
+def conto(db):
+    with get_db_connection() as conn:
+        conn.execute("UPDATE conti SET attivo = 0")
+        conto_id = conn.execute(
+            "INSERT INTO conti (nome, tipo, saldo) VALUES ('Previsione', 'corrente', 1000)"
+        ).lastrowid
+        for frequenza, importo, tipo, prossima, campi in RICORRENZE:
+            colonne = {
+                'descrizione': frequenza, 'importo': importo, 'tipo': tipo, 'frequenza': frequenza,
+                'prossima_data': prossima, 'conto_id': conto_id, **campi
+            }
+            conn.execute(
+                f"INSERT INTO movimenti_ricorrenti ({', '.join(colonne)}) VALUES ({', '.join('?' * len(colonne))})",
+                list(colonne.values())
+            )
+        conn.commit()
+    return conto_id
+
+
+def _saldo_atteso(giorno: date) -> float:
+    """Saldo a fine giornata iterando le ricorrenze una occorrenza alla volta"""
+    saldo = 1000.0
+    for frequenza, importo, tipo, prossima, campi in RICORRENZE:
+        corrente = date.fromisoformat(prossima)
+        fine = min(giorno, date.fromisoformat(campi.get('data_fine', '9999-12-31')))
+        while corrente <= fine:
+            saldo += importo if tipo == 'entrata' else -importo
+            corrente = prossima_occorrenza(
+                frequenza, corrente, campi.get('giorno_mese'), campi.get('giorno_settimana'), campi.get('mese')
+            )
+    return round(saldo, 2)
+
+
+class TestProietta:
+
+    def test_come_iterazione_giornaliera(self, conto):
+        with get_db_connection() as conn:
+            previsione = proietta(conn, mesi=24, granularita='giorno', oggi=OGGI)
+
+        (curva,) = previsione['conti']
+        assert len(curva['punti']) == (date(2028, 3, 20) - OGGI).days + 1
+        for punto in curva['punti'][::17]:
+            assert punto['saldo'] == _saldo_atteso(date.fromisoformat(punto['data'])), punto['data']
+        assert previsione['totale']['punti'] == curva['punti']
+
+    def test_punti_a_fine_mese(self, conto):
+        with get_db_connection() as conn:
+            punti = proietta(conn, mesi=3, oggi=OGGI)['conti'][0]['punti']
+
+        assert [p['data'] for p in punti] == ['2026-03-20', '2026-03-31', '2026-04-30', '2026-05-31', '2026-06-20']
+        assert punti[2]['saldo'] == _saldo_atteso(date(2026, 4, 30))
+
+    def test_scadute_contate_oggi(self, conto):
+        with get_db_connection() as conn:
+            punti = proietta(conn, mesi=1, granularita='giorno', oggi=OGGI + timedelta(days=30))['conti'][0]['punti']
+
+        assert punti[0]['saldo'] == _saldo_atteso(OGGI + timedelta(days=30))
+
+
+class TestEndpoint:
+
+    @pytest.fixture(autouse=True)
+    def cache_vuota(self):
+        cache_analytics.svuota()
+
+    def test_cache_invalidata_dalle_ricorrenze(self, client, conto):
+        prima = client.get("/api/analytics/forecast?mesi=12")
+        assert client.get("/api/analytics/forecast?mesi=12").headers["X-Cache"] == "HIT"
+
+        with get_db_connection() as conn:
+            conn.execute("UPDATE movimenti_ricorrenti SET importo = importo * 2 WHERE frequenza = 'mensile'")
+            conn.commit()
+        dopo = client.get("/api/analytics/forecast?mesi=12")
+
+        assert dopo.headers["X-Cache"] == "MISS"
+        assert dopo.json()['totale']['punti'][-1] != prima.json()['totale']['punti'][-1]
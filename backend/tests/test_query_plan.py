@@ -0,0 +1,67 @@
+"""Regressione EXPLAIN QUERY PLAN: i filtri per data non devono tornare a full scan"""
+
+import re
+import sqlite3
+
+from backend import database
+
+# Ogni riga di piano "SCAN movimenti" (o del suo alias) legge tutta la tabella
+# o tutto un indice, anche con "USING INDEX" o "USING COVERING INDEX"
+FULL_SCAN = re.compile(r"^SCAN (movimenti|m)\b")
+
+# Scansioni di movimenti previste nelle query filtrate per data: nessuna,
+# ogni accesso deve essere una SEARCH su indice
+SCAN_AMMESSI = frozenset()
+
+ENDPOINTS = [
+    "/api/analytics/dashboard",
+    "/api/analytics/dashboard?data_da=2026-01-01&data_a=2026-03-31",
+    "/api/analytics/trend?period=6m",
+    "/api/analytics/comparison?period=month",
+    "/api/analytics/comparison?period=year",
+    "/api/analytics/budget-warnings",
+    "/api/analytics/top-spese?period=3m",
+    "/api/analytics/spese-categoria?mese=1&anno=2026",
+    "/api/budget",
+    "/api/budget/1/history?mesi=6",
+    "/api/beni/1/costi-tempo?period=6m",
+    "/api/conti/1/saldo-storico?periodo=30d",
+]
+
+
+def _con_movimenti(sql: str) -> bool:
+    return "FROM movimenti" in sql and sql.lstrip().upper().startswith("SELECT")
+
+
+def test_scansioni_di_indice_riconosciute():
+    assert FULL_SCAN.match("SCAN m")
+    assert FULL_SCAN.match("SCAN movimenti USING INDEX idx_movimenti_giorno")
+    assert FULL_SCAN.match("SCAN m USING COVERING INDEX idx_movimenti_tipo_giorno")
+    assert not FULL_SCAN.match("SEARCH m USING INDEX idx_movimenti_giorno (data_giorno>? AND data_giorno<?)")
+    assert not FULL_SCAN.match("SCAN movimenti_mensili")
+
+
+def test_query_filtrate_per_data_usano_indici(client, query_tracciate):
+    for url in ENDPOINTS:
+        assert client.get(url).status_code == 200, url
+
+    query = [sql for sql in query_tracciate if _con_movimenti(sql) and "data_giorno" in sql]
+    assert query, "nessuna query con filtro per data tracciata"
+
+    conn = sqlite3.connect(database.DB_PATH)
+    try:
+        for sql in query:
+            piano = [riga[3] for riga in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            full_scan = [riga for riga in piano if FULL_SCAN.match(riga) and riga not in SCAN_AMMESSI]
+            assert not full_scan, f"full scan su movimenti:\n{sql}\n{piano}"
+    finally:
+        conn.close()
+
+
+def test_nessun_filtro_con_funzione_sulla_colonna(client, query_tracciate):
+    for url in ENDPOINTS:
+        client.get(url)
+
+    for sql in query_tracciate:
+        if _con_movimenti(sql):
+            assert not re.search(r"WHERE[\s\S]*date\((m\.)?data\)", sql, re.IGNORECASE), sql
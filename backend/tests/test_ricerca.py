@@ -0,0 +1,110 @@
+"""Test per la ricerca full-text sui movimenti"""
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.services.ricerca import espressione_fts, ricostruisci
+
+
+@pytest.fixture
+def movimenti_ricerca(db):
+    with get_db_connection() as conn:
+        conti = [r[0] for r in conn.execute("SELECT id FROM conti ORDER BY id LIMIT 2")]
+        categoria = conn.execute("SELECT id FROM categorie ORDER BY id LIMIT 1").fetchone()[0]
+        conn.executemany(
+            """
+            INSERT INTO movimenti (data, importo, tipo, conto_id, categoria_id, descrizione, note)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                ("2026-03-02", 45.3, 'uscita', conti[0], categoria, "Spesa Esselunga", None),
+                ("2026-03-03", 1.2, 'uscita', conti[1], None, "Caffè al bar", "con Marco"),
+                ("2026-03-10", 2500, 'entrata', conti[0], None, "Stipendio marzo", None),
+                ("2026-04-02", 60.0, 'uscita', conti[0], None, "Cena", "spesa divisa con Marco"),
+            ]
+        )
+        conn.commit()
+    return conti, categoria
+
+
+def _descrizioni(risposta):
+    assert risposta.status_code == 200
+    return [m['descrizione'] for m in risposta.json()['items']]
+
+
+class TestEspressione:
+
+    def test_parole_come_prefissi(self):
+        assert espressione_fts("spesa coop") == '"spesa"* "coop"*'
+
+    def test_sintassi_fts_ignorata(self):
+        assert espressione_fts('"caffè" OR NEAR(bar') == '"caffè"* "OR"* "NEAR"* "bar"*'
+        assert espressione_fts("-*()") is None
+
+
+class TestEndpointSearch:
+
+    def test_prefisso_e_accenti(self, client, movimenti_ricerca):
+        assert _descrizioni(client.get("/api/movimenti/search?q=esse")) == ["Spesa Esselunga"]
+        assert _descrizioni(client.get("/api/movimenti/search?q=caffe")) == ["Caffè al bar"]
+
+    def test_rilevanza_descrizione_prima_delle_note(self, client, movimenti_ricerca):
+        assert _descrizioni(client.get("/api/movimenti/search?q=spesa")) == ["Spesa Esselunga", "Cena"]
+
+    def test_filtri(self, client, movimenti_ricerca):
+        conti, _ = movimenti_ricerca
+
+        assert _descrizioni(client.get("/api/movimenti/search?q=marco&data_a=2026-03-31")) == ["Caffè al bar"]
+        assert _descrizioni(client.get(f"/api/movimenti/search?q=marco&conto_id={conti[0]}")) == ["Cena"]
+        assert _descrizioni(client.get("/api/movimenti/search?q=marzo&tipo=uscita")) == []
+
+    def test_has_more(self, client, movimenti_ricerca):
+        dati = client.get("/api/movimenti/search?q=spesa&limit=1").json()
+
+        assert len(dati['items']) == 1
+        assert dati['has_more'] is True
+
+    def test_rilevanza_su_tutte_le_corrispondenze(self, client, movimenti_ricerca):
+        """Un movimento vecchio più pertinente precede migliaia di corrispondenze più recenti"""
+        with get_db_connection() as conn:
+            conn.executemany(
+                "INSERT INTO movimenti (data, importo, tipo, descrizione, note) VALUES (?, ?, ?, ?, ?)",
+                [("2026-05-01", 1.0, 'uscita', f"Movimento {i}", "rata bolletta") for i in range(2100)]
+            )
+            conn.execute(
+                "INSERT INTO movimenti (data, importo, tipo, descrizione) VALUES (?, ?, ?, ?)",
+                ("2020-01-01", 80, 'uscita', "Bolletta")
+            )
+            conn.commit()
+
+        primi = client.get("/api/movimenti/search?q=bolletta&limit=1").json()
+        ultimi = client.get("/api/movimenti/search?q=bolletta&limit=50&offset=2080").json()
+
+        assert [m['data_giorno'] for m in primi['items']] == ["2020-01-01"]
+        assert len(ultimi['items']) == 21
+        assert ultimi['has_more'] is False
+
+
+class TestSincronizzazione:
+
+    def test_modifiche_ed_eliminazioni(self, client, movimenti_ricerca):
+        movimento = client.get("/api/movimenti/search?q=marzo").json()['items'][0]
+
+        client.put(f"/api/movimenti/{movimento['id']}", json={'descrizione': "Bonus annuale"})
+        assert _descrizioni(client.get("/api/movimenti/search?q=marzo")) == []
+        assert _descrizioni(client.get("/api/movimenti/search?q=bonus")) == ["Bonus annuale"]
+
+        client.delete(f"/api/movimenti/{movimento['id']}")
+        assert _descrizioni(client.get("/api/movimenti/search?q=bonus")) == []
+
+    def test_rinomina_categoria(self, client, movimenti_ricerca):
+        _, categoria = movimenti_ricerca
+        with get_db_connection() as conn:
+            conn.execute("UPDATE categorie SET nome = 'Supermercati' WHERE id = ?", (categoria,))
+            conn.commit()
+
+        assert _descrizioni(client.get("/api/movimenti/search?q=supermerc")) == ["Spesa Esselunga"]
+
+    def test_ricostruzione(self, movimenti_ricerca):
+        with get_db_connection() as conn:
+            assert ricostruisci(conn) == 4
@@ -0,0 +1,68 @@
+"""Test per la riconciliazione dei saldi"""
+
+import pytest
+
+from backend.database import get_db_connection
+
+
+@pytest.fixture
+def conto(client):
+    conto_id = client.post("/api/conti", json={"nome": "Verifica", "tipo": "corrente", "saldo": 500}).json()["id"]
+    client.post("/api/movimenti", json={
+        "data": "2026-03-05", "importo": 120, "tipo": "uscita", "descrizione": "Spesa", "conto_id": conto_id
+    })
+    return conto_id
+
+
+def _riconcilia(client, **params):
+    risposta = client.post("/api/conti/riconciliazione", params=params)
+    assert risposta.status_code == 200
+    return risposta.json()
+
+
+def _altera_saldo(conto_id, saldo):
+    """Simula una deriva: saldo cambiato senza movimenti"""
+    with get_db_connection() as conn:
+        conn.execute("UPDATE conti SET saldo = ? WHERE id = ?", (saldo, conto_id))
+        conn.commit()
+
+
+class TestRiconciliazione:
+
+    def test_saldi_coerenti(self, client, conto):
+        esito = _riconcilia(client, completa=True)
+
+        assert esito["completa"] is True
+        assert esito["discrepanze"] == []
+        assert esito["conti_verificati"] >= 1
+
+    def test_discrepanza_e_correzione(self, client, conto):
+        _altera_saldo(conto, 999)
+
+        esito = _riconcilia(client, completa=True)
+        assert esito["discrepanze"] == [{
+            "conto_id": conto, "nome": "Verifica", "saldo": 999,
+            "saldo_calcolato": 380, "differenza": 619
+        }]
+
+        esito = _riconcilia(client, completa=True, correggi=True)
+        assert esito["corrette"] is True
+        assert client.get(f"/api/conti/{conto}").json()["saldo"] == 380
+        assert _riconcilia(client, completa=True)["discrepanze"] == []
+
+    def test_incrementale_solo_conti_toccati(self, client, conto):
+        _riconcilia(client, completa=True)
+        assert _riconcilia(client)["conti_verificati"] == 0
+
+        _altera_saldo(conto, 1)
+        esito = _riconcilia(client)
+
+        assert esito["completa"] is False
+        assert esito["conti_verificati"] == 1
+        assert esito["discrepanze"][0]["saldo_calcolato"] == 380
+
+    def test_saldo_modificato_a_mano_non_e_discrepanza(self, client, conto):
+        dati = client.get(f"/api/conti/{conto}").json()
+        client.put(f"/api/conti/{conto}", json={**dati, "saldo": 1000})
+
+        assert _riconcilia(client, completa=True)["discrepanze"] == []
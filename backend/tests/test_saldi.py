@@ -0,0 +1,102 @@
+"""Test per lo storico dei saldi dalle variazioni giornaliere"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.services.movimenti_bulk import importa_movimenti
+from backend.services.saldi import ricostruisci
+
+
+def _giorno(giorni_fa):
+    return (date.today() - timedelta(days=giorni_fa)).isoformat()
+
+
+@pytest.fixture
+def conto(client):
+    return client.post("/api/conti", json={"nome": "Storico", "tipo": "corrente", "saldo": 1000}).json()["id"]
+
+
+def _variazioni(conn):
+    return conn.execute("SELECT * FROM saldi_giornalieri ORDER BY conto_id, giorno").fetchall()
+
+
+class TestSaldoStorico:
+
+    def test_saldi_di_fine_giornata(self, client, conto):
+        client.post("/api/movimenti", json={
+            "data": _giorno(5), "importo": 200, "tipo": "entrata", "descrizione": "Rimborso", "conto_id": conto
+        })
+        client.post("/api/movimenti", json={
+            "data": _giorno(2), "importo": 50, "tipo": "uscita", "descrizione": "Spesa", "conto_id": conto
+        })
+
+        dati = client.get(f"/api/conti/{conto}/saldo-storico?periodo=7d").json()
+
+        assert dati["saldo_corrente"] == 1150
+        assert dati["punti"] == [
+            {"data": _giorno(5), "saldo": 1200},
+            {"data": _giorno(2), "saldo": 1150},
+            {"data": _giorno(0), "saldo": 1150},
+        ]
+
+    def test_trasferimento_con_importo_negativo(self, client, conto):
+        altro = client.post("/api/conti", json={"nome": "Altro", "tipo": "corrente", "saldo": 0}).json()["id"]
+        client.post("/api/conti/trasferimento", json={
+            "conto_origine_id": conto, "conto_destinazione_id": altro,
+            "importo": 300, "descrizione": "Giroconto", "data": _giorno(1)
+        })
+
+        punti = client.get(f"/api/conti/{conto}/saldo-storico?periodo=7d").json()["punti"]
+
+        assert punti[0] == {"data": _giorno(1), "saldo": 700}
+
+    def test_movimento_futuro_escluso_da_oggi(self, client, conto):
+        client.post("/api/movimenti", json={
+            "data": (date.today() + timedelta(days=3)).isoformat(), "importo": 100,
+            "tipo": "uscita", "descrizione": "Programmato", "conto_id": conto
+        })
+
+        punti = client.get(f"/api/conti/{conto}/saldo-storico?periodo=7d").json()["punti"]
+
+        assert punti == [{"data": _giorno(0), "saldo": 1000}]
+
+
+class TestManutenzione:
+
+    def test_trigger_come_ricostruzione(self, client, conto):
+        movimento = client.post("/api/movimenti", json={
+            "data": _giorno(3), "importo": 80, "tipo": "uscita", "descrizione": "Cena", "conto_id": conto
+        }).json()
+        client.put(f"/api/movimenti/{movimento['id']}", json={"data": _giorno(4), "importo": 90})
+        client.post("/api/movimenti", json={
+            "data": _giorno(1), "importo": 10, "tipo": "entrata", "descrizione": "Resto", "conto_id": conto
+        })
+        with get_db_connection() as conn:
+            importa_movimenti(conn, [
+                {'data': _giorno(2), 'importo': 5, 'tipo': 'uscita', 'descrizione': f"M{i}", 'conto_id': conto}
+                for i in range(3)
+            ], ricostruisci_indici=True)
+        client.delete(f"/api/movimenti/{movimento['id']}")
+
+        with get_db_connection() as conn:
+            incrementale = _variazioni(conn)
+            ricostruisci(conn)
+            assert incrementale == _variazioni(conn)
+
+
+class TestPatrimonio:
+
+    def test_somma_dei_conti_attivi(self, client, conto):
+        client.post("/api/movimenti", json={
+            "data": _giorno(3), "importo": 100, "tipo": "uscita", "descrizione": "Spesa", "conto_id": conto
+        })
+        with get_db_connection() as conn:
+            totale = conn.execute("SELECT SUM(saldo) FROM conti WHERE attivo = 1").fetchone()[0]
+
+        dati = client.get("/api/conti/patrimonio-storico?periodo=7d").json()
+
+        assert dati["patrimonio_corrente"] == pytest.approx(totale)
+        assert dati["punti"][-1] == {"data": _giorno(0), "saldo": round(totale, 2)}
+        assert {"data": _giorno(3), "saldo": round(totale, 2)} in dati["punti"]
@@ -0,0 +1,179 @@
+"""Test per i componenti della scomposizione costi in tabella"""
+
+import pytest
+
+from backend.database import get_db_connection
+from backend.services.movimenti_bulk import importa_movimenti
+from backend.services.scomposizioni import main, ricostruisci
+
+
+@pytest.fixture
+def veicolo(client):
+    return client.post("/api/beni", json={
+        "nome": "Panda", "tipo": "veicolo", "data_acquisto": "2022-01-01", "prezzo_acquisto": 12000,
+        "veicolo_tipo_carburante": "benzina", "veicolo_consumo_medio": 5.5,
+        "veicolo_costo_manutenzione_per_km": 0.08, "tasso_ammortamento": 15
+    }).json()['id']
+
+
+def _rifornimento(client, veicolo, data="2026-03-05", km=300):
+    return client.post("/api/movimenti", json={
+        "data": data, "importo": 40, "tipo": "uscita", "descrizione": "Rifornimento",
+        "bene_id": veicolo, "km_percorsi": km
+    }).json()
+
+
+def _componenti(movimento_id):
+    with get_db_connection() as conn:
+        return {
+            row[0]: row[1] for row in conn.execute(
+                "SELECT nome_componente, valore_componente FROM scomposizioni_costi WHERE movimento_id = ?",
+                (movimento_id,)
+            )
+        }
+
+
+def _tutti():
+    with get_db_connection() as conn:
+        return conn.execute(
+            """
+            SELECT movimento_id, bene_id, nome_componente, valore_componente, percentuale_totale
+            FROM scomposizioni_costi ORDER BY movimento_id, nome_componente
+            """
+        ).fetchall()
+
+
+class TestMaterializzazione:
+
+    def test_componenti_alla_creazione(self, client, veicolo):
+        movimento = _rifornimento(client, veicolo)
+
+        componenti = _componenti(movimento['id'])
+
+        assert componenti == {
+            voce['tipo']: voce['importo'] for voce in movimento['scomposizione']['scomposizione']
+        }
+        assert componenti['usura'] == 24.0
+
+    def test_eliminazione(self, client, veicolo):
+        movimento = _rifornimento(client, veicolo)
+        altro = _rifornimento(client, veicolo)
+
+        client.delete(f"/api/movimenti/{movimento['id']}")
+
+        assert _componenti(movimento['id']) == {}
+        assert len(_componenti(altro['id'])) == 3
+
+    def test_bene_eliminato(self, client, veicolo):
+        movimento = _rifornimento(client, veicolo)
+
+        client.delete(f"/api/beni/{veicolo}")
+
+        assert {row[1] for row in _tutti() if row[0] == movimento['id']} == {None}
+
+    def test_importazione_con_trigger_sospesi(self, client, veicolo):
+        righe = [
+            {"data": "2026-02-%02d" % giorno, "importo": 40, "tipo": "uscita",
+             "descrizione": "Rifornimento", "bene_id": veicolo, "km_percorsi": 300}
+            for giorno in range(1, 21)
+        ]
+        with get_db_connection() as conn:
+            importa_movimenti(conn, righe, ricostruisci_indici=True)
+
+        assert len(_tutti()) == 60
+
+    def test_ricostruzione_a_blocchi(self, client, veicolo):
+        for giorno in range(1, 8):
+            _rifornimento(client, veicolo, data="2026-03-%02d" % giorno, km=100 * giorno)
+        prima = _tutti()
+
+        with get_db_connection() as conn:
+            conn.execute("DELETE FROM scomposizioni_costi WHERE movimento_id % 2 = 0")
+            conn.commit()
+            assert ricostruisci(conn, blocco=3) == len(prima)
+
+        assert [tuple(row)[:4] for row in _tutti()] == [tuple(row)[:4] for row in prima]
+
+    @pytest.mark.parametrize("argv", [
+        ["rebuild", "0"], ["rebuild", "-5"], ["rebuild", "mille"], ["rebuild", "1.5"]
+    ])
+    def test_dimensione_blocco_non_valida(self, db, capsys, argv):
+        assert main(argv) == 2
+        assert "Uso:" in capsys.readouterr().out
+
+
+class TestTotali:
+
+    def test_somma_per_componente(self, client, veicolo):
+        _rifornimento(client, veicolo, data="2025-12-20", km=200)
+        _rifornimento(client, veicolo, data="2026-01-10", km=300)
+        _rifornimento(client, veicolo, data="2026-02-10", km=500)
+
+        risposta = client.get("/api/beni/componenti-costo", params={
+            "tipo": "veicolo", "data_inizio": "2026-01-01", "data_fine": "2026-12-31"
+        })
+
+        assert risposta.status_code == 200
+        totali = risposta.json()
+        assert totali['componenti']['usura'] == 64.0
+        assert totali['componenti']['carburante'] == 80.0
+        assert totali['beni'][0]['bene_id'] == veicolo
+        assert totali['beni'][0]['movimenti'] == 2
+        assert totali['totale'] == round(sum(totali['componenti'].values()), 2)
+
+    def test_movimenti_distinti_per_bene(self, client, veicolo):
+        """Componenti diversi su movimenti diversi: ogni movimento conta una volta"""
+        with get_db_connection() as conn:
+            movimenti = [
+                conn.execute(
+                    "INSERT INTO movimenti (data, importo, tipo, descrizione, bene_id) VALUES (?, ?, ?, ?, ?)",
+                    ("2026-03-0%d" % giorno, 10, 'uscita', "Manutenzione", veicolo)
+                ).lastrowid
+                for giorno in (1, 2)
+            ]
+            conn.executemany(
+                """
+                INSERT INTO scomposizioni_costi (movimento_id, bene_id, nome_componente, valore_componente)
+                VALUES (?, ?, ?, 10)
+                """,
+                [(movimenti[0], veicolo, 'carburante'), (movimenti[1], veicolo, 'usura')]
+            )
+            conn.commit()
+
+        totali = client.get("/api/beni/componenti-costo", params={"bene_id": veicolo}).json()
+
+        assert totali['beni'][0]['movimenti'] == 2
+
+    def test_tco_con_componenti(self, client, veicolo):
+        _rifornimento(client, veicolo)
+
+        tco = client.get(f"/api/beni/{veicolo}/tco").json()
+
+        assert tco['componenti']['usura'] == 24.0
+
+    def test_periodo_non_valido(self, client):
+        risposta = client.get("/api/beni/componenti-costo", params={
+            "data_inizio": "2026-02-01", "data_fine": "2026-01-01"
+        })
+
+        assert risposta.status_code == 400
+
+
+class TestScomposizioneSuRichiesta:
+
+    def test_calcolata_se_non_salvata(self, client, veicolo):
+        with get_db_connection() as conn:
+            movimento_id = conn.execute(
+                """
+                INSERT INTO movimenti (data, importo, tipo, descrizione, bene_id, km_percorsi)
+                VALUES ('2026-03-05', 40, 'uscita', 'Rifornimento', ?, 300)
+                """,
+                (veicolo,)
+            ).lastrowid
+            conn.commit()
+
+        risposta = client.get(f"/api/movimenti/{movimento_id}/scomposizione")
+
+        assert risposta.status_code == 200
+        assert risposta.json()['costo_diretto'] == 40
+        assert _componenti(movimento_id) == {}
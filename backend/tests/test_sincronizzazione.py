@@ -0,0 +1,86 @@
+"""Test per la sincronizzazione incrementale"""
+
+from backend.database import get_db_connection
+from backend.services.movimenti_bulk import importa_movimenti
+
+
+def _sync(client, token=None, limit=None):
+    params = {}
+    if token is not None:
+        params['token'] = token
+    if limit is not None:
+        params['limit'] = limit
+    risposta = client.get("/api/sync", params=params)
+    assert risposta.status_code == 200
+    return risposta.json()
+
+
+def _nuovo_movimento(client, descrizione="Spesa"):
+    return client.post("/api/movimenti", json={
+        "data": "2026-03-05", "importo": 40, "tipo": "uscita", "descrizione": descrizione
+    }).json()
+
+
+class TestSync:
+
+    def test_prima_sincronizzazione_completa(self, client):
+        dati = _sync(client)
+
+        assert dati['reset'] is False
+        assert dati['has_more'] is False
+        with get_db_connection() as conn:
+            n_categorie = conn.execute("SELECT COUNT(*) FROM categorie").fetchone()[0]
+        assert len(dati['tabelle']['categorie']['aggiornati']) == n_categorie
+
+    def test_solo_differenze_e_tombstone(self, client):
+        token = _sync(client)['token']
+        assert _sync(client, token)['tabelle'] == {}
+
+        movimento = _nuovo_movimento(client)
+        client.put(f"/api/movimenti/{movimento['id']}", json={'descrizione': "Spesa Coop"})
+        dati = _sync(client, token)
+
+        aggiornati = dati['tabelle']['movimenti']['aggiornati']
+        assert [m['descrizione'] for m in aggiornati] == ["Spesa Coop"]
+        assert dati['tabelle']['movimenti']['eliminati'] == []
+
+        client.delete(f"/api/movimenti/{movimento['id']}")
+        dati = _sync(client, dati['token'])
+
+        assert dati['tabelle']['movimenti'] == {'aggiornati': [], 'eliminati': [movimento['id']]}
+
+    def test_paginazione(self, client):
+        token = _sync(client)['token']
+        for i in range(5):
+            _nuovo_movimento(client, f"Spesa {i}")
+
+        descrizioni = []
+        while True:
+            dati = _sync(client, token, limit=2)
+            descrizioni += [m['descrizione'] for m in dati['tabelle'].get('movimenti', {}).get('aggiornati', [])]
+            token = dati['token']
+            if not dati['has_more']:
+                break
+
+        assert descrizioni == [f"Spesa {i}" for i in range(5)]
+
+    def test_importazione_massiva_registrata(self, client):
+        token = _sync(client)['token']
+        with get_db_connection() as conn:
+            importa_movimenti(conn, [
+                {'data': "2026-03-01", 'importo': 5, 'tipo': 'uscita', 'descrizione': f"M{i}"}
+                for i in range(3)
+            ], ricostruisci_indici=True)
+
+        dati = _sync(client, token)
+
+        assert len(dati['tabelle']['movimenti']['aggiornati']) == 3
+
+    def test_token_di_altro_database(self, client):
+        dati = _sync(client, "1:99999999")
+
+        assert dati['reset'] is True
+        assert 'categorie' in dati['tabelle']
+
+    def test_token_malformato(self, client):
+        assert client.get("/api/sync?token=abc").status_code == 400
@@ -0,0 +1,162 @@
+"""Test per il calcolo della spesa dei budget"""
+
+from datetime import date, timedelta
+
+from backend.database import get_db_connection
+from backend.services.spese_budget import calcola_spese, inizio_periodo, stato_budget
+
+
+def _spesa_attesa(conn, budget_id, categoria_id, periodo, oggi):
+    """Regola di priorità calcolata budget per budget, direttamente sui movimenti"""
+    inizio = inizio_periodo(periodo, oggi).isoformat()
+    esplicita = conn.execute(
+        """
+        SELECT COALESCE(SUM(ABS(importo)), 0) FROM movimenti
+        WHERE budget_id = ? AND tipo = 'uscita' AND data_giorno >= ?
+        """,
+        (budget_id, inizio)
+    ).fetchone()[0]
+    categoria = conn.execute(
+        """
+        SELECT COALESCE(SUM(ABS(importo)), 0) FROM movimenti
+        WHERE categoria_id = ? AND budget_id IS NULL AND tipo = 'uscita' AND data_giorno >= ?
+        """,
+        (categoria_id, inizio)
+    ).fetchone()[0]
+    return round(esplicita + categoria, 2)
+
+
+class TestInizioPeriodo:
+
+    def test_periodi(self):
+        oggi = date(2026, 10, 17)
+
+        assert inizio_periodo('settimanale', oggi) == date(2026, 10, 10)
+        assert inizio_periodo('mensile', oggi) == date(2026, 10, 1)
+        assert inizio_periodo('annuale', oggi) == date(2026, 1, 1)
+
+
+class TestCalcolaSpese:
+
+    def test_regola_priorita(self, db):
+        oggi = date.today()
+
+        with get_db_connection() as conn:
+            conn.execute("UPDATE budget SET attivo = 0")
+            categorie = [r[0] for r in conn.execute("SELECT id FROM categorie WHERE tipo = 'uscita' LIMIT 3")]
+
+            budget = []
+            for categoria_id, periodo in zip(categorie, ('mensile', 'settimanale', 'annuale')):
+                budget_id = conn.execute(
+                    "INSERT INTO budget (categoria_id, importo, periodo) VALUES (?, 500, ?)",
+                    (categoria_id, periodo)
+                ).lastrowid
+                budget.append((budget_id, categoria_id, periodo))
+
+            giorni = [oggi - timedelta(days=d) for d in (0, 3, 6, 8, 20, 40, 400)]
+            for i, giorno in enumerate(giorni):
+                for budget_id, categoria_id, _ in budget:
+                    # esplicito, fallback per categoria, importo negativo, entrata ignorata
+                    for importo, tipo, con_budget in ((10 + i, 'uscita', True), (5.5, 'uscita', False),
+                                                      (-3.25, 'uscita', False), (99, 'entrata', False)):
+                        conn.execute(
+                            """
+                            INSERT INTO movimenti (data, importo, tipo, categoria_id, budget_id, descrizione)
+                            VALUES (?, ?, ?, ?, ?, 'test')
+                            """,
+                            (giorno.isoformat(), importo, tipo, categoria_id, budget_id if con_budget else None)
+                        )
+            conn.commit()
+
+            spese = calcola_spese(conn)
+
+            assert set(spese) == {b[0] for b in budget}
+            for budget_id, categoria_id, periodo in budget:
+                assert spese[budget_id] == _spesa_attesa(conn, budget_id, categoria_id, periodo, oggi)
+
+            assert calcola_spese(conn, budget_ids=[budget[0][0]]) == {budget[0][0]: spese[budget[0][0]]}
+            assert calcola_spese(conn, budget_ids=[]) == {}
+
+    def test_numero_query_costante(self, client, query_tracciate):
+        with get_db_connection() as conn:
+            categoria_id = conn.execute("SELECT id FROM categorie WHERE tipo = 'uscita'").fetchone()[0]
+            conn.executemany(
+                "INSERT INTO budget (categoria_id, importo, periodo) VALUES (?, 100, 'mensile')",
+                [(categoria_id,)] * 50
+            )
+            conn.commit()
+        query_tracciate.clear()
+
+        risposta = client.get("/api/budget")
+        query = [
+            sql for sql in query_tracciate
+            if not sql.startswith("PRAGMA") and sql != "SELECT 1" and "versioni_tabelle" not in sql
+        ]
+
+        assert risposta.status_code == 200
+        assert len(risposta.json()["budget"]) > 50
+        assert len(query) == 2
+
+
+class TestStatoBudget:
+
+    def test_soglie(self):
+        assert stato_budget(100, 80) == 'superato'
+        assert stato_budget(85, 80) == 'attenzione'
+        assert stato_budget(85, 90) == 'ok'
+        assert stato_budget(80, None) == 'attenzione'
+
+
+class TestStoricoBudget:
+
+    def test_storico_multi_budget(self, client, query_tracciate):
+        oggi = date.today()
+        mese_scorso = (oggi.replace(day=1) - timedelta(days=1)).replace(day=10)
+
+        with get_db_connection() as conn:
+            budget = [
+                (r[0], r[1])
+                for r in conn.execute("SELECT id, categoria_id FROM budget WHERE attivo = 1 ORDER BY id")
+            ]
+            for budget_id, categoria_id in budget[:2]:
+                conn.execute(
+                    """
+                    INSERT INTO movimenti (data, importo, tipo, categoria_id, descrizione)
+                    VALUES (?, 40, 'uscita', ?, 'categoria')
+                    """,
+                    (mese_scorso.isoformat(), categoria_id)
+                )
+                conn.execute(
+                    """
+                    INSERT INTO movimenti (data, importo, tipo, categoria_id, budget_id, descrizione)
+                    VALUES (?, 15, 'uscita', ?, ?, 'esplicito')
+                    """,
+                    (mese_scorso.isoformat(), categoria_id, budget_id)
+                )
+            conn.commit()
+        query_tracciate.clear()
+
+        ids = ",".join(str(b[0]) for b in budget)
+        risposta = client.get(f"/api/budget/history?ids={ids}&mesi=12")
+        query = [
+            sql for sql in query_tracciate
+            if not sql.startswith("PRAGMA") and sql != "SELECT 1" and "versioni_tabelle" not in sql
+        ]
+
+        assert risposta.status_code == 200
+        storici = risposta.json()["storici"]
+        assert [s["budget"]["id"] for s in storici] == [b[0] for b in budget]
+        assert len(query) == 2
+
+        for storico in storici:
+            assert len(storico["history"]) == 12
+            assert storico == client.get(f"/api/budget/{storico['budget']['id']}/history?mesi=12").json()
+
+        penultimo = storici[0]["history"][-2]
+        assert (penultimo["anno"], penultimo["mese"]) == (mese_scorso.year, mese_scorso.month)
+        assert penultimo["spesa"] >= 55
+        assert storici[0]["history"][0]["spesa"] == 0
+
+    def test_storico_budget_inesistente(self, client):
+        assert client.get("/api/budget/history?ids=1,99999").status_code == 404
+        assert client.get("/api/budget/history?ids=abc").status_code == 400
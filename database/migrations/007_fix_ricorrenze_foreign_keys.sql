@@ -0,0 +1,88 @@
+-- Migration 007: Correggi le foreign key di movimenti_ricorrenti
+-- Data: 2026-10-17
+--
+-- La migration 005 referenziava la tabella inesistente obiettivi(id).
+-- Con PRAGMA foreign_keys = ON (impostato dal pool di connessioni) ogni
+-- INSERT su movimenti_ricorrenti fallirebbe con "no such table: main.obiettivi".
+-- SQLite non permette di modificare un vincolo esistente, quindi la tabella
+-- viene ricostruita. I riferimenti orfani vengono azzerati durante la copia.
+
+CREATE TABLE movimenti_ricorrenti_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+
+    -- Template movimento
+    descrizione TEXT NOT NULL,
+    importo REAL NOT NULL,
+    tipo TEXT NOT NULL CHECK(tipo IN ('entrata', 'uscita')),
+
+    -- Ricorrenza
+    frequenza TEXT NOT NULL CHECK(frequenza IN ('giornaliera', 'settimanale', 'mensile', 'annuale')),
+    giorno_mese INTEGER CHECK(giorno_mese BETWEEN 1 AND 31),
+    giorno_settimana INTEGER CHECK(giorno_settimana BETWEEN 0 AND 6),
+    mese INTEGER CHECK(mese BETWEEN 1 AND 12),
+
+    -- Scheduling
+    data_inizio DATE NOT NULL DEFAULT CURRENT_DATE,
+    data_fine DATE,
+    prossima_data DATE NOT NULL,
+
+    -- Stato
+    attivo BOOLEAN NOT NULL DEFAULT 1,
+
+    -- Collegamenti (come movimenti normali)
+    conto_id INTEGER,
+    categoria_id INTEGER,
+    budget_id INTEGER,
+    obiettivo_id INTEGER,
+    bene_id INTEGER,
+
+    -- Metadata
+    note TEXT,
+    data_creazione TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    data_modifica TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    -- Foreign Keys
+    FOREIGN KEY (conto_id) REFERENCES conti(id) ON DELETE SET NULL,
+    FOREIGN KEY (categoria_id) REFERENCES categorie(id) ON DELETE SET NULL,
+    FOREIGN KEY (budget_id) REFERENCES budget(id) ON DELETE SET NULL,
+    FOREIGN KEY (obiettivo_id) REFERENCES obiettivi_risparmio(id) ON DELETE SET NULL,
+    FOREIGN KEY (bene_id) REFERENCES beni(id) ON DELETE SET NULL
+);
+
+INSERT INTO movimenti_ricorrenti_new (
+    id, descrizione, importo, tipo, frequenza,
+    giorno_mese, giorno_settimana, mese,
+    data_inizio, data_fine, prossima_data, attivo,
+    conto_id, categoria_id, budget_id, obiettivo_id, bene_id,
+    note, data_creazione, data_modifica
+)
+SELECT
+    r.id, r.descrizione, r.importo, r.tipo, r.frequenza,
+    r.giorno_mese, r.giorno_settimana, r.mese,
+    r.data_inizio, r.data_fine, r.prossima_data, r.attivo,
+    (SELECT id FROM conti WHERE id = r.conto_id),
+    (SELECT id FROM categorie WHERE id = r.categoria_id),
+    (SELECT id FROM budget WHERE id = r.budget_id),
+    (SELECT id FROM obiettivi_risparmio WHERE id = r.obiettivo_id),
+    (SELECT id FROM beni WHERE id = r.bene_id),
+    r.note, r.data_creazione, r.data_modifica
+FROM movimenti_ricorrenti r;
+
+DROP TABLE movimenti_ricorrenti;
+
+ALTER TABLE movimenti_ricorrenti_new RENAME TO movimenti_ricorrenti;
+
+-- Indici per performance
+CREATE INDEX IF NOT EXISTS idx_ricorrenze_prossima_data ON movimenti_ricorrenti(prossima_data);
+CREATE INDEX IF NOT EXISTS idx_ricorrenze_attivo ON movimenti_ricorrenti(attivo);
+CREATE INDEX IF NOT EXISTS idx_ricorrenze_conto ON movimenti_ricorrenti(conto_id);
+CREATE INDEX IF NOT EXISTS idx_ricorrenze_tipo ON movimenti_ricorrenti(tipo);
+
+-- Trigger per aggiornare data_modifica
+CREATE TRIGGER IF NOT EXISTS update_ricorrenze_timestamp
+AFTER UPDATE ON movimenti_ricorrenti
+BEGIN
+    UPDATE movimenti_ricorrenti
+    SET data_modifica = CURRENT_TIMESTAMP
+    WHERE id = NEW.id;
+END;
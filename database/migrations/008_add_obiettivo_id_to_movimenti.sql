@@ -0,0 +1,11 @@
+-- Migration 008: Colonna movimenti.obiettivo_id
+-- Data: 2026-10-17
+--
+-- Separata dalla riparazione di budget e obiettivi (008_repair): la colonna
+-- può essere già stata aggiunta da migrate.py, migrate_obiettivo.py o
+-- backend/migrations/add_obiettivo_id_to_movimenti.sql, e in quel caso la
+-- migration viene saltata senza impedire la riparazione.
+
+ALTER TABLE movimenti ADD COLUMN obiettivo_id INTEGER REFERENCES obiettivi_risparmio(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_movimenti_obiettivo ON movimenti(obiettivo_id);
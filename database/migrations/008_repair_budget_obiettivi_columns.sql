@@ -0,0 +1,20 @@
+-- Migration 008: Ripristina le colonne della migration 004_enhance
+-- Data: 2026-10-17
+--
+-- 004_enhance_budget_obiettivi.sql inizia con un ALTER su movimenti.budget_id,
+-- colonna già aggiunta da 004_add_budget_id_to_movimenti.sql: l'errore
+-- "duplicate column name" interrompe lo script alla prima istruzione e le
+-- colonne successive non vengono mai create sui database nuovi.
+-- Se la prima colonna esiste già la migration viene saltata per intero: per
+-- questo inizia da budget.data_fine, aggiunta solo da 004_enhance, e
+-- movimenti.obiettivo_id (creata anche da altri script) è in
+-- 008_add_obiettivo_id_to_movimenti.sql.
+
+ALTER TABLE budget ADD COLUMN data_fine TIMESTAMP;
+ALTER TABLE budget ADD COLUMN soglia_avviso INTEGER DEFAULT 80 CHECK(soglia_avviso BETWEEN 1 AND 100);
+ALTER TABLE budget ADD COLUMN descrizione TEXT;
+
+ALTER TABLE obiettivi_risparmio ADD COLUMN descrizione TEXT;
+ALTER TABLE obiettivi_risparmio ADD COLUMN categoria_id INTEGER REFERENCES categorie(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_obiettivi_categoria ON obiettivi_risparmio(categoria_id);
@@ -0,0 +1,25 @@
+-- Migration 009: Chiave data normalizzata e indici compositi per movimenti
+-- Data: 2026-10-17
+--
+-- movimenti.data contiene sia 'YYYY-MM-DD' sia 'YYYY-MM-DD HH:MM:SS', per cui
+-- le query filtravano con date(data): una funzione sulla colonna impedisce
+-- l'uso di qualunque indice e ogni dashboard eseguiva un full scan.
+-- data_giorno è una colonna generata (VIRTUAL, nessun backfill necessario)
+-- sempre uguale a date(data), su cui gli indici fanno range scan.
+
+ALTER TABLE movimenti ADD COLUMN data_giorno TEXT GENERATED ALWAYS AS (date(data)) VIRTUAL;
+
+-- Range scan per periodo (trend, confronti, esportazioni)
+CREATE INDEX IF NOT EXISTS idx_movimenti_giorno ON movimenti(data_giorno);
+
+-- Totali entrate/uscite del periodo: indice coprente, nessun accesso alla tabella
+CREATE INDEX IF NOT EXISTS idx_movimenti_tipo_giorno ON movimenti(tipo, data_giorno, importo);
+
+-- Spese per categoria e budget (fallback per categoria)
+CREATE INDEX IF NOT EXISTS idx_movimenti_categoria_tipo_giorno ON movimenti(categoria_id, tipo, data_giorno);
+
+-- Spese con budget esplicito
+CREATE INDEX IF NOT EXISTS idx_movimenti_budget_tipo_giorno ON movimenti(budget_id, tipo, data_giorno);
+
+-- Costi nel tempo di un bene
+CREATE INDEX IF NOT EXISTS idx_movimenti_bene_tipo_giorno ON movimenti(bene_id, tipo, data_giorno);
@@ -0,0 +1,132 @@
+-- Migration 010: Aggregato mensile dei movimenti
+-- Data: 2026-10-17
+--
+-- Somme e conteggi per (mese, tipo, categoria, conto, bene, budget, obiettivo),
+-- mantenuti dai trigger su movimenti: ogni percorso di scrittura (routes,
+-- trasferimenti, scheduler ricorrenze) resta allineato senza codice aggiuntivo.
+-- I riferimenti assenti sono salvati come 0 perché NULL non è confrontabile
+-- nella chiave primaria.
+-- Per rigenerarlo da zero: python -m backend.services.aggregati_mensili rebuild
+
+CREATE TABLE movimenti_mensili (
+    mese TEXT NOT NULL,                          -- 'YYYY-MM'
+    tipo TEXT NOT NULL,
+    categoria_id INTEGER NOT NULL DEFAULT 0,
+    conto_id INTEGER NOT NULL DEFAULT 0,
+    bene_id INTEGER NOT NULL DEFAULT 0,
+    budget_id INTEGER NOT NULL DEFAULT 0,
+    obiettivo_id INTEGER NOT NULL DEFAULT 0,
+
+    totale REAL NOT NULL DEFAULT 0,              -- SUM(importo)
+    totale_abs REAL NOT NULL DEFAULT 0,          -- SUM(ABS(importo))
+    conteggio INTEGER NOT NULL DEFAULT 0,        -- COUNT(*)
+
+    PRIMARY KEY (mese, tipo, categoria_id, conto_id, bene_id, budget_id, obiettivo_id)
+) WITHOUT ROWID;
+
+-- Popolamento iniziale dallo storico esistente
+INSERT INTO movimenti_mensili (
+    mese, tipo, categoria_id, conto_id, bene_id, budget_id, obiettivo_id,
+    totale, totale_abs, conteggio
+)
+SELECT
+    IFNULL(strftime('%Y-%m', data), substr(data, 1, 7)),
+    tipo,
+    IFNULL(categoria_id, 0), IFNULL(conto_id, 0), IFNULL(bene_id, 0),
+    IFNULL(budget_id, 0), IFNULL(obiettivo_id, 0),
+    SUM(importo), SUM(ABS(importo)), COUNT(*)
+FROM movimenti
+GROUP BY 1, 2, 3, 4, 5, 6, 7;
+
+-- ============================================================================
+-- Trigger di manutenzione
+-- ============================================================================
+
+CREATE TRIGGER IF NOT EXISTS movimenti_mensili_insert
+AFTER INSERT ON movimenti
+BEGIN
+    INSERT INTO movimenti_mensili (
+        mese, tipo, categoria_id, conto_id, bene_id, budget_id, obiettivo_id,
+        totale, totale_abs, conteggio
+    )
+    VALUES (
+        IFNULL(strftime('%Y-%m', NEW.data), substr(NEW.data, 1, 7)),
+        NEW.tipo,
+        IFNULL(NEW.categoria_id, 0), IFNULL(NEW.conto_id, 0), IFNULL(NEW.bene_id, 0),
+        IFNULL(NEW.budget_id, 0), IFNULL(NEW.obiettivo_id, 0),
+        NEW.importo, ABS(NEW.importo), 1
+    )
+    ON CONFLICT (mese, tipo, categoria_id, conto_id, bene_id, budget_id, obiettivo_id) DO UPDATE SET
+        totale = totale + excluded.totale,
+        totale_abs = totale_abs + excluded.totale_abs,
+        conteggio = conteggio + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS movimenti_mensili_delete
+AFTER DELETE ON movimenti
+BEGIN
+    UPDATE movimenti_mensili
+    SET totale = totale - OLD.importo,
+        totale_abs = totale_abs - ABS(OLD.importo),
+        conteggio = conteggio - 1
+    WHERE mese = IFNULL(strftime('%Y-%m', OLD.data), substr(OLD.data, 1, 7))
+    AND tipo = OLD.tipo
+    AND categoria_id = IFNULL(OLD.categoria_id, 0)
+    AND conto_id = IFNULL(OLD.conto_id, 0)
+    AND bene_id = IFNULL(OLD.bene_id, 0)
+    AND budget_id = IFNULL(OLD.budget_id, 0)
+    AND obiettivo_id = IFNULL(OLD.obiettivo_id, 0);
+
+    DELETE FROM movimenti_mensili
+    WHERE mese = IFNULL(strftime('%Y-%m', OLD.data), substr(OLD.data, 1, 7))
+    AND tipo = OLD.tipo
+    AND categoria_id = IFNULL(OLD.categoria_id, 0)
+    AND conto_id = IFNULL(OLD.conto_id, 0)
+    AND bene_id = IFNULL(OLD.bene_id, 0)
+    AND budget_id = IFNULL(OLD.budget_id, 0)
+    AND obiettivo_id = IFNULL(OLD.obiettivo_id, 0)
+    AND conteggio <= 0;
+END;
+
+-- Un UPDATE sposta il movimento: tolto dal gruppo vecchio, aggiunto al nuovo
+CREATE TRIGGER IF NOT EXISTS movimenti_mensili_update
+AFTER UPDATE OF data, importo, tipo, categoria_id, conto_id, bene_id, budget_id, obiettivo_id ON movimenti
+BEGIN
+    UPDATE movimenti_mensili
+    SET totale = totale - OLD.importo,
+        totale_abs = totale_abs - ABS(OLD.importo),
+        conteggio = conteggio - 1
+    WHERE mese = IFNULL(strftime('%Y-%m', OLD.data), substr(OLD.data, 1, 7))
+    AND tipo = OLD.tipo
+    AND categoria_id = IFNULL(OLD.categoria_id, 0)
+    AND conto_id = IFNULL(OLD.conto_id, 0)
+    AND bene_id = IFNULL(OLD.bene_id, 0)
+    AND budget_id = IFNULL(OLD.budget_id, 0)
+    AND obiettivo_id = IFNULL(OLD.obiettivo_id, 0);
+
+    DELETE FROM movimenti_mensili
+    WHERE mese = IFNULL(strftime('%Y-%m', OLD.data), substr(OLD.data, 1, 7))
+    AND tipo = OLD.tipo
+    AND categoria_id = IFNULL(OLD.categoria_id, 0)
+    AND conto_id = IFNULL(OLD.conto_id, 0)
+    AND bene_id = IFNULL(OLD.bene_id, 0)
+    AND budget_id = IFNULL(OLD.budget_id, 0)
+    AND obiettivo_id = IFNULL(OLD.obiettivo_id, 0)
+    AND conteggio <= 0;
+
+    INSERT INTO movimenti_mensili (
+        mese, tipo, categoria_id, conto_id, bene_id, budget_id, obiettivo_id,
+        totale, totale_abs, conteggio
+    )
+    VALUES (
+        IFNULL(strftime('%Y-%m', NEW.data), substr(NEW.data, 1, 7)),
+        NEW.tipo,
+        IFNULL(NEW.categoria_id, 0), IFNULL(NEW.conto_id, 0), IFNULL(NEW.bene_id, 0),
+        IFNULL(NEW.budget_id, 0), IFNULL(NEW.obiettivo_id, 0),
+        NEW.importo, ABS(NEW.importo), 1
+    )
+    ON CONFLICT (mese, tipo, categoria_id, conto_id, bene_id, budget_id, obiettivo_id) DO UPDATE SET
+        totale = totale + excluded.totale,
+        totale_abs = totale_abs + excluded.totale_abs,
+        conteggio = conteggio + 1;
+END;
@@ -0,0 +1,15 @@
+-- Migration 011: Indici per la paginazione a cursore dei movimenti
+-- Data: 2026-10-17
+--
+-- La paginazione keyset ordina per (data, id) oppure (importo, id). L'id è
+-- il rowid, incluso in coda a ogni indice in ordine crescente: un indice
+-- (data DESC) restituisce (data DESC, id ASC) e obbliga a un ordinamento
+-- temporaneo, mentre un indice crescente letto all'indietro copre sia
+-- ASC, ASC sia DESC, DESC.
+
+CREATE INDEX IF NOT EXISTS idx_movimenti_data_id ON movimenti(data, id);
+CREATE INDEX IF NOT EXISTS idx_movimenti_importo ON movimenti(importo);
+CREATE INDEX IF NOT EXISTS idx_movimenti_conto_data ON movimenti(conto_id, data);
+
+-- Sostituito da idx_movimenti_data_id
+DROP INDEX IF EXISTS idx_movimenti_data;
@@ -0,0 +1,13 @@
+-- Migration 012: Rimuove gli indici ridondanti di movimenti
+-- Data: 2026-10-17
+--
+-- Ogni indice rallenta tutte le scritture (import massivi compresi). Gli
+-- indici su una sola colonna sotto sono prefissi degli indici compositi
+-- delle migration 009 e 011, che li sostituiscono sia nelle query sia nel
+-- controllo delle foreign key.
+
+DROP INDEX IF EXISTS idx_movimenti_tipo;        -- idx_movimenti_tipo_giorno
+DROP INDEX IF EXISTS idx_movimenti_categoria;   -- idx_movimenti_categoria_tipo_giorno
+DROP INDEX IF EXISTS idx_movimenti_bene;        -- idx_movimenti_bene_tipo_giorno
+DROP INDEX IF EXISTS idx_movimenti_budget;      -- idx_movimenti_budget_tipo_giorno
+DROP INDEX IF EXISTS idx_movimenti_conto;       -- idx_movimenti_conto_data
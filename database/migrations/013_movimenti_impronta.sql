@@ -0,0 +1,15 @@
+-- Migration 013: Impronta dei movimenti importati da estratto conto
+-- Data: 2026-10-17
+--
+-- L'impronta è un hash di (conto_id, data, importo, descrizione) più il
+-- numero di occorrenza della stessa combinazione nel file. L'indice UNIQUE
+-- parziale rende la reimportazione dello stesso estratto un semplice probe
+-- per riga (INSERT ... ON CONFLICT DO NOTHING). I movimenti inseriti a mano
+-- non hanno impronta e non sono vincolati.
+
+-- Prima istruzione non idempotente: se la colonna esiste già il resto del
+-- file viene saltato
+ALTER TABLE movimenti ADD COLUMN impronta TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_movimenti_impronta
+    ON movimenti(impronta) WHERE impronta IS NOT NULL;
@@ -0,0 +1,71 @@
+-- Migration 014: Ricerca full-text sui movimenti (FTS5)
+-- Data: 2026-10-17
+--
+-- movimenti_fts indicizza descrizione e note del movimento e i nomi di
+-- categoria e conto, con rowid = movimenti.id. I trigger la tengono allineata
+-- sia alle modifiche dei movimenti sia ai cambi di nome di categorie e conti.
+-- Tokenizer unicode61 senza accenti ("caffe" trova "caffè"), indici dei
+-- prefissi di 2 e 3 caratteri per le ricerche mentre si digita.
+
+-- Prima istruzione non idempotente: se la colonna esiste già il resto del
+-- file viene saltato
+ALTER TABLE movimenti ADD COLUMN note TEXT;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS movimenti_fts USING fts5(
+    descrizione,
+    note,
+    categoria,
+    conto,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+INSERT INTO movimenti_fts (rowid, descrizione, note, categoria, conto)
+SELECT m.id, m.descrizione, m.note, c.nome, co.nome
+FROM movimenti m
+LEFT JOIN categorie c ON m.categoria_id = c.id
+LEFT JOIN conti co ON m.conto_id = co.id;
+
+CREATE TRIGGER IF NOT EXISTS movimenti_fts_insert
+AFTER INSERT ON movimenti
+BEGIN
+    INSERT INTO movimenti_fts (rowid, descrizione, note, categoria, conto)
+    VALUES (
+        NEW.id,
+        NEW.descrizione,
+        NEW.note,
+        (SELECT nome FROM categorie WHERE id = NEW.categoria_id),
+        (SELECT nome FROM conti WHERE id = NEW.conto_id)
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS movimenti_fts_delete
+AFTER DELETE ON movimenti
+BEGIN
+    DELETE FROM movimenti_fts WHERE rowid = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS movimenti_fts_update
+AFTER UPDATE OF descrizione, note, categoria_id, conto_id ON movimenti
+BEGIN
+    UPDATE movimenti_fts SET
+        descrizione = NEW.descrizione,
+        note = NEW.note,
+        categoria = (SELECT nome FROM categorie WHERE id = NEW.categoria_id),
+        conto = (SELECT nome FROM conti WHERE id = NEW.conto_id)
+    WHERE rowid = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS movimenti_fts_categoria_nome
+AFTER UPDATE OF nome ON categorie
+BEGIN
+    UPDATE movimenti_fts SET categoria = NEW.nome
+    WHERE rowid IN (SELECT id FROM movimenti WHERE categoria_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS movimenti_fts_conto_nome
+AFTER UPDATE OF nome ON conti
+BEGIN
+    UPDATE movimenti_fts SET conto = NEW.nome
+    WHERE rowid IN (SELECT id FROM movimenti WHERE conto_id = NEW.id);
+END;
@@ -0,0 +1,143 @@
+-- Migration 015: Contatori di versione per tabella
+-- Data: 2026-10-17
+--
+-- Ogni scrittura (INSERT, UPDATE, DELETE) su una tabella di dominio
+-- incrementa il suo contatore in versioni_tabelle, qualunque sia il percorso
+-- che la esegue: API, scheduler delle ricorrenze, importazioni da riga di
+-- comando. Le cache delle risposte confrontano questi contatori per sapere
+-- se i dati sono cambiati, con una lettura per chiave primaria.
+
+-- Prima istruzione non idempotente: se la tabella esiste già il resto del
+-- file viene saltato
+CREATE TABLE versioni_tabelle (
+    tabella TEXT PRIMARY KEY,
+    versione INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT INTO versioni_tabelle (tabella) VALUES
+    ('movimenti'),
+    ('conti'),
+    ('categorie'),
+    ('budget'),
+    ('obiettivi_risparmio'),
+    ('beni'),
+    ('movimenti_ricorrenti');
+
+-- movimenti
+CREATE TRIGGER IF NOT EXISTS versione_movimenti_insert
+AFTER INSERT ON movimenti
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'movimenti';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_movimenti_update
+AFTER UPDATE ON movimenti
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'movimenti';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_movimenti_delete
+AFTER DELETE ON movimenti
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'movimenti';
+END;
+
+-- conti
+CREATE TRIGGER IF NOT EXISTS versione_conti_insert
+AFTER INSERT ON conti
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'conti';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_conti_update
+AFTER UPDATE ON conti
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'conti';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_conti_delete
+AFTER DELETE ON conti
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'conti';
+END;
+
+-- categorie
+CREATE TRIGGER IF NOT EXISTS versione_categorie_insert
+AFTER INSERT ON categorie
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'categorie';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_categorie_update
+AFTER UPDATE ON categorie
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'categorie';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_categorie_delete
+AFTER DELETE ON categorie
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'categorie';
+END;
+
+-- budget
+CREATE TRIGGER IF NOT EXISTS versione_budget_insert
+AFTER INSERT ON budget
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'budget';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_budget_update
+AFTER UPDATE ON budget
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'budget';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_budget_delete
+AFTER DELETE ON budget
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'budget';
+END;
+
+-- obiettivi_risparmio
+CREATE TRIGGER IF NOT EXISTS versione_obiettivi_risparmio_insert
+AFTER INSERT ON obiettivi_risparmio
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'obiettivi_risparmio';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_obiettivi_risparmio_update
+AFTER UPDATE ON obiettivi_risparmio
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'obiettivi_risparmio';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_obiettivi_risparmio_delete
+AFTER DELETE ON obiettivi_risparmio
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'obiettivi_risparmio';
+END;
+
+-- beni
+CREATE TRIGGER IF NOT EXISTS versione_beni_insert
+AFTER INSERT ON beni
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'beni';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_beni_update
+AFTER UPDATE ON beni
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'beni';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_beni_delete
+AFTER DELETE ON beni
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'beni';
+END;
+
+-- movimenti_ricorrenti
+CREATE TRIGGER IF NOT EXISTS versione_movimenti_ricorrenti_insert
+AFTER INSERT ON movimenti_ricorrenti
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'movimenti_ricorrenti';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_movimenti_ricorrenti_update
+AFTER UPDATE ON movimenti_ricorrenti
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'movimenti_ricorrenti';
+END;
+CREATE TRIGGER IF NOT EXISTS versione_movimenti_ricorrenti_delete
+AFTER DELETE ON movimenti_ricorrenti
+BEGIN
+    UPDATE versioni_tabelle SET versione = versione + 1 WHERE tabella = 'movimenti_ricorrenti';
+END;
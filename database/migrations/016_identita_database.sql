@@ -0,0 +1,10 @@
+-- Migration 016: Identità casuale del database
+-- Data: 2026-10-17
+--
+-- Un valore casuale generato alla creazione del database, letto insieme ai
+-- contatori di versione: dopo un reset i contatori ripartono da capo, e senza
+-- questo valore un ETag salvato da un client potrebbe coincidere con uno
+-- nuovo pur descrivendo dati diversi.
+
+INSERT OR IGNORE INTO versioni_tabelle (tabella, versione)
+VALUES ('_database', abs(random()));
@@ -0,0 +1,215 @@
+-- Migration 017: Registro delle modifiche per la sincronizzazione
+-- Data: 2026-10-17
+--
+-- Una riga per ogni record modificato delle tabelle sincronizzate: a ogni
+-- INSERT o UPDATE la riga del record viene sostituita con un nuovo seq, a
+-- ogni DELETE diventa una tombstone. Il registro resta quindi grande quanto
+-- i dati più i record eliminati, e "tutto ciò che è
+-- cambiato dopo seq N" è una scansione per chiave primaria.
+--
+-- I trigger cancellano e reinseriscono invece di usare INSERT OR REPLACE:
+-- dentro un trigger la clausola OR REPLACE viene ignorata quando la modifica
+-- arriva da un'azione di foreign key (ON DELETE SET NULL).
+
+-- Prima istruzione non idempotente: se la tabella esiste già il resto del
+-- file viene saltato
+CREATE TABLE registro_modifiche (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabella TEXT NOT NULL,
+    riga_id INTEGER NOT NULL,
+    operazione TEXT NOT NULL CHECK(operazione IN ('upsert', 'delete'))
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_registro_modifiche_riga
+    ON registro_modifiche(tabella, riga_id);
+
+-- I record esistenti entrano nel registro come prima sincronizzazione
+INSERT OR REPLACE INTO registro_modifiche (tabella, riga_id, operazione)
+SELECT 'movimenti', id, 'upsert' FROM movimenti;
+INSERT OR REPLACE INTO registro_modifiche (tabella, riga_id, operazione)
+SELECT 'conti', id, 'upsert' FROM conti;
+INSERT OR REPLACE INTO registro_modifiche (tabella, riga_id, operazione)
+SELECT 'categorie', id, 'upsert' FROM categorie;
+INSERT OR REPLACE INTO registro_modifiche (tabella, riga_id, operazione)
+SELECT 'budget', id, 'upsert' FROM budget;
+INSERT OR REPLACE INTO registro_modifiche (tabella, riga_id, operazione)
+SELECT 'obiettivi_risparmio', id, 'upsert' FROM obiettivi_risparmio;
+INSERT OR REPLACE INTO registro_modifiche (tabella, riga_id, operazione)
+SELECT 'beni', id, 'upsert' FROM beni;
+INSERT OR REPLACE INTO registro_modifiche (tabella, riga_id, operazione)
+SELECT 'movimenti_ricorrenti', id, 'upsert' FROM movimenti_ricorrenti;
+
+-- movimenti
+CREATE TRIGGER IF NOT EXISTS registro_movimenti_insert
+AFTER INSERT ON movimenti
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'movimenti' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('movimenti', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_movimenti_update
+AFTER UPDATE ON movimenti
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'movimenti' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('movimenti', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_movimenti_delete
+AFTER DELETE ON movimenti
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'movimenti' AND riga_id = OLD.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('movimenti', OLD.id, 'delete');
+END;
+
+-- conti
+CREATE TRIGGER IF NOT EXISTS registro_conti_insert
+AFTER INSERT ON conti
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'conti' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('conti', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_conti_update
+AFTER UPDATE ON conti
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'conti' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('conti', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_conti_delete
+AFTER DELETE ON conti
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'conti' AND riga_id = OLD.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('conti', OLD.id, 'delete');
+END;
+
+-- categorie
+CREATE TRIGGER IF NOT EXISTS registro_categorie_insert
+AFTER INSERT ON categorie
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'categorie' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('categorie', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_categorie_update
+AFTER UPDATE ON categorie
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'categorie' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('categorie', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_categorie_delete
+AFTER DELETE ON categorie
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'categorie' AND riga_id = OLD.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('categorie', OLD.id, 'delete');
+END;
+
+-- budget
+CREATE TRIGGER IF NOT EXISTS registro_budget_insert
+AFTER INSERT ON budget
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'budget' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('budget', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_budget_update
+AFTER UPDATE ON budget
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'budget' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('budget', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_budget_delete
+AFTER DELETE ON budget
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'budget' AND riga_id = OLD.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('budget', OLD.id, 'delete');
+END;
+
+-- obiettivi_risparmio
+CREATE TRIGGER IF NOT EXISTS registro_obiettivi_risparmio_insert
+AFTER INSERT ON obiettivi_risparmio
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'obiettivi_risparmio' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('obiettivi_risparmio', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_obiettivi_risparmio_update
+AFTER UPDATE ON obiettivi_risparmio
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'obiettivi_risparmio' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('obiettivi_risparmio', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_obiettivi_risparmio_delete
+AFTER DELETE ON obiettivi_risparmio
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'obiettivi_risparmio' AND riga_id = OLD.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('obiettivi_risparmio', OLD.id, 'delete');
+END;
+
+-- beni
+CREATE TRIGGER IF NOT EXISTS registro_beni_insert
+AFTER INSERT ON beni
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'beni' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('beni', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_beni_update
+AFTER UPDATE ON beni
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'beni' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('beni', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_beni_delete
+AFTER DELETE ON beni
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'beni' AND riga_id = OLD.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('beni', OLD.id, 'delete');
+END;
+
+-- movimenti_ricorrenti
+CREATE TRIGGER IF NOT EXISTS registro_movimenti_ricorrenti_insert
+AFTER INSERT ON movimenti_ricorrenti
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'movimenti_ricorrenti' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('movimenti_ricorrenti', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_movimenti_ricorrenti_update
+AFTER UPDATE ON movimenti_ricorrenti
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'movimenti_ricorrenti' AND riga_id = NEW.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('movimenti_ricorrenti', NEW.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS registro_movimenti_ricorrenti_delete
+AFTER DELETE ON movimenti_ricorrenti
+BEGIN
+    DELETE FROM registro_modifiche WHERE tabella = 'movimenti_ricorrenti' AND riga_id = OLD.id;
+    INSERT INTO registro_modifiche (tabella, riga_id, operazione)
+    VALUES ('movimenti_ricorrenti', OLD.id, 'delete');
+END;
@@ -0,0 +1,92 @@
+-- Migration 018: Variazioni giornaliere del saldo per conto
+-- Data: 2026-10-17
+--
+-- Una riga per (conto, giorno) con l'effetto netto dei movimenti di quel
+-- giorno sul saldo, mantenuta dai trigger su movimenti. Il saldo a fine
+-- giornata di un giorno qualsiasi è il saldo corrente meno le variazioni dei
+-- giorni successivi, per cui lo storico di un periodo è una lettura per
+-- intervallo sulla chiave primaria, lunga quanto i giorni con movimenti.
+--
+-- L'effetto segue gli aggiornamenti di conti.saldo in tutti i percorsi di
+-- scrittura, indipendentemente dal segno con cui l'importo è salvato:
+-- entrata +ABS(importo), uscita -ABS(importo), trasferimento nessuno.
+-- Per rigenerarla da zero: python -m backend.services.saldi rebuild
+
+CREATE TABLE saldi_giornalieri (
+    conto_id INTEGER NOT NULL,
+    giorno TEXT NOT NULL,                        -- 'YYYY-MM-DD'
+    variazione REAL NOT NULL DEFAULT 0,
+    conteggio INTEGER NOT NULL DEFAULT 0,        -- movimenti del giorno
+    PRIMARY KEY (conto_id, giorno)
+) WITHOUT ROWID;
+
+-- Popolamento iniziale dallo storico esistente
+INSERT INTO saldi_giornalieri (conto_id, giorno, variazione, conteggio)
+SELECT
+    conto_id,
+    data_giorno,
+    SUM(CASE tipo WHEN 'entrata' THEN ABS(importo) WHEN 'uscita' THEN -ABS(importo) ELSE 0 END),
+    COUNT(*)
+FROM movimenti
+WHERE conto_id IS NOT NULL AND data_giorno IS NOT NULL
+GROUP BY conto_id, data_giorno;
+
+-- ============================================================================
+-- Trigger di manutenzione
+-- ============================================================================
+
+CREATE TRIGGER IF NOT EXISTS saldi_giornalieri_insert
+AFTER INSERT ON movimenti
+WHEN NEW.conto_id IS NOT NULL AND NEW.data_giorno IS NOT NULL
+BEGIN
+    INSERT INTO saldi_giornalieri (conto_id, giorno, variazione, conteggio)
+    VALUES (
+        NEW.conto_id,
+        NEW.data_giorno,
+        CASE NEW.tipo WHEN 'entrata' THEN ABS(NEW.importo) WHEN 'uscita' THEN -ABS(NEW.importo) ELSE 0 END,
+        1
+    )
+    ON CONFLICT (conto_id, giorno) DO UPDATE SET
+        variazione = variazione + excluded.variazione,
+        conteggio = conteggio + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS saldi_giornalieri_delete
+AFTER DELETE ON movimenti
+WHEN OLD.conto_id IS NOT NULL AND OLD.data_giorno IS NOT NULL
+BEGIN
+    UPDATE saldi_giornalieri
+    SET variazione = variazione
+            - CASE OLD.tipo WHEN 'entrata' THEN ABS(OLD.importo) WHEN 'uscita' THEN -ABS(OLD.importo) ELSE 0 END,
+        conteggio = conteggio - 1
+    WHERE conto_id = OLD.conto_id AND giorno = OLD.data_giorno;
+
+    DELETE FROM saldi_giornalieri
+    WHERE conto_id = OLD.conto_id AND giorno = OLD.data_giorno AND conteggio <= 0;
+END;
+
+-- Un UPDATE sposta il movimento: tolto dal giorno vecchio, aggiunto al nuovo.
+-- Scatta anche per ON DELETE SET NULL sul conto (il movimento esce dallo storico)
+CREATE TRIGGER IF NOT EXISTS saldi_giornalieri_update
+AFTER UPDATE OF data, importo, tipo, conto_id ON movimenti
+BEGIN
+    UPDATE saldi_giornalieri
+    SET variazione = variazione
+            - CASE OLD.tipo WHEN 'entrata' THEN ABS(OLD.importo) WHEN 'uscita' THEN -ABS(OLD.importo) ELSE 0 END,
+        conteggio = conteggio - 1
+    WHERE conto_id = OLD.conto_id AND giorno = OLD.data_giorno;
+
+    DELETE FROM saldi_giornalieri
+    WHERE conto_id = OLD.conto_id AND giorno = OLD.data_giorno AND conteggio <= 0;
+
+    INSERT INTO saldi_giornalieri (conto_id, giorno, variazione, conteggio)
+    SELECT
+        NEW.conto_id,
+        NEW.data_giorno,
+        CASE NEW.tipo WHEN 'entrata' THEN ABS(NEW.importo) WHEN 'uscita' THEN -ABS(NEW.importo) ELSE 0 END,
+        1
+    WHERE NEW.conto_id IS NOT NULL AND NEW.data_giorno IS NOT NULL
+    ON CONFLICT (conto_id, giorno) DO UPDATE SET
+        variazione = variazione + excluded.variazione,
+        conteggio = conteggio + 1;
+END;
@@ -0,0 +1,39 @@
+-- Migration 019: Saldo iniziale dei conti e registro delle riconciliazioni
+-- Data: 2026-10-17
+--
+-- Il saldo di un conto deve essere sempre saldo_iniziale più l'effetto dei
+-- suoi movimenti (entrata +ABS(importo), uscita -ABS(importo)): la
+-- riconciliazione (backend/services/riconciliazione.py) lo verifica e,
+-- se richiesto, corregge le differenze.
+--
+-- Per i conti esistenti il saldo iniziale è ricavato dal saldo corrente:
+-- eventuali differenze accumulate fin qui diventano parte del saldo iniziale.
+
+-- Prima istruzione non idempotente: se la colonna esiste già il resto del
+-- file viene saltato
+ALTER TABLE conti ADD COLUMN saldo_iniziale REAL NOT NULL DEFAULT 0;
+
+UPDATE conti
+SET saldo_iniziale = saldo - IFNULL(
+    (SELECT SUM(variazione) FROM saldi_giornalieri WHERE conto_id = conti.id), 0
+);
+
+-- Un conto nuovo non ha movimenti: il saldo con cui nasce è il saldo iniziale
+CREATE TRIGGER IF NOT EXISTS conti_saldo_iniziale
+AFTER INSERT ON conti
+WHEN NEW.saldo_iniziale IS NOT NEW.saldo
+BEGIN
+    UPDATE conti SET saldo_iniziale = NEW.saldo WHERE id = NEW.id;
+END;
+
+-- Un'esecuzione per riga; il seq del registro_modifiche (migration 017) è il
+-- punto da cui riparte la verifica incrementale successiva
+CREATE TABLE IF NOT EXISTS riconciliazioni (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    eseguita_il TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    seq INTEGER NOT NULL,
+    completa BOOLEAN NOT NULL,
+    conti_verificati INTEGER NOT NULL,
+    discrepanze INTEGER NOT NULL,
+    corrette BOOLEAN NOT NULL
+);
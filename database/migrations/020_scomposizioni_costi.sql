@@ -0,0 +1,101 @@
+-- Migration 020: Componenti della scomposizione costi in tabella
+-- Data: 2026-10-17
+--
+-- Una riga per componente (carburante, usura, ammortamento, energia) di ogni
+-- movimento con scomposizione_json, nella forma di ScomposizioneCosto
+-- (models.py): i totali per componente, bene e periodo sono una SUM in SQL
+-- invece di leggere e decodificare ogni JSON in Python.
+-- Le righe sono mantenute dai trigger su movimenti, nella stessa transazione
+-- della scrittura del movimento; scomposizione_json resta la risposta
+-- completa di GET /movimenti/{id}/scomposizione.
+-- Per rigenerarla a blocchi: python -m backend.services.scomposizioni rebuild
+
+CREATE TABLE scomposizioni_costi (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    movimento_id INTEGER NOT NULL,
+    bene_id INTEGER,
+    nome_componente TEXT NOT NULL,               -- 'carburante', 'usura', 'ammortamento', 'energia'
+    valore_componente REAL NOT NULL,
+    unita TEXT NOT NULL DEFAULT 'EUR',
+    percentuale_totale REAL,                     -- quota del costo totale del movimento
+    metodo_calcolo TEXT,                         -- descrizione del componente
+    parametri_calcolo TEXT,                      -- dettagli (JSON)
+    creato_il TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_scomposizioni_costi_movimento ON scomposizioni_costi(movimento_id);
+CREATE INDEX IF NOT EXISTS idx_scomposizioni_costi_bene ON scomposizioni_costi(bene_id, nome_componente);
+
+-- Popolamento iniziale dai JSON esistenti (decodificati da SQLite)
+INSERT INTO scomposizioni_costi (
+    movimento_id, bene_id, nome_componente, valore_componente,
+    percentuale_totale, metodo_calcolo, parametri_calcolo
+)
+SELECT
+    m.id,
+    m.bene_id,
+    json_extract(c.value, '$.tipo'),
+    json_extract(c.value, '$.importo'),
+    CASE WHEN json_extract(m.scomposizione_json, '$.costo_totale') != 0
+        THEN ROUND(json_extract(c.value, '$.importo') * 100.0 / json_extract(m.scomposizione_json, '$.costo_totale'), 1)
+    END,
+    json_extract(c.value, '$.descrizione'),
+    json_extract(c.value, '$.dettagli')
+FROM movimenti m, json_each(m.scomposizione_json, '$.scomposizione') c
+WHERE m.scomposizione_json IS NOT NULL AND json_valid(m.scomposizione_json);
+
+-- ============================================================================
+-- Trigger di manutenzione
+-- ============================================================================
+
+CREATE TRIGGER IF NOT EXISTS scomposizioni_costi_insert
+AFTER INSERT ON movimenti
+WHEN NEW.scomposizione_json IS NOT NULL AND json_valid(NEW.scomposizione_json)
+BEGIN
+    INSERT INTO scomposizioni_costi (
+        movimento_id, bene_id, nome_componente, valore_componente,
+        percentuale_totale, metodo_calcolo, parametri_calcolo
+    )
+    SELECT
+        NEW.id,
+        NEW.bene_id,
+        json_extract(c.value, '$.tipo'),
+        json_extract(c.value, '$.importo'),
+        CASE WHEN json_extract(NEW.scomposizione_json, '$.costo_totale') != 0
+            THEN ROUND(json_extract(c.value, '$.importo') * 100.0 / json_extract(NEW.scomposizione_json, '$.costo_totale'), 1)
+        END,
+        json_extract(c.value, '$.descrizione'),
+        json_extract(c.value, '$.dettagli')
+    FROM json_each(NEW.scomposizione_json, '$.scomposizione') c;
+END;
+
+CREATE TRIGGER IF NOT EXISTS scomposizioni_costi_delete
+AFTER DELETE ON movimenti
+WHEN OLD.scomposizione_json IS NOT NULL
+BEGIN
+    DELETE FROM scomposizioni_costi WHERE movimento_id = OLD.id;
+END;
+
+-- bene_id cambia anche per ON DELETE SET NULL quando il bene viene eliminato
+CREATE TRIGGER IF NOT EXISTS scomposizioni_costi_update
+AFTER UPDATE OF scomposizione_json, bene_id ON movimenti
+BEGIN
+    DELETE FROM scomposizioni_costi WHERE movimento_id = OLD.id;
+
+    INSERT INTO scomposizioni_costi (
+        movimento_id, bene_id, nome_componente, valore_componente,
+        percentuale_totale, metodo_calcolo, parametri_calcolo
+    )
+    SELECT
+        NEW.id,
+        NEW.bene_id,
+        json_extract(c.value, '$.tipo'),
+        json_extract(c.value, '$.importo'),
+        CASE WHEN json_extract(NEW.scomposizione_json, '$.costo_totale') != 0
+            THEN ROUND(json_extract(c.value, '$.importo') * 100.0 / json_extract(NEW.scomposizione_json, '$.costo_totale'), 1)
+        END,
+        json_extract(c.value, '$.descrizione'),
+        json_extract(c.value, '$.dettagli')
+    FROM json_each(NEW.scomposizione_json, '$.scomposizione') c
+    WHERE NEW.scomposizione_json IS NOT NULL AND json_valid(NEW.scomposizione_json);
+END;
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Script per importare in blocco movimenti da file CSV o JSON
+
+Uso:
+    python import_movements.py movimenti.csv
+    python import_movements.py movimenti.json
+
+Il CSV deve avere un'intestazione con i nomi dei campi di POST /movimenti
+(data, importo, tipo, descrizione, categoria_id, conto_id, ...); il JSON una
+lista di oggetti con gli stessi campi. Il database usato è quello di
+DB_PATH, come per il backend.
+"""
+
+import csv
+import json
+import sys
+from pathlib import Path
+
+from backend.database import get_db_connection, init_db
+from backend.services.movimenti_bulk import ErroreImportazione, importa_movimenti
+
+CAMPI_INTERI = ('categoria_id', 'conto_id', 'budget_id', 'obiettivo_id', 'bene_id')
+CAMPI_DECIMALI = ('importo', 'km_percorsi', 'ore_utilizzo')
+
+
+def _converti_riga_csv(riga: dict) -> dict:
+    """Converte i campi testuali del CSV nei tipi attesi"""
+    movimento = {chiave: (valore if valore != '' else None) for chiave, valore in riga.items()}
+
+    for campo in CAMPI_INTERI:
+        if movimento.get(campo) is not None:
+            movimento[campo] = int(movimento[campo])
+    for campo in CAMPI_DECIMALI:
+        if movimento.get(campo) is not None:
+            movimento[campo] = float(movimento[campo])
+    movimento['ricorrente'] = (movimento.get('ricorrente') or '').lower() in ('1', 'true', 'sì', 'si')
+
+    return movimento
+
+
+def leggi_movimenti(percorso: Path) -> list:
+    """Legge i movimenti da un file CSV o JSON"""
+    if percorso.suffix.lower() == '.json':
+        with open(percorso, encoding='utf-8') as f:
+            return json.load(f)
+
+    with open(percorso, newline='', encoding='utf-8') as f:
+        return [_converti_riga_csv(riga) for riga in csv.DictReader(f)]
+
+
+def import_movements(percorso: Path) -> int:
+    """Importa i movimenti del file, restituisce il codice di uscita"""
+    print("="*60)
+    print("  📥 IMPORTAZIONE MOVIMENTI")
+    print("="*60)
+    print()
+
+    if not percorso.exists():
+        print(f"❌ File non trovato: {percorso}")
+        return 1
+
+    movimenti = leggi_movimenti(percorso)
+    print(f"  📄 {len(movimenti)} movimenti letti da {percorso.name}")
+
+    init_db()
+
+    with get_db_connection() as conn:
+        try:
+            risultato = importa_movimenti(conn, movimenti)
+        except ErroreImportazione as e:
+            print(f"\n❌ {e}\n")
+            for errore in e.errori:
+                print(f"  Riga {errore['riga'] + 1}: {'; '.join(errore['errori'])}")
+            return 1
+
+    print(f"\n{'='*60}")
+    print(f"  ✅ {risultato['inseriti']} MOVIMENTI INSERITI")
+    print(f"{'='*60}\n")
+    print(f"  ⏱️  {risultato['durata_ms']:.0f} ms ({risultato['righe_al_secondo']} righe/s)")
+    if risultato['indici_ricostruiti']:
+        print(f"  🔧 {risultato['indici_ricostruiti']} indici ricostruiti")
+
+    print("\n💳 Variazioni Saldi:\n")
+    for conto_id, delta in risultato['saldi_aggiornati'].items():
+        print(f"  Conto {conto_id}: {delta:+.2f}")
+    print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python import_movements.py <file.csv|file.json>")
+        sys.exit(2)
+
+    sys.exit(import_movements(Path(sys.argv[1])))
@@ -4,7 +4,8 @@ import uvicorn
 
 if __name__ == "__main__":
     uvicorn.run(
-        "backend.main:app",
+        "backend.main:create_app",
+        factory=True,
         host="127.0.0.1",
         port=8000,
         reload=True,